@@ -1,26 +1,29 @@
 from __future__ import annotations
 
 import os, json, secrets
+import logging
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Body, Request, Header, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
 from admin_auth import require_admin, issue_admin_token, ADMIN_TOKEN_COOKIE
 from security import hash_password, verify_password, sanitize_user_for_response
 from stores.pg_users_store import (
-    create_user, find_user_by_email, find_user_by_id, list_users,
+    create_user, find_user_by_email, find_user_by_id, list_users, iter_users,
     delete_user, update_user_role, update_user_password, update_user_active,
     lock_user, unlock_user, get_audit_logs,
-    log_audit, update_user_profile, update_user_fields_by_id, get_user_mfa, set_user_mfa, disable_user_mfa
+    log_audit, update_user_profile, update_user_fields_by_id, get_user_mfa, set_user_mfa, disable_user_mfa,
+    find_existing_emails, bulk_update_users, bulk_delete_users, bulk_create_users, bulk_update_profiles,
 )
 from stores.demo_users_store import read_demo_users, write_demo_users, purge_expired_demo_users # Keep for demo requests mostly
 from stores.demo_requests_store import list_demo_requests as store_list_demo_requests, approve_demo_request as store_approve_demo_request, reject_demo_request as store_reject_demo_request
 from services.mail_service import send_reset_password_email
 from utils.totp import generate_base32_secret, verify_totp
+from utils.log_index import LogFilter, LogIndex, format_log_time
 from admin_auth import get_admin_sessions, revoke_admin_session
 from user_auth import get_current_user, user_has_admin_role
 from admin_panel_gate import (
@@ -39,6 +42,9 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 DEMO_REQUESTS_FILE = DATA_DIR / "demo_requests.json"
 SYSTEM_CONFIG_FILE = DATA_DIR / "system_config.json"
 
+SYSTEM_LOG_MAX_LINES = 5000
+_log_index = LogIndex()
+
 def _now() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -134,6 +140,7 @@ class SystemConfigIn(BaseModel):
 # Router
 # ------------------------
 router = APIRouter(tags=["admin"])
+logger = logging.getLogger("miron_api")
 
 
 class AdminExchangeIn(BaseModel):
@@ -817,6 +824,17 @@ def admin_update_user(email: str, body: UpdateUserIn, admin: Dict[str, Any] = De
     return {"ok": True}
 
 
+def _hash_passwords(passwords: List[str]) -> Dict[str, str]:
+    """Her farklı şifre yalnızca bir kez hash'lenir; argon2 GIL'i bıraktığı için thread'lerde paralel."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    distinct = list(dict.fromkeys(p for p in passwords if p))
+    if len(distinct) <= 1:
+        return {p: hash_password(p) for p in distinct}
+    with ThreadPoolExecutor(max_workers=min(4, len(distinct))) as pool:
+        return dict(zip(distinct, pool.map(hash_password, distinct)))
+
+
 @router.post("/users/bulk")
 def admin_bulk_users(body: BulkUsersIn, admin: Dict[str, Any] = Depends(require_admin)):
     self_user = find_user_by_id(str(admin.get("admin_id"))) or {}
@@ -824,47 +842,46 @@ def admin_bulk_users(body: BulkUsersIn, admin: Dict[str, Any] = Depends(require_
     emails = [str(e).strip().lower() for e in body.emails if str(e).strip()]
     emails = list(dict.fromkeys(emails))
 
-    updated = 0
-    deleted = 0
-    skipped = 0
-    errors = 0
+    if body.action == "set_role" and not body.role:
+        raise HTTPException(status_code=400, detail="role gerekli.")
+    if body.action == "set_password" and not body.password:
+        raise HTTPException(status_code=400, detail="password gerekli.")
 
+    skipped_emails = set()
+    if self_email and body.action in {"delete", "suspend"}:
+        skipped_emails = {self_email} & set(emails)
+    targets = [em for em in emails if em not in skipped_emails]
+
+    # Tek set-based sorgu; şifre bir kez hash'lenir
+    try:
+        if body.action == "activate":
+            done = bulk_update_users(targets, is_active=True)
+        elif body.action == "suspend":
+            done = bulk_update_users(targets, is_active=False)
+        elif body.action == "set_role":
+            done = bulk_update_users(targets, role=body.role)
+        elif body.action == "set_password":
+            done = bulk_update_users(targets, password_hash=hash_password(body.password))
+        else:
+            done = bulk_delete_users(targets)
+        failed_status = "not_found"
+    except Exception:
+        logger.exception("Admin bulk user action failed: %s", body.action)
+        done = set()
+        failed_status = "error"
+
+    ok_status = "deleted" if body.action == "delete" else "updated"
+    details: List[Dict[str, Any]] = []
     for em in emails:
-        try:
-            if self_email and em == self_email and body.action in {"delete", "suspend"}:
-                skipped += 1
-                continue
-            if body.action == "activate":
-                if update_user_active(em, True):
-                    updated += 1
-                else:
-                    errors += 1
-            elif body.action == "suspend":
-                if update_user_active(em, False):
-                    updated += 1
-                else:
-                    errors += 1
-            elif body.action == "set_role":
-                if not body.role:
-                    raise ValueError("role_missing")
-                if update_user_role(em, body.role):
-                    updated += 1
-                else:
-                    errors += 1
-            elif body.action == "set_password":
-                if not body.password:
-                    raise ValueError("password_missing")
-                if update_user_password(em, hash_password(body.password)):
-                    updated += 1
-                else:
-                    errors += 1
-            elif body.action == "delete":
-                if delete_user(em):
-                    deleted += 1
-                else:
-                    errors += 1
-        except Exception:
-            errors += 1
+        if em in skipped_emails:
+            details.append({"email": em, "status": "skipped", "reason": "self"})
+        else:
+            details.append({"email": em, "status": ok_status if em in done else failed_status})
+
+    updated = len(done) if body.action != "delete" else 0
+    deleted = len(done) if body.action == "delete" else 0
+    skipped = len(skipped_emails)
+    errors = len(targets) - len(done)
 
     log_audit(
         str(admin.get("admin_id")),
@@ -872,7 +889,79 @@ def admin_bulk_users(body: BulkUsersIn, admin: Dict[str, Any] = Depends(require_
         "users",
         {"action": body.action, "count": len(emails), "updated": updated, "deleted": deleted, "skipped": skipped, "errors": errors},
     )
-    return {"ok": True, "total": len(emails), "updated": updated, "deleted": deleted, "skipped": skipped, "errors": errors}
+    return {
+        "ok": True,
+        "total": len(emails),
+        "updated": updated,
+        "deleted": deleted,
+        "skipped": skipped,
+        "errors": errors,
+        "details": details,
+    }
+
+
+_EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _primed(rows: Iterator[Any]) -> Iterator[Any]:
+    """İlk satırı yanıt başlamadan çeker: sorgu hatası stream ortasında değil, HTTP 500 olarak döner."""
+    import itertools
+
+    try:
+        first = next(rows)
+    except StopIteration:
+        return iter(())
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Veritabanı hatası: {e}")
+    return itertools.chain([first], rows)
+
+
+def _csv_chunks(header: List[str], rows: Iterable[List[Any]]) -> Iterator[str]:
+    import csv
+    import io
+
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(header)
+    for row in rows:
+        w.writerow(row)
+        if buf.tell() >= _EXPORT_CHUNK_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _json_chunks(prefix: str, items: Iterable[Dict[str, Any]], suffix: str, sep: str) -> Iterator[str]:
+    parts: List[str] = [prefix]
+    size = len(prefix)
+    first = True
+    for item in items:
+        piece = ("" if first else sep) + json.dumps(item, ensure_ascii=False, default=str)
+        first = False
+        parts.append(piece)
+        size += len(piece)
+        if size >= _EXPORT_CHUNK_BYTES:
+            yield "".join(parts)
+            parts, size = [], 0
+    parts.append(suffix)
+    yield "".join(parts)
+
+
+def _audited_stream(chunks: Iterator[str], counter: List[int], on_done: Callable[[int], None]) -> Iterator[str]:
+    """Export bitince (veya istemci koparsa) gönderilen satır sayısıyla audit log yazar."""
+    try:
+        yield from chunks
+    finally:
+        on_done(counter[0])
+
+
+def _counted(rows: Iterable[Any], counter: List[int]) -> Iterator[Any]:
+    for row in rows:
+        counter[0] += 1
+        yield row
 
 
 @router.get("/users/export")
@@ -883,42 +972,48 @@ def admin_export_users(
     active: Optional[bool] = None,
     admin: Dict[str, Any] = Depends(require_admin),
 ):
-    from fastapi.responses import Response
-    import csv
-    import io
-
     fmt = (format or "csv").strip().lower()
-    users = list_users(limit=50000, offset=0, role=role, search=search, is_active=active)
-    rows = [sanitize_user_for_response(u) for u in users]
+    admin_id = str(admin.get("admin_id"))
+    counter = [0]
+    users = _counted(
+        (sanitize_user_for_response(u) for u in _primed(iter_users(role=role, search=search, is_active=active))),
+        counter,
+    )
+
+    def done(n: int) -> None:
+        log_audit(admin_id, "USER_EXPORT", "users", {"format": fmt, "count": n})
 
     if fmt == "json":
-        payload = json.dumps({"users": rows}, ensure_ascii=False).encode("utf-8")
-        log_audit(str(admin.get("admin_id")), "USER_EXPORT", "users", {"format": "json", "count": len(rows)})
-        return Response(
-            content=payload,
-            media_type="application/json; charset=utf-8",
-            headers={"Content-Disposition": "attachment; filename=users.json"},
+        chunks = _json_chunks('{"users": [', users, "]}", ", ")
+        media, filename = "application/json; charset=utf-8", "users.json"
+    elif fmt == "ndjson":
+        chunks = _json_chunks("", users, "\n", "\n")
+        media, filename = "application/x-ndjson; charset=utf-8", "users.ndjson"
+    else:
+        fmt = "csv"
+        chunks = _csv_chunks(
+            ["email", "first_name", "last_name", "role", "is_active", "is_verified", "created_at", "last_login_at"],
+            (
+                [
+                    u.get("email"),
+                    u.get("first_name"),
+                    u.get("last_name"),
+                    u.get("role"),
+                    u.get("is_active"),
+                    u.get("is_verified"),
+                    u.get("created_at"),
+                    u.get("last_login_at"),
+                ]
+                for u in users
+            ),
         )
+        media, filename = "text/csv; charset=utf-8", "users.csv"
 
-    buf = io.StringIO()
-    w = csv.writer(buf)
-    w.writerow(["email", "first_name", "last_name", "role", "is_active", "is_verified", "created_at", "last_login_at"])
-    for u in rows:
-        w.writerow(
-            [
-                u.get("email"),
-                u.get("first_name"),
-                u.get("last_name"),
-                u.get("role"),
-                u.get("is_active"),
-                u.get("is_verified"),
-                u.get("created_at"),
-                u.get("last_login_at"),
-            ]
-        )
-    data = buf.getvalue().encode("utf-8")
-    log_audit(str(admin.get("admin_id")), "USER_EXPORT", "users", {"format": "csv", "count": len(rows)})
-    return Response(content=data, media_type="text/csv; charset=utf-8", headers={"Content-Disposition": "attachment; filename=users.csv"})
+    return StreamingResponse(
+        _audited_stream(chunks, counter, done),
+        media_type=media,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 
 @router.get("/export-consents/{user_id}")
@@ -927,52 +1022,45 @@ def admin_export_legal_consents_csv(
     admin: Dict[str, Any] = Depends(require_admin),
 ):
     """Kullanıcıya ait yasal onay kayıtlarını CSV olarak dışa aktarır (KVKK / denetim)."""
-    from fastapi.responses import Response
-    import csv
-    import io
+    from db import iter_query
 
-    from db import get_db_cursor
-
-    buf = io.StringIO()
-    w = csv.writer(buf)
-    w.writerow(["user_id", "agreement_type", "agreed_at", "ip_address", "document_version_hash"])
-    try:
-        with get_db_cursor() as cur:
-            cur.execute(
+    admin_id = str(admin.get("admin_id"))
+    counter = [0]
+    rows = _counted(
+        _primed(
+            iter_query(
                 """
-                SELECT user_id::text, agreement_type, agreed_at, COALESCE(ip_address, ''), document_version_hash
+                SELECT user_id::text, agreement_type, agreed_at, COALESCE(ip_address, '') AS ip_address, document_version_hash
                 FROM legal_consents
                 WHERE user_id = %s::uuid
                 ORDER BY agreed_at ASC
                 """,
                 (user_id,),
             )
-            rows = cur.fetchall()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Veritabanı hatası: {e}")
+        ),
+        counter,
+    )
 
-    for row in rows:
+    def to_csv_row(row: Dict[str, Any]) -> List[Any]:
         agreed = row.get("agreed_at")
         agreed_s = agreed.isoformat() if hasattr(agreed, "isoformat") else str(agreed or "")
-        w.writerow(
-            [
-                row.get("user_id"),
-                row.get("agreement_type"),
-                agreed_s,
-                row.get("ip_address") or "",
-                row.get("document_version_hash") or "",
-            ]
-        )
-
-    data = buf.getvalue().encode("utf-8")
-    log_audit(
-        str(admin.get("admin_id")),
-        "LEGAL_CONSENTS_EXPORT",
-        "legal",
-        {"user_id": user_id, "rows": len(rows)},
+        return [
+            row.get("user_id"),
+            row.get("agreement_type"),
+            agreed_s,
+            row.get("ip_address") or "",
+            row.get("document_version_hash") or "",
+        ]
+
+    def done(n: int) -> None:
+        log_audit(admin_id, "LEGAL_CONSENTS_EXPORT", "legal", {"user_id": user_id, "rows": n})
+
+    chunks = _csv_chunks(
+        ["user_id", "agreement_type", "agreed_at", "ip_address", "document_version_hash"],
+        (to_csv_row(r) for r in rows),
     )
-    return Response(
-        content=data,
+    return StreamingResponse(
+        _audited_stream(chunks, counter, done),
         media_type="text/csv; charset=utf-8",
         headers={"Content-Disposition": f"attachment; filename=legal_consents_{user_id}.csv"},
     )
@@ -981,65 +1069,112 @@ def admin_export_legal_consents_csv(
 @router.post("/users/import")
 def admin_import_users(body: ImportUsersIn, admin: Dict[str, Any] = Depends(require_admin)):
     mode = (body.mode or "skip").strip().lower()
-    created = 0
-    updated = 0
-    skipped = 0
-    errors = 0
     details: List[Dict[str, Any]] = []
+    parsed: List[Dict[str, Any]] = []
+    seen_emails = set()
+    skipped = 0
 
     for raw in body.users:
+        raw = raw or {}
+        email = str(raw.get("email") or "").strip().lower()
+        if not email:
+            skipped += 1
+            continue
+        if email in seen_emails:
+            skipped += 1
+            details.append({"email": email, "status": "skipped", "reason": "duplicate_in_payload"})
+            continue
+        seen_emails.add(email)
+        role = str(raw.get("role") or "user").strip().lower()
+        if role not in {"user", "admin", "demo"}:
+            role = "user"
+        fn = str(raw.get("firstName") or raw.get("first_name") or "").strip()
+        ln = str(raw.get("lastName") or raw.get("last_name") or "").strip()
+        un = str(raw.get("username") or "").strip()
+        if un and (not fn and not ln):
+            parts = un.split()
+            fn = parts[0]
+            ln = " ".join(parts[1:]) if len(parts) > 1 else ""
+        pw = raw.get("password")
+        parsed.append({
+            "email": email,
+            "first_name": fn,
+            "last_name": ln,
+            "role": role,
+            "is_active": bool(raw.get("is_active", True)),
+            "password": str(pw) if pw else None,
+        })
+
+    try:
+        existing = find_existing_emails([r["email"] for r in parsed])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Veritabanı hatası: {e}")
+
+    to_create: List[Dict[str, Any]] = []
+    to_update: List[Dict[str, Any]] = []
+    outcome: Dict[str, Dict[str, Any]] = {}
+    for r in parsed:
+        if r["email"] in existing:
+            if mode == "skip":
+                outcome[r["email"]] = {"email": r["email"], "status": "skipped", "reason": "exists"}
+            else:
+                to_update.append(r)
+        elif not r["password"]:
+            outcome[r["email"]] = {"email": r["email"], "status": "skipped", "reason": "missing_password"}
+        else:
+            to_create.append(r)
+
+    # Aynı şifre birden çok kullanıcıya uygulanıyorsa tek hash
+    hashes = _hash_passwords([r["password"] for r in to_create + to_update])
+    for r in to_create + to_update:
+        r["password_hash"] = hashes.get(r["password"]) if r["password"] else None
+
+    created = 0
+    updated = 0
+    errors = 0
+    if to_create:
         try:
-            email = str((raw or {}).get("email") or "").strip().lower()
-            if not email:
-                skipped += 1
-                continue
-            role = str((raw or {}).get("role") or "user").strip().lower()
-            if role not in {"user", "admin", "demo"}:
-                role = "user"
-            is_active = bool((raw or {}).get("is_active", True))
-            fn = str((raw or {}).get("firstName") or (raw or {}).get("first_name") or "").strip()
-            ln = str((raw or {}).get("lastName") or (raw or {}).get("last_name") or "").strip()
-            un = str((raw or {}).get("username") or "").strip()
-            if un and (not fn and not ln):
-                parts = un.split()
-                fn = parts[0]
-                ln = " ".join(parts[1:]) if len(parts) > 1 else ""
-
-            pw = (raw or {}).get("password")
-            existing = find_user_by_email(email)
-            if existing:
-                if mode == "skip":
-                    skipped += 1
-                    continue
-                if update_user_profile(email, first_name=fn, last_name=ln, role=role, is_active=is_active):
-                    updated += 1
-                if pw:
-                    update_user_password(email, hash_password(str(pw)))
-                details.append({"email": email, "status": "updated"})
-                continue
-
-            if not pw:
-                skipped += 1
-                details.append({"email": email, "status": "skipped", "reason": "missing_password"})
-                continue
-            uid = create_user(
-                {
-                    "email": email,
-                    "firstName": fn,
-                    "lastName": ln,
-                    "hashed_password": hash_password(str(pw)),
-                    "role": role,
-                    "is_active": is_active,
-                }
-            )
-            created += 1
-            details.append({"email": email, "status": "created", "id": uid})
+            ids = bulk_create_users(to_create)
         except Exception as e:
+            logger.exception("Admin import: bulk create failed")
+            ids = None
+            for r in to_create:
+                outcome[r["email"]] = {"email": r["email"], "status": "error", "reason": str(e)}
+        if ids is not None:
+            for r in to_create:
+                uid = ids.get(r["email"])
+                if uid:
+                    created += 1
+                    outcome[r["email"]] = {"email": r["email"], "status": "created", "id": uid}
+                else:
+                    # Bu arada başka bir istekle oluşturulmuş
+                    outcome[r["email"]] = {"email": r["email"], "status": "skipped", "reason": "exists"}
+    if to_update:
+        try:
+            done = bulk_update_profiles(to_update)
+        except Exception as e:
+            logger.exception("Admin import: bulk update failed")
+            done = None
+            for r in to_update:
+                outcome[r["email"]] = {"email": r["email"], "status": "error", "reason": str(e)}
+        if done is not None:
+            for r in to_update:
+                if r["email"] in done:
+                    updated += 1
+                    outcome[r["email"]] = {"email": r["email"], "status": "updated"}
+                else:
+                    outcome[r["email"]] = {"email": r["email"], "status": "error", "reason": "not_found"}
+
+    for r in parsed:
+        o = outcome[r["email"]]
+        details.append(o)
+        if o["status"] == "skipped":
+            skipped += 1
+        elif o["status"] == "error":
             errors += 1
-            details.append({"email": str((raw or {}).get("email") or ""), "status": "error", "reason": str(e)})
 
     log_audit(str(admin.get("admin_id")), "USER_IMPORT", "users", {"mode": mode, "created": created, "updated": updated, "skipped": skipped, "errors": errors})
-    return {"ok": True, "created": created, "updated": updated, "skipped": skipped, "errors": errors, "details": details[:200]}
+    return {"ok": True, "created": created, "updated": updated, "skipped": skipped, "errors": errors, "details": details}
 
 
 @router.get("/sessions")
@@ -1086,17 +1221,37 @@ def get_audit_logs_endpoint(user_id: Optional[str] = None, limit: int = 100):
 # ------------------------
 @router.get("/logs/system", dependencies=[Depends(require_admin)])
 def get_system_logs(lines: int = 200):
-    log_file = Path("backend_access.log")
-    if not log_file.exists():
+    lines = max(1, min(lines, SYSTEM_LOG_MAX_LINES))
+    if not _log_index.files():
         return {"logs": ["Log dosyası bulunamadı."]}
-    
+
     try:
-        with log_file.open("r", encoding="utf-8") as f:
-            all_lines = f.readlines()
-            return {"logs": all_lines[-lines:]}
+        # Sondan geriye blok blok okunur; dosya boyutundan bağımsız
+        return {"logs": _log_index.tail(lines)}
     except Exception as e:
         return {"logs": [f"Log okuma hatası: {e}"]}
 
+@router.get("/logs/query", dependencies=[Depends(require_admin)])
+def query_system_logs(
+    level: Optional[str] = None,
+    path: Optional[str] = None,
+    request_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 200,
+):
+    """JSON access log'unda filtreli arama (en yeni önce). Sidecar offset indeksi
+    sayesinde yalnızca zaman aralığı/seviyesi uyabilecek bloklar okunur."""
+    flt = LogFilter(
+        level=level,
+        path=path,
+        request_id=request_id,
+        since=format_log_time(since) if since else None,
+        until=format_log_time(until) if until else None,
+    )
+    items = _log_index.query(flt, limit=max(1, min(limit, SYSTEM_LOG_MAX_LINES)))
+    return {"items": items, "count": len(items)}
+
 @router.get("/config", dependencies=[Depends(require_admin)])
 def get_system_config():
     return _load_json(
@@ -6,7 +6,8 @@ import psycopg2
 from psycopg2 import pool, extensions
 from psycopg2.extras import RealDictCursor
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Dict, Generator, Iterator, Optional, Sequence
+import uuid
 from dotenv import load_dotenv
 from fastapi import HTTPException
 from config import settings
@@ -270,6 +271,29 @@ def get_db_cursor(write: bool = True) -> Generator[RealDictCursor, None, None]:
             except Exception as e:
                 logger.error(f"Failed to return connection to pool: {e}")
 
+STREAM_ITERSIZE = 2000
+
+
+def iter_query(
+    sql: str,
+    params: Optional[Sequence[Any]] = None,
+    write: bool = False,
+    itersize: int = STREAM_ITERSIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Server-side (named) cursor ile satırları akıtır: sunucudan `itersize`'lık
+    FETCH'ler halinde gelir, bellek kullanımı sonuç boyutundan bağımsızdır.
+    Generator erken kapatılırsa cursor kapanır, bağlantı havuza döner
+    (havuz açık transaction'ı rollback eder).
+    """
+    with get_db_cursor(write=write) as cur:
+        name = f"stream_{uuid.uuid4().hex[:16]}"
+        with cur.connection.cursor(name=name, cursor_factory=RealDictCursor) as named:
+            named.itersize = itersize
+            named.execute(sql, params)
+            for row in named:
+                yield row
+
 def init_db():
     """
     Initialize database with schema if needed.
@@ -11,10 +11,6 @@ from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 from uyap_udf import _build_udf, _safe_filename
 
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-
 from openai_client import get_openai_client
 from llm_gateway import chat_completions_create
 from user_auth import get_current_user
@@ -627,6 +623,10 @@ def export_doc(req: ExportRequest, user: Dict[str, Any] = Depends(get_current_us
             )
 
         # ✅ DOCX
+        from docx import Document
+        from docx.shared import Pt
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
         doc = Document()
         style = doc.styles["Normal"]
         style.font.name = "Calibri"
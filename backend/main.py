@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import io
+import asyncio
 import os
 import re
 import sys
@@ -8,16 +9,13 @@ import datetime
 import pathlib
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Body, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Body, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-import pdfplumber
-from docx import Document
-
 # ---------------------------
 # PATH FIX (cwd bağımsız)
 # ---------------------------
@@ -271,6 +269,14 @@ async def startup_event():
         from schema import ensure_schema
 
         ensure_schema()
+        try:
+            from stores.pg_chats_store import purge_expired_chats
+
+            purge_expired_chats()
+        except Exception as _purge_exc:
+            from logger_utils import get_logger as _gl
+
+            _gl("miron.startup").warning("expired chat purge skipped", extra={"error": str(_purge_exc)})
         try:
             from services.legal_cms_service import seed_v1_if_empty
 
@@ -294,8 +300,17 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    # Kuyrukta bekleyen e-postaları gönder, worker'ları durdur
+    from services.mail_queue import mail_queue
+    await asyncio.to_thread(mail_queue.close, 5.0)
+    # Kuyruktaki audit olaylarını yaz
+    from services.audit_queue import audit_queue
+    await asyncio.to_thread(audit_queue.close, 5.0)
     close_pool()
     await async_db.close_pools()
+    # Kuyruktaki log kayıtlarını dosyaya/stdout'a yaz
+    from middleware.logging import stop_log_listener
+    stop_log_listener()
 
 # ---------------------------
 # CORS
@@ -491,8 +506,13 @@ def api_health():
 # ROUTER IMPORTS (opsiyonel)
 # ---------------------------
 import importlib
+import time as _time
+
+# Router modülü başına import süresi (ms); scripts/import_profile.py raporlar
+ROUTER_IMPORT_MS: dict[str, float] = {}
 
 def _safe_import(path: str, name: str = "router"):
+    t0 = _time.perf_counter()
     try:
         mod = importlib.import_module(path)
         return getattr(mod, name)
@@ -503,6 +523,8 @@ def _safe_import(path: str, name: str = "router"):
             extra={"import_path": path, "attr": name, "error": str(e)},
         )
         return None
+    finally:
+        ROUTER_IMPORT_MS.setdefault(path, round((_time.perf_counter() - t0) * 1000, 1))
 
 
 assistant_router = _safe_import("assistant_routes", "router")
@@ -721,6 +743,8 @@ def extract_text(filename: str, data: bytes):
 
     if fn.endswith(".pdf"):
         try:
+            import pdfplumber
+
             with pdfplumber.open(io.BytesIO(data)) as pdf:
                 return "\n".join([(page.extract_text() or "") for page in pdf.pages])
         except Exception:
@@ -728,6 +752,8 @@ def extract_text(filename: str, data: bytes):
 
     if fn.endswith(".docx"):
         try:
+            from docx import Document
+
             doc = Document(io.BytesIO(data))
             return "\n".join([p.text for p in doc.paragraphs])
         except Exception:
@@ -1022,20 +1048,42 @@ class ChatUpsertReq(BaseModel):
     name: str = Field(default="Yeni sohbet", max_length=120)
     messages: list = []
 
+class ChatAppendReq(BaseModel):
+    messages: list = Field(..., min_length=1, max_length=20)
+    name: Optional[str] = Field(default=None, max_length=120)
+
 class ChatRenameReq(BaseModel):
     name: str = Field(..., min_length=1, max_length=120)
 
 try:
-    from stores.pg_chats_store import list_chats, get_chat, upsert_chat, rename_chat, delete_chat as delete_chat_db
+    from stores.pg_chats_store import list_chats, get_chat, upsert_chat, append_messages, rename_chat, delete_chat as delete_chat_db
     _chats_store_ok = True
 except Exception:
     _chats_store_ok = False
 
 @app.get("/api/chats")
-def api_list_chats(user: dict = Depends(get_current_user)):
+def api_list_chats(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, max_length=200),
+    user: dict = Depends(get_current_user),
+):
+    """Sohbet listesi: yalnızca metadata, (updated_at, id) keyset sayfalama."""
     if not _chats_store_ok:
-        return {"chats": []}
-    return {"chats": list_chats(str(user["id"]))}
+        return {"chats": [], "next_cursor": None}
+    try:
+        chats, next_cursor = list_chats(str(user["id"]), limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz cursor.")
+    return {"chats": chats, "next_cursor": next_cursor}
+
+@app.get("/api/chats/{chat_id}")
+def api_get_chat(chat_id: int, user: dict = Depends(get_current_user)):
+    if not _chats_store_ok:
+        raise HTTPException(status_code=404, detail="Sohbet bulunamadı.")
+    chat = get_chat(str(user["id"]), chat_id)
+    if chat is None:
+        raise HTTPException(status_code=404, detail="Sohbet bulunamadı.")
+    return chat
 
 @app.post("/api/chats")
 def api_upsert_chat(req: ChatUpsertReq, user: dict = Depends(get_current_user)):
@@ -1044,6 +1092,16 @@ def api_upsert_chat(req: ChatUpsertReq, user: dict = Depends(get_current_user)):
     upsert_chat(str(user["id"]), req.chat_id, req.name, req.messages)
     return {"status": "ok"}
 
+@app.post("/api/chats/{chat_id}/messages")
+def api_append_chat_messages(chat_id: int, req: ChatAppendReq, user: dict = Depends(get_current_user)):
+    """Bir turun mesajlarını sohbetin sonuna ekler; önceki mesajlar yeniden yazılmaz."""
+    if not _chats_store_ok:
+        return {"status": "ok"}
+    count = append_messages(str(user["id"]), chat_id, req.messages, req.name)
+    if count is None:
+        raise HTTPException(status_code=404, detail="Sohbet bulunamadı.")
+    return {"status": "ok", "messageCount": count}
+
 @app.put("/api/chats/{chat_id}/rename")
 def api_rename_chat(chat_id: int, req: ChatRenameReq, user: dict = Depends(get_current_user)):
     if not _chats_store_ok:
@@ -1067,9 +1125,13 @@ async def parse_file(file: UploadFile = File(...), _user: dict = Depends(require
     text = ""
     try:
         if name.lower().endswith(".pdf"):
+            import pdfplumber
+
             with pdfplumber.open(io.BytesIO(raw)) as pdf:
                 text = "\n".join(page.extract_text() or "" for page in pdf.pages[:30])
         elif name.lower().endswith((".docx", ".doc")):
+            from docx import Document
+
             doc = Document(io.BytesIO(raw))
             text = "\n".join(p.text for p in doc.paragraphs)
         else:
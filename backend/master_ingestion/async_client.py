@@ -1,19 +1,49 @@
 import asyncio
+import os
 import random
 import logging
 import aiohttp
 from typing import Optional, Dict, Any, List
+from urllib.parse import urlsplit
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("async_client")
 
+class TokenBucket:
+    """
+    Politeness budget for a single host: `rate` requests/second on average,
+    with bursts of up to `capacity` back-to-back requests.
+    """
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters for the same host queue on this lock; other hosts are unaffected.
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            if self.updated is not None:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self.tokens = 0.0
+            self.updated = loop.time()
+
 class AsyncClient:
-    def __init__(self, rate_limit: float = 1.0):
+    def __init__(self, rate_limit: float = 1.0, burst: int = 1):
+        # rate_limit is the minimum average interval (seconds) between requests to one host.
         self.rate_limit = rate_limit
-        self.last_request_time = 0
+        self.burst = burst
         self.session: Optional[aiohttp.ClientSession] = None
-        self.lock = asyncio.Lock()
+        self.buckets: Dict[str, TokenBucket] = {}
         
     async def init(self):
         if not self.session:
@@ -27,14 +57,14 @@ class AsyncClient:
             await self.session.close()
             self.session = None
 
-    async def _wait_for_rate_limit(self):
-        async with self.lock:
-            now = asyncio.get_event_loop().time()
-            elapsed = now - self.last_request_time
-            if elapsed < self.rate_limit:
-                wait_time = self.rate_limit - elapsed + random.uniform(0.1, 0.5)
-                await asyncio.sleep(wait_time)
-            self.last_request_time = asyncio.get_event_loop().time()
+    async def _wait_for_rate_limit(self, url: str):
+        if self.rate_limit <= 0:
+            return
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(1.0 / self.rate_limit, self.burst)
+        await bucket.acquire()
 
     def _get_headers(self) -> Dict[str, str]:
         # Rotation
@@ -56,7 +86,7 @@ class AsyncClient:
     )
     async def fetch(self, url: str, method: str = "GET", **kwargs) -> Dict[str, Any]:
         if not self.session: await self.init()
-        await self._wait_for_rate_limit()
+        await self._wait_for_rate_limit(url)
         
         headers = self._get_headers()
         if "headers" in kwargs:
@@ -70,15 +100,26 @@ class AsyncClient:
                         response.request_info, response.history, status=response.status
                     )
                 
+                # Validators for conditional re-fetches (If-None-Match / If-Modified-Since)
+                validators = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                if response.status == 304:
+                    return {"type": "not_modified", "data": None, "status": 304, "headers": validators}
+
                 try:
                     data = await response.json()
-                    return {"type": "json", "data": data, "status": response.status}
+                    return {"type": "json", "data": data, "status": response.status, "headers": validators}
                 except:
                     text = await response.text()
-                    return {"type": "html", "data": text, "status": response.status}
+                    return {"type": "html", "data": text, "status": response.status, "headers": validators}
                     
         except Exception as e:
             logger.error(f"Fetch failed {url}: {e}")
             raise e
 
-client = AsyncClient()
+client = AsyncClient(
+    rate_limit=float(os.getenv("CRAWLER_HOST_INTERVAL", "1.0")),
+    burst=int(os.getenv("CRAWLER_HOST_BURST", "1")),
+)
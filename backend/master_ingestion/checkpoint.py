@@ -1,5 +1,6 @@
 import json
 import os
+import time
 import logging
 from typing import Dict, Any, Optional
 
@@ -7,9 +8,17 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("checkpoint")
 
 class CheckpointManager:
-    def __init__(self, filepath: str = "backend/storage/crawl_checkpoint.json"):
+    """
+    Per-source crawl cursor (last_page, backfilled). Page updates are
+    coalesced and written at most every `flush_interval` seconds; per-URL
+    state lives in the crawl_frontier table, not here.
+    """
+    def __init__(self, filepath: str = "backend/storage/crawl_checkpoint.json", flush_interval: float = 30.0):
         self.filepath = filepath
+        self.flush_interval = flush_interval
         self.data = self._load()
+        self._dirty = False
+        self._last_flush = time.monotonic()
 
     def _load(self) -> Dict[str, Any]:
         if os.path.exists(self.filepath):
@@ -24,18 +33,36 @@ class CheckpointManager:
     def save(self):
         try:
             os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
-            with open(self.filepath, "w") as f:
+            tmp = f"{self.filepath}.tmp"
+            with open(tmp, "w") as f:
                 json.dump(self.data, f, indent=2)
+            os.replace(tmp, self.filepath)
+            self._dirty = False
+            self._last_flush = time.monotonic()
         except Exception as e:
             logger.error(f"Failed to save checkpoint: {e}")
 
+    def flush(self):
+        if self._dirty:
+            self.save()
+
+    def _maybe_flush(self):
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.save()
+
     def update_page(self, source: str, page: int):
-        if source not in self.data:
-            self.data[source] = {}
-        self.data[source]["last_page"] = page
-        self.save()
+        self.data.setdefault(source, {})["last_page"] = page
+        self._maybe_flush()
 
     def get_last_page(self, source: str) -> int:
         return self.data.get(source, {}).get("last_page", 1)
 
+    def mark_backfilled(self, source: str):
+        self.data.setdefault(source, {})["backfilled"] = True
+        self.save()
+
+    def is_backfilled(self, source: str) -> bool:
+        return bool(self.data.get(source, {}).get("backfilled"))
+
 checkpoint = CheckpointManager()
@@ -21,6 +21,7 @@ from master_ingestion.endpoint_resolver import AYMEndpointResolver
 from master_ingestion.persistence import persistence
 from master_ingestion.async_client import client
 from master_ingestion.checkpoint import checkpoint
+from master_ingestion.frontier import frontier
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("crawler_engine")
@@ -28,11 +29,30 @@ logger = logging.getLogger("crawler_engine")
 class CrawlerEngine:
     def __init__(self):
         self.target_count = 80000
+        # Steady-state cycle: head scan until this many all-known listing
+        # pages, then re-fetch whatever the frontier says is due.
+        self.known_page_limit = int(os.getenv("CRAWLER_KNOWN_PAGE_LIMIT", "2"))
+        self.recrawl_batch = int(os.getenv("CRAWLER_RECRAWL_BATCH", "200"))
+        self.cycle_interval = int(os.getenv("CRAWLER_CYCLE_INTERVAL", "600"))
         # Register all known AYM subdomains
         self.resolvers = [
-            AYMEndpointResolver("kararlarbilgibankasi"),
-            AYMEndpointResolver("normkararlarbilgibankasi")
+            AYMEndpointResolver("kararlarbilgibankasi", frontier=frontier),
+            AYMEndpointResolver("normkararlarbilgibankasi", frontier=frontier)
         ] 
+
+    async def _save_docs(self, resolver, docs) -> int:
+        """Persists docs; only those that did not error are confirmed to the frontier."""
+        saved_count = 0
+        settled = []
+        for doc in docs:
+            result = await persistence.store_decision(doc)
+            if result == "error":
+                continue
+            settled.append(doc)
+            if result == "inserted":
+                saved_count += 1
+        await resolver.confirm(settled)
+        return saved_count
         
     async def run(self):
         print("--- 🚀 MASTER INGESTION ENGINE STARTED (RESILIENT MODE) ---")
@@ -57,22 +77,23 @@ class CrawlerEngine:
                         if total_valid >= self.target_count: break
                         
                         source_key = resolver.subdomain
-                        start_page = checkpoint.get_last_page(source_key)
+                        backfilled = checkpoint.is_backfilled(source_key)
+                        # Initial backfill walks every page from the checkpoint;
+                        # afterwards only the head of the listing is scanned.
+                        start_page = 1 if backfilled else checkpoint.get_last_page(source_key)
+                        stop_after_known = self.known_page_limit if backfilled else None
                         
                         logger.info(f"Scanning Subdomain: {source_key} starting from page {start_page}...")
                         
                         try:
                             # Async generator usage
-                            async for page, docs in resolver.traverse_pages(start_page=start_page):
-                                saved_count = 0
-                                for doc in docs:
-                                    saved = await persistence.save_decision(doc)
-                                    if saved:
-                                        saved_count += 1
-                                        total_valid += 1
+                            async for page, docs in resolver.traverse_pages(start_page=start_page, stop_after_known=stop_after_known):
+                                saved_count = await self._save_docs(resolver, docs)
+                                total_valid += saved_count
                                 
                                 # Update Checkpoint after processing page
-                                checkpoint.update_page(source_key, page + 1)
+                                if not backfilled:
+                                    checkpoint.update_page(source_key, page + 1)
                                 
                                 if saved_count > 0:
                                     if total_valid % 10 == 0:
@@ -80,14 +101,23 @@ class CrawlerEngine:
                                 
                                 if total_valid >= self.target_count:
                                     break
+
+                            if not backfilled and resolver.reached_end:
+                                checkpoint.mark_backfilled(source_key)
+
+                            # Changed-decision pass driven by the frontier schedule
+                            docs = await resolver.recrawl_due(self.recrawl_batch)
+                            total_valid += await self._save_docs(resolver, docs)
                                     
                         except Exception as e:
                             logger.error(f"Crawler Error on {source_key}: {e}")
                             await asyncio.sleep(10) # Backoff
+                        finally:
+                            checkpoint.flush()
                         
                     if total_valid < self.target_count:
-                        print("Cycle finished (all pages scanned). Waiting before restart...")
-                        await asyncio.sleep(600) # Wait 10 mins before rescanning for new content
+                        print("Cycle finished (caught up with new content). Waiting before restart...")
+                        await asyncio.sleep(self.cycle_interval)
                 
                 break # Exit main loop if target reached
 
@@ -1,31 +1,157 @@
 import logging
 import asyncio
+import hashlib
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timezone
 from typing import List, Dict, Any, AsyncGenerator, Optional, Tuple
 from bs4 import BeautifulSoup
-from master_ingestion.async_client import client
+from master_ingestion.async_client import AsyncClient, client
 from master_ingestion.decision_validator import validator
+from master_ingestion.frontier import conditional_headers, is_due, next_interval
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("resolvers.aym")
 
+DETAIL_PATTERNS = ["/BB/", "/Norm/", "/ND/", "/Karar/"]
+
+# BeautifulSoup/html.parser is pure Python, so parsing runs in worker
+# processes to keep it off the event loop and off the GIL.
+_parse_pool: Optional[Executor] = None
+
+def _default_parse_pool() -> Executor:
+    global _parse_pool
+    if _parse_pool is None:
+        workers = int(os.getenv("AYM_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+        _parse_pool = ProcessPoolExecutor(max_workers=max(1, workers))
+    return _parse_pool
+
+def parse_listing(html: str, base_url: str) -> Dict[str, Any]:
+    """
+    Extracts decision detail links from a listing page.
+    Returns {"title", "links", "has_pagination"}.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    page_title = soup.title.get_text(strip=True) if soup.title else "No Title"
+
+    # Selector strategy: Find ALL links that look like decision details
+    # Patterns: /BB/..., /Norm/..., /ND/..., /Karar/...
+    unique_links = set()
+    for link in soup.find_all("a", href=True):
+        href = link['href']
+
+        # Check valid patterns
+        if not any(x in href for x in DETAIL_PATTERNS):
+            continue
+
+        # Filter out non-detail links
+        if "Dil=" in href or "Siralama" in href: continue
+
+        # Normalize URL
+        if href.startswith("/"):
+            full_url = f"{base_url}{href}"
+        else:
+            full_url = href
+
+        unique_links.add(full_url)
+
+    return {
+        "title": page_title,
+        "links": sorted(unique_links),
+        "has_pagination": bool(soup.select(".pagination")),
+    }
+
+def parse_detail(html: str, url: str) -> Dict[str, Any]:
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Content Selector
+    content_div = soup.find('div', class_='karar-metni') or soup.find('div', id='content') or soup.find('article')
+
+    # Metadata
+    # .kararbilgileri contains: "2025/10406 | Esas (İhlal)| ..."
+    info_div = soup.find(class_='kararbilgileri')
+    info_text = info_div.get_text(strip=True) if info_div else ""
+
+    # Title
+    title_div = soup.find(class_='bkararbaslik')
+    title = title_div.get_text(strip=True) if title_div else ""
+
+    if not content_div:
+         # Try to extract text from body if specific div missing
+         # But exclude nav/footer
+         for tag in soup.select("nav, footer, .header, .sidebar"):
+             tag.decompose()
+         full_text = soup.get_text(separator="\n", strip=True)
+    else:
+        full_text = content_div.get_text(separator="\n", strip=True)
+
+    # Basic parsing of info_text
+    # "2025/10406 | Esas (İhlal)| ..."
+    parts = info_text.split('|')
+    dec_no = parts[0].strip() if parts else None
+
+    return {
+        "source": "AYM",
+        "court": "Anayasa Mahkemesi",
+        "decision_date": None, # Extract from info_text if possible
+        "decision_no": dec_no,
+        "full_text": full_text,
+        "raw_json": {"info": info_text, "title": title},
+        "hash": hashlib.sha256(full_text.encode('utf-8')).hexdigest(),
+        "source_url": url,
+        "summary": full_text[:500],
+        "referenced_laws": [],
+        "citation_count": 0
+    }
+
 class AYMEndpointResolver:
-    def __init__(self, subdomain: str = "kararlarbilgibankasi"):
+    def __init__(
+        self,
+        subdomain: str = "kararlarbilgibankasi",
+        concurrency: Optional[int] = None,
+        base_url: Optional[str] = None,
+        http_client: Optional[AsyncClient] = None,
+        parse_executor: Optional[Executor] = None,
+        frontier=None,
+    ):
         self.subdomain = subdomain
-        self.base_url = f"https://{subdomain}.anayasa.gov.tr"
-        
-    async def traverse_pages(self, start_page: int = 1) -> AsyncGenerator[Tuple[int, List[Dict[str, Any]]], None]:
+        self.base_url = base_url or f"https://{subdomain}.anayasa.gov.tr"
+        # Max detail requests in flight; the per-host token bucket in the
+        # client still caps the request rate.
+        self.concurrency = concurrency or int(os.getenv("AYM_DETAIL_CONCURRENCY", "8"))
+        self.client = http_client or client
+        self._parse_executor = parse_executor
+        # Optional URL frontier (see master_ingestion.frontier). Without one
+        # every detail link is fetched unconditionally.
+        self.frontier = frontier
+        # Frontier outcomes of returned docs, keyed by URL; written only once
+        # the caller confirms the doc was persisted (see confirm()).
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self.reached_end = False
+
+    async def _parse(self, fn, *args):
+        executor = self._parse_executor or _default_parse_pool()
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    async def traverse_pages(
+        self, start_page: int = 1, stop_after_known: Optional[int] = None
+    ) -> AsyncGenerator[Tuple[int, List[Dict[str, Any]]], None]:
         """
         Yields (page_number, list_of_docs)
+        With a frontier and stop_after_known=N, traversal stops once N
+        consecutive listing pages contain only URLs that are already known
+        and not yet due (incremental head scan).
         """
         logger.info(f"Resolving AYM ({self.subdomain}) via Pagination starting at {start_page}...")
-        
+
         page = start_page
         consecutive_empty = 0
-        
+        consecutive_known = 0
+        self.reached_end = False
+
         while True:
             url = f"{self.base_url}/?page={page}"
-            page_docs = []
-            
+
             try:
                 # Browser-like headers for HTML navigation
                 headers = {
@@ -36,80 +162,63 @@ class AYMEndpointResolver:
                     "Sec-Fetch-Site": "none",
                     "Sec-Fetch-User": "?1"
                 }
-                resp = await client.fetch(url, headers=headers)
-                
+                resp = await self.client.fetch(url, headers=headers)
+
                 if isinstance(resp, dict) and resp.get("status") != 200:
                     logger.warning(f"Status {resp.get('status')} on page {page}. Stopping.")
                     break
-                
+
                 if resp["type"] == "html":
-                    soup = BeautifulSoup(resp["data"], 'html.parser')
-                    
+                    listing = await self._parse(parse_listing, resp["data"], self.base_url)
+
                     # Debug: Check if we are blocked
-                    page_title = soup.title.get_text(strip=True) if soup.title else "No Title"
+                    page_title = listing["title"]
                     if "captcha" in page_title.lower() or "security" in page_title.lower():
                         logger.warning(f"Blocked (Captcha) on page {page}. Title: {page_title}")
                         break
-                        
-                    # Extract Links
-                    # Selector strategy: Find ALL links that look like decision details
-                    # Patterns: /BB/..., /Norm/..., /ND/..., /Karar/...
-                    all_links = soup.find_all("a", href=True)
-                    
-                    unique_links = set()
-                    
-                    for link in all_links:
-                        href = link['href']
-                        
-                        # Check valid patterns
-                        if not any(x in href for x in ["/BB/", "/Norm/", "/ND/", "/Karar/"]):
-                            continue
-                            
-                        # Filter out non-detail links
-                        if "Dil=" in href or "Siralama" in href: continue
-                        
-                        # Normalize URL
-                        if href.startswith("/"):
-                            full_url = f"{self.base_url}{href}"
-                        else:
-                            full_url = href
-                            
-                        unique_links.add(full_url)
-                            
-                    for full_url in unique_links:
-                        # Detail Fetch
-                        detail = await self._fetch_detail(full_url)
-                        if detail:
-                            is_valid, reason = validator.validate(detail)
-                            if is_valid:
-                                page_docs.append(detail)
-                            else:
-                                # Log invalid but maybe keep going
-                                pass
-                    
+
+                    links = listing["links"]
+                    known = await self.frontier.lookup(links) if self.frontier else {}
+                    now = datetime.now(timezone.utc)
+                    due_links = [u for u in links if is_due(known.get(u), now)]
+
+                    page_docs = await self._fetch_details(due_links, known)
+
                     yield page, page_docs
-                    
-                    if not page_docs:
+
+                    if links and not due_links:
+                        # Everything on this page is already in the frontier and not yet due.
+                        consecutive_known += 1
+                        if stop_after_known is not None and consecutive_known >= stop_after_known:
+                            logger.info(f"AYM ({self.subdomain}) caught up at page {page}")
+                            self.reached_end = True
+                            break
+                    elif not page_docs:
+                        consecutive_known = 0
                         logger.info(f"Page {page} yielded 0 docs. Checking for end...")
                         # Debug Dump
                         if page == 1:
                             with open(f"backend/diagnostics/debug_page_{page}.html", "w") as f:
-                                f.write(str(soup))
+                                f.write(resp["data"])
                             logger.info(f"Dumped Page {page} to debug_page_{page}.html")
-                            
+
                         # Check for pagination controls to be sure
-                        if not soup.select(".pagination"):
+                        if not listing["has_pagination"]:
+                            self.reached_end = True
                             break
                         consecutive_empty += 1
-                        if consecutive_empty > 2: break
+                        if consecutive_empty > 2:
+                            self.reached_end = True
+                            break
                     else:
+                        consecutive_known = 0
                         consecutive_empty = 0
                         logger.info(f"AYM ({self.subdomain}) Page {page}: Yielded {len(page_docs)} docs")
-                    
+
                     page += 1
                     # Safety
                     if page > 10000: break
-                    
+
                 else:
                     break
 
@@ -119,52 +228,87 @@ class AYMEndpointResolver:
                 consecutive_empty += 1
                 if consecutive_empty > 5: break
 
-    async def _fetch_detail(self, url: str) -> Optional[Dict[str, Any]]:
+    async def recrawl_due(self, limit: int = 200) -> List[Dict[str, Any]]:
+        """Conditionally re-fetches frontier URLs whose recrawl time has come."""
+        if not self.frontier:
+            return []
+        rows = await self.frontier.due(self.subdomain, limit)
+        return await self._fetch_details([r["url"] for r in rows], {r["url"]: r for r in rows})
+
+    async def _fetch_details(
+        self, urls: List[str], known: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetches detail pages concurrently (bounded), keeping listing order.
+        Only new or changed decisions are returned. Outcomes of everything
+        else go to the frontier in one batch; outcomes of the returned docs
+        wait for confirm(), so a doc whose save fails is fetched again
+        instead of being remembered as "unchanged".
+        """
+        known = known or {}
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _bounded(detail_url: str):
+            async with sem:
+                return await self._fetch_detail(detail_url, known.get(detail_url))
+
+        results = await asyncio.gather(*(_bounded(u) for u in urls))
+
+        # The previous batch has been handed to the caller by now; anything
+        # still unconfirmed was not saved and stays due.
+        self._pending.clear()
+        settled = []
+        page_docs = []
+        for detail, outcome in results:
+            if detail:
+                is_valid, reason = validator.validate(detail)
+                if is_valid:
+                    page_docs.append(detail)
+                    if outcome:
+                        self._pending[detail["source_url"]] = outcome
+                    continue
+            if outcome:
+                settled.append(outcome)
+
+        if self.frontier:
+            await self.frontier.record_many(self.subdomain, settled)
+        return page_docs
+
+    async def confirm(self, docs: List[Dict[str, Any]]) -> None:
+        """Records the frontier outcome of docs that were persisted."""
+        outcomes = [self._pending.pop(d["source_url"]) for d in docs if d.get("source_url") in self._pending]
+        if self.frontier and outcomes:
+            await self.frontier.record_many(self.subdomain, outcomes)
+
+    async def _fetch_detail(
+        self, url: str, known: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Returns (doc_or_None, frontier_outcome_or_None)."""
         try:
-            resp = await client.fetch(url)
-            if resp["type"] != "html": return None
-            
-            soup = BeautifulSoup(resp["data"], 'html.parser')
-            
-            # Content Selector
-            content_div = soup.find('div', class_='karar-metni') or soup.find('div', id='content') or soup.find('article')
-            
-            # Metadata
-            # .kararbilgileri contains: "2025/10406 | Esas (İhlal)| ..."
-            info_div = soup.find(class_='kararbilgileri')
-            info_text = info_div.get_text(strip=True) if info_div else ""
-            
-            # Title
-            title_div = soup.find(class_='bkararbaslik')
-            title = title_div.get_text(strip=True) if title_div else ""
-            
-            if not content_div: 
-                 # Try to extract text from body if specific div missing
-                 # But exclude nav/footer
-                 for tag in soup.select("nav, footer, .header, .sidebar"):
-                     tag.decompose()
-                 full_text = soup.get_text(separator="\n", strip=True)
-            else:
-                full_text = content_div.get_text(separator="\n", strip=True)
-            
-            # Basic parsing of info_text
-            # "2025/10406 | Esas (İhlal)| ..."
-            parts = info_text.split('|')
-            dec_no = parts[0].strip() if parts else None
-            
-            import hashlib
-            return {
-                "source": "AYM",
-                "court": "Anayasa Mahkemesi",
-                "decision_date": None, # Extract from info_text if possible
-                "decision_no": dec_no,
-                "full_text": full_text,
-                "raw_json": {"info": info_text, "title": title},
-                "hash": hashlib.sha256(full_text.encode('utf-8')).hexdigest(),
-                "source_url": url,
-                "summary": full_text[:500],
-                "referenced_laws": [],
-                "citation_count": 0
+            resp = await self.client.fetch(url, headers=conditional_headers(known))
+            validators = resp.get("headers") or {}
+            outcome = {
+                "url": url,
+                "status": resp["status"],
+                "etag": validators.get("etag"),
+                "last_modified": validators.get("last_modified"),
+                "content_hash": None,
+                "changed": False,
             }
+            prev_interval = known.get("recrawl_interval_s") if known else None
+
+            if resp["type"] != "html":
+                outcome["recrawl_interval_s"] = next_interval(prev_interval, False)
+                return None, outcome
+
+            doc = await self._parse(parse_detail, resp["data"], url)
+            changed = not known or known.get("content_hash") != doc["hash"]
+            outcome["content_hash"] = doc["hash"]
+            outcome["changed"] = changed
+            outcome["recrawl_interval_s"] = next_interval(prev_interval, changed)
+            if changed and known and known.get("content_hash"):
+                # Known URL with new content: persistence updates the stored row
+                doc["replaces_hash"] = known["content_hash"]
+            return (doc if changed else None), outcome
         except:
-            return None
+            return None, None
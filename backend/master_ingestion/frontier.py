@@ -0,0 +1,97 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Iterable
+
+from db_async import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("frontier")
+
+# Recrawl scheduling bounds (seconds). A URL whose content changed is checked
+# twice as often next time, an unchanged one half as often.
+DEFAULT_INTERVAL = 24 * 3600
+MIN_INTERVAL = 6 * 3600
+MAX_INTERVAL = 30 * 24 * 3600
+
+def next_interval(previous: Optional[int], changed: bool) -> int:
+    if previous is None:
+        return DEFAULT_INTERVAL
+    if changed:
+        return max(MIN_INTERVAL, previous // 2)
+    return min(MAX_INTERVAL, previous * 2)
+
+def is_due(row: Optional[Dict[str, Any]], now: Optional[datetime] = None) -> bool:
+    if row is None:
+        return True
+    now = now or datetime.now(timezone.utc)
+    return row["next_fetch_at"] is None or row["next_fetch_at"] <= now
+
+def conditional_headers(row: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    headers = {}
+    if row:
+        if row.get("etag"):
+            headers["If-None-Match"] = row["etag"]
+        if row.get("last_modified"):
+            headers["If-Modified-Since"] = row["last_modified"]
+    return headers
+
+class Frontier:
+    """
+    URL frontier backed by the crawl_frontier table.
+    All reads and writes are per batch (one listing page / recrawl slice).
+    """
+
+    async def lookup(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not urls:
+            return {}
+        rows = await db.fetch_all("""
+            SELECT url, etag, last_modified, content_hash, recrawl_interval_s, next_fetch_at
+            FROM crawl_frontier WHERE url = ANY($1::text[])
+        """, urls)
+        return {r["url"]: dict(r) for r in rows}
+
+    async def due(self, source: str, limit: int = 200) -> List[Dict[str, Any]]:
+        rows = await db.fetch_all("""
+            SELECT url, etag, last_modified, content_hash, recrawl_interval_s, next_fetch_at
+            FROM crawl_frontier
+            WHERE source = $1 AND next_fetch_at <= NOW()
+            ORDER BY next_fetch_at
+            LIMIT $2
+        """, source, limit)
+        return [dict(r) for r in rows]
+
+    async def record_many(self, source: str, outcomes: Iterable[Dict[str, Any]]):
+        """
+        Upserts fetch outcomes. Each outcome carries url, status, etag,
+        last_modified, content_hash, changed and recrawl_interval_s.
+        """
+        outcomes = list(outcomes)
+        if not outcomes:
+            return
+        cols = ("url", "etag", "last_modified", "content_hash", "status", "recrawl_interval_s", "changed")
+        arrays = [[o.get(c) for o in outcomes] for c in cols]
+        await db.execute("""
+            INSERT INTO crawl_frontier (
+                url, source, etag, last_modified, content_hash, status, recrawl_interval_s,
+                fetch_count, change_count, last_fetched_at, last_changed_at, next_fetch_at
+            )
+            SELECT u.url, $1, u.etag, u.last_modified, u.content_hash, u.status, u.interval_s,
+                   1, CASE WHEN u.changed THEN 1 ELSE 0 END, NOW(),
+                   CASE WHEN u.changed THEN NOW() END,
+                   NOW() + make_interval(secs => u.interval_s)
+            FROM unnest($2::text[], $3::text[], $4::text[], $5::text[], $6::int[], $7::int[], $8::bool[])
+                 AS u(url, etag, last_modified, content_hash, status, interval_s, changed)
+            ON CONFLICT (url) DO UPDATE SET
+                etag = COALESCE(EXCLUDED.etag, crawl_frontier.etag),
+                last_modified = COALESCE(EXCLUDED.last_modified, crawl_frontier.last_modified),
+                content_hash = COALESCE(EXCLUDED.content_hash, crawl_frontier.content_hash),
+                status = EXCLUDED.status,
+                recrawl_interval_s = EXCLUDED.recrawl_interval_s,
+                fetch_count = crawl_frontier.fetch_count + 1,
+                change_count = crawl_frontier.change_count + EXCLUDED.change_count,
+                last_fetched_at = EXCLUDED.last_fetched_at,
+                last_changed_at = COALESCE(EXCLUDED.last_changed_at, crawl_frontier.last_changed_at),
+                next_fetch_at = EXCLUDED.next_fetch_at
+        """, source, *arrays)
+
+frontier = Frontier()
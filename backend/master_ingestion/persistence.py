@@ -10,12 +10,16 @@ import json
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from db_async import db
+from utils.fingerprint import band_buckets, nearest, simhash
 from dotenv import load_dotenv
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "backend", ".env"))
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("persistence")
 
+# Upper bound on band-collision rows pulled back per dedup check.
+NEAR_DUP_CANDIDATE_LIMIT = 256
+
 class Persistence:
     def __init__(self):
         self.initialized = False
@@ -41,25 +45,36 @@ class Persistence:
     async def is_duplicate(self, content_hash: str, source_url: str = None, fingerprint: str = None) -> bool:
         """
         Checks if doc exists in DB using multi-layer dedup.
+        Hash, source URL and exact fingerprint are checked together with the
+        SimHash band candidates in a single round trip; near-duplicates are
+        then confirmed by Hamming distance on the (few) colliding rows.
         """
         # Ensure init
         if not self.initialized: await self.init()
-            
+
+        bands, buckets = [], []
+        if fingerprint:
+            buckets = band_buckets(fingerprint)
+            bands = list(range(len(buckets)))
+
         try:
-            # Layer 1: Content Hash
-            res = await db.fetch_one("SELECT 1 FROM decisions WHERE hash = $1", content_hash)
-            if res: return True
-            
-            # Layer 2: Source URL (External ID)
-            if source_url:
-                res = await db.fetch_one("SELECT 1 FROM decisions WHERE source_url = $1", source_url)
-                if res: return True
-                
-            # Layer 3: Fingerprint (Exact match for now, fuzzy later if needed)
-            if fingerprint:
-                res = await db.fetch_one("SELECT 1 FROM decisions WHERE fingerprint = $1", fingerprint)
-                if res: return True
-                
+            res = await db.fetch_one("""
+                SELECT
+                    EXISTS (
+                        SELECT 1 FROM decisions
+                        WHERE hash = $1 OR source_url = $2 OR fingerprint = $3
+                    ) AS exact,
+                    ARRAY(
+                        SELECT DISTINCT d.fingerprint
+                        FROM unnest($4::smallint[], $5::int[]) AS q(band, bucket)
+                        JOIN decision_simhash_bands b ON b.band = q.band AND b.bucket = q.bucket
+                        JOIN decisions d ON d.id = b.decision_id
+                        LIMIT $6
+                    ) AS candidates
+            """, content_hash, source_url, fingerprint, bands, buckets, NEAR_DUP_CANDIDATE_LIMIT)
+            if res['exact']: return True
+            if fingerprint and nearest(fingerprint, res['candidates'] or []):
+                return True
             return False
         except Exception as e:
             logger.error(f"Duplicate check error: {e}")
@@ -73,44 +88,114 @@ class Persistence:
         """
         Saves decision to DB. Returns True if saved, False if duplicate or error.
         """
+        return await self.store_decision(doc) in ("inserted", "updated")
+
+    async def store_decision(self, doc: Dict[str, Any]) -> str:
+        """
+        Saves or updates a decision.
+        Returns "inserted", "updated", "duplicate" or "error"; only "error"
+        means the doc should be fetched again.
+        """
         if not self.initialized: await self.init()
         
         # Deduplication check
         # We need to compute fingerprint here if not present
         if 'fingerprint' not in doc:
-            from utils.fingerprint import simhash
             doc['fingerprint'] = simhash(doc['full_text'])
+
+        buckets = band_buckets(doc['fingerprint']) if doc.get('fingerprint') else []
+        bands = list(range(len(buckets)))
+
+        # Recrawl found new content for a known URL: the stored row is updated
+        # in place (is_duplicate would match it on source_url).
+        if doc.get('replaces_hash') and doc.get('source_url'):
+            try:
+                if await self._update_decision(doc, bands, buckets):
+                    return "updated"
+            except Exception as e:
+                if "unique constraint" in str(e).lower():
+                    logger.warning(f"Updated text duplicates another decision: {doc.get('source_url')}")
+                    return "duplicate"
+                logger.error(f"Update Error: {e}")
+                return "error"
             
         try:
             if await self.is_duplicate(doc['hash'], doc.get('source_url'), doc.get('fingerprint')):
                 logger.debug(f"Duplicate found: {doc.get('decision_no')}")
-                return False
+                return "duplicate"
         except Exception as e:
             logger.error(f"Duplicate check failed: {e}")
-            return False
+            return "error"
             
         try:
             # Handle JSONB serialization
             raw_json = json.dumps(doc.get('raw_json')) if doc.get('raw_json') else None
-            
+
+            # Decision row and its LSH band rows go in as one statement.
             await db.execute("""
-                INSERT INTO decisions (
-                    source, court, decision_date, decision_no, full_text, 
-                    raw_json, hash, source_url, summary, referenced_laws, citation_count, fingerprint
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+                WITH ins AS (
+                    INSERT INTO decisions (
+                        source, court, decision_date, decision_no, full_text, 
+                        raw_json, hash, source_url, summary, referenced_laws, citation_count, fingerprint
+                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+                    RETURNING id
+                )
+                INSERT INTO decision_simhash_bands (decision_id, band, bucket)
+                SELECT ins.id, q.band, q.bucket
+                FROM ins, unnest($13::smallint[], $14::int[]) AS q(band, bucket)
             """, 
                 doc['source'], doc['court'], doc.get('decision_date'), doc.get('decision_no'),
                 doc['full_text'], raw_json, doc['hash'], doc.get('source_url'),
                 doc.get('summary'), doc.get('referenced_laws'), doc.get('citation_count', 0),
-                doc.get('fingerprint')
+                doc.get('fingerprint'), bands, buckets
             )
-            return True
+            return "inserted"
         except Exception as e:
             if "unique constraint" in str(e).lower():
                 logger.warning(f"Duplicate caught by DB constraint: {doc.get('decision_no')}")
-                return False
+                return "duplicate"
             logger.error(f"Save Error: {e}")
-            return False
+            return "error"
+
+    async def _update_decision(self, doc: Dict[str, Any], bands, buckets) -> bool:
+        """
+        Replaces text, hash and fingerprint of the row with this source_url and
+        swaps its band rows, in one statement. False if no row matched.
+        """
+        raw_json = json.dumps(doc.get('raw_json')) if doc.get('raw_json') else None
+        res = await db.fetch_one("""
+            WITH upd AS (
+                UPDATE decisions SET
+                    hash = $2, full_text = $3, fingerprint = $4, summary = $5,
+                    raw_json = COALESCE($6::jsonb, raw_json),
+                    decision_no = COALESCE($7, decision_no)
+                WHERE source_url = $1
+                RETURNING id
+            ),
+            nb AS (
+                SELECT upd.id AS decision_id, q.band, q.bucket
+                FROM upd, unnest($8::smallint[], $9::int[]) AS q(band, bucket)
+            ),
+            stale AS (
+                DELETE FROM decision_simhash_bands b
+                USING upd
+                WHERE b.decision_id = upd.id
+                  AND NOT EXISTS (
+                      SELECT 1 FROM nb
+                      WHERE nb.decision_id = b.decision_id AND nb.band = b.band AND nb.bucket = b.bucket
+                  )
+            ),
+            ins AS (
+                INSERT INTO decision_simhash_bands (decision_id, band, bucket)
+                SELECT decision_id, band, bucket FROM nb
+                ON CONFLICT DO NOTHING
+            )
+            SELECT COUNT(*) AS n FROM upd
+        """,
+            doc['source_url'], doc['hash'], doc['full_text'], doc.get('fingerprint'),
+            doc.get('summary'), raw_json, doc.get('decision_no'), bands, buckets
+        )
+        return bool(res and res['n'])
 
     async def get_total_count(self) -> int:
         if not self.initialized: await self.init()
@@ -0,0 +1,37 @@
+"""Shared plumbing for the pure-ASGI middleware stack.
+
+Every middleware in this package used to subclass ``BaseHTTPMiddleware``.
+Each of those layers runs ``call_next`` in its own task and re-wraps the
+response body in a streaming wrapper, which adds a task hop per layer and
+breaks backpressure for SSE routes. The classes now implement the raw ASGI
+interface; the only thing most of them need from the response is the
+``http.response.start`` message, which these helpers expose.
+"""
+
+from __future__ import annotations
+
+from typing import Awaitable, Callable
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import Message, Send
+
+__all__ = ["on_response_start", "response_headers"]
+
+
+def on_response_start(send: Send, hook: Callable[[Message], Awaitable[None] | None]) -> Send:
+    """Wrap ``send`` so ``hook(message)`` runs on ``http.response.start``,
+    before the message is forwarded. Body chunks pass through untouched."""
+
+    async def send_wrapper(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            result = hook(message)
+            if result is not None:
+                await result
+        await send(message)
+
+    return send_wrapper
+
+
+def response_headers(message: Message) -> MutableHeaders:
+    """Mutable view over the raw headers of an ``http.response.start`` message."""
+    return MutableHeaders(scope=message)
@@ -2,11 +2,10 @@ import os
 import time
 import random
 import asyncio
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-class ChaosMiddleware(BaseHTTPMiddleware):
+class ChaosMiddleware:
     """
     Middleware for Failure Injection Testing.
     Enabled only if CHAOS_MODE=true env var is set.
@@ -15,16 +14,16 @@ class ChaosMiddleware(BaseHTTPMiddleware):
     - Errors (500s)
     - DB Connection Failures (Simulated via 503)
     """
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         self.enabled = os.getenv("CHAOS_MODE", "false").lower() == "true"
         self.latency_ms = int(os.getenv("CHAOS_LATENCY_MS", "0"))
         self.error_rate = float(os.getenv("CHAOS_ERROR_RATE", "0.0")) # 0.0 to 1.0
         self.failure_type = os.getenv("CHAOS_FAILURE_TYPE", "random") # random, db, redis
 
-    async def dispatch(self, request: Request, call_next):
-        if not self.enabled:
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
             
         # 1. Latency Injection
         if self.latency_ms > 0:
@@ -35,10 +34,11 @@ class ChaosMiddleware(BaseHTTPMiddleware):
         # 2. Error Injection
         if self.error_rate > 0 and random.random() < self.error_rate:
             if self.failure_type == "db":
-                return Response(status_code=503, content="Simulated DB Connection Failure")
+                response = Response(status_code=503, content="Simulated DB Connection Failure")
             elif self.failure_type == "redis":
-                return Response(status_code=503, content="Simulated Redis Failure")
+                response = Response(status_code=503, content="Simulated Redis Failure")
             else:
-                return Response(status_code=500, content="Simulated Internal Server Error")
+                response = Response(status_code=500, content="Simulated Internal Server Error")
+            return await response(scope, receive, send)
                 
-        return await call_next(request)
+        return await self.app(scope, receive, send)
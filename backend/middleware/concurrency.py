@@ -1,48 +1,71 @@
+import asyncio
 import time
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from config import settings
+from middleware.asgi import on_response_start
 
-class IdempotencyMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
         # In-memory storage for idempotency keys.
         # For distributed systems, use Redis.
         self.seen_keys = {} # key -> (status_code, body)
 
-    async def dispatch(self, request, call_next):
-        if request.method not in ["POST", "PUT", "PATCH"]:
-            return await call_next(request)
-            
-        key = request.headers.get(settings.IDEMPOTENCY_HEADER)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in ["POST", "PUT", "PATCH"]:
+            return await self.app(scope, receive, send)
+
+        key = Headers(scope=scope).get(settings.IDEMPOTENCY_HEADER)
         if not key:
-            return await call_next(request)
-            
+            return await self.app(scope, receive, send)
+
         # Check if key exists
         if key in self.seen_keys:
             # Return cached response (Simple simulation)
             # In real world, we need to store full response headers/body
-            return Response(status_code=409, content="Idempotent request already processed (Simulation)")
-            
-        response = await call_next(request)
-        
-        if 200 <= response.status_code < 300:
-            self.seen_keys[key] = True
-            
-        return response
-
-class TimeoutMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        import asyncio
-
-        path = request.url.path or ""
+            response = Response(status_code=409, content="Idempotent request already processed (Simulation)")
+            return await response(scope, receive, send)
+
+        def remember(message: Message) -> None:
+            if 200 <= message["status"] < 300:
+                self.seen_keys[key] = True
+
+        await self.app(scope, receive, on_response_start(send, remember))
+
+class TimeoutMiddleware:
+    """
+    The timeout covers the handler up to the start of the response, as the
+    BaseHTTPMiddleware version did (call_next returned once headers were
+    ready). Once headers are sent the deadline is lifted, so SSE/streaming
+    bodies are not cut off mid-stream.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        path = scope.get("path") or ""
         long_prefixes = getattr(settings, "LONG_REQUEST_PATH_PREFIXES", ()) or ()
         if any(path.startswith(pref) for pref in long_prefixes):
             timeout = getattr(settings, "LONG_REQUEST_TIMEOUT", settings.GLOBAL_REQUEST_TIMEOUT)
         else:
             timeout = settings.GLOBAL_REQUEST_TIMEOUT
 
+        started = False
+
         try:
-            return await asyncio.wait_for(call_next(request), timeout=timeout)
-        except asyncio.TimeoutError:
-            return Response(status_code=504, content="Request Timeout")
+            async with asyncio.timeout(timeout) as deadline:
+                def lift_deadline(message: Message) -> None:
+                    nonlocal started
+                    started = True
+                    deadline.reschedule(None)
+
+                await self.app(scope, receive, on_response_start(send, lift_deadline))
+        except TimeoutError:
+            if started:
+                raise
+            await Response(status_code=504, content="Request Timeout")(scope, receive, send)
@@ -5,16 +5,18 @@ from __future__ import annotations
 import re
 from typing import Optional, Sequence
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from middleware.asgi import on_response_start, response_headers
 
-class EnforceCorsHeadersMiddleware(BaseHTTPMiddleware):
+
+class EnforceCorsHeadersMiddleware:
     """Runs outside Starlette CORSMiddleware; ensures credentialed browser
     responses always echo Access-Control-Allow-Origin for allowed Origins."""
 
-    def __init__(self, app, allowed_origins: Sequence[str], origin_regex: Optional[str] = None):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, allowed_origins: Sequence[str], origin_regex: Optional[str] = None):
+        self.app = app
         self._allowed = tuple(allowed_origins)
         self._rx = re.compile(origin_regex) if (origin_regex or "").strip() else None
 
@@ -28,10 +30,16 @@ class EnforceCorsHeadersMiddleware(BaseHTTPMiddleware):
                 return False
         return False
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        origin = (request.headers.get("origin") or "").strip()
-        if origin and self._origin_ok(origin):
-            response.headers["access-control-allow-origin"] = origin
-            response.headers["access-control-allow-credentials"] = "true"
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        origin = (Headers(scope=scope).get("origin") or "").strip()
+        if not (origin and self._origin_ok(origin)):
+            return await self.app(scope, receive, send)
+
+        def echo_origin(message: Message) -> None:
+            headers = response_headers(message)
+            headers["access-control-allow-origin"] = origin
+            headers["access-control-allow-credentials"] = "true"
+
+        await self.app(scope, receive, on_response_start(send, echo_origin))
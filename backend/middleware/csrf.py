@@ -1,14 +1,15 @@
 import secrets
 import logging
 from utils.request_meta import cookie_secure as _cookie_secure_util
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from middleware.asgi import on_response_start, response_headers
 
 logger = logging.getLogger("miron_csrf")
 
 
-class CSRFProtectionMiddleware(BaseHTTPMiddleware):
+class CSRFProtectionMiddleware:
     """
     CSRF Protection — Cross-domain API mode.
 
@@ -64,8 +65,8 @@ class CSRFProtectionMiddleware(BaseHTTPMiddleware):
         "/api/stripe/webhook",
     )
 
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         self.cookie_name = "csrf_token"
         self.header_name = "X-CSRF-Token"
 
@@ -83,7 +84,26 @@ class CSRFProtectionMiddleware(BaseHTTPMiddleware):
     def _secure_cookie(self) -> bool:
         return _cookie_secure_util()
 
-    async def dispatch(self, request: Request, call_next):
+    def _set_cookie_header(self) -> bytes:
+        # Reuse Starlette's cookie serialisation so the attributes match
+        # what Response.set_cookie produced before the ASGI rewrite.
+        token = secrets.token_urlsafe(32)
+        secure = self._secure_cookie()
+        carrier = Response()
+        carrier.set_cookie(
+            key=self.cookie_name,
+            value=token,
+            httponly=False,
+            samesite="none" if secure else "lax",
+            secure=secure,
+        )
+        return next(v for k, v in carrier.raw_headers if k == b"set-cookie")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request = Request(scope)
         # Validate BEFORE invoking the handler. The previous order (call_next
         # first, check second) meant a forged cross-origin unsafe request
         # still executed its side effects - e.g. /auth/refresh would rotate
@@ -93,20 +113,15 @@ class CSRFProtectionMiddleware(BaseHTTPMiddleware):
             header_token = request.headers.get(self.header_name)
             if not cookie_token or not header_token or cookie_token != header_token:
                 logger.info("CSRF validation failed", extra={"path": request.url.path})
-                return Response(status_code=403, content="CSRF validation failed")
-
-        response = await call_next(request)
+                response = Response(status_code=403, content="CSRF validation failed")
+                return await response(scope, receive, send)
 
         # Issue a fresh csrf_token cookie on safe responses if the client
         # doesn't already have one - this is how SPAs bootstrap the token.
         if request.method in self.SAFE_METHODS and self.cookie_name not in request.cookies:
-            token = secrets.token_urlsafe(32)
-            secure = self._secure_cookie()
-            response.set_cookie(
-                key=self.cookie_name,
-                value=token,
-                httponly=False,
-                samesite="none" if secure else "lax",
-                secure=secure,
-            )
-        return response
+            def issue_token(message: Message) -> None:
+                response_headers(message).append("set-cookie", self._set_cookie_header().decode("latin-1"))
+
+            return await self.app(scope, receive, on_response_start(send, issue_token))
+
+        await self.app(scope, receive, send)
@@ -2,59 +2,134 @@ import time
 import os
 import json
 import uuid
+import atexit
+import queue
+import random
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from collections import deque
 from utils.request_meta import client_meta
+from utils.log_index import ACCESS_LOG_PATH, ACCESS_LOG_BACKUPS
 from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-from stores.pg_users_store import log_audit
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from middleware.asgi import on_response_start, response_headers
+from services.audit_queue import audit_queue
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_LOG_FIELDS = (
+    "request_id", "user_id", "ip", "method", "path",
+    "status_code", "duration", "error",
+)
+
+def _dumps(obj) -> str:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+    return json.dumps(obj, default=str)
 
 class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. Only attributes that are set are emitted, the
+    strftime part of the timestamp is cached per second, and orjson is used
+    when installed.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ts_second = None
+        self._ts_prefix = ""
+
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        if second != self._ts_second:
+            self._ts_prefix = time.strftime(self.default_time_format, self.converter(record.created))
+            self._ts_second = second
+        return self.default_msec_format % (self._ts_prefix, record.msecs)
+
     def format(self, record):
         log_record = {
             "timestamp": self.formatTime(record, self.datefmt),
             "level": record.levelname,
             "message": record.getMessage(),
             "logger": record.name,
-            "request_id": getattr(record, "request_id", None),
-            "user_id": getattr(record, "user_id", None),
-            "ip": getattr(record, "ip", None),
-            "method": getattr(record, "method", None),
-            "path": getattr(record, "path", None),
-            "status_code": getattr(record, "status_code", None),
-            "duration": getattr(record, "duration", None),
-            "error": getattr(record, "error", None),
         }
-        return json.dumps({k: v for k, v in log_record.items() if v is not None})
+        attrs = record.__dict__
+        for key in _LOG_FIELDS:
+            value = attrs.get(key)
+            if value is not None:
+                log_record[key] = value
+        return _dumps(log_record)
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: when the log queue is full the record is dropped and counted."""
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
 
 # Configure Rotating File Handler
 # Max 10 MB per file, keep last 5 backups
 file_handler = RotatingFileHandler(
-    "backend_access.log", 
-    maxBytes=10*1024*1024, 
-    backupCount=5
+    str(ACCESS_LOG_PATH),
+    maxBytes=10*1024*1024,
+    backupCount=ACCESS_LOG_BACKUPS
 )
 file_handler.setFormatter(JsonFormatter())
 
 stream_handler = logging.StreamHandler()
 stream_handler.setFormatter(JsonFormatter())
 
+# Stream/file writes and rotation happen on the listener thread; request
+# handlers only pay for a put_nowait onto the queue.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of "Incoming Request" lines to keep (1.0 = all). "Response Sent"
+# carries the same fields plus status/duration and is always logged.
+LOG_INCOMING_SAMPLE_RATE = float(os.getenv("LOG_INCOMING_SAMPLE_RATE", "1.0"))
+
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+queue_handler = _DroppingQueueHandler(_log_queue)
+# prepare() renders the message with this formatter before enqueueing; without
+# it basicConfig would install "%(levelname)s:%(name)s:%(message)s" and that
+# prefix would end up inside the JSON "message" field.
+queue_handler.setFormatter(logging.Formatter("%(message)s"))
+log_listener = QueueListener(_log_queue, stream_handler, file_handler, respect_handler_level=True)
+
 logging.basicConfig(
     level=logging.INFO,
-    handlers=[
-        stream_handler,
-        file_handler
-    ],
+    handlers=[queue_handler],
     force=True # Override existing config
 )
+log_listener.start()
+
+def stop_log_listener() -> None:
+    """Flush queued records to the stream/file handlers and stop the listener thread."""
+    if log_listener._thread is not None:
+        log_listener.stop()
+
+atexit.register(stop_log_listener)
+
 logger = logging.getLogger("miron_api")
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class LoggingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
         start_time = time.time()
         request_id = str(uuid.uuid4())
+        request = Request(scope)
         
         # Attach request_id to request state for other middlewares/routers
         request.state.request_id = request_id
@@ -72,48 +147,48 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             "ua": ua
         }
         
-        logger.info(f"Incoming Request", extra=log_context)
-        
-        try:
-            response = await call_next(request)
+        if LOG_INCOMING_SAMPLE_RATE >= 1.0 or random.random() < LOG_INCOMING_SAMPLE_RATE:
+            logger.info(f"Incoming Request", extra=log_context)
+
+        def on_start(message: Message) -> None:
             process_time = time.time() - start_time
+            status_code = message["status"]
             
             # Add user_id if available (from AuthMiddleware)
             user_id = getattr(request.state, "user_id", None)
             if user_id:
                 log_context["user_id"] = str(user_id)
             
-            log_context["status_code"] = response.status_code
+            log_context["status_code"] = status_code
             log_context["duration"] = round(process_time, 4)
             
             logger.info(f"Response Sent", extra=log_context)
             
-            response.headers["X-Request-ID"] = request_id
-            response.headers["X-Process-Time"] = str(process_time)
+            headers = response_headers(message)
+            headers["X-Request-ID"] = request_id
+            headers["X-Process-Time"] = str(process_time)
             
-            # Log critical events to DB Audit
-            if response.status_code >= 400:
+            # Log critical events to DB Audit (queued; written in batches off the event loop)
+            if status_code >= 400:
                 details = {
                     "method": method,
                     "path": path,
-                    "status": response.status_code,
+                    "status": status_code,
                     "duration": process_time,
                     "request_id": request_id
                 }
                 
-                try:
-                    log_audit(
-                        user_id=user_id,
-                        action="REQUEST_FAILED",
-                        resource=path,
-                        details=details,
-                        ip=ip,
-                        ua=ua
-                    )
-                except Exception as e:
-                    logger.error(f"Audit log failed: {e}", extra={"request_id": request_id})
-
-            return response
+                audit_queue.enqueue(
+                    user_id=user_id,
+                    action="REQUEST_FAILED",
+                    resource=path,
+                    details=details,
+                    ip=ip,
+                    ua=ua
+                )
+        
+        try:
+            await self.app(scope, receive, on_response_start(send, on_start))
             
         except Exception as e:
             process_time = time.time() - start_time
@@ -123,63 +198,72 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             logger.error(f"Request Failed: {e}", extra=log_context)
             
             # Audit log critical failure
-            try:
-                log_audit(
-                    user_id=getattr(request.state, "user_id", None),
-                    action="SYSTEM_ERROR",
-                    resource=path,
-                    details={"error": str(e), "request_id": request_id},
-                    ip=ip,
-                    ua=ua
-                )
-            except:
-                pass
+            audit_queue.enqueue(
+                user_id=getattr(request.state, "user_id", None),
+                action="SYSTEM_ERROR",
+                resource=path,
+                details={"error": str(e), "request_id": request_id},
+                ip=ip,
+                ua=ua
+            )
             raise e
 
 from config import settings
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
+class SecurityHeadersMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
         # HSTS Config
         hsts = f"max-age={settings.HSTS_MAX_AGE}"
         if settings.HSTS_INCLUDE_SUBDOMAINS:
             hsts += "; includeSubDomains"
         if settings.HSTS_PRELOAD:
             hsts += "; preload"
-        response.headers["Strict-Transport-Security"] = hsts
         
         # CSP Config
         csp = "; ".join([f"{k} {v}" for k, v in settings.CSP_POLICY.items()])
-        response.headers["Content-Security-Policy"] = csp
         
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        return response
+        # Settings are fixed for the process, so build the header set once
+        self.headers = {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            "X-XSS-Protection": "1; mode=block",
+            "Strict-Transport-Security": hsts,
+            "Content-Security-Policy": csp,
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+            "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        def add_headers(message: Message) -> None:
+            headers = response_headers(message)
+            for k, v in self.headers.items():
+                headers[k] = v
+
+        await self.app(scope, receive, on_response_start(send, add_headers))
 
 # Deprecated: RateLimitMiddleware logic moved to backend/middleware/rate_limit.py (Redis)
 # Keeping BotProtectionMiddleware here
 
-class BotProtectionMiddleware(BaseHTTPMiddleware):
+class BotProtectionMiddleware:
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
+        self.app = app
         blocked = os.getenv("BOT_BLOCKLIST", "curl,python-requests,httpclient,wget").split(",")
         self.blocked = [b.strip().lower() for b in blocked if b.strip()]
 
-    async def dispatch(self, request: Request, call_next):
-        if request.method == "OPTIONS":
-            return await call_next(request)
-        path = request.url.path
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        path = scope["path"]
         if path in ("/health", "/api/health"):
-            return await call_next(request)
+            return await self.app(scope, receive, send)
         if path.startswith("/api/auth/") or path.startswith("/auth/"):
             # Auth endpointlerinde UA tabanlı bot engeli, gerçek kullanıcıları da vurabiliyor.
-            return await call_next(request)
-        ua = (request.headers.get("user-agent") or "").lower()
+            return await self.app(scope, receive, send)
+        ua = (Headers(scope=scope).get("user-agent") or "").lower()
         if not ua or any(b in ua for b in self.blocked):
-            return Response(status_code=403, content="Bot access denied")
-        return await call_next(request)
+            return await Response(status_code=403, content="Bot access denied")(scope, receive, send)
+        await self.app(scope, receive, send)
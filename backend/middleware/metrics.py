@@ -1,8 +1,8 @@
 import time
 import os
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from middleware.asgi import on_response_start
 
 try:
     from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
@@ -56,85 +56,129 @@ if PROMETHEUS_AVAILABLE:
         ["name"]
     )
     
+    # Reminder dispatcher (services/reminder_scheduler.py)
+    REMINDER_DISPATCH_TOTAL = Counter(
+        "reminder_dispatch_total",
+        "Reminder triggers processed by the dispatcher",
+        ["channel", "outcome"] # sent, retry, dead
+    )
+    REMINDER_DISPATCH_LAG = Histogram(
+        "reminder_dispatch_lag_seconds",
+        "Delay between trigger_at and delivery",
+        ["channel"],
+        buckets=[1, 5, 15, 30, 60, 120, 300, 900, 3600]
+    )
+    
+    # Outbound mail (services/mail_queue.py)
+    MAIL_QUEUE_DEPTH = Gauge("mail_queue_depth", "Emails waiting in the in-process mail queue")
+    MAIL_SEND_TOTAL = Counter(
+        "mail_send_total",
+        "Emails processed by the mail workers",
+        ["outcome"] # sent, failed, dropped
+    )
+    MAIL_SEND_LATENCY = Histogram(
+        "mail_send_duration_seconds",
+        "Provider call duration per email batch",
+        buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 15.0]
+    )
+    
+    # Request audit events (services/audit_queue.py)
+    AUDIT_QUEUE_DEPTH = Gauge("audit_queue_depth", "Audit events waiting in the in-process audit queue")
+    AUDIT_EVENTS_TOTAL = Counter(
+        "audit_events_total",
+        "Audit events handled by the audit queue",
+        ["outcome"] # written, failed, dropped, sampled_out
+    )
+    
     # System Metrics (Basic)
     SYSTEM_MEMORY_USAGE = Gauge("system_memory_usage_bytes", "Memory usage in bytes")
     SYSTEM_CPU_USAGE = Gauge("system_cpu_usage_percent", "CPU usage percent")
 
-class PrometheusMiddleware(BaseHTTPMiddleware):
+class PrometheusMiddleware:
     """
     Middleware to expose Prometheus metrics at /metrics
     and track HTTP request duration/counts.
+    Latency is measured up to the start of the response, so long-lived SSE
+    streams do not land in the top bucket.
     """
-    async def dispatch(self, request: Request, call_next):
-        if not PROMETHEUS_AVAILABLE:
-             return await call_next(request)
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not PROMETHEUS_AVAILABLE or scope["type"] != "http":
+             return await self.app(scope, receive, send)
 
         # Expose metrics endpoint
-        if request.url.path == "/metrics":
-            # Collect Pool Metrics
-            try:
-                from db import get_pool_status
-                stats = get_pool_status()
-                if stats["status"] == "active":
-                    DB_POOL_STATS.labels(state="active").set(stats["used"])
-                    DB_POOL_STATS.labels(state="idle").set(stats["idle"])
-                    DB_POOL_STATS.labels(state="max").set(stats["max"])
-            except Exception as e:
-                pass
-                
-            # Collect Circuit Breaker Metrics
-            try:
-                from utils.circuit_breaker import db_circuit, redis_circuit, CircuitState
-                state_map = {CircuitState.CLOSED: 0, CircuitState.OPEN: 1, CircuitState.HALF_OPEN: 2}
-                CB_STATE.labels(name="db_circuit").set(state_map[db_circuit.state])
-                CB_STATE.labels(name="redis_circuit").set(state_map[redis_circuit.state])
-                CB_FAILURES.labels(name="db_circuit").inc(db_circuit.failures) # Note: failures is current count, not total. Ideally monotonic.
-                # Actually, CB failures property resets on success. We need a monotonic counter inside CB class.
-                # For now, we just expose state.
-            except Exception as e:
-                pass
-                
-            # Collect System Metrics (Memory)
-            try:
-                import psutil
-                process = psutil.Process(os.getpid())
-                SYSTEM_MEMORY_USAGE.set(process.memory_info().rss)
-                SYSTEM_CPU_USAGE.set(process.cpu_percent())
-            except ImportError:
-                pass
-            except Exception:
-                pass
-                
-            return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+        if scope["path"] == "/metrics":
+            return await self._metrics_response()(scope, receive, send)
             
         start_time = time.time()
-        
-        try:
-            response = await call_next(request)
-            
+        method = scope["method"]
+        endpoint = scope["path"]
+        recorded = False
+
+        def record(message: Message) -> None:
+            nonlocal recorded
+            recorded = True
             process_time = time.time() - start_time
-            endpoint = request.url.path
             
             # Record metrics
             REQUEST_COUNT.labels(
-                method=request.method, 
+                method=method, 
                 endpoint=endpoint, 
-                status=response.status_code
+                status=message["status"]
             ).inc()
             
             REQUEST_LATENCY.labels(
-                method=request.method, 
+                method=method, 
                 endpoint=endpoint
             ).observe(process_time)
-            
-            return response
-            
+        
+        try:
+            await self.app(scope, receive, on_response_start(send, record))
         except Exception as e:
             # Count 500
-            endpoint = request.url.path
-            REQUEST_COUNT.labels(
-                method=request.method, 
-                endpoint=endpoint, 
-                status=500
-            ).inc()
+            if not recorded:
+                REQUEST_COUNT.labels(
+                    method=method, 
+                    endpoint=endpoint, 
+                    status=500
+                ).inc()
             raise e
+
+    def _metrics_response(self) -> Response:
+        # Collect Pool Metrics
+        try:
+            from db import get_pool_status
+            stats = get_pool_status()
+            if stats["status"] == "active":
+                DB_POOL_STATS.labels(state="active").set(stats["used"])
+                DB_POOL_STATS.labels(state="idle").set(stats["idle"])
+                DB_POOL_STATS.labels(state="max").set(stats["max"])
+        except Exception as e:
+            pass
+            
+        # Collect Circuit Breaker Metrics
+        try:
+            from utils.circuit_breaker import db_circuit, redis_circuit, CircuitState
+            state_map = {CircuitState.CLOSED: 0, CircuitState.OPEN: 1, CircuitState.HALF_OPEN: 2}
+            CB_STATE.labels(name="db_circuit").set(state_map[db_circuit.state])
+            CB_STATE.labels(name="redis_circuit").set(state_map[redis_circuit.state])
+            CB_FAILURES.labels(name="db_circuit").inc(db_circuit.failures) # Note: failures is current count, not total. Ideally monotonic.
+            # Actually, CB failures property resets on success. We need a monotonic counter inside CB class.
+            # For now, we just expose state.
+        except Exception as e:
+            pass
+            
+        # Collect System Metrics (Memory)
+        try:
+            import psutil
+            process = psutil.Process(os.getpid())
+            SYSTEM_MEMORY_USAGE.set(process.memory_info().rss)
+            SYSTEM_CPU_USAGE.set(process.cpu_percent())
+        except ImportError:
+            pass
+        except Exception:
+            pass
+            
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -3,20 +3,19 @@ import os
 import time
 import logging
 import redis
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 logger = logging.getLogger("miron_ratelimit")
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
     Redis ile oran sınırlandırma (kayan pencere).
     Redis yoksa bellek içi sınırlamaya düşer.
     """
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
+        self.app = app
         self.redis_url = os.getenv("REDIS_URL")
         self.redis_client = None
         
@@ -44,10 +43,19 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         _extra = [p.strip() for p in (os.getenv("TRUSTED_PROXIES") or "").split(",") if p.strip()]
         self.trusted_proxies = _default_private + _extra
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        response = self._check(Request(scope))
+        if response is not None:
+            return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+    def _check(self, request: Request):
+        """Politikayı uygular; limit aşıldıysa 429 Response, aksi halde None."""
         is_test = os.getenv("ENVIRONMENT") == "test"
         if is_test and (os.getenv("RATE_LIMIT_DISABLE_IN_TEST", "true") or "").lower() == "true":
-            return await call_next(request)
+            return None
 
         # Identify client IP. X-Forwarded-For can be trivially spoofed, so we
         # only trust it if the direct peer is in TRUSTED_PROXIES.
@@ -147,11 +155,11 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             except redis.RedisError as e:
                 logger.error(f"Redis error during rate limit check: {e}")
                 # Fail open or use memory fallback? Let's use memory fallback for resilience
-                return await self._memory_check(ip, call_next, request, limit, window, policy_name)
+                return self._memory_check(ip, limit, window, policy_name)
         else:
-            return await self._memory_check(ip, call_next, request, limit, window, policy_name)
+            return self._memory_check(ip, limit, window, policy_name)
 
-        return await call_next(request)
+        return None
 
 
     def _is_trusted_proxy(self, ip: str) -> bool:
@@ -175,7 +183,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 continue
         return False
 
-    async def _memory_check(self, ip, call_next, request, limit, window, policy_name):
+    def _memory_check(self, ip, limit, window, policy_name):
         from collections import deque
         now = time.time()
         
@@ -198,4 +206,4 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         if len(self.memory_hits) > 10000:
             self.memory_hits.clear()
             
-        return await call_next(request)
+        return None
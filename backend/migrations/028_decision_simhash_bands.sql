@@ -0,0 +1,14 @@
+-- Near-duplicate index for ingestion dedup.
+-- decisions.fingerprint is a 64-bit SimHash (hex). It is split into four
+-- 16-bit bands; two fingerprints within Hamming distance <= 3 always share
+-- at least one (band, bucket) pair, so persistence.is_duplicate only has to
+-- compare the handful of rows that collide on a band.
+CREATE TABLE IF NOT EXISTS decision_simhash_bands (
+  decision_id UUID NOT NULL REFERENCES decisions(id) ON DELETE CASCADE,
+  band        SMALLINT NOT NULL,
+  bucket      INTEGER NOT NULL,
+  PRIMARY KEY (band, bucket, decision_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_decision_simhash_bands_decision
+  ON decision_simhash_bands (decision_id);
@@ -0,0 +1,21 @@
+-- Persistent URL frontier for the master ingestion crawler.
+-- One row per decision detail URL. Validators (etag / last_modified) drive
+-- conditional GETs; recrawl_interval_s adapts to how often the page actually
+-- changes, and next_fetch_at is when the URL is due again.
+CREATE TABLE IF NOT EXISTS crawl_frontier (
+  url                 TEXT PRIMARY KEY,
+  source              TEXT NOT NULL,
+  etag                TEXT,
+  last_modified       TEXT,
+  content_hash        TEXT,
+  status              INT,
+  recrawl_interval_s  INT NOT NULL DEFAULT 86400,
+  fetch_count         INT NOT NULL DEFAULT 0,
+  change_count        INT NOT NULL DEFAULT 0,
+  last_fetched_at     TIMESTAMPTZ,
+  last_changed_at     TIMESTAMPTZ,
+  next_fetch_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_frontier_due
+  ON crawl_frontier (source, next_fetch_at);
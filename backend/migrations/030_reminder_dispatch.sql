@@ -0,0 +1,15 @@
+-- Reminder dispatcher state.
+-- The scheduler claims due triggers with FOR UPDATE SKIP LOCKED and leases
+-- them via claimed_until, so several workers can drain a burst in parallel
+-- and a crashed worker's batch becomes claimable again once the lease ends.
+-- Failed sends are retried with backoff (claimed_until doubles as the next
+-- attempt time) and dead-lettered via dead_at after max attempts.
+ALTER TABLE case_reminder_triggers
+  ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ,
+  ADD COLUMN IF NOT EXISTS last_error TEXT,
+  ADD COLUMN IF NOT EXISTS dead_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_case_reminder_triggers_dispatch
+  ON case_reminder_triggers (trigger_at)
+  WHERE sent_at IS NULL AND dead_at IS NULL;
@@ -0,0 +1,7 @@
+-- Embedding cluster of a decision (tr_e5_knn_cluster_id from the HF 700k
+-- corpus). Kept as a retrieval-diversity signal: search can cap results per
+-- cluster instead of returning near-identical decisions.
+ALTER TABLE decisions ADD COLUMN IF NOT EXISTS cluster_id INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_decisions_cluster_id
+  ON decisions (cluster_id) WHERE cluster_id IS NOT NULL;
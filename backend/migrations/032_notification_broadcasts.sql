@@ -0,0 +1,22 @@
+-- Fan-out-on-read broadcasts.
+-- An admin broadcast is stored once instead of one notifications row per
+-- user. Recipients are users whose account existed when it was sent; the
+-- user list / unread count merge broadcasts in at read time and per-user read
+-- state is written lazily, only when a user marks a broadcast as read.
+CREATE TABLE IF NOT EXISTS notification_broadcasts (
+  id BIGSERIAL PRIMARY KEY,
+  type VARCHAR(50) NOT NULL,
+  title VARCHAR(255) NOT NULL,
+  message TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_broadcasts_created
+  ON notification_broadcasts (created_at DESC);
+
+CREATE TABLE IF NOT EXISTS notification_broadcast_reads (
+  user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  broadcast_id BIGINT NOT NULL REFERENCES notification_broadcasts(id) ON DELETE CASCADE,
+  read_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (user_id, broadcast_id)
+);
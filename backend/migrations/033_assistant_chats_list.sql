@@ -0,0 +1,6 @@
+-- Chat sidebar list: metadata only, keyset-paginated on (updated_at, id).
+-- message_count lets the list show sizes without decrypting messages_enc.
+ALTER TABLE assistant_chats ADD COLUMN IF NOT EXISTS message_count INT;
+
+CREATE INDEX IF NOT EXISTS idx_assistant_chats_user_updated_id
+  ON assistant_chats (user_id, updated_at DESC, id DESC);
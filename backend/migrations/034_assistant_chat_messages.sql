@@ -0,0 +1,13 @@
+-- Append-only chat message rows: a turn inserts only its new messages instead
+-- of rewriting the whole assistant_chats.messages / messages_enc payload.
+-- payload holds the Fernet token when encrypted, otherwise the message JSON.
+-- Rows go with their chat (ON DELETE CASCADE), so the 90-day expires_at purge
+-- on assistant_chats also covers them.
+CREATE TABLE IF NOT EXISTS assistant_chat_messages (
+  chat_id    BIGINT NOT NULL REFERENCES assistant_chats(id) ON DELETE CASCADE,
+  seq        INT NOT NULL,
+  payload    TEXT NOT NULL,
+  encrypted  BOOLEAN NOT NULL DEFAULT FALSE,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (chat_id, seq)
+);
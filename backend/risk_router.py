@@ -16,8 +16,6 @@ except ImportError:
     from security import sanitize_text
     from llm_gateway import chat_completions_create
 
-import pdfplumber
-from docx import Document
 
 router = APIRouter(prefix="/api/risk", tags=["Risk & Strateji Analizi"])
 
@@ -206,12 +204,16 @@ def extract_text_from_bytes(filename: str, b: bytes) -> str:
     name = (filename or "").lower()
     if name.endswith(".pdf"):
         try:
+            import pdfplumber
+
             with pdfplumber.open(io.BytesIO(b)) as pdf:
                 return "\n".join([p.extract_text() or "" for p in pdf.pages])
         except Exception:
             return b.decode("utf-8", errors="ignore")
     elif name.endswith(".docx"):
         try:
+            from docx import Document
+
             doc = Document(io.BytesIO(b))
             parts = [p.text for p in doc.paragraphs]
             for table in doc.tables:
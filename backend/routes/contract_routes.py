@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, Depends, Body, Query, UploadFile, File, Form
-from typing import List, Dict, Any, Optional, Union
+from fastapi import APIRouter, HTTPException, Depends, Body, Query, UploadFile, File, Form, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from typing import Callable, List, Dict, Any, Optional, Union
 from datetime import datetime
 from pydantic import BaseModel
 from db import get_db_cursor
@@ -12,6 +14,9 @@ import os
 import time
 import io
 import re
+import hashlib
+import threading
+from collections import OrderedDict
 from functools import lru_cache
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
@@ -773,142 +778,246 @@ def _extract_text_from_upload(filename: str, data: bytes) -> str:
 
     return data.decode("utf-8", errors="ignore")
 
-# --- Endpoints ---
+# --- Şablon kataloğu önbelleği ---
+#
+# seed + DB + remote kaynakları tek bir süreç içi katalogda birleşir; alanlar
+# (fields) kayıt önbelleğe girerken bir kez çıkarılır. DB satırları kısa bir
+# TTL ile tutulur (diğer worker'lardaki admin değişiklikleri için üst sınır),
+# bu süreçteki create/update/delete anında geçersiz kılar. Remote kaynaklar
+# istekte beklenmez: TTL dolunca eski liste servis edilirken arka plan
+# thread'i yeniler. Her (kategori, bayraklar) görünümü serialize edilmiş
+# gövdesi ve ETag'iyle küçük bir LRU'da saklanır.
+
+CATALOG_DB_TTL_SECONDS = int(os.getenv("CONTRACT_TEMPLATE_DB_TTL_SECONDS", "60"))
+CATALOG_VIEW_CACHE_SIZE = 64
+REMOTE_FETCH_TIMEOUT = 8
 
-@router.get("/templates")
-def list_templates(
-    category: Optional[str] = None,
-    include_remote: bool = Query(False),
-    catalog: bool = Query(False),
-    include_seed: bool = Query(True),
-):
-    """Mevcut sözleşme şablonlarını listele"""
-    seed = _seed_catalog() if include_seed else {"categories": [], "templates": []}
-    categories = list(seed.get("categories") or [])
-    templates: List[Dict[str, Any]] = list(seed.get("templates") or [])
 
-    sql = "SELECT * FROM contract_templates"
-    params: tuple = ()
-    if category and not catalog:
-        sql += " WHERE category = %s"
-        params = (category,)
+def _with_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(row)
+    row["id"] = str(row.get("id"))
+    if "fields" not in row:
+        row["fields"] = _infer_fields_from_content(str(row.get("content") or ""))
+    return row
 
+
+def _db_templates_enabled() -> bool:
     use_remote_db = (os.getenv("TEST_USE_REMOTE_DB", "false") or "").lower() == "true"
-    if (os.getenv("ENVIRONMENT") or "").lower() != "test" or use_remote_db:
-        with get_db_cursor() as cur:
-            cur.execute(sql, params)
-            rows = cur.fetchall() or []
-            for r in rows:
-                row = dict(r)
-                row["id"] = str(row.get("id"))
-                if "fields" not in row:
-                    row["fields"] = _infer_fields_from_content(str(row.get("content") or ""))
-                templates.append(row)
-
-    if include_remote and (os.getenv("ENVIRONMENT") or "").lower() != "test":
-        for r in _fetch_remote_templates():
-            if not isinstance(r, dict):
-                continue
-            row = dict(r)
-            row["id"] = str(row.get("id"))
-            if "fields" not in row:
-                row["fields"] = _infer_fields_from_content(str(row.get("content") or ""))
-            templates.append(row)
-
-    if category:
-        c = str(category).strip().lower()
-        templates = [
-            t
-            for t in templates
-            if str(t.get("category_key") or "").lower() == c or str(t.get("category") or "").lower() == c
-        ]
+    return (os.getenv("ENVIRONMENT") or "").lower() != "test" or use_remote_db
 
-    if not catalog:
-        out: List[Dict[str, Any]] = []
-        for t in templates:
-            if not isinstance(t, dict):
-                continue
-            row = dict(t)
-            if "id" in row:
-                row["id"] = str(row["id"])
-            out.append(row)
-        return out
-
-    summaries: List[Dict[str, Any]] = []
-    for t in templates:
-        if not isinstance(t, dict):
-            continue
-        row = dict(t)
-        fields = row.get("fields") or []
-        summaries.append(
-            {
-                "id": str(row.get("id")),
-                "title": row.get("title"),
-                "category": row.get("category"),
-                "category_key": row.get("category_key"),
-                "category_icon": row.get("category_icon"),
-                "subcategory": row.get("subcategory"),
-                "description": row.get("description"),
-                "fields": fields,
-                "field_count": len(fields) if isinstance(fields, list) else 0,
-            }
-        )
-    return {"categories": categories, "templates": summaries}
 
+def _remote_templates_enabled() -> bool:
+    return (os.getenv("ENVIRONMENT") or "").lower() != "test"
 
-_REMOTE_CACHE = {"ts": 0.0, "items": []}
 
 def _default_source_urls() -> List[str]:
     return [
         "https://raw.githubusercontent.com/mironintelligence/Miron22/main/backend/contract_templates_public.json",
     ]
 
-def _fetch_remote_templates(category: Optional[str] = None) -> List[Dict[str, Any]]:
-    ttl = int(os.getenv("CONTRACT_TEMPLATE_REMOTE_TTL_SECONDS", "900"))
-    now = time.time()
-    if _REMOTE_CACHE["items"] and (now - float(_REMOTE_CACHE["ts"])) < ttl:
-        items = list(_REMOTE_CACHE["items"])
-        if category:
-            items = [t for t in items if str(t.get("category") or "").lower() == str(category).lower()]
-        return items
 
+def _fetch_remote_templates() -> List[Dict[str, Any]]:
+    """Remote JSON kaynaklarını senkron indirir; yalnızca arka plan yenilemesinde çağrılır."""
     raw = (os.getenv("CONTRACT_TEMPLATE_SOURCE_URLS") or "").strip()
     urls = [u.strip() for u in raw.split(",") if u.strip()] if raw else _default_source_urls()
     gathered: List[Dict[str, Any]] = []
     for u in urls:
         try:
             req = Request(u, headers={"User-Agent": "miron-ai"})
-            with urlopen(req, timeout=8) as resp:
+            with urlopen(req, timeout=REMOTE_FETCH_TIMEOUT) as resp:
                 data = resp.read().decode("utf-8", errors="replace")
             parsed = json.loads(data)
             if isinstance(parsed, list):
                 for item in parsed:
                     if isinstance(item, dict):
-                        gathered.append(item)
-        except (URLError, HTTPError, ValueError):
+                        gathered.append(_with_fields(item))
+        except (URLError, HTTPError, ValueError, OSError):
             continue
+    return gathered
 
-    _REMOTE_CACHE["ts"] = now
-    _REMOTE_CACHE["items"] = gathered
 
-    if category:
-        gathered = [t for t in gathered if str(t.get("category") or "").lower() == str(category).lower()]
-    return gathered
+class _TemplateCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._db_load_lock = threading.Lock()
+        self._db_rows: Optional[List[Dict[str, Any]]] = None
+        self._db_ts = 0.0
+        self._db_gen = 0
+        self._remote: List[Dict[str, Any]] = []
+        self._remote_ts = 0.0
+        self._remote_refreshing = False
+        self._version = 0
+        self._views: "OrderedDict[tuple, tuple[int, str, bytes]]" = OrderedDict()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    # -- DB -----------------------------------------------------------------
+
+    def invalidate_db(self) -> None:
+        with self._lock:
+            self._db_rows = None
+            self._db_gen += 1
+            self._version += 1
+
+    def db_templates(self) -> List[Dict[str, Any]]:
+        rows, ts = self._db_rows, self._db_ts
+        if rows is not None and time.monotonic() - ts < CATALOG_DB_TTL_SECONDS:
+            return rows
+        # Tek seferde tek yükleme: eşzamanlı soğuk istekler aynı sonucu bekler
+        with self._db_load_lock:
+            if self._db_rows is not None and time.monotonic() - self._db_ts < CATALOG_DB_TTL_SECONDS:
+                return self._db_rows
+            gen = self._db_gen
+            with get_db_cursor() as cur:
+                cur.execute("SELECT * FROM contract_templates ORDER BY id")
+                loaded = [_with_fields(r) for r in (cur.fetchall() or [])]
+            with self._lock:
+                if gen == self._db_gen:
+                    # Yükleme sırasında invalidate geldiyse sonucu önbelleğe alma
+                    if loaded != self._db_rows:
+                        self._version += 1
+                    self._db_rows = loaded
+                    self._db_ts = time.monotonic()
+            return loaded
+
+    # -- Remote -------------------------------------------------------------
+
+    def remote_templates(self) -> List[Dict[str, Any]]:
+        ttl = int(os.getenv("CONTRACT_TEMPLATE_REMOTE_TTL_SECONDS", "900"))
+        with self._lock:
+            stale = not self._remote_ts or time.monotonic() - self._remote_ts >= ttl
+            if stale and not self._remote_refreshing:
+                self._remote_refreshing = True
+                threading.Thread(target=self._refresh_remote, name="contract-template-remote", daemon=True).start()
+            return self._remote
+
+    def _refresh_remote(self) -> None:
+        try:
+            items = _fetch_remote_templates()
+        except Exception:
+            items = None
+        with self._lock:
+            if items is not None and items != self._remote:
+                self._remote = items
+                self._version += 1
+            self._remote_ts = time.monotonic()
+            self._remote_refreshing = False
+
+    # -- Görünümler -------------------------------------------------------
+
+    def view(self, key: tuple, version: int, build: Callable[[], Any]) -> tuple[str, bytes]:
+        """
+        `key` görünümünün (ETag, JSON gövdesi). `version`, build()'in kullandığı
+        veriler okunmadan önce alınmış sürümdür; arada değişiklik olduysa kayıt
+        eski sürümle etiketlenir ve bir sonraki istekte yeniden kurulur.
+        """
+        with self._lock:
+            hit = self._views.get(key)
+            if hit is not None and hit[0] == version == self._version:
+                self._views.move_to_end(key)
+                return hit[1], hit[2]
+        body = json.dumps(jsonable_encoder(build()), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        with self._lock:
+            self._views[key] = (version, etag, body)
+            self._views.move_to_end(key)
+            while len(self._views) > CATALOG_VIEW_CACHE_SIZE:
+                self._views.popitem(last=False)
+        return etag, body
+
+
+_catalog = _TemplateCatalog()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
+
+
+# --- Endpoints ---
+
+@router.get("/templates")
+def list_templates(
+    category: Optional[str] = None,
+    include_remote: bool = Query(False),
+    catalog: bool = Query(False),
+    include_seed: bool = Query(True),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Mevcut sözleşme şablonlarını listele"""
+    use_db = _db_templates_enabled()
+    use_remote = include_remote and _remote_templates_enabled()
+    version = _catalog.version
+    db_rows = _catalog.db_templates() if use_db else []
+    remote_rows = _catalog.remote_templates() if use_remote else []
+
+    def build() -> Any:
+        seed = _seed_catalog() if include_seed else {"categories": [], "templates": []}
+        categories = list(seed.get("categories") or [])
+        templates: List[Dict[str, Any]] = list(seed.get("templates") or []) + db_rows + remote_rows
+
+        if category:
+            c = str(category).strip().lower()
+            templates = [
+                t
+                for t in templates
+                if str(t.get("category_key") or "").lower() == c or str(t.get("category") or "").lower() == c
+            ]
+
+        if not catalog:
+            out: List[Dict[str, Any]] = []
+            for t in templates:
+                row = dict(t)
+                if "id" in row:
+                    row["id"] = str(row["id"])
+                out.append(row)
+            return out
+
+        summaries: List[Dict[str, Any]] = []
+        for t in templates:
+            fields = t.get("fields") or []
+            summaries.append(
+                {
+                    "id": str(t.get("id")),
+                    "title": t.get("title"),
+                    "category": t.get("category"),
+                    "category_key": t.get("category_key"),
+                    "category_icon": t.get("category_icon"),
+                    "subcategory": t.get("subcategory"),
+                    "description": t.get("description"),
+                    "fields": fields,
+                    "field_count": len(fields) if isinstance(fields, list) else 0,
+                }
+            )
+        return {"categories": categories, "templates": summaries}
+
+    key = (str(category or "").strip().lower(), use_remote, catalog, include_seed, use_db)
+    etag, body = _catalog.view(key, version, build)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 @router.get("/templates/{template_id}")
 def get_template(template_id: str):
     """Tekil şablon detayı"""
     tid = str(template_id)
     # DB check
-    if tid.isdigit():
+    if tid.isdigit() and _db_templates_enabled():
+        for t in _catalog.db_templates():
+            if t["id"] == tid:
+                return dict(t)
+        # Başka bir worker'da yeni eklenmiş olabilir
         with get_db_cursor() as cur:
             cur.execute("SELECT * FROM contract_templates WHERE id = %s", (int(tid),))
             row = cur.fetchone()
             if row:
-                r = dict(row)
-                r["id"] = str(r.get("id"))
-                r.setdefault("fields", _infer_fields_from_content(str(r.get("content") or "")))
-                return r
+                return _with_fields(row)
 
     for t in (_seed_catalog().get("templates") or []):
         if str(t.get("id")) == tid:
@@ -918,18 +1027,13 @@ def get_template(template_id: str):
 
     for t in MOCK_TEMPLATES:
         if str(t.get("id")) == tid:
-            row = dict(t)
-            row["id"] = str(row.get("id"))
-            row.setdefault("fields", _infer_fields_from_content(str(row.get("content") or "")))
-            return row
+            return _with_fields(t)
+
+    if _remote_templates_enabled():
+        for t in _catalog.remote_templates():
+            if t["id"] == tid:
+                return dict(t)
 
-    for t in _fetch_remote_templates():
-        if str(t.get("id")) == tid:
-            row = dict(t)
-            row["id"] = str(row.get("id"))
-            row.setdefault("fields", _infer_fields_from_content(str(row.get("content") or "")))
-            return row
-    
     raise HTTPException(status_code=404, detail="Şablon bulunamadı.")
 
 
@@ -1395,7 +1499,9 @@ def create_template(payload: TemplateCreate):
     """
     with get_db_cursor() as cur:
         cur.execute(sql, (payload.title, payload.category, payload.content, payload.description))
-        return {"id": cur.fetchone()['id'], "message": "Şablon oluşturuldu."}
+        new_id = cur.fetchone()['id']
+    _catalog.invalidate_db()
+    return {"id": new_id, "message": "Şablon oluşturuldu."}
 
 
 @router.put("/templates/{template_id}", dependencies=[Depends(require_admin)])
@@ -1428,7 +1534,8 @@ def update_template(template_id: str, payload: TemplateUpdate):
         row = cur.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Şablon bulunamadı.")
-        return {"ok": True, "id": str(row.get("id")), "message": "Şablon güncellendi."}
+    _catalog.invalidate_db()
+    return {"ok": True, "id": str(row.get("id")), "message": "Şablon güncellendi."}
 
 
 @router.delete("/templates/{template_id}", dependencies=[Depends(require_admin)])
@@ -1448,4 +1555,5 @@ def delete_template(template_id: str):
         row = cur.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Şablon bulunamadı.")
-        return {"ok": True, "id": str(row.get("id")), "message": "Şablon silindi."}
+    _catalog.invalidate_db()
+    return {"ok": True, "id": str(row.get("id")), "message": "Şablon silindi."}
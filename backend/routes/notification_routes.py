@@ -1,213 +1,239 @@
+import asyncio
+import hashlib
+import json
 import logging
 
-from fastapi import APIRouter, HTTPException, Depends, Body, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Body, Header, Query
+from fastapi.responses import JSONResponse, Response
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from pydantic import BaseModel
 from db import get_db_cursor
 from admin_auth import require_admin
 from user_auth import get_current_user
-from services.notification_delivery import send_email, build_reminder_email
+from services import notification_state
 
 router = APIRouter(prefix="/api/notifications", tags=["Bildirimler"])
 logger = logging.getLogger("miron_notifications")
 
 
-def _fmt_due(dt) -> str:
-    try:
-        return dt.astimezone().strftime("%d %B %Y, %H:%M")
-    except Exception:
-        return str(dt)
+class NotificationCreate(BaseModel):
+    user_id: Optional[str] = None # If None, system-wide or specific target logic needed
+    type: str # 'system', 'admin', 'case_reminder'
+    title: str
+    message: str
+
+# --- Kullanıcı Endpointleri ---
 
+LONG_POLL_MAX_SECONDS = 25
+LIST_LIMIT = 50
 
-def _offset_label(minutes: int) -> str:
-    if minutes >= 7 * 24 * 60: return "7 gün"
-    if minutes >= 24 * 60:     return f"{minutes // (24 * 60)} gün"
-    if minutes >= 60:          return f"{minutes // 60} saat"
-    return f"{minutes} dakika"
 
+def _etag(payload: Any) -> str:
+    body = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return f'W/"{hashlib.sha1(body.encode("utf-8")).hexdigest()[:20]}"'
 
-def _lawyer_display(first: Optional[str], last: Optional[str]) -> str:
-    name = " ".join(p for p in [first, last] if p and p.strip()).strip()
-    return f"Av. {name}" if name else "Değerli Avukat"
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
 
-def _send_email_safely(email: str, subject: str, html: str) -> None:
+
+# Duyurular (notification_broadcasts) bir kez saklanır ve okuma anında
+# birleştirilir: alıcılar, duyuru anında hesabı bulunan kullanıcılardır; okundu
+# bilgisi yalnızca kullanıcı işaretlediğinde notification_broadcast_reads'e yazılır.
+_BROADCAST_VISIBLE = """
+    b.created_at >= COALESCE((SELECT u.created_at FROM users u WHERE u.id = %s), '-infinity'::timestamptz)
+"""
+BROADCAST_ID_PREFIX = "b"
+
+
+def _load_list(user_id: str) -> Dict[str, Any]:
+    with get_db_cursor(write=False) as cur:
+        cur.execute(
+            """
+            SELECT id, user_id::text, type, title, message, is_read,
+                   to_char(created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') AS created_at
+            FROM notifications
+            WHERE user_id = %s
+            ORDER BY created_at DESC
+            LIMIT %s
+            """,
+            (user_id, LIST_LIMIT),
+        )
+        rows = [dict(r) for r in (cur.fetchall() or [])]
+        cur.execute(
+            f"""
+            SELECT b.id, b.type, b.title, b.message, (r.user_id IS NOT NULL) AS is_read,
+                   to_char(b.created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') AS created_at
+            FROM notification_broadcasts b
+            LEFT JOIN notification_broadcast_reads r ON r.broadcast_id = b.id AND r.user_id = %s
+            WHERE {_BROADCAST_VISIBLE}
+            ORDER BY b.created_at DESC
+            LIMIT %s
+            """,
+            (user_id, user_id, LIST_LIMIT),
+        )
+        for b in cur.fetchall() or []:
+            row = dict(b)
+            row["broadcast_id"] = int(row["id"])
+            row["id"] = f"{BROADCAST_ID_PREFIX}{row['id']}"
+            row["user_id"] = user_id
+            rows.append(row)
+    rows.sort(key=lambda r: str(r.get("created_at") or ""), reverse=True)
+    rows = rows[:LIST_LIMIT]
+    return {"rows": rows, "etag": _etag(rows)}
+
+
+def _load_unread(user_id: str) -> Dict[str, Any]:
+    with get_db_cursor(write=False) as cur:
+        cur.execute(
+            f"""
+            SELECT
+              (SELECT COUNT(*) FROM notifications
+               WHERE user_id = %s AND is_read = FALSE)
+            + (SELECT COUNT(*) FROM notification_broadcasts b
+               WHERE {_BROADCAST_VISIBLE}
+                 AND NOT EXISTS (
+                   SELECT 1 FROM notification_broadcast_reads r
+                   WHERE r.broadcast_id = b.id AND r.user_id = %s
+                 )) AS c
+            """,
+            (user_id, user_id, user_id),
+        )
+        row = cur.fetchone() or {}
+    count = int(row.get("c") or 0)
+    return {"count": count, "etag": _etag({"count": count})}
+
+
+def _snapshot(user_id: str) -> tuple[int, Dict[str, Any]]:
+    return notification_state.cached(user_id, "list", lambda: _load_list(user_id))
+
+
+def _parse_cursor(since: Optional[str]) -> Optional[tuple[int, int]]:
+    """`since` = "<son bildirim id>[:<son duyuru id>]"; X-Notification-Cursor'dan gelir."""
+    if since is None:
+        return None
+    own, _, broadcast = since.partition(":")
     try:
-        send_email(email, subject, html)
-    except Exception:
-        pass
+        return int(own or 0), int(broadcast or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz since değeri.")
 
 
-def _fanout_due_reminders(user_id: str, pending_emails: list[tuple[str, str, str]]) -> None:
-    """Create in-app rows for due reminders; append (email, subject, html) jobs to pending_emails."""
-    with get_db_cursor() as cur:
-        try:
-            cur.execute(
-                """
-                SELECT t.id AS trigger_id, t.channel, r.id AS reminder_id,
-                       r.title, r.details, r.due_at, r.case_number, r.court, t.trigger_at,
-                       u.email AS user_email, u.first_name, u.last_name
-                FROM case_reminder_triggers t
-                JOIN case_reminders r ON r.id = t.reminder_id
-                JOIN users u ON u.id = t.user_id
-                WHERE t.user_id = %s
-                  AND t.sent_at IS NULL
-                  AND r.archived_at IS NULL
-                  AND t.trigger_at <= NOW()
-                ORDER BY t.trigger_at ASC
-                LIMIT 50
-                """,
-                (user_id,),
-            )
-            due = cur.fetchall() or []
-            for r in due:
-                title = str(r.get("title") or "Dava Hatırlatıcı")
-                due_at = r.get("due_at")
-                channel = str(r.get("channel") or "in_app").strip().lower()
-                due_fmt = _fmt_due(due_at) if due_at else ""
-
-                # in_app bildirimi (her kanalda oluştur)
-                parts = [f"Tarih: {due_fmt}"]
-                if r.get("court"):       parts.append(f"Mahkeme: {r['court']}")
-                if r.get("case_number"): parts.append(f"Dosya No: {r['case_number']}")
-                cur.execute(
-                    "INSERT INTO notifications (user_id, type, title, message, is_read) VALUES (%s, %s, %s, %s, FALSE)",
-                    (user_id, "case_reminder", title, "\n".join(parts)),
-                )
-
-                # email kanalı → branded HTML şablon
-                if channel == "email":
-                    email_addr = str(r.get("user_email") or "").strip()
-                    if email_addr:
-                        trigger_at = r.get("trigger_at")
-                        diff_min = int((due_at - trigger_at).total_seconds() / 60) if (trigger_at and due_at) else 0
-                        lawyer = _lawyer_display(r.get("first_name"), r.get("last_name"))
-                        subj, html = build_reminder_email(
-                            lawyer_name  = lawyer,
-                            title        = title,
-                            due_at_fmt   = due_fmt,
-                            court        = r.get("court"),
-                            case_number  = r.get("case_number"),
-                            details      = r.get("details"),
-                            offset_label = _offset_label(diff_min),
-                        )
-                        pending_emails.append((email_addr, subj, html))
-
-                cur.execute(
-                    "UPDATE case_reminder_triggers SET sent_at = NOW() WHERE id = %s",
-                    (r.get("trigger_id"),),
-                )
-        except Exception:
-            cur.execute(
-                """
-                SELECT id, title, details, due_at
-                FROM case_reminders
-                WHERE user_id = %s
-                  AND notified_at IS NULL
-                  AND due_at <= NOW()
-                ORDER BY due_at ASC
-                LIMIT 50
-                """,
-                (user_id,),
-            )
-            due = cur.fetchall() or []
-            for r in due:
-                title = str(r.get("title") or "Dava Hatırlatıcı")
-                due_at = r.get("due_at")
-                msg = f"Tarih: {_fmt_due(due_at)}" if due_at else title
-                cur.execute(
-                    "INSERT INTO notifications (user_id, type, title, message, is_read) VALUES (%s, %s, %s, %s, FALSE)",
-                    (user_id, "case_reminder", title, msg),
-                )
-                cur.execute(
-                    "UPDATE case_reminders SET notified_at = NOW() WHERE id = %s",
-                    (r.get("id"),),
-                )
+def _cursor_of(rows: List[Dict[str, Any]], cursor: Optional[tuple[int, int]]) -> str:
+    own, broadcast = cursor or (0, 0)
+    for r in rows:
+        if "broadcast_id" in r:
+            broadcast = max(broadcast, int(r["broadcast_id"]))
+        else:
+            own = max(own, int(r.get("id") or 0))
+    return f"{own}:{broadcast}"
 
 
-class NotificationCreate(BaseModel):
-    user_id: Optional[str] = None # If None, system-wide or specific target logic needed
-    type: str # 'system', 'admin', 'case_reminder'
-    title: str
-    message: str
+def _newer(rows: List[Dict[str, Any]], cursor: Optional[tuple[int, int]]) -> List[Dict[str, Any]]:
+    if cursor is None:
+        return rows
+    own, broadcast = cursor
+    return [
+        r for r in rows
+        if (int(r["broadcast_id"]) > broadcast if "broadcast_id" in r else int(r.get("id") or 0) > own)
+    ]
 
-# --- Kullanıcı Endpointleri ---
 
 # Hem /api/notifications hem /api/notifications/ (307 yönlendirmesiz).
 @router.get("", include_in_schema=False)
 @router.get("/")
-def get_my_notifications(
-    background_tasks: BackgroundTasks,
+async def get_my_notifications(
+    since: Optional[str] = Query(None, max_length=64),
+    wait: int = Query(0, ge=0, le=LONG_POLL_MAX_SECONDS),
+    if_none_match: Optional[str] = Header(None),
     user: Dict[str, Any] = Depends(get_current_user),
 ):
     """List the caller's notifications.
 
     This endpoint is polled every minute by every authed browser tab, so it is
-    the single hottest read in the system. Two rules:
-      1. Keep the query plan narrow: one composite index hit for the SELECT.
-      2. Never do a blocking network call (SMTP) while holding a DB cursor.
-         Email delivery is scheduled via BackgroundTasks.
-    """
-    user_id = user.get("id")
-    pending_emails: list[tuple[str, str, str]] = []
-
-    try:
-        _fanout_due_reminders(str(user_id), pending_emails)
-    except Exception:
-        logger.exception(
-            "reminder fan-out failed (continuing to list notifications) user_id=%s",
-            user_id,
-        )
+    the single hottest read in the system. Rules:
+      1. Read-only: due reminders are materialised into `notifications` by the
+         scheduled sweeper (services/reminder_scheduler.py), never here.
+      2. Keep the query plan narrow: one composite index hit for the SELECT.
+      3. If the caller's change stamp hasn't moved, answer from the
+         per-process cache without touching Postgres.
+      4. Unchanged polls carry no body: 304 for a matching If-None-Match,
+         204 when `since` has nothing newer. `since` is the opaque
+         X-Notification-Cursor of the previous response ("<id>:<broadcast id>").
 
-    for email_addr, subject, html in pending_emails:
-        background_tasks.add_task(_send_email_safely, email_addr, subject, html)
+    `wait` > 0 turns the call into a long-poll: when nothing changed the
+    request parks (without holding a DB connection or a worker thread) until
+    the caller's stamp moves or `wait` seconds pass.
+    """
+    user_id = str(user.get("id"))
+    cursor = _parse_cursor(since)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
 
     try:
-        with get_db_cursor(write=False) as cur:
-            cur.execute(
-                """
-                SELECT id, user_id::text, type, title, message, is_read,
-                       to_char(created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') AS created_at
-                FROM notifications
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-                LIMIT 50
-                """,
-                (user_id,),
-            )
-            return [dict(r) for r in (cur.fetchall() or [])]
+        stamp, snap = await asyncio.to_thread(_snapshot, user_id)
+        while True:
+            rows = _newer(snap["rows"], cursor)
+            unchanged = not rows if cursor is not None else _etag_matches(if_none_match, snap["etag"])
+            remaining = deadline - loop.time()
+            if not unchanged or remaining <= 0:
+                break
+            await notification_state.wait_for_change(user_id, stamp, remaining)
+            stamp, snap = await asyncio.to_thread(_snapshot, user_id)
     except Exception:
         logger.exception("notification list fetch failed user_id=%s", user_id)
         return []
 
+    headers = {
+        "ETag": snap["etag"],
+        "Cache-Control": "private, no-cache",
+        "X-Notification-Cursor": _cursor_of(snap["rows"], cursor),
+    }
+    if unchanged:
+        return Response(status_code=304 if cursor is None else 204, headers=headers)
+    return JSONResponse(content=rows, headers=headers)
+
 
 @router.get("/unread-count")
-def get_unread_count(user: Dict[str, Any] = Depends(get_current_user)):
-    user_id = user.get("id")
-    with get_db_cursor() as cur:
-        cur.execute(
-            """
-            SELECT COUNT(*) AS c
-            FROM notifications
-            WHERE user_id = %s AND is_read = FALSE
-            """,
-            (user_id,),
-        )
-        row = cur.fetchone() or {}
-    return {"count": int(row.get("c") or 0)}
+def get_unread_count(
+    if_none_match: Optional[str] = Header(None),
+    user: Dict[str, Any] = Depends(get_current_user),
+):
+    user_id = str(user.get("id"))
+    _, snap = notification_state.cached(user_id, "unread", lambda: _load_unread(user_id))
+    headers = {"ETag": snap["etag"], "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, snap["etag"]):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content={"count": snap["count"]}, headers=headers)
 
 @router.post("/{notif_id}/read")
-def mark_as_read(notif_id: int, user: Dict[str, Any] = Depends(get_current_user)):
-    """Bildirimi okundu olarak işaretle"""
+def mark_as_read(notif_id: str, user: Dict[str, Any] = Depends(get_current_user)):
+    """Bildirimi okundu olarak işaretle (duyurular için id "b<id>" biçimindedir)"""
     user_id = user.get("id")
-    sql = """
-        UPDATE notifications 
-        SET is_read = TRUE 
-        WHERE id = %s AND user_id = %s
-    """
+    nid = str(notif_id).strip()
+    if nid.startswith(BROADCAST_ID_PREFIX) and nid[1:].isdigit():
+        sql = """
+            INSERT INTO notification_broadcast_reads (user_id, broadcast_id)
+            VALUES (%s, %s)
+            ON CONFLICT (user_id, broadcast_id) DO NOTHING
+        """
+        params = (user_id, int(nid[1:]))
+    elif nid.isdigit():
+        sql = """
+            UPDATE notifications 
+            SET is_read = TRUE 
+            WHERE id = %s AND user_id = %s
+        """
+        params = (int(nid), user_id)
+    else:
+        raise HTTPException(status_code=400, detail="Geçersiz bildirim id.")
     with get_db_cursor() as cur:
-        cur.execute(sql, (notif_id, user_id))
+        cur.execute(sql, params)
+    notification_state.bump([user_id])
     return {"status": "ok"}
 
 # --- Admin Endpointleri ---
@@ -224,6 +250,7 @@ def send_notification(payload: NotificationCreate):
         """
         with get_db_cursor() as cur:
             cur.execute(sql, (payload.user_id, payload.type, payload.title, payload.message))
+        notification_state.bump([payload.user_id])
         return {"status": "ok", "message": "Bildirim gönderildi."}
     
     # Eğer user_id yoksa, bu bir "Broadcast" denemesi olabilir (Tüm kullanıcılara)
@@ -239,23 +266,29 @@ class BroadcastPayload(BaseModel):
 
 @router.post("/broadcast", dependencies=[Depends(require_admin)])
 def broadcast_notification(payload: BroadcastPayload):
-    """Admin: Tüm kullanıcılara duyuru gönder"""
-    # Bu işlem ağır olabilir, background task olarak yapılmalı.
-    # Şimdilik basit döngü ile (Limitli)
-    
-    sql_users = "SELECT id FROM users WHERE is_active = TRUE"
-    
+    """Admin: Tüm kullanıcılara duyuru gönder
+
+    Duyuru tek satır olarak saklanır (fan-out-on-read); kullanıcı listesi ve
+    okunmamış sayısı onu okuma anında birleştirir. Kullanıcı sayısından
+    bağımsız olarak tek INSERT.
+    """
     with get_db_cursor() as cur:
-        cur.execute(sql_users)
-        users = cur.fetchall()
-        
-        # Batch insert
-        if not users:
-            return {"status": "ok", "count": 0}
-            
-        args_list = [(u['id'], payload.type, payload.title, payload.message) for u in users]
-        sql_insert = "INSERT INTO notifications (user_id, type, title, message) VALUES (%s, %s, %s, %s)"
-        
-        cur.executemany(sql_insert, args_list)
-        
-    return {"status": "ok", "count": len(users), "message": "Duyuru tüm kullanıcılara gönderildi."}
+        cur.execute(
+            """
+            INSERT INTO notification_broadcasts (type, title, message)
+            VALUES (%s, %s, %s)
+            RETURNING id
+            """,
+            (payload.type, payload.title, payload.message),
+        )
+        broadcast_id = (cur.fetchone() or {}).get("id")
+        cur.execute("SELECT COUNT(*) AS c FROM users WHERE is_active = TRUE")
+        count = int((cur.fetchone() or {}).get("c") or 0)
+
+    notification_state.bump_all()
+    return {
+        "status": "ok",
+        "id": f"{BROADCAST_ID_PREFIX}{broadcast_id}",
+        "count": count,
+        "message": "Duyuru tüm kullanıcılara gönderildi.",
+    }
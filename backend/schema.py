@@ -112,6 +112,25 @@ def ensure_schema() -> None:
         # authed tab. A narrow composite index lets both queries plan on an
         # index-only scan without touching the heap.
         "CREATE INDEX IF NOT EXISTS idx_notifications_user_unread ON notifications(user_id, is_read, created_at DESC);",
+        # Fan-out-on-read broadcasts (migration 032): stored once, read state per user lazily.
+        """
+        CREATE TABLE IF NOT EXISTS notification_broadcasts (
+            id BIGSERIAL PRIMARY KEY,
+            type VARCHAR(50) NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            message TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_notification_broadcasts_created ON notification_broadcasts(created_at DESC);",
+        """
+        CREATE TABLE IF NOT EXISTS notification_broadcast_reads (
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            broadcast_id BIGINT NOT NULL REFERENCES notification_broadcasts(id) ON DELETE CASCADE,
+            read_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (user_id, broadcast_id)
+        );
+        """,
         """
         CREATE TABLE IF NOT EXISTS case_reminders (
             id UUID PRIMARY KEY,
@@ -147,6 +166,15 @@ def ensure_schema() -> None:
         # Supporting the JOIN in /api/notifications which filters by
         # (user_id, sent_at IS NULL, trigger_at <= NOW()).
         "CREATE INDEX IF NOT EXISTS idx_case_reminder_triggers_pending ON case_reminder_triggers(user_id, trigger_at) WHERE sent_at IS NULL;",
+        # Dispatcher claim/lease + retry / dead-letter state (migration 030).
+        """
+        ALTER TABLE case_reminder_triggers
+            ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ,
+            ADD COLUMN IF NOT EXISTS last_error TEXT,
+            ADD COLUMN IF NOT EXISTS dead_at TIMESTAMPTZ;
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_case_reminder_triggers_dispatch ON case_reminder_triggers(trigger_at) WHERE sent_at IS NULL AND dead_at IS NULL;",
         """
         CREATE TABLE IF NOT EXISTS contract_templates (
             id SERIAL PRIMARY KEY,
@@ -321,10 +349,46 @@ def ensure_schema() -> None:
         "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS metadata JSONB DEFAULT '{}';",
         "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS referenced_laws TEXT[] DEFAULT '{}';",
         "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS citation_count INTEGER DEFAULT 0;",
+        "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS cluster_id INTEGER;",
         "CREATE INDEX IF NOT EXISTS idx_decisions_fts ON decisions USING GIN(to_tsvector('turkish', full_text));",
         "CREATE INDEX IF NOT EXISTS idx_decisions_court ON decisions(court);",
         "CREATE INDEX IF NOT EXISTS idx_decisions_hash ON decisions(hash);",
         "CREATE INDEX IF NOT EXISTS idx_decisions_date ON decisions(decision_date);",
+        "CREATE INDEX IF NOT EXISTS idx_decisions_cluster_id ON decisions(cluster_id) WHERE cluster_id IS NOT NULL;",
+        # Ingestion dedup: source URL + 64-bit SimHash (migration 010/011).
+        "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS source_url TEXT;",
+        "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS raw_json JSONB;",
+        "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS fingerprint TEXT;",
+        "CREATE INDEX IF NOT EXISTS idx_decisions_source_url ON decisions(source_url);",
+        "CREATE INDEX IF NOT EXISTS idx_decisions_fingerprint ON decisions(fingerprint);",
+        # Banded SimHash near-duplicate index (migration 028).
+        """
+        CREATE TABLE IF NOT EXISTS decision_simhash_bands (
+            decision_id UUID NOT NULL REFERENCES decisions(id) ON DELETE CASCADE,
+            band        SMALLINT NOT NULL,
+            bucket      INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, decision_id)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_decision_simhash_bands_decision ON decision_simhash_bands(decision_id);",
+        # Crawler URL frontier: validators + adaptive recrawl schedule (migration 029).
+        """
+        CREATE TABLE IF NOT EXISTS crawl_frontier (
+            url                 TEXT PRIMARY KEY,
+            source              TEXT NOT NULL,
+            etag                TEXT,
+            last_modified       TEXT,
+            content_hash        TEXT,
+            status              INT,
+            recrawl_interval_s  INT NOT NULL DEFAULT 86400,
+            fetch_count         INT NOT NULL DEFAULT 0,
+            change_count        INT NOT NULL DEFAULT 0,
+            last_fetched_at     TIMESTAMPTZ,
+            last_changed_at     TIMESTAMPTZ,
+            next_fetch_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_crawl_frontier_due ON crawl_frontier(source, next_fetch_at);",
         # ------------------------------------------------------------------
         # Asistan sohbet geçmişi (Supabase kalıcı depolama)
         # ------------------------------------------------------------------
@@ -342,6 +406,20 @@ def ensure_schema() -> None:
         "ALTER TABLE assistant_chats ADD COLUMN IF NOT EXISTS messages_enc TEXT;",
         "ALTER TABLE assistant_chats ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ NOT NULL DEFAULT (NOW() + INTERVAL '90 days');",
         "CREATE INDEX IF NOT EXISTS idx_assistant_chats_expires ON assistant_chats(expires_at);",
+        # Metadata-only sidebar list with (updated_at, id) keyset paging (migration 033).
+        "ALTER TABLE assistant_chats ADD COLUMN IF NOT EXISTS message_count INT;",
+        "CREATE INDEX IF NOT EXISTS idx_assistant_chats_user_updated_id ON assistant_chats(user_id, updated_at DESC, id DESC);",
+        # Append-only per-message rows, one per turn message (migration 034).
+        """
+        CREATE TABLE IF NOT EXISTS assistant_chat_messages (
+            chat_id     BIGINT NOT NULL REFERENCES assistant_chats(id) ON DELETE CASCADE,
+            seq         INT NOT NULL,
+            payload     TEXT NOT NULL,
+            encrypted   BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (chat_id, seq)
+        );
+        """,
         "ALTER TABLE users ADD COLUMN IF NOT EXISTS ai_improvement_consent BOOLEAN DEFAULT FALSE;",
         "ALTER TABLE users ADD COLUMN IF NOT EXISTS ai_improvement_consent_at TIMESTAMPTZ;",
         # Şifre sıfırlama kolonları — forgot-password + OTP akışı için gerekli
@@ -1,50 +1,228 @@
+"""Backfill (or refresh) decisions.fingerprint and its LSH band rows.
+
+  python scripts/backfill_fingerprints.py              # rows with fingerprint IS NULL
+  python scripts/backfill_fingerprints.py --refresh    # every row, after a SimHash change
+  python scripts/backfill_fingerprints.py --refresh --reset  # ignore the saved checkpoint
+
+Rows are read in keyset order by id and SimHash runs in a process pool while
+the next batch is being fetched. Each batch is written with a single
+statement: UPDATE ... FROM unnest(...) for the fingerprints plus the matching
+decision_simhash_bands rows, so a batch lands (or fails) as a unit. The
+fingerprint is a pure function of full_text, so in --refresh mode rows whose
+recomputed value equals the stored one are not written at all.
+
+The default mode needs no checkpoint: "fingerprint IS NULL" already skips
+finished rows, and ids are random UUIDs, so a saved position would hide new
+NULL rows that sort below it. --refresh rewrites rows that are not NULL, so
+its progress (last id and counters) is checkpointed to a small JSON file after
+every batch; rerunning resumes after the last committed batch and the file is
+removed once the pass completes.
+"""
+
+import argparse
 import asyncio
+import json
 import os
 import sys
-import hashlib
-import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
-# Adjust path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
 from dotenv import load_dotenv
-load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "backend", ".env"))
+load_dotenv(os.path.join(BACKEND_DIR, ".env"))
 
 from db_async import db
-from utils.fingerprint import simhash
+from utils.fingerprint import band_buckets, simhash_many
 
-async def backfill():
-    print("--- 🧬 BACKFILLING FINGERPRINTS ---")
-    await db.init_pools()
-    
-    # Process in batches
-    batch_size = 100
-    offset = 0
-    
-    while True:
+MIN_UUID = "00000000-0000-0000-0000-000000000000"
+DEFAULT_STATE = Path(BACKEND_DIR) / "data" / "backfill_fingerprints.state.json"
+MAX_ATTEMPTS = 5
+
+WRITE_SQL = """
+    WITH v AS (
+        SELECT * FROM unnest($1::uuid[], $2::text[]) AS v(id, fp)
+    ),
+    nb AS (
+        SELECT * FROM unnest($3::uuid[], $4::smallint[], $5::int[]) AS nb(decision_id, band, bucket)
+    ),
+    upd AS (
+        UPDATE decisions d SET fingerprint = v.fp FROM v WHERE d.id = v.id
+    ),
+    stale AS (
+        DELETE FROM decision_simhash_bands b
+        USING v
+        WHERE b.decision_id = v.id
+          AND NOT EXISTS (
+              SELECT 1 FROM nb
+              WHERE nb.decision_id = b.decision_id AND nb.band = b.band AND nb.bucket = b.bucket
+          )
+    )
+    INSERT INTO decision_simhash_bands (decision_id, band, bucket)
+    SELECT decision_id, band, bucket FROM nb
+    ON CONFLICT DO NOTHING
+"""
+
+
+def load_state(path: Path, refresh: bool, reset: bool) -> Dict[str, Any]:
+    mode = "refresh" if refresh else "missing"
+    fresh = {"mode": mode, "last_id": MIN_UUID, "scanned": 0, "written": 0, "unchanged": 0}
+    if not refresh or reset or not path.exists():
+        return fresh
+    try:
+        state = json.loads(path.read_text())
+    except Exception:
+        return fresh
+    # A checkpoint from the other mode covers a different row set.
+    return state if state.get("mode") == mode else fresh
+
+
+def save_state(path: Path, state: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+async def with_retry(label: str, op):
+    for attempt in range(1, MAX_ATTEMPTS + 1):
         try:
-            rows = await db.fetch_all(f"SELECT id, full_text FROM decisions WHERE fingerprint IS NULL LIMIT {batch_size}")
-            if not rows:
-                break
-                
-            print(f"Processing batch offset {offset} ({len(rows)} docs)...")
-            
-            updates = []
-            for row in rows:
-                fp = simhash(row['full_text'])
-                updates.append((fp, row['id']))
-                
-            # Construct update queries
-            # "UPDATE decisions SET fingerprint = $1 WHERE id = $2"
-            await db.execute_many("UPDATE decisions SET fingerprint = $1 WHERE id = $2", updates, timeout=120.0)
-            
-            offset += len(rows)
+            return await op()
         except Exception as e:
-            print(f"Error in batch: {e}. Retrying in 5s...")
+            if attempt == MAX_ATTEMPTS:
+                raise
+            print(f"{label} failed ({e}); retry {attempt}/{MAX_ATTEMPTS - 1} in 5s")
             await asyncio.sleep(5)
+
+
+async def fetch_batch(after_id: str, batch_size: int, refresh: bool):
+    where = "id > $1::uuid" if refresh else "id > $1::uuid AND fingerprint IS NULL"
+    sql = f"SELECT id, full_text, fingerprint FROM decisions WHERE {where} ORDER BY id LIMIT $2"
+    return await with_retry("fetch", lambda: db.fetch_all(sql, after_id, batch_size, timeout=120.0))
+
+
+async def compute(pool: ProcessPoolExecutor, workers: int, texts: List[str]) -> List[str]:
+    """simhash_many over ``workers`` contiguous slices, order preserved."""
+    loop = asyncio.get_running_loop()
+    step = max(1, -(-len(texts) // workers))
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, simhash_many, texts[i:i + step])
+        for i in range(0, len(texts), step)
+    ))
+    return [fp for part in parts for fp in part]
+
+
+def build_write_args(rows, fingerprints: List[str]):
+    """Changed rows only: (ids, fps, band_ids, bands, buckets)."""
+    ids, fps, band_ids, bands, buckets = [], [], [], [], []
+    for row, fp in zip(rows, fingerprints):
+        if row["fingerprint"] == fp:
             continue
-        
+        ids.append(row["id"])
+        fps.append(fp)
+        for band, bucket in enumerate(band_buckets(fp)):
+            band_ids.append(row["id"])
+            bands.append(band)
+            buckets.append(bucket)
+    return ids, fps, band_ids, bands, buckets
+
+
+async def estimate_rows() -> Optional[int]:
+    try:
+        row = await db.fetch_one("SELECT reltuples::bigint AS n FROM pg_class WHERE relname = 'decisions'")
+        return int(row["n"]) if row and row["n"] and row["n"] > 0 else None
+    except Exception:
+        return None
+
+
+async def backfill(args) -> None:
+    print("--- 🧬 BACKFILLING FINGERPRINTS ---")
+    await db.init_pools()
+    state_path = Path(args.state)
+    state = load_state(state_path, args.refresh, args.reset)
+    total = await estimate_rows() if args.refresh else None
+    print({"mode": state["mode"], "resume_after": state["last_id"], "workers": args.workers,
+           "batch_size": args.batch_size, "estimated_rows": total})
+
+    started = time.perf_counter()
+    run_scanned = 0
+    pool = ProcessPoolExecutor(max_workers=args.workers)
+    try:
+        next_rows = asyncio.create_task(fetch_batch(state["last_id"], args.batch_size, args.refresh))
+        while True:
+            t_fetch = time.perf_counter()
+            rows = await next_rows
+            fetch_s = time.perf_counter() - t_fetch
+            if not rows:
+                break
+            last_id = str(rows[-1]["id"])
+            # Overlap the next read with this batch's compute + write.
+            next_rows = asyncio.create_task(fetch_batch(last_id, args.batch_size, args.refresh))
+
+            t0 = time.perf_counter()
+            fingerprints = await compute(pool, args.workers, [r["full_text"] for r in rows])
+            compute_s = time.perf_counter() - t0
+
+            write_args = build_write_args(rows, fingerprints)
+            t0 = time.perf_counter()
+            if write_args[0]:
+                await with_retry("write", lambda: db.execute(WRITE_SQL, *write_args, timeout=120.0))
+            write_s = time.perf_counter() - t0
+
+            written = len(write_args[0])
+            run_scanned += len(rows)
+            state.update(
+                last_id=last_id,
+                scanned=state["scanned"] + len(rows),
+                written=state["written"] + written,
+                unchanged=state["unchanged"] + len(rows) - written,
+            )
+            if args.refresh:
+                save_state(state_path, state)
+
+            elapsed = time.perf_counter() - started
+            rate = run_scanned / elapsed if elapsed > 0 else 0.0
+            progress = {
+                "scanned": state["scanned"],
+                "written": state["written"],
+                "unchanged": state["unchanged"],
+                "rows_per_s": round(rate, 1),
+                "batch": {"rows": len(rows), "written": written, "fetch_s": round(fetch_s, 3),
+                          "compute_s": round(compute_s, 3), "write_s": round(write_s, 3)},
+            }
+            if total:
+                progress["pct"] = round(min(100.0, 100.0 * state["scanned"] / total), 1)
+                if rate:
+                    progress["eta_s"] = round(max(0, total - state["scanned"]) / rate)
+            print(progress)
+        if args.refresh:
+            # Pass complete: the next --refresh starts from the beginning.
+            state_path.unlink(missing_ok=True)
+    finally:
+        pool.shutdown(cancel_futures=True)
+        await db.close_pools()
+
+    elapsed = time.perf_counter() - started
+    print({"done": True, "elapsed_s": round(elapsed, 1), "scanned": state["scanned"],
+           "written": state["written"], "unchanged": state["unchanged"],
+           "rows_per_s": round(run_scanned / elapsed, 1) if elapsed > 0 else None})
     print("Backfill Complete.")
-    await db.close_pools()
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--refresh", action="store_true", help="recompute every row, not only NULL fingerprints")
+    p.add_argument("--reset", action="store_true", help="--refresh from the beginning, ignoring the checkpoint")
+    p.add_argument("--batch-size", type=int, default=int(os.getenv("FINGERPRINT_BATCH_SIZE", "1000")))
+    p.add_argument("--workers", type=int, default=int(os.getenv("FINGERPRINT_WORKERS", str(os.cpu_count() or 1))))
+    p.add_argument("--state", default=os.getenv("FINGERPRINT_STATE_FILE", str(DEFAULT_STATE)))
+    args = p.parse_args(argv)
+    args.batch_size = max(1, args.batch_size)
+    args.workers = max(1, args.workers)
+    return args
+
 
 if __name__ == "__main__":
-    asyncio.run(backfill())
+    asyncio.run(backfill(parse_args()))
@@ -0,0 +1,64 @@
+import hashlib
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.fingerprint import simhash_many
+
+# Roughly AYM-sized synthetic decisions drawn from a legal-ish vocabulary.
+VOCAB = (
+    "anayasa mahkemesi başvuru hak ihlal karar madde kanun mahkeme davacı davalı "
+    "hüküm temyiz itiraz gerekçe esas sayı tarih bireysel mülkiyet adil yargılanma "
+    "ifade özgürlüğü kişi hürriyeti güvenlik tazminat yargılama süre makul ilke"
+).split() + [f"t{i}" for i in range(5000)]
+
+
+def legacy_simhash(text: str) -> str:
+    # Pre-vectorization implementation kept for comparison.
+    if not text: return "0"
+    v = [0] * 64
+    for t in re.findall(r'\w+', text.lower()):
+        h = int(hashlib.sha256(t.encode("utf-8")).hexdigest()[:16], 16)
+        for i in range(64):
+            if h & (1 << i):
+                v[i] += 1
+            else:
+                v[i] -= 1
+    fingerprint = 0
+    for i in range(64):
+        if v[i] > 0:
+            fingerprint |= (1 << i)
+    return hex(fingerprint)[2:]
+
+
+def make_docs(n: int, words: int, seed: int = 42):
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choices(VOCAB, k=words)) for _ in range(n)]
+
+
+def bench(label, fn, docs):
+    t0 = time.perf_counter()
+    fn(docs)
+    elapsed = time.perf_counter() - t0
+    print({"impl": label, "docs": len(docs), "total_s": round(elapsed, 3), "docs_per_s": round(len(docs) / elapsed, 1)})
+
+
+def main():
+    n = int(os.getenv("BENCH_DOCS", "10000"))
+    words = int(os.getenv("BENCH_WORDS", "3000"))
+    docs = make_docs(n, words)
+    bench("vectorized", simhash_many, docs)
+    # Legacy is ~2 orders of magnitude slower; sample it and extrapolate.
+    sample = docs[: max(1, n // 20)]
+    t0 = time.perf_counter()
+    [legacy_simhash(d) for d in sample]
+    per_doc = (time.perf_counter() - t0) / len(sample)
+    print({"impl": "legacy_sha256", "docs": len(sample), "est_total_s": round(per_doc * n, 3), "docs_per_s": round(1 / per_doc, 1)})
+
+
+if __name__ == "__main__":
+    main()
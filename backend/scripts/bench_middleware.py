@@ -0,0 +1,123 @@
+"""Per-request middleware overhead on /api/health.
+
+Drives ASGI apps directly (no HTTP client, no TestClient thread hop) so the
+numbers isolate the middleware stack:
+
+  bare         FastAPI app with only the /api/health route
+  asgi_stack   same app wrapped in the production middleware stack
+  legacy_stack same app wrapped in an equal number of pass-through
+               BaseHTTPMiddleware layers (what the stack cost before the
+               pure-ASGI rewrite, minus the layers' own logic)
+
+Usage: BENCH_REQUESTS=5000 python scripts/bench_middleware.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from middleware.chaos import ChaosMiddleware
+from middleware.concurrency import IdempotencyMiddleware, TimeoutMiddleware
+from middleware.csrf import CSRFProtectionMiddleware
+from middleware.logging import BotProtectionMiddleware, LoggingMiddleware, SecurityHeadersMiddleware
+from middleware.metrics import PrometheusMiddleware
+from middleware.rate_limit import RateLimitMiddleware
+
+# Same order as main.py (innermost last).
+STACK = (
+    BotProtectionMiddleware,
+    ChaosMiddleware,
+    RateLimitMiddleware,
+    CSRFProtectionMiddleware,
+    IdempotencyMiddleware,
+    TimeoutMiddleware,
+    PrometheusMiddleware,
+    SecurityHeadersMiddleware,
+    LoggingMiddleware,
+)
+
+
+class _PassThrough(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def make_app(layers):
+    app = FastAPI()
+
+    @app.get("/api/health")
+    def api_health():
+        return {"ok": True}
+
+    for cls in layers:
+        app.add_middleware(cls)
+    return app
+
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/api/health",
+    "raw_path": b"/api/health",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"bench"), (b"user-agent", b"bench/1.0"), (b"cookie", b"csrf_token=x")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("bench", 80),
+}
+
+
+async def one_request(app):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status = None
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(dict(SCOPE), receive, send)
+    return status
+
+
+async def bench(label, app, n):
+    for _ in range(min(200, n)):  # warm-up (routing caches, lazy imports)
+        await one_request(app)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        status = await one_request(app)
+    elapsed = time.perf_counter() - t0
+    print({"stack": label, "requests": n, "status": status, "us_per_req": round(elapsed / n * 1e6, 1)})
+    return elapsed / n
+
+
+async def main():
+    n = int(os.getenv("BENCH_REQUESTS", "5000"))
+    # Request logging goes to stdout/file; keep it out of the measurement.
+    import logging
+    logging.getLogger("miron_api").setLevel(logging.WARNING)
+
+    bare = await bench("bare", make_app(()), n)
+    new = await bench("asgi_stack", make_app(STACK), n)
+    old = await bench("legacy_stack", make_app([_PassThrough] * len(STACK)), n)
+    print({
+        "asgi_overhead_us": round((new - bare) * 1e6, 1),
+        "legacy_overhead_us": round((old - bare) * 1e6, 1),
+    })
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
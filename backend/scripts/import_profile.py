@@ -0,0 +1,105 @@
+"""Import-time profile of the API worker (``python -X importtime``).
+
+Imports ``main`` in a fresh interpreter with ``-X importtime`` and reports
+the modules with the largest cumulative and self import time, so regressions
+in worker boot time (a heavy library pulled in at module level, DDL run on
+import, ...) show up as a named line instead of a slower deploy.
+
+Usage:
+  python scripts/import_profile.py                 # top 25 table
+  IMPORT_PROFILE_TOP=50 python scripts/import_profile.py
+  python scripts/import_profile.py --json diagnostics/import_profile.json
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Routers are loaded through importlib in main._safe_import, which records its
+# own per-module timings; print them on a marked stdout line.
+_PROBE = (
+    "import json, {target} as m; "
+    "print('ROUTER_IMPORT_MS=' + json.dumps(getattr(m, 'ROUTER_IMPORT_MS', {{}})))"
+)
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of ``import time: self | cumulative | name`` as dicts (microseconds)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "depth": depth,
+        })
+    return rows
+
+
+def profile(target: str = "main") -> Dict:
+    env = dict(os.environ)
+    env.setdefault("ENVIRONMENT", "test")
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(target=target)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - t0
+    rows = parse_importtime(proc.stderr)
+    routers = {}
+    for line in proc.stdout.splitlines():
+        if line.startswith("ROUTER_IMPORT_MS="):
+            routers = json.loads(line.split("=", 1)[1])
+    return {
+        "target": target,
+        "returncode": proc.returncode,
+        "wall_s": round(wall, 3),
+        "modules": len(rows),
+        "rows": rows,
+        "routers_ms": routers,
+    }
+
+
+def main():
+    top = int(os.getenv("IMPORT_PROFILE_TOP", "25"))
+    report = profile(os.getenv("IMPORT_PROFILE_TARGET", "main"))
+    rows = report.pop("rows")
+    routers = report.pop("routers_ms")
+    by_cumulative = sorted(rows, key=lambda r: r["cumulative_us"], reverse=True)[:top]
+    by_self = sorted(rows, key=lambda r: r["self_us"], reverse=True)[:top]
+
+    print(report)
+    print(f"\n-- top {top} by cumulative import time --")
+    for r in by_cumulative:
+        print(f"{r['cumulative_us'] / 1000:9.1f} ms  {'  ' * r['depth']}{r['module']}")
+    print(f"\n-- top {top} by self import time --")
+    for r in by_self:
+        print(f"{r['self_us'] / 1000:9.1f} ms  {r['module']}")
+
+    if routers:
+        print("\n-- router modules (main._safe_import) --")
+        for path, ms in sorted(routers.items(), key=lambda kv: kv[1], reverse=True):
+            print(f"{ms:9.1f} ms  {path}")
+
+    if "--json" in sys.argv:
+        out = sys.argv[sys.argv.index("--json") + 1]
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, "w") as f:
+            json.dump({**report, "top_cumulative": by_cumulative, "top_self": by_self, "routers_ms": routers}, f, indent=2)
+        print(f"\nreport written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Miron GROUP LLC — Süreç içi audit kuyruğu
+İstek yolundaki audit olayları (REQUEST_FAILED, SYSTEM_ERROR) sınırlı bir
+kuyruğa bırakılır; tek bir yazıcı thread bunları çok satırlı INSERT ile
+toplu yazar. Üretici hiçbir zaman bloklamaz: kuyruk doluysa olay düşürülür,
+kuyruk yarıdan fazla doluyken REQUEST_FAILED olayları örneklenir. Böylece
+toplu 401/429 dalgaları event loop'u durduramaz ve DB'ye yazma fırtınasına
+dönüşmez.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+log = logging.getLogger("miron.audit")
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "5000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+# Kuyruk doluluğu bu oranı aşınca örneklenebilir olaylardan yalnızca
+# AUDIT_SAMPLE_RATE kadarı tutulur.
+AUDIT_SAMPLE_ABOVE = float(os.getenv("AUDIT_SAMPLE_ABOVE", "0.5"))
+AUDIT_SAMPLE_RATE = float(os.getenv("AUDIT_SAMPLE_RATE", "0.1"))
+
+# Sistem hataları yük altında bile örneklenmez (yalnızca kuyruk doluysa düşer)
+ALWAYS_KEEP = frozenset({"SYSTEM_ERROR"})
+
+Event = Dict[str, Any]
+
+
+def _metric(name: str):
+    try:
+        from middleware import metrics
+        if metrics.PROMETHEUS_AVAILABLE:
+            return getattr(metrics, name)
+    except Exception:
+        pass
+    return None
+
+
+class AuditQueue:
+    def __init__(self, maxsize: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE,
+                 sample_above: float = AUDIT_SAMPLE_ABOVE, sample_rate: float = AUDIT_SAMPLE_RATE,
+                 writer=None):
+        self._queue: "queue.Queue[Optional[Event]]" = queue.Queue(maxsize=maxsize)
+        self._maxsize = max(1, maxsize)
+        self._batch_size = max(1, batch_size)
+        self._sample_above = sample_above
+        self._sample_rate = sample_rate
+        self._writer = writer
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {"enqueued": 0, "written": 0, "failed": 0, "dropped": 0, "sampled_out": 0}
+
+    # ── Üretici tarafı ────────────────────────────────────────────────────
+
+    def enqueue(self, user_id: Optional[str], action: str, resource: str = None,
+                details: Dict = None, ip: str = None, ua: str = None) -> bool:
+        """log_audit ile aynı imza; bloklamaz. Olay kuyruğa girdiyse True."""
+        self._ensure_started()
+        if action not in ALWAYS_KEEP and self._queue.qsize() >= self._maxsize * self._sample_above:
+            if random.random() >= self._sample_rate:
+                self.stats["sampled_out"] += 1
+                self._count("sampled_out")
+                return False
+        event = {"user_id": user_id, "action": action, "resource": resource,
+                 "details": details, "ip": ip, "ua": ua}
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            self._count("dropped")
+            return False
+        self.stats["enqueued"] += 1
+        self._set_depth()
+        return True
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Kuyruk boşalana kadar bekler (test / kapanış). Boşaldıysa True."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Bekleyenleri yazar, yazıcı thread'i durdurur."""
+        self.join(timeout)
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                try:
+                    self._queue.put_nowait(None)
+                except queue.Full:
+                    pass
+        if thread is not None:
+            thread.join(timeout)
+
+    # ── Yazıcı tarafı ─────────────────────────────────────────────────────
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> Tuple[List[Event], bool]:
+        """Bloklayarak bir olay alır, ardından beklemeden batch'i doldurur."""
+        first = self._queue.get()
+        if first is None:
+            self._queue.task_done()
+            return [], True
+        batch = [first]
+        stop = False
+        while len(batch) < self._batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.task_done()
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self) -> None:
+        writer = self._writer
+        if writer is None:
+            from stores.pg_users_store import log_audit_many as writer
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._flush(batch, writer)
+            if stop:
+                return
+
+    def _flush(self, batch: List[Event], writer) -> None:
+        try:
+            # Yazıcı yazdığı satır sayısını döner; bozuk satırlar atlanmış
+            # olabilir (log_audit_many satır satır geri düşer).
+            written = writer(batch)
+            written = len(batch) if written is None else written
+            self.stats["written"] += written
+            self._count("written", written)
+            if written < len(batch):
+                self.stats["failed"] += len(batch) - written
+                self._count("failed", len(batch) - written)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            self._count("failed", len(batch))
+            log.error("audit_write_failed batch=%d: %s", len(batch), e)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+            self._set_depth()
+
+    def _count(self, outcome: str, n: int = 1) -> None:
+        counter = _metric("AUDIT_EVENTS_TOTAL")
+        if counter is not None:
+            counter.labels(outcome=outcome).inc(n)
+
+    def _set_depth(self) -> None:
+        gauge = _metric("AUDIT_QUEUE_DEPTH")
+        if gauge is not None:
+            gauge.set(self._queue.qsize())
+
+
+audit_queue = AuditQueue()
@@ -6,7 +6,8 @@ import logging
 from typing import Any, Dict, List
 
 from db import get_db_cursor
-from services.mail_service import send_email
+from services import notification_state
+from services.mail_queue import mail_queue
 from stores.pg_users_store import _use_inmemory
 
 logger = logging.getLogger("miron.legal_notify")
@@ -55,15 +56,13 @@ def fanout_legal_document_update(doc_type: str, title: str, version: str) -> Dic
                 n_inapp += 1
             except Exception as e:
                 logger.warning("legal fanout in-app failed", extra={"user_id": uid, "error": str(e)})
+    notification_state.bump(r.get("id") for r in rows)
 
-    for row in rows:
-        em = str(row.get("email") or "").strip()
-        if not em:
-            continue
-        try:
-            send_email(em, email_subject, email_body)
-            n_email += 1
-        except Exception as e:
-            logger.warning("legal fanout email failed", extra={"email": em, "error": str(e)})
+    # Toplu kuyruk: etkileşimli e-postaların kapasitesini kullanmaz, düşürmez
+    emails = [em for em in (str(r.get("email") or "").strip() for r in rows) if em]
+    try:
+        n_email = mail_queue.enqueue_bulk((em, email_subject, email_body, email_body) for em in emails)
+    except Exception as e:
+        logger.warning("legal fanout email failed", extra={"error": str(e)})
 
     return {"in_app": n_inapp, "email_attempts": n_email, "doc_type": doc_type}
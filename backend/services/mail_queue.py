@@ -0,0 +1,266 @@
+"""
+Miron GROUP LLC — Süreç içi e-posta kuyruğu
+Sınırlı bir kuyruk + sabit sayıda worker thread. Her worker kendi SMTP
+oturumunu açık tutar; Resend tarafında keep-alive'lı HTTP istemcisi ve
+sağlayıcı destekliyorsa batch gönderimi kullanılır.
+
+Toplu gönderimler (ör. legal_notify fan-out) ayrı bir kuyruk ve kendi
+worker'ları ile işlenir; etkileşimli e-postalar (OTP, şifre sıfırlama,
+hoşgeldin) hiçbir zaman fan-out'un arkasında yer beklemez. Kapanışta
+gönderilemeyen toplu mesajlar spool dizinine yazılır ve bir sonraki
+başlangıçta yeniden kuyruğa alınır.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+log = logging.getLogger("miron.mail")
+
+MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", "1000"))
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "4"))
+MAIL_BULK_WORKERS = int(os.getenv("MAIL_BULK_WORKERS", "1"))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAIL_SPOOL_DIR = os.getenv(
+    "MAIL_SPOOL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "mail_spool"),
+)
+
+Message = Tuple[str, str, str, str]  # (to, subject, html, plain)
+
+
+def _metric(name: str):
+    try:
+        from middleware import metrics
+        if metrics.PROMETHEUS_AVAILABLE:
+            return getattr(metrics, name)
+    except Exception:
+        pass
+    return None
+
+
+class MailQueue:
+    def __init__(self, maxsize: int = MAIL_QUEUE_SIZE, workers: int = MAIL_WORKERS,
+                 batch_size: int = MAIL_BATCH_SIZE, bulk_workers: int = MAIL_BULK_WORKERS,
+                 spool_dir: str = MAIL_SPOOL_DIR):
+        self._queue: "queue.Queue[Optional[Message]]" = queue.Queue(maxsize=maxsize)
+        # Sınırsız: fan-out listesi zaten bellekte; sınır, etkileşimli kuyruğu korumak içindir.
+        self._bulk: "queue.Queue[Optional[Message]]" = queue.Queue()
+        self._workers = max(1, workers)
+        self._bulk_workers = max(1, bulk_workers)
+        self._batch_size = max(1, batch_size)
+        self._spool_dir = Path(spool_dir)
+        self._threads: List[threading.Thread] = []
+        self._bulk_threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.stats = {"enqueued": 0, "sent": 0, "failed": 0, "dropped": 0, "spooled": 0}
+
+    # ── Üretici tarafı ────────────────────────────────────────────────────
+
+    def enqueue(self, to: str, subject: str, html: str, plain: str = "") -> bool:
+        """Mesajı kuyruğa ekler; bloklamaz. Kuyruk doluysa mesaj düşürülür."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((to, subject, html, plain))
+        except queue.Full:
+            self._bump("dropped")
+            log.error("mail_queue_full dropped to=%s subject=%s", to, subject)
+            return False
+        self._bump("enqueued", metric=False)
+        self._set_depth()
+        return True
+
+    def enqueue_bulk(self, messages: Iterable[Message]) -> int:
+        """
+        Toplu gönderim (ör. legal_notify fan-out) için: mesajlar ayrı toplu
+        kuyruğa girer, etkileşimli kuyruğun kapasitesini kullanmaz ve
+        düşürülmez. Kuyruğa giren mesaj sayısını döner.
+        """
+        self._ensure_started()
+        added = 0
+        for msg in messages:
+            self._bulk.put_nowait(msg)
+            added += 1
+        if added:
+            self._bump("enqueued", added, metric=False)
+            self._set_depth()
+        return added
+
+    def depth(self) -> int:
+        return self._queue.qsize() + self._bulk.qsize()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Kuyruklar boşalana kadar bekler (test / kapanış). Boşaldıysa True."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks or self._bulk.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Bekleyenleri gönderir; gönderilemeyen toplu mesajları spool'a yazar, worker'ları durdurur."""
+        self.join(timeout)
+        self._spool_pending()
+        with self._lock:
+            for q, threads in ((self._queue, self._threads), (self._bulk, self._bulk_threads)):
+                for _ in threads:
+                    try:
+                        q.put_nowait(None)
+                    except queue.Full:
+                        break
+            threads = self._threads + self._bulk_threads
+            self._threads, self._bulk_threads = [], []
+        for t in threads:
+            t.join(timeout)
+
+    # ── Spool (toplu mesajların kapanışta kalıcılığı) ─────────────────────
+
+    def _spool_pending(self) -> None:
+        pending: List[Message] = []
+        while True:
+            try:
+                item = self._bulk.get_nowait()
+            except queue.Empty:
+                break
+            self._bulk.task_done()
+            if item is not None:
+                pending.append(item)
+        if not pending:
+            return
+        try:
+            self._spool_dir.mkdir(parents=True, exist_ok=True)
+            path = self._spool_dir / f"bulk-{os.getpid()}-{time.time_ns()}.jsonl"
+            tmp = path.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for msg in pending:
+                    f.write(json.dumps(list(msg), ensure_ascii=False) + "\n")
+            os.replace(tmp, path)
+        except Exception as e:
+            self._bump("dropped", len(pending))
+            log.error("mail_spool_failed dropped=%d: %s", len(pending), e)
+            return
+        self._bump("spooled", len(pending))
+        log.warning("mail_spooled count=%d path=%s", len(pending), path)
+
+    def _recover_spool(self) -> int:
+        """Önceki çalıştırmadan kalan spool dosyalarını toplu kuyruğa geri alır."""
+        recovered = 0
+        if not self._spool_dir.is_dir():
+            return recovered
+        for path in sorted(self._spool_dir.glob("bulk-*.jsonl")):
+            # rename ile sahiplen: aynı dizini paylaşan diğer süreçler aynı dosyayı almaz
+            claimed = path.with_name(f"{path.stem}.claimed-{os.getpid()}")
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            try:
+                with claimed.open("r", encoding="utf-8") as f:
+                    messages = [tuple(json.loads(line)) for line in f if line.strip()]
+            except Exception as e:
+                log.error("mail_spool_unreadable path=%s: %s", claimed, e)
+                continue
+            for msg in messages:
+                self._bulk.put_nowait(msg)
+            claimed.unlink()
+            recovered += len(messages)
+            log.info("mail_spool_recovered count=%d", len(messages))
+        return recovered
+
+    # ── Worker tarafı ─────────────────────────────────────────────────────
+
+    def _ensure_started(self) -> None:
+        if len(self._threads) >= self._workers:
+            return
+        recovered = 0
+        with self._lock:
+            if not self._threads:
+                recovered = self._recover_spool()
+            for q, threads, size, name in ((self._queue, self._threads, self._workers, "mail-worker"),
+                                           (self._bulk, self._bulk_threads, self._bulk_workers, "mail-bulk")):
+                while len(threads) < size:
+                    t = threading.Thread(target=self._run, args=(q,), name=f"{name}-{len(threads)}", daemon=True)
+                    t.start()
+                    threads.append(t)
+        if recovered:
+            self._bump("enqueued", recovered, metric=False)
+            self._set_depth()
+
+    def _next_batch(self, q: "queue.Queue[Optional[Message]]") -> Tuple[List[Message], bool]:
+        """Bloklayarak bir mesaj alır, ardından beklemeden batch'i doldurur."""
+        first = q.get()
+        if first is None:
+            q.task_done()
+            return [], True
+        batch = [first]
+        stop = False
+        while len(batch) < self._batch_size:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                q.task_done()
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self, q: "queue.Queue[Optional[Message]]") -> None:
+        from services.notification_delivery import close_smtp_connection, send_email_batch
+
+        try:
+            while True:
+                batch, stop = self._next_batch(q)
+                if batch:
+                    self._deliver(q, batch, send_email_batch)
+                if stop:
+                    return
+        finally:
+            close_smtp_connection()
+
+    def _deliver(self, q: "queue.Queue[Optional[Message]]", batch: List[Message], send_batch) -> None:
+        started = time.monotonic()
+        try:
+            results = send_batch(batch)
+        except Exception as e:
+            log.error("mail_error batch=%d: %s", len(batch), e)
+            results = [False] * len(batch)
+        finally:
+            for _ in batch:
+                q.task_done()
+            self._set_depth()
+
+        latency = _metric("MAIL_SEND_LATENCY")
+        if latency is not None:
+            latency.observe(time.monotonic() - started)
+        for (to, subject, _html, _plain), ok in zip(batch, results):
+            if ok:
+                self._bump("sent")
+            else:
+                self._bump("failed")
+                log.warning("mail_send_failed to=%s subject=%s", to, subject)
+
+    def _bump(self, outcome: str, n: int = 1, metric: bool = True) -> None:
+        # Worker'lar ve üreticiler aynı anda sayar; += atomik değildir.
+        with self._lock:
+            self.stats[outcome] += n
+        if metric:
+            counter = _metric("MAIL_SEND_TOTAL")
+            if counter is not None:
+                counter.labels(outcome=outcome).inc(n)
+
+    def _set_depth(self) -> None:
+        gauge = _metric("MAIL_QUEUE_DEPTH")
+        if gauge is not None:
+            gauge.set(self.depth())
+
+
+mail_queue = MailQueue()
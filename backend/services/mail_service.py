@@ -1,31 +1,30 @@
 """
 Miron GROUP LLC — Auth & Sistem E-postaları
-Tüm gönderim notification_delivery.send_email() üzerinden Resend/SMTP fallback.
+Tüm gönderim services.mail_queue üzerinden (worker'lar notification_delivery ile
+Resend/SMTP fallback kullanır).
 """
 from __future__ import annotations
 
 import logging
-import threading
 from typing import Optional
 
 from services.email_template import (
     wrap, gold_button, otp_box, separator, feature_row,
     _BRAND, _TXT_G, _TXT_D, _BASE, _FONT,
 )
+from services.mail_queue import mail_queue
 
 log = logging.getLogger("miron.mail")
 
 
 def _send(to: str, subject: str, html: str) -> None:
-    def _do():
-        try:
-            from services.notification_delivery import send_email
-            ok = send_email(to, subject, html)
-            if not ok:
-                log.warning("mail_send_failed to=%s subject=%s", to, subject)
-        except Exception as e:
-            log.error("mail_error to=%s: %s", to, e)
-    threading.Thread(target=_do, daemon=True).start()
+    # Sınırlı kuyruk + sabit worker havuzu; istek thread'i ağ çağrısı yapmaz.
+    mail_queue.enqueue(to, subject, html)
+
+
+def send_email(to: str, subject: str, body: str) -> bool:
+    """Düz metin gövdeli e-postayı kuyruğa alır."""
+    return mail_queue.enqueue(to, subject, body, body)
 
 
 # ── Hoşgeldin ────────────────────────────────────────────────────────────────
@@ -6,9 +6,12 @@ from __future__ import annotations
 
 import os
 import smtplib
+import threading
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Optional
+from typing import List, Optional, Tuple
+
+import httpx
 
 from services.email_template import (
     wrap, gold_button, detail_row, info_card, separator,
@@ -58,8 +61,19 @@ def build_reminder_email(
 
 # ---------------------------------------------------------------------------
 # Gönderim — Resend API önce, SMTP fallback
+# Bağlantılar yeniden kullanılır: Resend için keep-alive'lı tek httpx.Client,
+# SMTP için thread başına açık tutulan bir oturum (worker havuzu ile birlikte
+# her worker kendi SMTP bağlantısını taşır).
 # ---------------------------------------------------------------------------
 
+_RESEND_API = "https://api.resend.com"
+RESEND_BATCH_MAX = 100          # Resend /emails/batch üst sınırı
+
+_http_client: Optional[httpx.Client] = None
+_http_lock = threading.Lock()
+_smtp_local = threading.local()
+
+
 def send_email(to_email: str, subject: str, html: str, plain: str = "") -> bool:
     """Resend varsa Resend, yoksa SMTP ile gönderir."""
     resend_key = (os.getenv("RESEND_API_KEY") or "").strip()
@@ -68,6 +82,28 @@ def send_email(to_email: str, subject: str, html: str, plain: str = "") -> bool:
     return _send_via_smtp(to_email, subject, html, plain)
 
 
+def send_email_batch(messages: List[Tuple[str, str, str, str]]) -> List[bool]:
+    """(to, subject, html, plain) listesini gönderir; Resend varsa tek batch isteği."""
+    resend_key = (os.getenv("RESEND_API_KEY") or "").strip()
+    if resend_key and len(messages) > 1:
+        results: List[bool] = []
+        for i in range(0, len(messages), RESEND_BATCH_MAX):
+            chunk = messages[i:i + RESEND_BATCH_MAX]
+            try:
+                resp = _resend_client().post(
+                    "/emails/batch",
+                    headers={"Authorization": f"Bearer {resend_key}"},
+                    json=[_resend_payload(*m) for m in chunk],
+                )
+                resp.raise_for_status()
+                results.extend([True] * len(chunk))
+            except Exception as e:
+                print(f"[mail] Resend batch hatası: {e}")
+                results.extend(_send_via_smtp(*m) for m in chunk)
+        return results
+    return [send_email(*m) for m in messages]
+
+
 def _from_address() -> str:
     explicit = (os.getenv("SMTP_FROM") or "").strip()
     if explicit:
@@ -75,23 +111,68 @@ def _from_address() -> str:
     return "Miron AI <bildirim@mironintelligence.com>"
 
 
+def _resend_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        with _http_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    base_url=_RESEND_API,
+                    timeout=15.0,
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                )
+    return _http_client
+
+
+def _resend_payload(to: str, subject: str, html: str, plain: str = "") -> dict:
+    return {
+        "from": _from_address(),
+        "to": [to],
+        "subject": subject,
+        "html": html,
+        "text": plain or subject,
+    }
+
+
 def _send_via_resend(key: str, to: str, subject: str, html: str, plain: str) -> bool:
     try:
-        import resend  # type: ignore
-        resend.api_key = key
-        resend.Emails.send({
-            "from": _from_address(),
-            "to": [to],
-            "subject": subject,
-            "html": html,
-            "text": plain or subject,
-        })
+        resp = _resend_client().post(
+            "/emails",
+            headers={"Authorization": f"Bearer {key}"},
+            json=_resend_payload(to, subject, html, plain),
+        )
+        resp.raise_for_status()
         return True
     except Exception as e:
         print(f"[mail] Resend hatası: {e}")
         return _send_via_smtp(to, subject, html, plain)
 
 
+def _smtp_connect(host: str, port: int, user: str, password: str) -> smtplib.SMTP:
+    s = smtplib.SMTP(host, port, timeout=15)
+    s.ehlo()
+    if os.getenv("SMTP_STARTTLS", "true").lower() != "false":
+        s.starttls()
+        s.ehlo()
+    if user and password:
+        s.login(user, password)
+    return s
+
+
+def close_smtp_connection() -> None:
+    """Bu thread'in açık SMTP oturumunu kapatır (worker kapanışında çağrılır)."""
+    conn = getattr(_smtp_local, "conn", None)
+    _smtp_local.conn = None
+    if conn is not None:
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
 def _send_via_smtp(to: str, subject: str, html: str, plain: str) -> bool:
     host     = (os.getenv("SMTP_HOST") or "").strip()
     port     = int(os.getenv("SMTP_PORT", "587") or "587")
@@ -110,19 +191,28 @@ def _send_via_smtp(to: str, subject: str, html: str, plain: str) -> bool:
     msg.attach(MIMEText(plain or subject, "plain", "utf-8"))
     msg.attach(MIMEText(html, "html", "utf-8"))
 
-    try:
-        with smtplib.SMTP(host, port, timeout=15) as s:
-            s.ehlo()
-            if os.getenv("SMTP_STARTTLS", "true").lower() != "false":
-                s.starttls()
-                s.ehlo()
-            if user and password:
-                s.login(user, password)
-            s.sendmail(from_, [to], msg.as_string())
-        return True
-    except Exception as e:
-        print(f"[mail] SMTP hatası: {e}")
-        return False
+    # Açık oturum sunucu tarafında zaman aşımına uğramış olabilir: bir kez yeniden bağlan.
+    for attempt in range(2):
+        try:
+            conn = getattr(_smtp_local, "conn", None)
+            if conn is None:
+                conn = _smtp_local.conn = _smtp_connect(host, port, user, password)
+            conn.sendmail(from_, [to], msg.as_string())
+            return True
+        except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError) as e:
+            close_smtp_connection()
+            if attempt == 0:
+                continue
+            print(f"[mail] SMTP hatası: {e}")
+            return False
+        except Exception as e:
+            print(f"[mail] SMTP hatası: {e}")
+            if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500:
+                # Oturum hala kullanılabilir (ör. alıcı reddi); sadece bu mesaj başarısız.
+                return False
+            close_smtp_connection()
+            return False
+    return False
 
 
 # Legacy stub — artık gerekmiyor ama import kırmamak için bırakıldı
@@ -0,0 +1,173 @@
+"""
+Kullanıcı başına bildirim "son değişiklik" damgası + süreç içi liste önbelleği.
+
+/api/notifications her açık sekmeden dakikada bir çağrılır; çoğu çağrıda hiçbir
+şey değişmemiştir. Bildirim yazan her yol (hatırlatıcı sweeper'ı, admin
+gönderimi, okundu işaretleme) ilgili kullanıcıların damgasını artırır; duyurular
+tek bir genel sayacı artırır. Okuma
+tarafı damga değişmediyse son sonucu Postgres'e gitmeden döner.
+
+Damga REDIS_URL varsa Redis'te (worker'lar arası tutarlı), yoksa süreç içinde
+tutulur. Süreç içi modda diğer worker'ların yazdıkları görülemeyeceği için
+önbellek girdileri kısa bir TTL ile sınırlanır.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+log = logging.getLogger("miron_notifications")
+
+_KEY = "notif:stamp:{}"
+_BROADCAST_KEY = "notif:stamp:broadcast"
+STAMP_TTL_SECONDS = 7 * 24 * 3600
+CACHE_MAX_ENTRIES = int(os.getenv("NOTIFICATION_CACHE_MAX_ENTRIES", "20000"))
+# Redis yokken başka worker'ın yazdığı bildirim en geç bu kadar gecikir
+LOCAL_CACHE_TTL_SECONDS = float(os.getenv("NOTIFICATION_CACHE_TTL_SECONDS", "30"))
+SHARED_CACHE_TTL_SECONDS = 300.0
+WAIT_POLL_SECONDS = 1.0
+
+_lock = threading.Lock()
+_local_stamps: Dict[str, int] = {}
+_local_broadcast = 0
+_cache: "OrderedDict[Tuple[str, str], Tuple[int, float, Any]]" = OrderedDict()
+_redis = None
+_redis_checked = False
+
+
+def _client():
+    global _redis, _redis_checked
+    if _redis_checked:
+        return _redis
+    _redis_checked = True
+    url = os.getenv("REDIS_URL")
+    if url:
+        try:
+            import redis
+
+            _redis = redis.from_url(url, decode_responses=True, socket_timeout=0.5)
+        except Exception as e:
+            log.warning("notification stamp: Redis kullanılamıyor, süreç içi moda geçildi: %s", e)
+            _redis = None
+    return _redis
+
+
+def stamp(user_id: str) -> int:
+    """
+    Kullanıcının güncel damgası (hiç yazılmadıysa 0): kişisel sayaç + genel
+    duyuru sayacı. İkisi de yalnızca artar; toplam her değişiklikte ilerler.
+    """
+    uid = str(user_id)
+    client = _client()
+    if client is not None:
+        try:
+            own, broadcast = client.mget(_KEY.format(uid), _BROADCAST_KEY)
+            return int(own or 0) + int(broadcast or 0)
+        except Exception as e:
+            log.warning("notification stamp read failed: %s", e)
+    with _lock:
+        return _local_stamps.get(uid, 0) + _local_broadcast
+
+
+def bump(user_ids: Iterable[Any]) -> None:
+    """Verilen kullanıcıların damgasını artırır; yazan transaction commit edildikten sonra çağrılır."""
+    uids = {str(u) for u in user_ids if u}
+    if not uids:
+        return
+    with _lock:
+        for uid in uids:
+            _local_stamps[uid] = _local_stamps.get(uid, 0) + 1
+    client = _client()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for uid in uids:
+            key = _KEY.format(uid)
+            pipe.incr(key)
+            pipe.expire(key, STAMP_TTL_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        # Damga ilerlemediyse önbellek de atlanmalı: yerel kopyaları düşür
+        log.warning("notification stamp bump failed: %s", e)
+        invalidate(uids)
+
+
+def bump_all() -> None:
+    """Duyuru yayınlandı: tek sayaç artar, tüm kullanıcıların damgası ilerler."""
+    global _local_broadcast
+    with _lock:
+        _local_broadcast += 1
+    client = _client()
+    if client is None:
+        return
+    try:
+        client.incr(_BROADCAST_KEY)
+    except Exception as e:
+        log.warning("notification broadcast stamp bump failed: %s", e)
+        with _lock:
+            _cache.clear()
+
+
+def invalidate(user_ids: Iterable[Any]) -> None:
+    uids = {str(u) for u in user_ids if u}
+    with _lock:
+        for key in [k for k in _cache if k[0] in uids]:
+            _cache.pop(key, None)
+
+
+def cached(user_id: str, kind: str, load: Callable[[], Any]) -> Tuple[int, Any]:
+    """
+    (damga, değer). Damga son yüklemedekiyle aynıysa ve girdi TTL'i dolmadıysa
+    `load()` çağrılmaz. Damga yüklemeden önce okunur: arada yazılan bir bildirim
+    bir sonraki çağrıda yeniden yüklemeye yol açar, asla kaybolmaz.
+    """
+    uid = str(user_id)
+    current = stamp(uid)
+    ttl = SHARED_CACHE_TTL_SECONDS if _client() is not None else LOCAL_CACHE_TTL_SECONDS
+    key = (uid, kind)
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == current and now - hit[1] < ttl:
+            _cache.move_to_end(key)
+            return current, hit[2]
+    value = load()
+    with _lock:
+        _cache[key] = (current, now, value)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return current, value
+
+
+async def wait_for_change(user_id: str, seen: int, timeout: float, interval: float = WAIT_POLL_SECONDS) -> int:
+    """
+    Long-poll için: damga `seen`'den farklılaşana ya da `timeout` dolana kadar
+    bekler, son damgayı döner. Yalnızca damga okunur (Redis GET ya da sözlük);
+    bekleme süresince DB bağlantısı ve thread tutulmaz.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        current = await asyncio.to_thread(stamp, user_id) if _client() is not None else stamp(user_id)
+        remaining = deadline - loop.time()
+        if current != seen or remaining <= 0:
+            return current
+        await asyncio.sleep(min(interval, remaining))
+
+
+def reset() -> None:
+    """Testler için: tüm yerel durumu temizler."""
+    global _redis, _redis_checked, _local_broadcast
+    with _lock:
+        _local_stamps.clear()
+        _local_broadcast = 0
+        _cache.clear()
+    _redis = None
+    _redis_checked = False
@@ -1,15 +1,41 @@
 """
-Hatırlatıcı zamanlayıcı — her 2 dakikada case_reminder_triggers kontrol eder,
-zamanı gelen kayıtlar için mail + in_app bildirimi gönderir.
+Hatırlatıcı zamanlayıcı — REMINDER_POLL_SECONDS'ta bir case_reminder_triggers
+kontrol eder, zamanı gelen kayıtlar için mail + in_app bildirimi gönderir.
+
+Akış (dispatcher):
+  1. Kısa transaction: zamanı gelen tetikleyiciler FOR UPDATE SKIP LOCKED ile
+     talep edilir ve claimed_until ile kiralanır.
+  2. Transaction dışında: e-postalar sınırlı eşzamanlılıkla gönderilir.
+  3. Kısa transaction: in_app bildirimleri toplu INSERT edilir, gönderilenler
+     sent_at ile kapatılır, başarısızlar backoff ile geri bırakılır ya da
+     MAX_ATTEMPTS sonrası dead_at ile dead-letter'a alınır.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
 log = logging.getLogger("miron.scheduler")
 
+# Dispatcher ayarları
+BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+MAX_BATCHES_PER_RUN = int(os.getenv("REMINDER_MAX_BATCHES", "50"))
+EMAIL_CONCURRENCY = int(os.getenv("REMINDER_EMAIL_CONCURRENCY", "16"))
+EMAIL_SEND_RETRIES = 2          # aynı deneme içinde hızlı tekrar sayısı
+MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", "5"))
+CLAIM_LEASE_SECONDS = 300
+POLL_SECONDS = int(os.getenv("REMINDER_POLL_SECONDS", "30"))
+
+_email_pool: Optional[ThreadPoolExecutor] = None
+
+# Süreç içi sayaçlar — Prometheus kurulu değilse de loglarda görünür
+_stats = {"claimed": 0, "sent": 0, "retried": 0, "dead": 0, "last_lag_s": 0.0, "last_rate_per_s": 0.0}
+
 
 def _fmt_due(dt: datetime) -> str:
     try:
@@ -38,67 +64,259 @@ def _lawyer_display(first: Optional[str], last: Optional[str]) -> str:
     return f"Av. {name}"
 
 
-def process_due_triggers() -> None:
-    """Zamanı gelen tetikleyicileri işle. Her 2 dakikada çağrılır."""
+def dispatcher_stats() -> dict:
+    return dict(_stats)
+
+
+def _observe(channel: str, outcome: str, lag_s: Optional[float] = None) -> None:
     try:
-        from db import get_db_cursor
-        from services.notification_delivery import build_reminder_email, send_email
+        from middleware.metrics import PROMETHEUS_AVAILABLE
+        if not PROMETHEUS_AVAILABLE:
+            return
+        from middleware.metrics import REMINDER_DISPATCH_LAG, REMINDER_DISPATCH_TOTAL
+        REMINDER_DISPATCH_TOTAL.labels(channel=channel, outcome=outcome).inc()
+        if lag_s is not None:
+            REMINDER_DISPATCH_LAG.labels(channel=channel).observe(lag_s)
+    except Exception:
+        pass
+
+
+def _claim_batch(cur, window: datetime, limit: int) -> list[dict]:
+    """Zamanı gelen tetikleyicileri kilitleyip kiralar; diğer worker'lar bunları atlar."""
+    cur.execute("""
+        WITH due AS (
+            SELECT t.id
+            FROM case_reminder_triggers t
+            JOIN case_reminders r ON r.id = t.reminder_id
+            WHERE t.sent_at IS NULL
+              AND t.dead_at IS NULL
+              AND t.trigger_at <= %s
+              AND (t.claimed_until IS NULL OR t.claimed_until < NOW())
+              AND r.archived_at IS NULL
+            ORDER BY t.trigger_at
+            LIMIT %s
+            FOR UPDATE OF t SKIP LOCKED
+        )
+        UPDATE case_reminder_triggers t
+        SET claimed_until = NOW() + make_interval(secs => %s),
+            attempts = t.attempts + 1
+        FROM due, case_reminders r, users u
+        WHERE t.id = due.id AND r.id = t.reminder_id AND u.id = t.user_id
+        RETURNING
+            t.id::text      AS trigger_id,
+            t.user_id::text AS user_id,
+            t.channel,
+            t.trigger_at,
+            t.attempts,
+            r.id         AS reminder_id,
+            r.title,
+            r.details,
+            r.due_at,
+            r.court,
+            r.case_number,
+            u.email      AS user_email,
+            u.first_name,
+            u.last_name
+    """, (window, limit, CLAIM_LEASE_SECONDS))
+    return [dict(r) for r in (cur.fetchall() or [])]
+
+
+def _in_app_message(row) -> tuple[str, str]:
+    due_at = row.get("due_at")
+    due_fmt = _fmt_due(due_at) if due_at else ""
+    title = row.get("title") or "Hatırlatıcı"
+    parts = [f"Tarih: {due_fmt}"]
+    if row.get("court"):    parts.append(f"Mahkeme: {row['court']}")
+    if row.get("case_number"): parts.append(f"Dosya No: {row['case_number']}")
+    return title, "\n".join(parts)
+
+
+def _insert_in_app_notifications(cur, rows: list[dict]) -> None:
+    """Batch'in tüm in_app bildirimlerini tek INSERT ile yazar."""
+    if not rows:
+        return
+    user_ids, titles, messages = [], [], []
+    for row in rows:
+        title, message = _in_app_message(row)
+        user_ids.append(row["user_id"])
+        titles.append(title)
+        messages.append(message)
+    # Aynı reminder için mükerrer in_app oluşmasını engelle: DISTINCT ON aynı
+    # batch'teki (user, title) tekrarlarını, NOT EXISTS ise kira süresi dolup
+    # yeniden talep edilen batch'lerin daha önce yazdıklarını eler.
+    cur.execute("""
+        INSERT INTO notifications (user_id, type, title, message, is_read)
+        SELECT n.user_id, 'case_reminder', n.title, n.message, FALSE
+        FROM (
+            SELECT DISTINCT ON (u.user_id, u.title) u.user_id, u.title, u.message
+            FROM unnest(%s::uuid[], %s::text[], %s::text[]) WITH ORDINALITY AS u(user_id, title, message, ord)
+            ORDER BY u.user_id, u.title, u.ord
+        ) n
+        WHERE NOT EXISTS (
+            SELECT 1 FROM notifications x
+            WHERE x.user_id = n.user_id
+              AND x.type = 'case_reminder'
+              AND x.title = n.title
+              AND x.created_at > NOW() - INTERVAL '10 minutes'
+        )
+    """, (user_ids, titles, messages))
+
+
+def _mark_sent(cur, trigger_ids: list[str]) -> None:
+    if trigger_ids:
+        cur.execute("""
+            UPDATE case_reminder_triggers
+            SET sent_at = NOW(), claimed_until = NULL, last_error = NULL
+            WHERE id = ANY(%s::uuid[])
+        """, (trigger_ids,))
+
+
+def _mark_failed(cur, failures: list[tuple[str, str]]) -> None:
+    """Başarısızları üstel backoff ile geri bırakır; MAX_ATTEMPTS sonrası dead-letter."""
+    if not failures:
+        return
+    cur.execute("""
+        UPDATE case_reminder_triggers t
+        SET last_error = f.error,
+            dead_at = CASE WHEN t.attempts >= %s THEN NOW() END,
+            claimed_until = NOW() + make_interval(secs => LEAST(3600, 60 * power(2, t.attempts)))
+        FROM unnest(%s::uuid[], %s::text[]) AS f(id, error)
+        WHERE t.id = f.id
+    """, (MAX_ATTEMPTS, [f[0] for f in failures], [f[1][:500] for f in failures]))
+
+
+def _email_executor() -> ThreadPoolExecutor:
+    # Çalıştırmalar arasında kalıcı: her thread kendi SMTP oturumunu yeniden kullanır.
+    global _email_pool
+    if _email_pool is None:
+        _email_pool = ThreadPoolExecutor(max_workers=EMAIL_CONCURRENCY, thread_name_prefix="reminder-mail")
+    return _email_pool
 
-        now = datetime.now(timezone.utc)
-        # 5 dakika öne alarak kontrol et — scheduler gecikmelerine karşı tolerans
-        window = now + timedelta(minutes=5)
 
-        with get_db_cursor(write=True) as cur:
-            cur.execute("""
-                SELECT
-                    t.id         AS trigger_id,
-                    t.channel,
-                    t.trigger_at,
-                    r.id         AS reminder_id,
-                    r.title,
-                    r.details,
-                    r.due_at,
-                    r.court,
-                    r.case_number,
-                    r.archived_at,
-                    u.email      AS user_email,
-                    u.first_name,
-                    u.last_name
-                FROM case_reminder_triggers t
-                JOIN case_reminders r ON r.id = t.reminder_id
-                JOIN users u ON u.id = t.user_id
-                WHERE t.sent_at IS NULL
-                  AND t.trigger_at <= %s
-                  AND r.archived_at IS NULL
-                LIMIT 50
-            """, (window,))
-            rows = cur.fetchall() or []
-
-            for row in rows:
-                tid = row["trigger_id"]
-                channel = row["channel"]
+async def _send_emails(rows: list[dict], build_fn, send_fn) -> tuple[list[str], list[tuple[str, str]]]:
+    """E-postaları EMAIL_CONCURRENCY ile sınırlı paralel gönderir. (sent_ids, [(id, hata)]) döner."""
+    sem = asyncio.Semaphore(EMAIL_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+
+    async def _one(row):
+        async with sem:
+            error = "send_failed"
+            for attempt in range(EMAIL_SEND_RETRIES + 1):
                 try:
-                    if channel == "email":
-                        _send_email_notification(row, build_reminder_email, send_email)
-                    elif channel == "in_app":
-                        _create_in_app_notification(cur, row)
-
-                    cur.execute(
-                        "UPDATE case_reminder_triggers SET sent_at = NOW() WHERE id = %s",
-                        (tid,)
+                    ok = await loop.run_in_executor(
+                        _email_executor(), _send_email_notification, row, build_fn, send_fn
                     )
-                    log.info("trigger_sent channel=%s reminder=%s", channel, row["reminder_id"])
+                    if ok:
+                        return row["trigger_id"], None
                 except Exception as e:
-                    log.warning("trigger_failed id=%s error=%s", tid, e)
+                    error = str(e) or e.__class__.__name__
+                if attempt < EMAIL_SEND_RETRIES:
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+            return row["trigger_id"], error
+
+    sent, failed = [], []
+    for tid, error in await asyncio.gather(*(_one(r) for r in rows)):
+        if error is None:
+            sent.append(tid)
+        else:
+            failed.append((tid, error))
+    return sent, failed
+
+
+def _lag_seconds(row, now: datetime) -> float:
+    trigger_at = row.get("trigger_at")
+    if not trigger_at:
+        return 0.0
+    return max(0.0, (now - trigger_at).total_seconds())
+
+
+def _record_outcomes(rows: list[dict], failed_ids: set[str]) -> None:
+    now = datetime.now(timezone.utc)
+    lags = []
+    for row in rows:
+        channel = "email" if row.get("channel") == "email" else "in_app"
+        if row["trigger_id"] in failed_ids:
+            dead = (row.get("attempts") or 0) >= MAX_ATTEMPTS
+            _stats["dead" if dead else "retried"] += 1
+            _observe(channel, "dead" if dead else "retry")
+            if dead:
+                log.warning("trigger_dead_letter id=%s reminder=%s", row["trigger_id"], row.get("reminder_id"))
+            continue
+        lag = _lag_seconds(row, now)
+        lags.append(lag)
+        _stats["sent"] += 1
+        _observe(channel, "sent", lag)
+    _stats["claimed"] += len(rows)
+    if lags:
+        _stats["last_lag_s"] = max(lags)
+
+
+def dispatch_batch(window: datetime, limit: int = BATCH_SIZE) -> int:
+    """Bir batch talep eder, gönderir ve sonuçlandırır. Talep edilen satır sayısını döner."""
+    from db import get_db_cursor
+    from services.notification_delivery import build_reminder_email, send_email
+    from services import notification_state
+
+    with get_db_cursor(write=True) as cur:
+        rows = _claim_batch(cur, window, limit)
+    if not rows:
+        return 0
 
+    in_app = [r for r in rows if r.get("channel") != "email"]
+    emails = [r for r in rows if r.get("channel") == "email"]
+
+    # Ağ çağrıları hiçbir DB transaction'ı açıkken yapılmaz
+    sent_emails, failed = [], []
+    if emails:
+        sent_emails, failed = asyncio.run(_send_emails(emails, build_reminder_email, send_email))
+
+    with get_db_cursor(write=True) as cur:
+        _insert_in_app_notifications(cur, in_app)
+        _mark_sent(cur, [r["trigger_id"] for r in in_app] + sent_emails)
+        _mark_failed(cur, failed)
+    # Commit sonrası: polling okuyucuları önbelleği atlayıp yeni satırları görsün
+    notification_state.bump(r["user_id"] for r in in_app)
+
+    for r in in_app:
+        log.info("trigger_sent channel=%s reminder=%s", r.get("channel"), r.get("reminder_id"))
+    for tid, error in failed:
+        log.warning("trigger_failed id=%s error=%s", tid, error)
+
+    _record_outcomes(rows, {tid for tid, _ in failed})
+    return len(rows)
+
+
+def process_due_triggers() -> None:
+    """Zamanı gelen tetikleyicileri batch'ler halinde boşaltır."""
+    try:
+        now = datetime.now(timezone.utc)
+        # 5 dakika öne alarak kontrol et — scheduler gecikmelerine karşı tolerans
+        window = now + timedelta(minutes=5)
+
+        started = time.monotonic()
+        total = 0
+        for _ in range(MAX_BATCHES_PER_RUN):
+            claimed = dispatch_batch(window)
+            total += claimed
+            if claimed < BATCH_SIZE:
+                break
+
+        if total:
+            elapsed = max(time.monotonic() - started, 1e-6)
+            _stats["last_rate_per_s"] = total / elapsed
+            log.info(
+                "reminder_dispatch processed=%d elapsed=%.2fs rate=%.1f/s max_lag=%.1fs",
+                total, elapsed, total / elapsed, _stats["last_lag_s"],
+            )
     except Exception as e:
         log.error("scheduler_error: %s", e)
 
 
-def _send_email_notification(row, build_fn, send_fn) -> None:
+def _send_email_notification(row, build_fn, send_fn) -> bool:
     to_email = row.get("user_email") or ""
     if not to_email:
-        return
+        # Adresi olmayan kullanıcı için yeniden denemenin anlamı yok
+        return True
 
     due_at = row.get("due_at")
     due_fmt = _fmt_due(due_at) if due_at else "—"
@@ -124,34 +342,7 @@ def _send_email_notification(row, build_fn, send_fn) -> None:
     ok = send_fn(to_email, subject, html)
     if not ok:
         log.warning("email_send_failed to=%s", to_email)
-
-
-def _create_in_app_notification(cur, row) -> None:
-    due_at = row.get("due_at")
-    due_fmt = _fmt_due(due_at) if due_at else ""
-    title = row.get("title") or "Hatırlatıcı"
-    parts = [f"Tarih: {due_fmt}"]
-    if row.get("court"):    parts.append(f"Mahkeme: {row['court']}")
-    if row.get("case_number"): parts.append(f"Dosya No: {row['case_number']}")
-    message = "\n".join(parts)
-    # Aynı reminder için mükerrer in_app oluşmasını engelle
-    cur.execute("""
-        SELECT 1 FROM notifications
-        WHERE user_id = (SELECT user_id FROM case_reminder_triggers WHERE id = %s)
-          AND type = 'case_reminder'
-          AND title = %s
-          AND created_at > NOW() - INTERVAL '10 minutes'
-        LIMIT 1
-    """, (row["trigger_id"], title))
-    if cur.fetchone():
-        return
-    cur.execute("""
-        INSERT INTO notifications (user_id, type, title, message, is_read)
-        VALUES (
-            (SELECT user_id FROM case_reminder_triggers WHERE id = %s),
-            'case_reminder', %s, %s, FALSE
-        )
-    """, (row["trigger_id"], title, message))
+    return bool(ok)
 
 
 def start_scheduler() -> None:
@@ -162,13 +353,13 @@ def start_scheduler() -> None:
         scheduler.add_job(
             process_due_triggers,
             trigger="interval",
-            minutes=2,
+            seconds=POLL_SECONDS,
             id="reminder_processor",
             replace_existing=True,
             max_instances=1,
             coalesce=True,
         )
         scheduler.start()
-        log.info("reminder_scheduler başlatıldı — her 2 dakika")
+        log.info("reminder_scheduler başlatıldı — her %d saniye", POLL_SECONDS)
     except Exception as e:
         log.error("scheduler_start_failed: %s", e)
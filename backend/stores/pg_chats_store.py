@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import base64
 import json
 import os
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 from cryptography.fernet import Fernet, InvalidToken
 
@@ -56,63 +58,118 @@ def _msgs_from_row(row: Dict[str, Any]) -> List[Any]:
     return list(msgs) if msgs else []
 
 
-def _ensure_table() -> None:
+def _pack_message(f: Optional[Fernet], message: Any) -> Tuple[str, bool]:
+    raw = json.dumps(message, ensure_ascii=False)
+    return (_encrypt(f, raw), True) if f else (raw, False)
+
+
+def _unpack_message(f: Optional[Fernet], payload: str, encrypted: bool) -> Optional[Any]:
+    raw = payload
+    if encrypted:
+        if not f:
+            return None
+        raw = _decrypt(f, payload)
+        if raw is None:
+            return None
+    try:
+        return json.loads(raw)
+    except Exception:
+        return None
+
+
+def _insert_messages(cur, chat_id: int, start_seq: int, messages: List[Any]) -> None:
+    """Mesajları (chat_id, seq) satırları olarak tek çok-satırlı INSERT ile yazar."""
+    if not messages:
+        return
+    from psycopg2.extras import execute_values
+
+    f = _fernet()
+    values = []
+    for i, m in enumerate(messages):
+        payload, encrypted = _pack_message(f, m)
+        values.append((chat_id, start_seq + i, payload, encrypted))
+    execute_values(
+        cur,
+        "INSERT INTO assistant_chat_messages (chat_id, seq, payload, encrypted) VALUES %s",
+        values,
+        page_size=len(values),
+    )
+
+
+# Tablo/indeks DDL'i schema.ensure_schema'da (migration 027/033/034); modül
+# import'unda DB'ye dokunulmaz, süresi dolan sohbetler startup'ta temizlenir.
+
+def purge_expired_chats() -> int:
+    """90 günlük saklama süresi dolan sohbetleri siler (mesaj satırları CASCADE)."""
     with get_db_cursor(write=True) as cur:
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS assistant_chats (
-                id           BIGINT PRIMARY KEY,
-                user_id      UUID NOT NULL,
-                name         TEXT NOT NULL DEFAULT 'Yeni sohbet',
-                messages     JSONB NOT NULL DEFAULT '[]',
-                messages_enc TEXT,
-                expires_at   TIMESTAMPTZ NOT NULL DEFAULT (NOW() + INTERVAL '90 days'),
-                created_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            )
-        """)
-        for stmt in [
-            "ALTER TABLE assistant_chats ADD COLUMN IF NOT EXISTS messages_enc TEXT;",
-            "ALTER TABLE assistant_chats ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ NOT NULL DEFAULT (NOW() + INTERVAL '90 days');",
-            "CREATE INDEX IF NOT EXISTS idx_assistant_chats_user_updated ON assistant_chats(user_id, updated_at DESC);",
-            "CREATE INDEX IF NOT EXISTS idx_assistant_chats_expires ON assistant_chats(expires_at);",
-        ]:
-            try:
-                cur.execute(stmt)
-            except Exception:
-                pass
-        # Purge expired rows
         cur.execute("DELETE FROM assistant_chats WHERE expires_at < NOW()")
+        return cur.rowcount
+
+
+LIST_PAGE_SIZE = 50
+LIST_PAGE_MAX = 200
+
+
+def _encode_cursor(updated_at: datetime, chat_id: int) -> str:
+    raw = f"{updated_at.isoformat()}|{chat_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Geçersiz cursor için ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        ts, chat_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(chat_id)
+    except Exception as e:
+        raise ValueError("invalid chat cursor") from e
 
 
-try:
-    _ensure_table()
-except Exception:
-    pass
+def list_chats(
+    user_id: str, limit: int = LIST_PAGE_SIZE, cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Kenar çubuğu için yalnızca sohbet metadatası; mesajlar get_chat'te çözülür.
 
+    (updated_at, id) üzerinde keyset sayfalama: `cursor` önceki sayfanın
+    döndürdüğü next_cursor'dır. (sayfa, next_cursor) döner; son sayfada None.
+    """
+    limit = max(1, min(int(limit), LIST_PAGE_MAX))
+    sql = (
+        "SELECT id, name, message_count, created_at, updated_at "
+        "FROM assistant_chats "
+        "WHERE user_id = %s AND expires_at > NOW() "
+    )
+    params: list = [user_id]
+    if cursor:
+        updated_at, chat_id = _decode_cursor(cursor)
+        sql += "AND (updated_at, id) < (%s, %s) "
+        params += [updated_at, chat_id]
+    sql += "ORDER BY updated_at DESC, id DESC LIMIT %s"
+    params.append(limit + 1)
 
-def list_chats(user_id: str) -> List[Dict[str, Any]]:
     with get_db_cursor(write=False) as cur:
-        cur.execute(
-            "SELECT id, name, messages, messages_enc, created_at, updated_at "
-            "FROM assistant_chats "
-            "WHERE user_id = %s AND expires_at > NOW() "
-            "ORDER BY updated_at DESC LIMIT 200",
-            (user_id,),
-        )
+        cur.execute(sql, tuple(params))
         rows = cur.fetchall() or []
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last["updated_at"], last["id"])
     result = []
     for r in rows:
         result.append({
             "id": r["id"],
             "name": r["name"],
-            "messages": _msgs_from_row(r),
+            "messageCount": r.get("message_count"),
             "createdAt": int(r["created_at"].timestamp() * 1000) if r.get("created_at") else r["id"],
             "date": r["updated_at"].strftime("%d.%m.%Y") if r.get("updated_at") else "",
         })
-    return result
+    return result, next_cursor
 
 
 def get_chat(user_id: str, chat_id: int) -> Optional[Dict[str, Any]]:
+    """Tam sohbet: eski tek-blob mesajlar (varsa) + append-only satırlar, seq sırasıyla."""
     with get_db_cursor(write=False) as cur:
         cur.execute(
             "SELECT id, name, messages, messages_enc, created_at, updated_at "
@@ -121,38 +178,98 @@ def get_chat(user_id: str, chat_id: int) -> Optional[Dict[str, Any]]:
             (user_id, chat_id),
         )
         r = cur.fetchone()
-    if not r:
-        return None
+        if not r:
+            return None
+        cur.execute(
+            "SELECT payload, encrypted FROM assistant_chat_messages "
+            "WHERE chat_id = %s ORDER BY seq",
+            (chat_id,),
+        )
+        parts = cur.fetchall() or []
+    f = _fernet()
+    messages = _msgs_from_row(r)
+    for p in parts:
+        m = _unpack_message(f, p["payload"], bool(p["encrypted"]))
+        if m is not None:
+            messages.append(m)
     return {
         "id": r["id"],
         "name": r["name"],
-        "messages": _msgs_from_row(r),
+        "messages": messages,
         "createdAt": int(r["created_at"].timestamp() * 1000) if r.get("created_at") else r["id"],
         "date": r["updated_at"].strftime("%d.%m.%Y") if r.get("updated_at") else "",
     }
 
 
-def upsert_chat(user_id: str, chat_id: int, name: str, messages: list) -> None:
-    raw = json.dumps(messages, ensure_ascii=False)
-    f = _fernet()
-    enc = _encrypt(f, raw) if f else None
-    # If encrypted, clear plaintext column; otherwise keep plaintext for readability
-    msgs_jsonb = "[]" if enc else raw
+def append_messages(user_id: str, chat_id: int, messages: list, name: Optional[str] = None) -> Optional[int]:
+    """
+    Bir tura ait yeni mesajları sohbetin sonuna ekler; sohbet yoksa oluşturur.
+    Maliyet sohbetin uzunluğundan bağımsızdır: yeni mesaj başına bir satır +
+    sohbet satırında sayaç/zaman güncellemesi. Sohbet satırı FOR UPDATE ile
+    kilitlenir, eşzamanlı turlar seq'leri sırayla alır. Sohbetin yeni toplam
+    mesaj sayısını döner; sohbet başka kullanıcıya aitse None.
+    """
+    with get_db_cursor(write=True) as cur:
+        cur.execute(
+            """
+            INSERT INTO assistant_chats (id, user_id, name, message_count)
+            VALUES (%s, %s, %s, 0)
+            ON CONFLICT (id) DO NOTHING
+            """,
+            (chat_id, user_id, name or "Yeni sohbet"),
+        )
+        cur.execute(
+            "SELECT message_count, messages, messages_enc FROM assistant_chats "
+            "WHERE id = %s AND user_id = %s FOR UPDATE",
+            (chat_id, user_id),
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        count = row.get("message_count")
+        if count is None:
+            # 044 öncesi satır: sayaç yok, bir kereliğine eski blob'dan say
+            cur.execute("SELECT COUNT(*) AS c FROM assistant_chat_messages WHERE chat_id = %s", (chat_id,))
+            count = len(_msgs_from_row(row)) + int((cur.fetchone() or {}).get("c") or 0)
 
+        _insert_messages(cur, chat_id, count, messages)
+        cur.execute(
+            """
+            UPDATE assistant_chats
+            SET message_count = %s,
+                name          = COALESCE(%s, name),
+                expires_at    = NOW() + INTERVAL '90 days',
+                updated_at    = NOW()
+            WHERE id = %s
+            """,
+            (count + len(messages), name, chat_id),
+        )
+        return count + len(messages)
+
+
+def upsert_chat(user_id: str, chat_id: int, name: str, messages: list) -> None:
+    """Sohbetin tamamını verilen mesajlarla değiştirir (oluşturma / içe aktarma için).
+    Normal akışta turlar append_messages ile eklenir."""
     with get_db_cursor(write=True) as cur:
         cur.execute("""
             INSERT INTO assistant_chats
-                (id, user_id, name, messages, messages_enc, expires_at, updated_at)
+                (id, user_id, name, messages, messages_enc, message_count, expires_at, updated_at)
             VALUES
-                (%s, %s, %s, %s::jsonb, %s, NOW() + INTERVAL '90 days', NOW())
+                (%s, %s, %s, '[]'::jsonb, NULL, %s, NOW() + INTERVAL '90 days', NOW())
             ON CONFLICT (id) DO UPDATE
-              SET name         = EXCLUDED.name,
-                  messages     = EXCLUDED.messages,
-                  messages_enc = EXCLUDED.messages_enc,
-                  expires_at   = NOW() + INTERVAL '90 days',
-                  updated_at   = NOW()
+              SET name          = EXCLUDED.name,
+                  messages      = EXCLUDED.messages,
+                  messages_enc  = EXCLUDED.messages_enc,
+                  message_count = EXCLUDED.message_count,
+                  expires_at    = NOW() + INTERVAL '90 days',
+                  updated_at    = NOW()
             WHERE assistant_chats.user_id = %s
-        """, (chat_id, user_id, name, msgs_jsonb, enc, user_id))
+            RETURNING id
+        """, (chat_id, user_id, name, len(messages), user_id))
+        if not cur.fetchone():
+            return  # başka kullanıcının sohbeti
+        cur.execute("DELETE FROM assistant_chat_messages WHERE chat_id = %s", (chat_id,))
+        _insert_messages(cur, chat_id, 0, messages)
 
 
 def rename_chat(user_id: str, chat_id: int, name: str) -> bool:
@@ -1,10 +1,10 @@
 import os
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List
 from datetime import datetime, timedelta, timezone
 import uuid
 import threading
-from db import get_db_cursor, get_pool_status
+from db import get_db_cursor, get_pool_status, iter_query
 from security import encrypt_value, decrypt_value, hmac_hash
 
 logger = logging.getLogger("miron_pg_store")
@@ -279,6 +279,181 @@ def update_user_active(email: str, is_active: bool) -> bool:
         cur.execute(sql, (is_active, _norm_email(email)))
         return cur.fetchone() is not None
 
+# --- Bulk Operations (admin) ---
+
+BULK_CHUNK_SIZE = 1000
+
+
+def _chunks(items: List[Any], size: int = BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def find_existing_emails(emails: List[str]) -> set:
+    """Verilen e-postalardan users tablosunda olanları döndürür (tek sorgu/chunk)."""
+    norm = [_norm_email(e) for e in emails if _norm_email(e)]
+    if _use_inmemory():
+        with _mem_lock:
+            return {e for e in norm if e in _mem_users_by_email}
+    found = set()
+    with get_db_cursor(write=False) as cur:
+        for chunk in _chunks(norm):
+            cur.execute("SELECT email FROM users WHERE email = ANY(%s)", (chunk,))
+            found.update(r["email"] for r in cur.fetchall() or [])
+    return found
+
+
+def bulk_update_users(
+    emails: List[str],
+    is_active: Optional[bool] = None,
+    role: Optional[str] = None,
+    password_hash: Optional[str] = None,
+) -> set:
+    """
+    Aynı değerleri tüm e-postalara tek UPDATE ile uygular.
+    Returns: gerçekten güncellenen e-postalar (bulunamayanlar dahil değil).
+    """
+    norm = [_norm_email(e) for e in emails if _norm_email(e)]
+    if _use_inmemory():
+        updated = set()
+        with _mem_lock:
+            for e in norm:
+                uid = _mem_users_by_email.get(e)
+                if not uid:
+                    continue
+                u = _mem_users_by_id[uid]
+                if is_active is not None:
+                    u["is_active"] = bool(is_active)
+                if role is not None:
+                    u["role"] = str(role)
+                if password_hash is not None:
+                    u["password_hash"] = password_hash
+                updated.add(e)
+        return updated
+
+    sets = []
+    params: List[Any] = []
+    if is_active is not None:
+        sets.append("is_active = %s")
+        params.append(bool(is_active))
+    if role is not None:
+        sets.append("role = %s")
+        params.append(str(role))
+    if password_hash is not None:
+        sets.append("password_hash = %s")
+        params.append(password_hash)
+    if not sets:
+        return find_existing_emails(norm)
+    sql = f"UPDATE users SET {', '.join(sets)} WHERE email = ANY(%s) RETURNING email"
+    updated = set()
+    with get_db_cursor() as cur:
+        for chunk in _chunks(norm):
+            cur.execute(sql, (*params, chunk))
+            updated.update(r["email"] for r in cur.fetchall() or [])
+    return updated
+
+
+def bulk_delete_users(emails: List[str]) -> set:
+    """Tek DELETE ... WHERE email = ANY(...). Returns: silinen e-postalar."""
+    norm = [_norm_email(e) for e in emails if _norm_email(e)]
+    if _use_inmemory():
+        deleted = set()
+        with _mem_lock:
+            for e in norm:
+                uid = _mem_users_by_email.pop(e, None)
+                if uid:
+                    _mem_users_by_id.pop(uid, None)
+                    deleted.add(e)
+        return deleted
+    deleted = set()
+    with get_db_cursor() as cur:
+        for chunk in _chunks(norm):
+            cur.execute("DELETE FROM users WHERE email = ANY(%s) RETURNING email", (chunk,))
+            deleted.update(r["email"] for r in cur.fetchall() or [])
+    return deleted
+
+
+def bulk_create_users(rows: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    rows: email, password_hash, first_name, last_name, role, is_active.
+    execute_values ile çok satırlı INSERT ... ON CONFLICT (email) DO NOTHING.
+    Returns: {email: id} — yalnızca gerçekten oluşturulanlar.
+    """
+    if _use_inmemory():
+        created: Dict[str, str] = {}
+        for r in rows:
+            e = _norm_email(r["email"])
+            with _mem_lock:
+                if e in _mem_users_by_email:
+                    continue
+            created[e] = create_user({**r, "email": e, "hashed_password": r["password_hash"]})
+        return created
+
+    from psycopg2.extras import execute_values
+
+    sql = """
+        INSERT INTO users (email, password_hash, first_name, last_name, role, is_active, created_at)
+        VALUES %s
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id, email
+    """
+    template = "(%s, %s, %s, %s, %s, %s, NOW())"
+    created = {}
+    with get_db_cursor() as cur:
+        for chunk in _chunks(rows):
+            values = [
+                (_norm_email(r["email"]), r["password_hash"], r.get("first_name") or "",
+                 r.get("last_name") or "", r.get("role") or "user", bool(r.get("is_active", True)))
+                for r in chunk
+            ]
+            for row in execute_values(cur, sql, values, template=template, page_size=len(values), fetch=True):
+                created[row["email"]] = str(row["id"])
+    return created
+
+
+def bulk_update_profiles(rows: List[Dict[str, Any]]) -> set:
+    """
+    Satır başına farklı profil değerlerini tek UPDATE ... FROM (VALUES ...) ile yazar.
+    password_hash None ise mevcut şifre korunur.
+    Returns: güncellenen e-postalar.
+    """
+    if _use_inmemory():
+        updated = set()
+        for r in rows:
+            e = _norm_email(r["email"])
+            if update_user_profile(e, r.get("first_name"), r.get("last_name"), r.get("role"), r.get("is_active")):
+                if r.get("password_hash"):
+                    update_user_password(e, r["password_hash"])
+                updated.add(e)
+        return updated
+
+    from psycopg2.extras import execute_values
+
+    sql = """
+        UPDATE users AS u SET
+            first_name = v.first_name,
+            last_name = v.last_name,
+            role = v.role,
+            is_active = v.is_active,
+            password_hash = COALESCE(v.password_hash, u.password_hash)
+        FROM (VALUES %s) AS v(email, first_name, last_name, role, is_active, password_hash)
+        WHERE u.email = v.email
+        RETURNING u.email
+    """
+    template = "(%s, %s, %s, %s, %s::boolean, %s::text)"
+    updated = set()
+    with get_db_cursor() as cur:
+        for chunk in _chunks(rows):
+            values = [
+                (_norm_email(r["email"]), r.get("first_name") or "", r.get("last_name") or "",
+                 r.get("role") or "user", bool(r.get("is_active", True)), r.get("password_hash"))
+                for r in chunk
+            ]
+            for row in execute_values(cur, sql, values, template=template, page_size=len(values), fetch=True):
+                updated.add(row["email"])
+    return updated
+
+
 def update_user_login(user_id: str, ip: str, refresh_hash: str):
     if _use_inmemory():
         uid = str(user_id)
@@ -464,6 +639,23 @@ def get_audit_logs(user_id: str = None, limit: int = 100) -> List[Dict[str, Any]
         rows = cur.fetchall()
         return [dict(r) for r in rows]
 
+def _user_filters(role: str = None, search: str = None, is_active: Optional[bool] = None):
+    where = []
+    params = []
+    if role:
+        where.append("role = %s")
+        params.append(role)
+    if is_active is not None:
+        where.append("is_active = %s")
+        params.append(bool(is_active))
+    q = (search or "").strip().lower()
+    if q:
+        where.append("(LOWER(email) LIKE %s OR LOWER(COALESCE(first_name,'')) LIKE %s OR LOWER(COALESCE(last_name,'')) LIKE %s)")
+        like = f"%{q}%"
+        params.extend([like, like, like])
+    return (" WHERE " + " AND ".join(where)) if where else "", params
+
+
 def list_users(limit=100, offset=0, role: str = None, search: str = None, is_active: Optional[bool] = None) -> List[Dict[str, Any]]:
     if _use_inmemory():
         with _mem_lock:
@@ -483,23 +675,8 @@ def list_users(limit=100, offset=0, role: str = None, search: str = None, is_act
             ]
         users.sort(key=lambda x: x.get("created_at") or _now_utc(), reverse=True)
         return [dict(u) for u in users[int(offset) : int(offset) + int(limit)]]
-    sql = "SELECT * FROM users"
-    where = []
-    params = []
-    if role:
-        where.append("role = %s")
-        params.append(role)
-    if is_active is not None:
-        where.append("is_active = %s")
-        params.append(bool(is_active))
-    q = (search or "").strip().lower()
-    if q:
-        where.append("(LOWER(email) LIKE %s OR LOWER(COALESCE(first_name,'')) LIKE %s OR LOWER(COALESCE(last_name,'')) LIKE %s)")
-        like = f"%{q}%"
-        params.extend([like, like, like])
-    if where:
-        sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY created_at DESC LIMIT %s OFFSET %s"
+    where_sql, params = _user_filters(role, search, is_active)
+    sql = f"SELECT * FROM users{where_sql} ORDER BY created_at DESC LIMIT %s OFFSET %s"
     params.extend([limit, offset])
         
     with get_db_cursor() as cur:
@@ -508,6 +685,16 @@ def list_users(limit=100, offset=0, role: str = None, search: str = None, is_act
         return [_row_to_user(r) for r in rows]
 
 
+def iter_users(role: str = None, search: str = None, is_active: Optional[bool] = None) -> Iterator[Dict[str, Any]]:
+    """list_users ile aynı filtre/sıra; limit yok, server-side cursor ile akıtılır (export)."""
+    if _use_inmemory():
+        yield from list_users(limit=len(_mem_users_by_id), offset=0, role=role, search=search, is_active=is_active)
+        return
+    where_sql, params = _user_filters(role, search, is_active)
+    for row in iter_query(f"SELECT * FROM users{where_sql} ORDER BY created_at DESC", tuple(params)):
+        yield _row_to_user(row)
+
+
 def update_user_profile(
     email: str,
     first_name: Optional[str] = None,
@@ -908,3 +1095,74 @@ def log_audit(user_id: Optional[str], action: str, resource: str = None, details
         # details JSON serialization fix
         d_json = json.dumps(details) if details else None
         cur.execute(sql, (user_id, action, resource, d_json, ip, ua))
+
+
+def log_audit_many(events: List[Dict[str, Any]]) -> int:
+    """
+    log_audit'in toplu hali: her event log_audit'in keyword argümanlarını
+    taşır (user_id, action, resource, details, ip, ua). Tek çok satırlı
+    INSERT ile yazar; yazılan satır sayısını döner.
+    Batch'teki tek bir bozuk satır (silinmiş kullanıcı FK'si, INET'e
+    dönüşmeyen IP) tüm batch'i düşürmesin diye, IntegrityError/DataError
+    durumunda aynı transaction içinde satır satır SAVEPOINT ile yeniden
+    denenir; yalnızca hatalı satırlar atlanır.
+    """
+    if not events or (os.getenv("AUDIT_LOG_ENABLED", "true") or "").lower() != "true":
+        return 0
+    if _use_inmemory():
+        with _mem_lock:
+            for e in events:
+                _mem_audit_logs.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "user_id": e.get("user_id"),
+                        "action": e.get("action"),
+                        "resource": e.get("resource"),
+                        "details": e.get("details"),
+                        "ip_address": e.get("ip"),
+                        "user_agent": e.get("ua"),
+                        "created_at": _now_utc(),
+                    }
+                )
+        return len(events)
+    status = get_pool_status()
+    if status.get("status") != "active":
+        return 0
+    import json
+    from psycopg2.extras import execute_values
+
+    values = [
+        (
+            e.get("user_id"),
+            e.get("action"),
+            e.get("resource"),
+            json.dumps(e["details"]) if e.get("details") else None,
+            e.get("ip"),
+            e.get("ua"),
+        )
+        for e in events
+    ]
+    import psycopg2
+
+    sql = "INSERT INTO audit_logs (user_id, action, resource, details, ip_address, user_agent) VALUES %s"
+    row_sql = "INSERT INTO audit_logs (user_id, action, resource, details, ip_address, user_agent) VALUES (%s, %s, %s, %s, %s, %s)"
+    written = 0
+    with get_db_cursor() as cur:
+        cur.execute("SAVEPOINT audit_batch")
+        try:
+            execute_values(cur, sql, values, page_size=len(values))
+            cur.execute("RELEASE SAVEPOINT audit_batch")
+            return len(values)
+        except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+            cur.execute("ROLLBACK TO SAVEPOINT audit_batch")
+            logger.warning("audit batch rejected (%s); retrying %d rows one by one", e, len(values))
+        for row in values:
+            cur.execute("SAVEPOINT audit_row")
+            try:
+                cur.execute(row_sql, row)
+                cur.execute("RELEASE SAVEPOINT audit_row")
+                written += 1
+            except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+                cur.execute("ROLLBACK TO SAVEPOINT audit_row")
+                logger.warning("audit event dropped action=%s: %s", row[1], e)
+    return written
@@ -119,3 +119,134 @@ def test_admin_config_update(admin_token):
     assert res2.status_code == 200
     assert res2.json().get("ok") is True
 
+
+
+
+def _admin_ctx(email: str) -> dict:
+    uid = create_user({"email": email, "hashed_password": hash_password("StrongPassword123!"), "role": "admin"})
+    return {"admin_id": uid}
+
+
+def test_admin_bulk_users_reports_per_email(monkeypatch):
+    import admin_router
+
+    admin = _admin_ctx("bulk-admin@example.com")
+    for i in range(3):
+        create_user({"email": f"bulk{i}@example.com", "hashed_password": hash_password("StrongPassword123!"), "role": "user"})
+    calls = []
+    real_hash = admin_router.hash_password
+    monkeypatch.setattr(admin_router, "hash_password", lambda pw: calls.append(pw) or real_hash(pw))
+    emails = ["bulk0@example.com", "bulk1@example.com", "bulk2@example.com", "missing@example.com"]
+
+    body = admin_router.admin_bulk_users(
+        admin_router.BulkUsersIn(action="set_password", emails=emails, password="NewPassword123!"), admin=admin
+    )
+    assert (body["updated"], body["errors"]) == (3, 1)
+    assert {d["email"]: d["status"] for d in body["details"]}["missing@example.com"] == "not_found"
+    assert len(calls) == 1
+
+    body = admin_router.admin_bulk_users(
+        admin_router.BulkUsersIn(action="delete", emails=emails[:2] + ["bulk-admin@example.com"]), admin=admin
+    )
+    assert (body["deleted"], body["skipped"]) == (2, 1)
+    assert find_user_by_email("bulk0@example.com") is None
+    assert find_user_by_email("bulk-admin@example.com") is not None
+
+
+def test_admin_import_users_set_based(monkeypatch):
+    import admin_router
+
+    admin = _admin_ctx("import-admin@example.com")
+    create_user({"email": "imp-existing@example.com", "hashed_password": hash_password("StrongPassword123!"), "first_name": "Eski"})
+    calls = []
+    real_hash = admin_router.hash_password
+    monkeypatch.setattr(admin_router, "hash_password", lambda pw: calls.append(pw) or real_hash(pw))
+    users = [
+        {"email": "imp1@example.com", "username": "Ayşe Yılmaz", "password": "SharedPass123!"},
+        {"email": "imp2@example.com", "password": "SharedPass123!", "role": "demo"},
+        {"email": "imp3@example.com"},
+        {"email": "imp1@example.com", "password": "Other123!"},
+        {"email": "imp-existing@example.com", "firstName": "Yeni", "is_active": False},
+    ]
+
+    body = admin_router.admin_import_users(admin_router.ImportUsersIn(mode="upsert", users=users), admin=admin)
+    statuses = [(d["email"], d["status"]) for d in body["details"]]
+    assert ("imp1@example.com", "created") in statuses
+    assert ("imp2@example.com", "created") in statuses
+    assert ("imp3@example.com", "skipped") in statuses
+    assert ("imp-existing@example.com", "updated") in statuses
+    assert (body["created"], body["updated"], body["skipped"], body["errors"]) == (2, 1, 2, 0)
+    assert calls == ["SharedPass123!"]
+
+    imp1 = find_user_by_email("imp1@example.com")
+    assert (imp1["first_name"], imp1["last_name"]) == ("Ayşe", "Yılmaz")
+    assert find_user_by_email("imp2@example.com")["role"] == "demo"
+    existing = find_user_by_email("imp-existing@example.com")
+    assert existing["first_name"] == "Yeni" and existing["is_active"] is False
+
+    body = admin_router.admin_import_users(admin_router.ImportUsersIn(mode="skip", users=users[:1]), admin=admin)
+    assert body["details"] == [{"email": "imp1@example.com", "status": "skipped", "reason": "exists"}]
+
+
+def _drain(response) -> str:
+    import asyncio
+
+    async def collect():
+        parts = []
+        async for chunk in response.body_iterator:
+            parts.append(chunk if isinstance(chunk, str) else chunk.decode("utf-8"))
+        return "".join(parts)
+
+    return asyncio.run(collect())
+
+
+def test_admin_export_users_streams_all_formats(monkeypatch):
+    import json as _json
+
+    import admin_router
+
+    admin = _admin_ctx("export-admin@example.com")
+    for i in range(5):
+        create_user({"email": f"export{i}@example.com", "hashed_password": hash_password("StrongPassword123!"), "first_name": "Ex"})
+    audits = []
+    monkeypatch.setattr(admin_router, "log_audit", lambda *a, **k: audits.append(a))
+
+    csv_text = _drain(admin_router.admin_export_users(format="csv", search="export", admin=admin))
+    lines = csv_text.strip().splitlines()
+    assert lines[0].startswith("email,first_name")
+    assert len(lines) == 1 + 6  # 5 kullanıcı + export-admin
+    assert "password" not in csv_text
+
+    payload = _json.loads(_drain(admin_router.admin_export_users(format="json", search="export", admin=admin)))
+    assert len(payload["users"]) == 6
+    assert all("password_hash" not in u for u in payload["users"])
+
+    nd = _drain(admin_router.admin_export_users(format="ndjson", search="export0", admin=admin)).strip().splitlines()
+    assert [_json.loads(l)["email"] for l in nd] == ["export0@example.com"]
+
+    assert [a[3]["count"] for a in audits] == [6, 6, 1]
+
+
+def test_iter_query_uses_named_cursor(monkeypatch):
+    from contextlib import contextmanager
+    from unittest.mock import MagicMock
+
+    import db
+
+    named = MagicMock()
+    named.__enter__.return_value = named
+    named.__iter__.return_value = iter([{"id": 1}, {"id": 2}])
+    cur = MagicMock()
+    cur.connection.cursor.return_value = named
+
+    @contextmanager
+    def fake_cursor(write=True):
+        yield cur
+
+    monkeypatch.setattr(db, "get_db_cursor", fake_cursor)
+    rows = list(db.iter_query("SELECT id FROM t WHERE x = %s", (1,), itersize=500))
+
+    assert rows == [{"id": 1}, {"id": 2}]
+    assert cur.connection.cursor.call_args.kwargs["name"].startswith("stream_")
+    assert named.itersize == 500
+    named.execute.assert_called_once_with("SELECT id FROM t WHERE x = %s", (1,))
@@ -0,0 +1,100 @@
+import threading
+
+from services.audit_queue import AuditQueue
+
+
+class _GatedWriter:
+    """İlk batch'i kapı açılana kadar tutar; böylece kuyruk dolar."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.batches = []
+
+    def __call__(self, batch):
+        self.gate.wait(5)
+        self.batches.append(list(batch))
+
+
+def test_burst_is_written_in_batches():
+    writer = _GatedWriter()
+    q = AuditQueue(maxsize=1000, batch_size=50, sample_above=1.0, writer=writer)
+
+    q.enqueue(None, "REQUEST_FAILED", "/api/x", {"status": 401})
+    for i in range(120):
+        assert q.enqueue(None, "REQUEST_FAILED", "/api/x", {"status": 401, "i": i})
+    writer.gate.set()
+    assert q.join(5)
+    q.close()
+
+    sizes = [len(b) for b in writer.batches]
+    assert sum(sizes) == 121 and max(sizes) == 50
+    # İlk olay tek başına yazılırken kalan 120'si 3 çok satırlı INSERT'e sığar
+    assert len(sizes) <= 4
+    assert q.stats["written"] == 121
+
+
+def test_full_queue_drops_and_samples_without_blocking():
+    writer = _GatedWriter()
+    q = AuditQueue(maxsize=10, batch_size=10, sample_above=0.5, sample_rate=0.0, writer=writer)
+
+    q.enqueue(None, "REQUEST_FAILED", "/a")  # yazıcı bunu alıp kapıda bekler
+    q.join(0.2)
+    kept = sum(q.enqueue(None, "REQUEST_FAILED", "/a") for _ in range(100))
+    # Yarıya kadar dolar, sonrası örneklenir (rate=0 → hepsi elenir)
+    assert kept == 5
+    assert q.stats["sampled_out"] == 95
+
+    # SYSTEM_ERROR örneklenmez; yalnızca kuyruk tamamen doluysa düşer
+    kept_errors = sum(q.enqueue(None, "SYSTEM_ERROR", "/a") for _ in range(10))
+    assert kept_errors == 5
+    assert q.stats["dropped"] == 5
+
+    writer.gate.set()
+    assert q.join(5)
+    q.close()
+    assert q.stats["written"] == 11
+
+
+def test_partial_write_counts_only_rejected_rows_as_failed():
+    q = AuditQueue(maxsize=100, batch_size=10, sample_above=1.0, writer=lambda batch: len(batch) - 1)
+    for i in range(5):
+        q.enqueue(None, "REQUEST_FAILED", "/a", {"i": i})
+    assert q.join(5)
+    q.close()
+    assert q.stats["written"] + q.stats["failed"] == 5
+    assert 1 <= q.stats["failed"] < 5
+
+
+def test_log_audit_many_retries_row_by_row_when_batch_is_rejected(monkeypatch):
+    import contextlib
+
+    import psycopg2
+    import psycopg2.extras
+
+    from stores import pg_users_store as store
+
+    inserted, statements = [], []
+
+    class _Cursor:
+        def execute(self, sql, params=None):
+            statements.append(sql.split()[0])
+            if params is not None:
+                # Silinmiş kullanıcının FK'si batch'i de, tek satırı da reddeder
+                if params[0] == "deleted-user":
+                    raise psycopg2.IntegrityError("fk violation")
+                inserted.append(params)
+
+    def _execute_values(cur, sql, values, page_size=None):
+        if any(v[0] == "deleted-user" for v in values):
+            raise psycopg2.IntegrityError("fk violation")
+        inserted.extend(values)
+
+    monkeypatch.setattr(store, "_use_inmemory", lambda: False)
+    monkeypatch.setattr(store, "get_pool_status", lambda: {"status": "active"})
+    monkeypatch.setattr(store, "get_db_cursor", contextlib.contextmanager(lambda: (yield _Cursor())))
+    monkeypatch.setattr(psycopg2.extras, "execute_values", _execute_values)
+
+    events = [{"user_id": uid, "action": "REQUEST_FAILED", "resource": "/a"} for uid in ("u1", "deleted-user", "u2")]
+    assert store.log_audit_many(events) == 2
+    assert [row[0] for row in inserted] == ["u1", "u2"]
+    assert statements.count("ROLLBACK") == 2  # batch + the bad row
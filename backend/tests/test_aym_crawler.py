@@ -0,0 +1,227 @@
+"""AYM resolver against a local fake AYM server (no network)."""
+
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+BACKEND = pathlib.Path(__file__).resolve().parent.parent
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+from master_ingestion.async_client import AsyncClient, TokenBucket  # noqa: E402
+from master_ingestion.endpoint_resolver import AYMEndpointResolver  # noqa: E402
+from master_ingestion.frontier import DEFAULT_INTERVAL, MAX_INTERVAL, MIN_INTERVAL, next_interval  # noqa: E402
+
+DETAILS_PER_PAGE = 12
+DETAIL_LATENCY = 0.05
+
+
+def _detail_html(n: int, rev: int = 0) -> str:
+    body = f"KARAR {n} r{rev}\nGEREKÇE\n" + ("Başvurucunun hak ihlali iddiası incelenmiştir. " * 60) + "\nHÜKÜM"
+    return (
+        "<html><head><title>Karar</title></head><body>"
+        f"<div class='kararbilgileri'>2025/{n} | Esas (İhlal)</div>"
+        f"<div class='karar-metni'>{body}</div></body></html>"
+    )
+
+
+def _fake_aym_app(state: dict) -> web.Application:
+    async def listing(request):
+        page = int(request.query.get("page", "1"))
+        if page > 2:
+            return web.Response(text="<html><title>AYM</title><body></body></html>", content_type="text/html")
+        links = "".join(
+            f"<a href='/BB/2025/{page * 100 + i}'>k</a>" for i in range(DETAILS_PER_PAGE)
+        )
+        return web.Response(
+            text=f"<html><title>AYM</title><body>{links}<div class='pagination'></div></body></html>",
+            content_type="text/html",
+        )
+
+    async def detail(request):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        state["detail_requests"] = state.get("detail_requests", 0) + 1
+        try:
+            await asyncio.sleep(DETAIL_LATENCY)
+            n = int(request.match_info["n"])
+            rev = state.get("revision", 0)
+            etag = f'"{n}-{rev}"'
+            if request.headers.get("If-None-Match") == etag:
+                state["not_modified"] = state.get("not_modified", 0) + 1
+                return web.Response(status=304, headers={"ETag": etag})
+            return web.Response(text=_detail_html(n, rev), content_type="text/html", headers={"ETag": etag})
+        finally:
+            state["in_flight"] -= 1
+
+    app = web.Application()
+    app.router.add_get("/", listing)
+    app.router.add_get("/BB/2025/{n}", detail)
+    return app
+
+
+class _MemoryFrontier:
+    """Same interface as master_ingestion.frontier.Frontier, kept in a dict."""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def lookup(self, urls):
+        return {u: dict(self.rows[u]) for u in urls if u in self.rows}
+
+    async def due(self, source, limit=200):
+        now = datetime.now(timezone.utc)
+        return [dict(r) for r in self.rows.values() if r["next_fetch_at"] <= now][:limit]
+
+    async def record_many(self, source, outcomes):
+        now = datetime.now(timezone.utc)
+        for o in outcomes:
+            row = self.rows.setdefault(o["url"], {"url": o["url"]})
+            row.update({k: v for k, v in o.items() if v is not None})
+            row["next_fetch_at"] = now + timedelta(seconds=o["recrawl_interval_s"])
+
+
+async def _crawl(concurrency: int, state: dict, frontier=None, runs=1, stop_after_known=None, before_run=None,
+                 confirm=True):
+    from aiohttp.test_utils import TestServer
+
+    server = TestServer(_fake_aym_app(state))
+    await server.start_server()
+    http = AsyncClient(rate_limit=0)
+    resolver = AYMEndpointResolver(
+        "fake",
+        concurrency=concurrency,
+        base_url=str(server.make_url("")).rstrip("/"),
+        http_client=http,
+        parse_executor=ThreadPoolExecutor(max_workers=2),
+        frontier=frontier,
+    )
+    pages = []
+    t0 = time.perf_counter()
+    try:
+        for run in range(runs):
+            if before_run:
+                before_run(run)
+            async for page, docs in resolver.traverse_pages(start_page=1, stop_after_known=stop_after_known):
+                pages.append((page, docs))
+                if confirm:
+                    await resolver.confirm(docs)
+                if page >= 2:
+                    break
+            recrawled = await resolver.recrawl_due()
+            if confirm:
+                await resolver.confirm(recrawled)
+            pages.extend((0, [d]) for d in recrawled)
+    finally:
+        await http.close()
+        await server.close()
+    return pages, time.perf_counter() - t0
+
+
+def test_detail_fetches_are_concurrent_and_bounded():
+    state = {"in_flight": 0, "max_in_flight": 0}
+    pages, _ = asyncio.run(_crawl(4, state))
+
+    assert [p for p, _ in pages] == [1, 2]
+    docs = [d for _, page_docs in pages for d in page_docs]
+    assert len(docs) == 2 * DETAILS_PER_PAGE
+    assert docs[0]["decision_no"] == "2025/100"
+    assert 1 < state["max_in_flight"] <= 4
+
+
+def test_throughput_scales_with_concurrency():
+    _, serial = asyncio.run(_crawl(1, {"in_flight": 0, "max_in_flight": 0}))
+    _, parallel = asyncio.run(_crawl(6, {"in_flight": 0, "max_in_flight": 0}))
+    assert parallel < serial / 2
+
+
+def test_token_bucket_spaces_requests_per_host():
+    async def run():
+        bucket = TokenBucket(rate=20.0, capacity=2)
+        t0 = asyncio.get_running_loop().time()
+        for _ in range(6):
+            await bucket.acquire()
+        return asyncio.get_running_loop().time() - t0
+
+    # 2 burst tokens free, then 4 more at 20/s.
+    assert asyncio.run(run()) >= 0.18
+
+
+def test_frontier_skips_known_urls_on_steady_state_scan():
+    state = {"in_flight": 0, "max_in_flight": 0}
+    frontier = _MemoryFrontier()
+    pages, _ = asyncio.run(_crawl(4, state, frontier=frontier, runs=2, stop_after_known=1))
+
+    docs = [d for _, page_docs in pages for d in page_docs]
+    assert len(docs) == 2 * DETAILS_PER_PAGE
+    # Second run stops at page 1 without touching any detail page.
+    assert state["detail_requests"] == 2 * DETAILS_PER_PAGE
+    assert len(frontier.rows) == 2 * DETAILS_PER_PAGE
+
+
+def test_due_urls_are_refetched_conditionally():
+    state = {"in_flight": 0, "max_in_flight": 0}
+    frontier = _MemoryFrontier()
+
+    def expire(run):
+        if run == 1:
+            for row in frontier.rows.values():
+                row["next_fetch_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    pages, _ = asyncio.run(_crawl(4, state, frontier=frontier, runs=2, stop_after_known=1, before_run=expire))
+
+    docs = [d for _, page_docs in pages for d in page_docs]
+    assert len(docs) == 2 * DETAILS_PER_PAGE
+    assert state["not_modified"] >= DETAILS_PER_PAGE
+    assert all(r["recrawl_interval_s"] == 2 * DEFAULT_INTERVAL for r in frontier.rows.values() if r.get("status") == 304)
+
+
+def test_unconfirmed_docs_are_not_recorded_in_frontier():
+    state = {"in_flight": 0, "max_in_flight": 0}
+    frontier = _MemoryFrontier()
+    # Nothing confirmed (every save failed): the frontier must not learn the
+    # new content hashes, so the next run fetches the same docs again.
+    pages, _ = asyncio.run(_crawl(4, state, frontier=frontier, runs=2, stop_after_known=1, confirm=False))
+
+    docs = [d for _, page_docs in pages for d in page_docs]
+    assert len(docs) == 2 * 2 * DETAILS_PER_PAGE
+    assert frontier.rows == {}
+
+
+def test_changed_content_on_recrawl_is_marked_for_update():
+    state = {"in_flight": 0, "max_in_flight": 0}
+    frontier = _MemoryFrontier()
+
+    def expire_and_edit(run):
+        if run == 1:
+            state["revision"] = 1
+            for row in frontier.rows.values():
+                row["next_fetch_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    pages, _ = asyncio.run(_crawl(4, state, frontier=frontier, runs=2, stop_after_known=1, before_run=expire_and_edit))
+
+    docs = [d for _, page_docs in pages for d in page_docs]
+    first, changed = docs[:2 * DETAILS_PER_PAGE], docs[2 * DETAILS_PER_PAGE:]
+    assert not any("replaces_hash" in d for d in first)
+    assert len(changed) == 2 * DETAILS_PER_PAGE
+    old = {d["source_url"]: d["hash"] for d in first}
+    assert all(d["replaces_hash"] == old[d["source_url"]] != d["hash"] for d in changed)
+    assert {r["content_hash"] for r in frontier.rows.values()} == {d["hash"] for d in changed}
+
+
+def test_next_interval_adapts_to_change_frequency():
+    assert next_interval(None, True) == DEFAULT_INTERVAL
+    assert next_interval(DEFAULT_INTERVAL, False) == 2 * DEFAULT_INTERVAL
+    assert next_interval(DEFAULT_INTERVAL, True) == DEFAULT_INTERVAL // 2
+    assert next_interval(MIN_INTERVAL, True) == MIN_INTERVAL
+    assert next_interval(MAX_INTERVAL, False) == MAX_INTERVAL
@@ -0,0 +1,68 @@
+"""Tests for the pure helpers of scripts/backfill_fingerprints.py (no DB)."""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import pathlib
+import sys
+
+BACKEND = pathlib.Path(__file__).resolve().parent.parent
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+from utils.fingerprint import NUM_BANDS, band_buckets, simhash  # noqa: E402
+
+_spec = importlib.util.spec_from_file_location("backfill_fingerprints", BACKEND / "scripts" / "backfill_fingerprints.py")
+backfill = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(backfill)
+
+
+def _text(i: int) -> str:
+    return f"KARAR {i} GEREKÇE " + ("Başvurucunun iddiası incelenmiştir. " * 20)
+
+
+def test_build_write_args_only_changed_rows_with_their_bands():
+    fps = [simhash(_text(i)) for i in range(4)]
+    rows = [
+        {"id": "a", "fingerprint": None},        # missing → written
+        {"id": "b", "fingerprint": fps[1]},      # unchanged → skipped
+        {"id": "c", "fingerprint": "0" * 16},    # stale → written
+        {"id": "d", "fingerprint": fps[3]},      # unchanged → skipped
+    ]
+    ids, out_fps, band_ids, bands, buckets = backfill.build_write_args(rows, fps)
+
+    assert ids == ["a", "c"]
+    assert out_fps == [fps[0], fps[2]]
+    assert band_ids == ["a"] * NUM_BANDS + ["c"] * NUM_BANDS
+    assert bands == list(range(NUM_BANDS)) * 2
+    assert buckets == band_buckets(fps[0]) + band_buckets(fps[2])
+
+
+def test_build_write_args_nothing_to_write_when_unchanged():
+    fps = [simhash(_text(i)) for i in range(3)]
+    rows = [{"id": str(i), "fingerprint": fp} for i, fp in enumerate(fps)]
+    assert backfill.build_write_args(rows, fps) == ([], [], [], [], [])
+
+
+def test_load_state_resumes_refresh_checkpoint_only(tmp_path):
+    path = tmp_path / "state.json"
+    saved = {"mode": "refresh", "last_id": "7f000000-0000-0000-0000-000000000000",
+             "scanned": 10, "written": 3, "unchanged": 7}
+    backfill.save_state(path, saved)
+
+    assert backfill.load_state(path, refresh=True, reset=False) == saved
+    # --reset and the NULL-fingerprint mode always start from the beginning
+    assert backfill.load_state(path, refresh=True, reset=True)["last_id"] == backfill.MIN_UUID
+    missing = backfill.load_state(path, refresh=False, reset=False)
+    assert missing["mode"] == "missing" and missing["last_id"] == backfill.MIN_UUID
+
+
+def test_load_state_ignores_mismatched_or_corrupt_checkpoint(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text(json.dumps({"mode": "missing", "last_id": "ff", "scanned": 1, "written": 1, "unchanged": 0}))
+    assert backfill.load_state(path, refresh=True, reset=False)["last_id"] == backfill.MIN_UUID
+
+    path.write_text("{not json")
+    state = backfill.load_state(path, refresh=True, reset=False)
+    assert state == {"mode": "refresh", "last_id": backfill.MIN_UUID, "scanned": 0, "written": 0, "unchanged": 0}
@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import stores.pg_chats_store as chats
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self._result = []
+
+    def execute(self, sql, params=None):
+        self.queries.append((" ".join(sql.split()), params))
+        if "FROM assistant_chats" in sql and sql.lstrip().startswith("SELECT"):
+            user_id = params[0]
+            rows = [r for r in self.rows if r["user_id"] == user_id]
+            rows.sort(key=lambda r: (r["updated_at"], r["id"]), reverse=True)
+            if "(updated_at, id) <" in sql:
+                key = (params[1], params[2])
+                rows = [r for r in rows if (r["updated_at"], r["id"]) < key]
+            self._result = [dict(r) for r in rows[: params[-1]]]
+
+    def fetchall(self):
+        return self._result
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        {"id": i, "user_id": "u1", "name": f"Sohbet {i}", "message_count": i,
+         "created_at": base, "updated_at": base + timedelta(minutes=i // 2)}
+        for i in range(1, 8)
+    ]
+    cur = _Cursor(rows)
+
+    @contextmanager
+    def fake_cursor(write=True):
+        yield cur
+
+    monkeypatch.setattr(chats, "get_db_cursor", fake_cursor)
+    return cur
+
+
+def test_list_chats_is_metadata_only_with_keyset_pages(fake_db):
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = chats.list_chats("u1", limit=3, cursor=cursor)
+        seen += [c["id"] for c in page]
+        if cursor is None:
+            break
+
+    # updated_at eşit olan sohbetlerde id ile kırılır; tekrar/atlama yok
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+    assert all("messages" not in c for c in page)
+    assert page[-1]["messageCount"] == 1
+    for sql, _ in fake_db.queries:
+        assert "messages" not in sql and "ORDER BY updated_at DESC, id DESC" in sql
+
+
+def test_list_chats_rejects_garbage_cursor(fake_db):
+    with pytest.raises(ValueError):
+        chats.list_chats("u1", cursor="not-a-cursor")
+
+
+class _AppendCursor:
+    def __init__(self, message_count):
+        self.message_count = message_count
+        self.queries = []
+        self.inserted = []
+        self._row = None
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.queries.append((sql, params))
+        self._row = None
+        if sql.startswith("SELECT message_count"):
+            self._row = {"message_count": self.message_count, "messages": [], "messages_enc": None}
+
+    def fetchone(self):
+        return self._row
+
+
+def test_append_messages_writes_only_the_new_turn(monkeypatch):
+    import psycopg2.extras
+    from cryptography.fernet import Fernet
+
+    key = Fernet.generate_key()
+    monkeypatch.setenv("CHAT_ENCRYPTION_KEY", key.decode())
+    cur = _AppendCursor(message_count=500)
+
+    @contextmanager
+    def fake_cursor(write=True):
+        yield cur
+
+    def fake_execute_values(c, sql, values, page_size=100):
+        c.inserted.extend(values)
+
+    monkeypatch.setattr(chats, "get_db_cursor", fake_cursor)
+    monkeypatch.setattr(psycopg2.extras, "execute_values", fake_execute_values)
+
+    turn = [{"sender": "user", "text": "Merhaba"}, {"sender": "assistant", "text": "Selam"}]
+    assert chats.append_messages("u1", 9, turn) == 502
+
+    # Uzun sohbette bile yalnızca turun iki satırı yazılır; blob yeniden yazılmaz
+    assert [(c, s) for c, s, _, _ in cur.inserted] == [(9, 500), (9, 501)]
+    assert all(enc for *_, enc in cur.inserted)
+    assert chats._unpack_message(Fernet(key), cur.inserted[1][2], True) == turn[1]
+    assert not any("messages_enc =" in sql or "messages =" in sql for sql, _ in cur.queries)
+    update = next(p for sql, p in cur.queries if sql.startswith("UPDATE assistant_chats"))
+    assert update[0] == 502
+
+
+def test_import_runs_no_ddl(monkeypatch):
+    import importlib
+
+    import db
+
+    calls = []
+
+    @contextmanager
+    def tracking_cursor(write=True):
+        calls.append(write)
+        yield _Cursor([])
+
+    monkeypatch.setattr(db, "get_db_cursor", tracking_cursor)
+    try:
+        # DDL startup'taki ensure_schema'da; import DB'ye dokunmamalı
+        importlib.reload(chats)
+        assert calls == []
+    finally:
+        monkeypatch.undo()
+        importlib.reload(chats)
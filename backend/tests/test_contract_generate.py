@@ -46,3 +46,74 @@ def test_contract_templates_remote_skipped_in_test_env(monkeypatch):
     assert res.status_code == 200
     items = res.json()
     assert isinstance(items, list)
+
+
+def _catalog_app(monkeypatch, rows):
+    calls = []
+
+    @contextmanager
+    def _cursor(*a, **kw):
+        cur = MagicMock()
+        cur.execute.side_effect = lambda sql, params=None: calls.append(sql.split()[0])
+        cur.fetchall.side_effect = lambda: [dict(r) for r in rows]
+        cur.fetchone.return_value = {"id": 99}
+        yield cur
+
+    monkeypatch.setenv("ENVIRONMENT", "test")
+    monkeypatch.setenv("TEST_USE_REMOTE_DB", "true")
+    monkeypatch.setattr(contract_routes, "get_db_cursor", _cursor)
+    monkeypatch.setattr(contract_routes, "_catalog", contract_routes._TemplateCatalog())
+    app = FastAPI()
+    app.include_router(contract_routes.router)
+    app.dependency_overrides[contract_routes.require_admin] = lambda: {"admin_id": "a1"}
+    return TestClient(app, base_url="https://testserver"), calls
+
+
+def test_contract_templates_catalog_cached_with_etag(monkeypatch):
+    rows = [{"id": 7, "title": "Kira", "category": "Kira", "content": "{{ kiraci }} {{ bedel }}", "description": ""}]
+    c, calls = _catalog_app(monkeypatch, rows)
+
+    first = c.get("/api/contracts/templates?include_seed=false")
+    assert first.status_code == 200
+    assert [f["key"] for f in first.json()[0]["fields"]] == ["kiraci", "bedel"]
+    etag = first.headers["etag"]
+
+    again = c.get("/api/contracts/templates?include_seed=false", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert calls == ["SELECT"]  # DB tek kez okundu
+
+    rows.append({"id": 8, "title": "NDA", "category": "Ticari", "content": "{{ taraf }}", "description": ""})
+    created = c.post("/api/contracts/templates", json={"title": "NDA", "category": "Ticari", "content": "{{ taraf }}"})
+    assert created.status_code == 200
+
+    fresh = c.get("/api/contracts/templates?include_seed=false", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert [t["id"] for t in fresh.json()] == ["7", "8"]
+
+
+def test_contract_templates_remote_refresh_does_not_block(monkeypatch):
+    import threading
+
+    c, _ = _catalog_app(monkeypatch, [])
+    monkeypatch.setenv("ENVIRONMENT", "production")
+    gate = threading.Event()
+    done = threading.Event()
+
+    def _slow_fetch():
+        gate.wait(5)
+        done.set()
+        return [contract_routes._with_fields({"id": "r1", "title": "Remote", "category": "X", "content": "{{ a }}"})]
+
+    monkeypatch.setattr(contract_routes, "_fetch_remote_templates", _slow_fetch)
+
+    res = c.get("/api/contracts/templates?include_seed=false&include_remote=true")
+    assert res.status_code == 200 and res.json() == []  # yenileme arka planda sürüyor
+    gate.set()
+    assert done.wait(5)
+    for _ in range(50):
+        res = c.get("/api/contracts/templates?include_seed=false&include_remote=true")
+        if res.json():
+            break
+        threading.Event().wait(0.02)
+    assert [t["id"] for t in res.json()] == ["r1"]
@@ -0,0 +1,77 @@
+"""Tests for the vectorized SimHash and its LSH banding helpers."""
+
+from __future__ import annotations
+
+import pathlib
+import random
+import sys
+
+BACKEND = pathlib.Path(__file__).resolve().parent.parent
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+from utils.fingerprint import (  # noqa: E402
+    MAX_DISTANCE,
+    NUM_BANDS,
+    band_buckets,
+    hamming_distance,
+    nearest,
+    simhash,
+    simhash_many,
+)
+
+_WORDS = "anayasa mahkemesi başvuru hak ihlal karar madde kanun davacı davalı hüküm temyiz".split()
+
+
+def _doc(seed: int, n: int = 400) -> str:
+    rnd = random.Random(seed)
+    return " ".join(rnd.choice(_WORDS) + str(rnd.randint(0, 300)) for _ in range(n))
+
+
+def test_simhash_is_deterministic_hex():
+    text = _doc(1)
+    fp = simhash(text)
+    assert fp == simhash(text)
+    assert int(fp, 16) < 2**64
+    assert simhash("") == "0"
+
+
+def test_simhash_case_insensitive():
+    assert simhash("Anayasa Mahkemesi KARAR") == simhash("anayasa mahkemesi karar")
+
+
+def test_near_duplicate_is_close_and_unrelated_is_far():
+    base = _doc(2)
+    edited = base + " ek açıklama"
+    other = _doc(3)
+    assert hamming_distance(simhash(base), simhash(edited)) <= MAX_DISTANCE
+    assert hamming_distance(simhash(base), simhash(other)) > MAX_DISTANCE
+
+
+def test_simhash_many_matches_single():
+    docs = [_doc(i, 50) for i in range(5)]
+    assert simhash_many(docs) == [simhash(d) for d in docs]
+
+
+def test_band_buckets_cover_all_bits():
+    fp = "fedcba9876543210"
+    buckets = band_buckets(fp)
+    assert len(buckets) == NUM_BANDS
+    assert buckets == [0x3210, 0x7654, 0xBA98, 0xFEDC]
+
+
+def test_bands_share_bucket_within_max_distance():
+    rnd = random.Random(7)
+    for _ in range(200):
+        a = rnd.getrandbits(64)
+        b = a
+        for bit in rnd.sample(range(64), MAX_DISTANCE):
+            b ^= 1 << bit
+        ba, bb = band_buckets(format(a, "x")), band_buckets(format(b, "x"))
+        assert any(x == y for x, y in zip(ba, bb))
+
+
+def test_nearest_filters_by_distance():
+    fp = "ff"
+    assert nearest(fp, [None, "0", "fe"]) == "fe"
+    assert nearest(fp, ["0"]) is None
@@ -85,10 +85,7 @@ def clean_data():
 @pytest.fixture(autouse=True)
 def bypass_csrf():
     # Bypass CSRF for all tests
-    async def mock_dispatch(self, request, call_next):
-        return await call_next(request)
-        
-    with patch("middleware.csrf.CSRFProtectionMiddleware.dispatch", side_effect=mock_dispatch, autospec=True):
+    with patch("middleware.csrf.CSRFProtectionMiddleware._should_skip", return_value=True):
         yield
 
 @pytest.fixture(autouse=True)
@@ -0,0 +1,47 @@
+import json
+import logging
+import queue
+
+from middleware.logging import JsonFormatter, _DroppingQueueHandler
+
+
+def _record(created, **extra):
+    record = logging.LogRecord("miron_api", logging.INFO, __file__, 1, "Response Sent", None, None)
+    record.created = created
+    record.msecs = (created - int(created)) * 1000
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_matches_stdlib_timestamp_and_skips_unset_fields():
+    fmt = JsonFormatter()
+    stdlib = logging.Formatter()
+    for created in (1_800_000_000.123, 1_800_000_000.987, 1_800_000_001.004):
+        r = _record(created, request_id="abc", status_code=401, duration=0.25, ua="x")
+        row = json.loads(fmt.format(r))
+        # Saniye önbelleği log_index'in karşılaştırdığı biçimi değiştirmemeli
+        assert row["timestamp"] == stdlib.formatTime(r)
+        assert row == {
+            "timestamp": row["timestamp"], "level": "INFO", "message": "Response Sent",
+            "logger": "miron_api", "request_id": "abc", "status_code": 401, "duration": 0.25,
+        }
+
+
+def test_queue_handler_drops_instead_of_blocking_when_full():
+    q = queue.Queue(maxsize=2)
+    handler = _DroppingQueueHandler(q)
+    before = _DroppingQueueHandler.dropped
+    for i in range(5):
+        handler.handle(_record(1_800_000_000.0 + i))
+    assert q.qsize() == 2
+    assert _DroppingQueueHandler.dropped - before == 3
+
+
+def test_queued_record_message_is_not_prefixed():
+    from middleware.logging import queue_handler
+
+    # Kuyruğa giren kayıt prepare() ile biçimlenir; JSON "message" alanı
+    # basicConfig'in "LEVEL:name:" önekini taşımamalı
+    record = logging.LogRecord("miron_db", logging.WARNING, __file__, 1, "pool %s", ("ready",), None)
+    row = json.loads(JsonFormatter().format(queue_handler.prepare(record)))
+    assert row["message"] == "pool ready"
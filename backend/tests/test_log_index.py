@@ -0,0 +1,91 @@
+"""Tests for the reverse tail reader and the sidecar access-log index."""
+
+from __future__ import annotations
+
+import json
+import logging
+import pathlib
+import sys
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+BACKEND = pathlib.Path(__file__).resolve().parent.parent
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+from utils.log_index import LogFilter, LogIndex, format_log_time, tail_lines  # noqa: E402
+
+
+def _row(i: int, level: str = "INFO", path: str = "/api/x") -> str:
+    ts = f"2026-01-01 10:{i // 60:02d}:{i % 60:02d},000"
+    return json.dumps({"timestamp": ts, "level": level, "path": path, "request_id": f"r{i}"}) + "\n"
+
+
+def test_tail_lines_matches_readlines(tmp_path):
+    log = tmp_path / "a.log"
+    log.write_text("".join(f"line {i}\n" for i in range(1000)), encoding="utf-8")
+    full = log.read_text(encoding="utf-8").splitlines(keepends=True)
+    for n in (1, 7, 200, 1000, 5000):
+        assert tail_lines(log, n, block_size=64) == full[-n:]
+
+    log.write_text("a\nb\nno-newline", encoding="utf-8")
+    assert tail_lines(log, 2, block_size=3) == ["b\n", "no-newline"]
+    log.write_text("", encoding="utf-8")
+    assert tail_lines(log, 5) == []
+
+
+def test_index_is_incremental_and_filters(tmp_path):
+    log = tmp_path / "access.log"
+    with log.open("w", encoding="utf-8") as f:
+        for i in range(300):
+            f.write(_row(i, level="ERROR" if i % 50 == 0 else "INFO", path="/api/admin" if i % 3 == 0 else "/api/x"))
+
+    idx = LogIndex(log, backups=2, stride=512)
+    assert [r["request_id"] for r in idx.query(LogFilter(level="error"), limit=10)] == [
+        f"r{i}" for i in (250, 200, 150, 100, 50, 0)
+    ]
+    assert idx.query(LogFilter(request_id="r42")) == [json.loads(_row(42, path="/api/admin"))]
+
+    since = format_log_time(datetime(2026, 1, 1, 10, 4, 50))
+    until = format_log_time(datetime(2026, 1, 1, 10, 4, 55))
+    rows = idx.query(LogFilter(path="/api/admin", since=since, until=until))
+    assert [r["request_id"] for r in rows] == ["r294", "r291"]
+
+    # Appending only indexes the new tail; the sidecar keeps the old blocks.
+    before = json.loads(idx.index_path.read_text())["files"]
+    (key, entry), = before.items()
+    with log.open("a", encoding="utf-8") as f:
+        f.write(_row(300, level="CRITICAL"))
+    idx.query(LogFilter(level="CRITICAL"))
+    after = json.loads(idx.index_path.read_text())["files"]
+    assert after[key]["blocks"][: len(entry["blocks"]) - 1] == entry["blocks"][:-1]
+    assert after[key]["size"] == log.stat().st_size
+    assert idx.query(LogFilter(level="CRITICAL"))[0]["request_id"] == "r300"
+
+
+def test_index_follows_rotation(tmp_path):
+    log = tmp_path / "access.log"
+    handler = RotatingFileHandler(str(log), maxBytes=4000, backupCount=3)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    lg = logging.getLogger("test_log_index_rotation")
+    lg.propagate = False
+    lg.setLevel(logging.INFO)
+    lg.addHandler(handler)
+    try:
+        idx = LogIndex(log, backups=3, stride=1024)
+        for i in range(60):
+            lg.info(_row(i).rstrip("\n"))
+        idx.refresh()
+        for i in range(60, 120):
+            lg.info(_row(i).rstrip("\n"))
+        rows = idx.query(LogFilter(), limit=1000)
+    finally:
+        lg.removeHandler(handler)
+        handler.close()
+
+    ids = [int(r["request_id"][1:]) for r in rows]
+    assert ids == sorted(ids, reverse=True)
+    assert ids[0] == 119 and len(ids) == len(set(ids))
+    on_disk = sum(len(p.read_text().splitlines()) for p in idx.files())
+    assert len(ids) == on_disk
+    assert len(idx.tail(on_disk + 10)) == on_disk
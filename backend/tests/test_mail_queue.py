@@ -0,0 +1,160 @@
+import socketserver
+import threading
+
+import pytest
+
+import services.notification_delivery as delivery
+from services.mail_queue import MailQueue
+
+
+class _SMTPStub(socketserver.ThreadingTCPServer):
+    """Minimal SMTP sunucusu: bağlantı ve mesaj sayar."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode())
+        self.wfile.flush()
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply("220 stub ESMTP")
+        rcpt = []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            cmd = raw.decode("utf-8", "replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250 stub")
+            elif verb == "MAIL":
+                rcpt = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                rcpt.append(cmd.split(":", 1)[1].strip(" <>"))
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with server.lock:
+                    server.messages.extend(rcpt)
+                self._reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Not implemented")
+
+
+@pytest.fixture
+def smtp_stub(monkeypatch):
+    server = _SMTPStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.delenv("RESEND_API_KEY", raising=False)
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(server.server_address[1]))
+    monkeypatch.setenv("SMTP_STARTTLS", "false")
+    monkeypatch.delenv("SMTP_USER", raising=False)
+    monkeypatch.delenv("SMTP_PASSWORD", raising=False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_workers_reuse_smtp_sessions(smtp_stub):
+    q = MailQueue(maxsize=500, workers=3, batch_size=20)
+    for i in range(200):
+        assert q.enqueue(f"user{i}@example.com", f"Konu {i}", "<p>merhaba</p>")
+    assert q.join(timeout=30)
+    q.close()
+
+    assert q.stats["sent"] == 200
+    assert q.stats["failed"] == 0
+    assert sorted(smtp_stub.messages) == sorted(f"user{i}@example.com" for i in range(200))
+    # Her worker tek bir oturum açar; mesaj başına bağlantı yok.
+    assert smtp_stub.connections <= 3
+
+
+def test_reconnects_after_server_drops_session(smtp_stub):
+    assert delivery.send_email("a@example.com", "Konu", "<p>x</p>")
+    # Kopmuş oturumu simüle et: sendmail SMTPServerDisconnected fırlatır
+    delivery._smtp_local.conn.close()
+    assert delivery.send_email("b@example.com", "Konu", "<p>y</p>")
+    delivery.close_smtp_connection()
+
+    assert smtp_stub.messages == ["a@example.com", "b@example.com"]
+    assert smtp_stub.connections == 2
+
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch, tmp_path):
+    q = MailQueue(maxsize=2, workers=1, spool_dir=str(tmp_path))
+    # Worker'ları başlatmadan doldur: kuyruk tüketilmez
+    monkeypatch.setattr(q, "_ensure_started", lambda: None)
+
+    assert q.enqueue("a@example.com", "s", "h")
+    assert q.enqueue("b@example.com", "s", "h")
+    assert not q.enqueue("c@example.com", "s", "h")
+    assert q.stats == {"enqueued": 2, "sent": 0, "failed": 0, "dropped": 1, "spooled": 0}
+    assert q.depth() == 2
+
+
+def test_bulk_fanout_does_not_take_interactive_slots(monkeypatch, tmp_path):
+    q = MailQueue(maxsize=2, workers=1, spool_dir=str(tmp_path))
+    monkeypatch.setattr(q, "_ensure_started", lambda: None)
+
+    assert q.enqueue_bulk(_bulk(500)) == 500
+    # OTP / şifre sıfırlama gibi etkileşimli e-postalar yine yer bulur
+    assert q.enqueue("otp@example.com", "Kod", "<p>123456</p>")
+    assert q.stats["dropped"] == 0
+
+
+def test_bulk_messages_are_sent_by_bulk_workers(monkeypatch, tmp_path):
+    sent = []
+    monkeypatch.setattr(delivery, "send_email_batch", lambda batch: [sent.append(m[0]) or True for m in batch])
+    q = MailQueue(maxsize=5, workers=2, batch_size=3, spool_dir=str(tmp_path))
+
+    messages = _bulk(100)
+    assert q.enqueue_bulk(messages) == 100
+    assert q.enqueue("otp@example.com", "Kod", "<p>123456</p>")
+    assert q.join(timeout=10)
+    q.close()
+    assert sorted(sent) == sorted([m[0] for m in messages] + ["otp@example.com"])
+    assert q.stats["sent"] == 101 and q.stats["dropped"] == 0
+
+
+def test_unsent_bulk_is_spooled_on_close_and_requeued_on_start(monkeypatch, tmp_path):
+    q = MailQueue(maxsize=5, workers=1, spool_dir=str(tmp_path))
+    monkeypatch.setattr(q, "_ensure_started", lambda: None)
+    q.enqueue_bulk(_bulk(7))
+    q.close(timeout=0.05)
+    assert q.stats["spooled"] == 7
+    assert len(list(tmp_path.glob("bulk-*.jsonl"))) == 1
+
+    sent = []
+    monkeypatch.setattr(delivery, "send_email_batch", lambda batch: [sent.append(m[0]) or True for m in batch])
+    q2 = MailQueue(maxsize=5, workers=1, spool_dir=str(tmp_path))
+    assert q2.enqueue("otp@example.com", "Kod", "<p>1</p>")
+    assert q2.join(timeout=10)
+    q2.close()
+    assert sorted(sent) == sorted([m[0] for m in _bulk(7)] + ["otp@example.com"])
+    assert list(tmp_path.iterdir()) == []
+
+
+def _bulk(n):
+    return [(f"user{i}@example.com", "Güncelleme", "metin", "metin") for i in range(n)]
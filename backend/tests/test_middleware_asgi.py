@@ -0,0 +1,86 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from config import settings
+from middleware.concurrency import TimeoutMiddleware
+from middleware.csrf import CSRFProtectionMiddleware
+from middleware.logging import LoggingMiddleware, SecurityHeadersMiddleware
+
+
+async def _slow(request):
+    await asyncio.sleep(0.5)
+    return PlainTextResponse("late")
+
+
+async def _stream(request):
+    async def body():
+        for i in range(3):
+            yield f"data: {i}\n\n"
+            await asyncio.sleep(0.1)
+
+    return StreamingResponse(body(), media_type="text/event-stream")
+
+
+async def _echo_state(request):
+    return JSONResponse({"request_id": request.state.request_id})
+
+
+async def _post(request):
+    return PlainTextResponse("ok")
+
+
+def _client(*middleware):
+    app = Starlette(routes=[
+        Route("/slow", _slow),
+        Route("/stream", _stream),
+        Route("/state", _echo_state),
+        Route("/api/things", _post, methods=["POST"]),
+    ])
+    for cls in middleware:
+        app.add_middleware(cls)
+    return TestClient(app)
+
+
+def test_timeout_applies_until_response_start_only(monkeypatch):
+    monkeypatch.setattr(settings, "GLOBAL_REQUEST_TIMEOUT", 0.15)
+    monkeypatch.setattr(settings, "LONG_REQUEST_PATH_PREFIXES", ())
+    client = _client(TimeoutMiddleware)
+
+    r = client.get("/slow")
+    assert r.status_code == 504 and r.text == "Request Timeout"
+
+    # Başlıklar gönderildikten sonra süre sınırı kalkar; SSE akışı kesilmez
+    r = client.get("/stream")
+    assert r.status_code == 200
+    assert r.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+
+
+def test_header_layers_decorate_streaming_response():
+    client = _client(SecurityHeadersMiddleware, LoggingMiddleware)
+
+    r = client.get("/stream")
+    assert r.text.count("data:") == 3
+    assert r.headers["x-content-type-options"] == "nosniff"
+    assert r.headers["strict-transport-security"].startswith("max-age=")
+    assert r.headers["x-request-id"]
+
+    r = client.get("/state")
+    assert r.json()["request_id"] == r.headers["x-request-id"]
+
+
+def test_csrf_validates_before_handler_and_bootstraps_cookie():
+    client = _client(CSRFProtectionMiddleware)
+
+    r = client.get("/missing")  # 404, ama güvenli metod: çerez yine verilir
+    assert "csrf_token" in r.cookies
+
+    r = client.post("/api/things")
+    assert r.status_code == 403
+
+    token = client.cookies["csrf_token"]
+    r = client.post("/api/things", headers={"X-CSRF-Token": token})
+    assert r.status_code == 200 and r.text == "ok"
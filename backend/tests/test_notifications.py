@@ -0,0 +1,204 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import db
+import routes.notification_routes as notification_routes
+import services.reminder_scheduler as scheduler
+from services import notification_state
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    notification_state.reset()
+    yield
+    notification_state.reset()
+
+
+def _client(monkeypatch, rows, broadcasts=None):
+    """notifications/duyuru tablolarını taklit eden sahte cursor ile test istemcisi."""
+    calls = []
+    broadcasts = broadcasts if broadcasts is not None else []
+    reads = set()
+
+    class _Cur:
+        def __init__(self, write):
+            self.write = write
+            self.result = []
+
+        def execute(self, sql, params=None):
+            sql = " ".join(sql.split())
+            calls.append((self.write, sql))
+            if sql.startswith("SELECT id, user_id::text"):
+                self.result = [dict(r) for r in rows]
+            elif sql.startswith("SELECT b.id"):
+                self.result = [dict(b, is_read=b["id"] in reads) for b in broadcasts]
+            elif sql.startswith("SELECT (SELECT COUNT(*)"):
+                unread = sum(1 for r in rows if not r.get("is_read"))
+                unread += sum(1 for b in broadcasts if b["id"] not in reads)
+                self.result = [{"c": unread}]
+            elif sql.startswith("INSERT INTO notification_broadcasts"):
+                bid = len(broadcasts) + 1
+                broadcasts.insert(0, {"id": bid, "type": params[0], "title": params[1], "message": params[2],
+                                      "created_at": f"2030-01-01T00:00:{bid:02d}Z"})
+                self.result = [{"id": bid}]
+            elif sql.startswith("INSERT INTO notification_broadcast_reads"):
+                reads.add(params[1])
+            elif sql.startswith("SELECT COUNT(*) AS c FROM users"):
+                self.result = [{"c": 3}]
+            else:
+                self.result = []
+
+        def fetchall(self):
+            return list(self.result)
+
+        def fetchone(self):
+            return self.result[0] if self.result else None
+
+    @contextmanager
+    def fake_cursor(write=True):
+        yield _Cur(write)
+
+    monkeypatch.setattr(notification_routes, "get_db_cursor", fake_cursor)
+    app = FastAPI()
+    app.include_router(notification_routes.router)
+    app.dependency_overrides[notification_routes.get_current_user] = lambda: {"id": "u1"}
+    app.dependency_overrides[notification_routes.require_admin] = lambda: {"admin_id": "a1"}
+    return TestClient(app, base_url="https://testserver"), calls
+
+
+def _loads(calls):
+    return [sql for _, sql in calls if sql.startswith("SELECT id, user_id::text")]
+
+
+def test_list_is_read_only_and_served_from_stamp_cache(monkeypatch):
+    rows = [{"id": 1, "user_id": "u1", "type": "admin", "title": "A", "message": "m", "is_read": False}]
+    c, calls = _client(monkeypatch, rows)
+
+    assert c.get("/api/notifications").json() == rows
+    assert c.get("/api/notifications/").json() == rows
+    # Tek yükleme, salt okunur; hatırlatıcı fan-out'u yok
+    assert len(_loads(calls)) == 1
+    assert all(write is False and sql.startswith("SELECT") and "case_reminder_triggers" not in sql
+               for write, sql in calls)
+
+    rows.append({"id": 2, "user_id": "u1", "type": "admin", "title": "B", "message": "m", "is_read": False})
+    assert c.post("/api/notifications/send", json={"user_id": "u1", "type": "admin", "title": "B", "message": "m"}).status_code == 200
+    assert [r["id"] for r in c.get("/api/notifications").json()] == [1, 2]
+
+
+def test_stamp_cache_expires_without_shared_store(monkeypatch):
+    rows = []
+    c, calls = _client(monkeypatch, rows)
+    monkeypatch.setattr(notification_state, "LOCAL_CACHE_TTL_SECONDS", 0.0)
+
+    c.get("/api/notifications")
+    c.get("/api/notifications")
+    assert len(_loads(calls)) == 2
+
+
+def test_sweeper_bumps_stamp_for_in_app_recipients(monkeypatch):
+    now = datetime.now(timezone.utc)
+    claimed = [{
+        "trigger_id": "t1", "user_id": "u7", "channel": "in_app", "trigger_at": now, "attempts": 1,
+        "reminder_id": "r1", "title": "Duruşma", "details": None, "due_at": now, "court": None,
+        "case_number": None, "user_email": None, "first_name": None, "last_name": None,
+    }]
+    cursors = []
+
+    @contextmanager
+    def fake_cursor(write=True):
+        cur = MagicMock()
+        cur.fetchall.return_value = claimed if not cursors else []
+        cursors.append(cur)
+        yield cur
+
+    monkeypatch.setattr(db, "get_db_cursor", fake_cursor)
+    assert notification_state.stamp("u7") == 0
+    assert scheduler.dispatch_batch(now) == 1
+    assert notification_state.stamp("u7") == 1
+
+
+def test_list_etag_and_since_cursor(monkeypatch):
+    rows = [{"id": 3, "title": "C"}, {"id": 2, "title": "B"}, {"id": 1, "title": "A"}]
+    c, calls = _client(monkeypatch, rows)
+
+    first = c.get("/api/notifications")
+    etag = first.headers["etag"]
+    not_modified = c.get("/api/notifications", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    assert [r["id"] for r in c.get("/api/notifications?since=1").json()] == [3, 2]
+    assert c.get("/api/notifications?since=3").status_code == 204
+    assert len(_loads(calls)) == 1
+
+
+def test_long_poll_wakes_on_new_notification(monkeypatch):
+    import threading
+
+    rows = [{"id": 1, "title": "A"}]
+    c, calls = _client(monkeypatch, rows)
+    monkeypatch.setattr(notification_state, "WAIT_POLL_SECONDS", 0.02)
+
+    def _arrive():
+        rows.insert(0, {"id": 2, "title": "B"})
+        notification_state.bump(["u1"])
+
+    timer = threading.Timer(0.2, _arrive)
+    timer.start()
+    try:
+        res = c.get("/api/notifications?since=1&wait=5")
+    finally:
+        timer.cancel()
+    assert res.status_code == 200
+    assert [r["id"] for r in res.json()] == [2]
+    assert len(_loads(calls)) == 2
+
+    # Değişiklik yoksa süre dolunca gövdesiz döner
+    res = c.get("/api/notifications?since=2&wait=1")
+    assert res.status_code == 204
+
+
+def test_unread_count_cached_with_etag(monkeypatch):
+    rows = [{"id": i, "is_read": False} for i in range(4)]
+    c, calls = _client(monkeypatch, rows)
+
+    first = c.get("/api/notifications/unread-count")
+    assert first.json() == {"count": 4}
+    assert c.get("/api/notifications/unread-count", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    assert len(calls) == 1 and calls[0][0] is False
+
+    rows[0]["is_read"] = True
+    assert c.post("/api/notifications/0/read").status_code == 200
+    assert c.get("/api/notifications/unread-count", headers={"If-None-Match": first.headers["etag"]}).json() == {"count": 3}
+
+
+def test_broadcast_is_stored_once_and_merged_at_read(monkeypatch):
+    rows = [{"id": 5, "title": "Kişisel", "is_read": False, "created_at": "2029-12-31T00:00:00Z"}]
+    c, calls = _client(monkeypatch, rows)
+    first = c.get("/api/notifications")
+    cursor = first.headers["x-notification-cursor"]
+    assert cursor == "5:0"
+
+    sent = c.post("/api/notifications/broadcast", json={"title": "Bakım", "message": "Bu gece"})
+    assert sent.json()["status"] == "ok" and sent.json()["count"] == 3
+    inserts = [sql.split()[2] for _, sql in calls if sql.startswith("INSERT")]
+    assert inserts == ["notification_broadcasts"]  # kullanıcı başına satır yok
+
+    # Genel damga ilerledi: önbellek atlanır, duyuru listede ve sayımda görünür
+    fresh = c.get("/api/notifications", headers={"If-None-Match": first.headers["etag"]})
+    assert fresh.status_code == 200
+    assert [r["id"] for r in fresh.json()] == ["b1", 5]
+    assert c.get(f"/api/notifications?since={cursor}").json()[0]["title"] == "Bakım"
+    assert c.get(f"/api/notifications?since={fresh.headers['x-notification-cursor']}").status_code == 204
+    assert c.get("/api/notifications/unread-count").json() == {"count": 2}
+
+    assert c.post("/api/notifications/b1/read").status_code == 200
+    assert c.get("/api/notifications/unread-count").json() == {"count": 1}
+    assert c.get("/api/notifications").json()[0]["is_read"] is True
+    assert c.post("/api/notifications/x1/read").status_code == 400
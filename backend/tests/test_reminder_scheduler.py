@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import db
+import services.notification_delivery as delivery
+import services.reminder_scheduler as scheduler
+
+
+def _row(i, channel, attempts=1):
+    now = datetime.now(timezone.utc)
+    return {
+        "trigger_id": f"t{i}",
+        "user_id": f"u{i}",
+        "channel": channel,
+        "trigger_at": now - timedelta(seconds=5),
+        "attempts": attempts,
+        "reminder_id": f"r{i}",
+        "title": f"Duruşma {i}",
+        "details": None,
+        "due_at": now + timedelta(days=1),
+        "court": "İstanbul 1. Asliye",
+        "case_number": "2030/1",
+        "user_email": f"avukat{i}@example.com",
+        "first_name": "Ayşe",
+        "last_name": "Yılmaz",
+    }
+
+
+def _install_fake_db(monkeypatch, claimed_rows):
+    events = []
+    cursors = []
+
+    @contextmanager
+    def fake_cursor(write=True):
+        cur = MagicMock()
+        cur.fetchall.return_value = claimed_rows if not cursors else []
+        cursors.append(cur)
+        events.append("tx_open")
+        yield cur
+        events.append("tx_close")
+
+    monkeypatch.setattr(db, "get_db_cursor", fake_cursor)
+    return events, cursors
+
+
+def test_dispatch_sends_email_outside_transaction_and_bulk_inserts(monkeypatch):
+    rows = [_row(i, "email") for i in range(3)] + [_row(i, "in_app") for i in range(3, 8)]
+    events, cursors = _install_fake_db(monkeypatch, rows)
+
+    def fake_send(to, subject, html):
+        events.append("send")
+        return True
+
+    monkeypatch.setattr(delivery, "send_email", fake_send)
+
+    claimed = scheduler.dispatch_batch(datetime.now(timezone.utc))
+
+    assert claimed == 8
+    # claim tx closes before any network send; finalize tx opens after all sends
+    assert events == ["tx_open", "tx_close", "send", "send", "send", "tx_open", "tx_close"]
+    claim_sql = cursors[0].execute.call_args_list[0].args[0]
+    assert "FOR UPDATE OF t SKIP LOCKED" in claim_sql
+
+    finalize = [c.args for c in cursors[1].execute.call_args_list]
+    assert len(finalize) == 2  # one bulk INSERT + one bulk sent UPDATE
+    insert_sql, insert_params = finalize[0]
+    assert "unnest" in insert_sql
+    # Aynı sweep'te aynı (user, title) için iki tetik tek bildirim yazar
+    assert "DISTINCT ON (u.user_id, u.title)" in insert_sql
+    assert len(insert_params[0]) == 5
+    assert sorted(finalize[1][1][0]) == sorted(f"t{i}" for i in range(8))
+
+
+def test_failed_email_is_retried_then_dead_lettered(monkeypatch):
+    monkeypatch.setattr(scheduler, "EMAIL_SEND_RETRIES", 0)
+    rows = [_row(1, "email", attempts=1), _row(2, "email", attempts=scheduler.MAX_ATTEMPTS)]
+    _, cursors = _install_fake_db(monkeypatch, rows)
+    monkeypatch.setattr(delivery, "send_email", lambda *a, **k: False)
+    before = scheduler.dispatcher_stats()
+
+    scheduler.dispatch_batch(datetime.now(timezone.utc))
+
+    calls = [c.args for c in cursors[1].execute.call_args_list]
+    assert len(calls) == 1
+    sql, params = calls[0]
+    assert "dead_at" in sql
+    assert sorted(params[1]) == ["t1", "t2"]
+
+    after = scheduler.dispatcher_stats()
+    assert after["retried"] - before["retried"] == 1
+    assert after["dead"] - before["dead"] == 1
+
+
+def test_process_due_triggers_drains_full_batches(monkeypatch):
+    calls = []
+
+    def fake_dispatch(window, limit=scheduler.BATCH_SIZE):
+        calls.append(window)
+        return scheduler.BATCH_SIZE if len(calls) < 3 else 7
+
+    monkeypatch.setattr(scheduler, "dispatch_batch", fake_dispatch)
+    scheduler.process_due_triggers()
+    assert len(calls) == 3
@@ -1,30 +1,80 @@
 import hashlib
 import re
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+# 64-bit SimHash, split into 4 x 16-bit LSH bands.
+# Pigeonhole: two fingerprints within Hamming distance <= 3 must agree on at
+# least one band, so a band lookup never misses a near-duplicate at that radius.
+WIDTH = 64
+NUM_BANDS = 4
+BAND_BITS = WIDTH // NUM_BANDS
+MAX_DISTANCE = NUM_BANDS - 1
+
+_TOKEN_RE = re.compile(r"\w+")
+_BAND_MASK = (1 << BAND_BITS) - 1
+
+
+@lru_cache(maxsize=262144)
+def _token_hash(token: str) -> int:
+    # Legal vocabulary repeats heavily across decisions, so the cache turns most
+    # lookups into a dict hit instead of a digest.
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _simhash_int(text: str) -> int:
+    if not text:
+        return 0
+    counts = Counter(_TOKEN_RE.findall(text.lower()))
+    if not counts:
+        return 0
+
+    hashes = np.array(list(map(_token_hash, counts)), dtype="<u8")
+    weights = np.array(list(counts.values()), dtype=np.float64)
+
+    # (tokens x 64) bit matrix, bit i of each hash in column i. Every token
+    # votes +w on its set bits and -w on the rest: v = 2 * (w @ bits) - sum(w).
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    v = 2 * (weights @ bits) - weights.sum()
+
+    fingerprint = 0
+    for i in np.flatnonzero(v > 0):
+        fingerprint |= 1 << int(i)
+    return fingerprint
+
 
 def simhash(text: str) -> str:
+    """64-bit SimHash of ``text`` as a lowercase hex string (no ``0x``)."""
     if not text: return "0"
-    
-    # 64-bit SimHash
-    width = 64
-    v = [0] * width
-    
-    # Tokenize (simple word split)
-    tokens = re.findall(r'\w+', text.lower())
-    
-    for t in tokens:
-        # Hash token
-        h = int(hashlib.sha256(t.encode("utf-8")).hexdigest()[:16], 16)
-        
-        for i in range(width):
-            if h & (1 << i):
-                v[i] += 1
-            else:
-                v[i] -= 1
-                
-    # Build result
-    fingerprint = 0
-    for i in range(width):
-        if v[i] > 0:
-            fingerprint |= (1 << i)
-            
-    return hex(fingerprint)[2:]
+    return format(_simhash_int(text), "x")
+
+
+def simhash_many(texts: Iterable[str]) -> List[str]:
+    """Batch variant of :func:`simhash`; shares the token-hash cache across documents."""
+    return [simhash(t) for t in texts]
+
+
+def to_int(fingerprint: str) -> int:
+    return int(fingerprint, 16) if fingerprint else 0
+
+
+def hamming_distance(a: str, b: str) -> int:
+    return (to_int(a) ^ to_int(b)).bit_count()
+
+
+def band_buckets(fingerprint: str) -> List[int]:
+    """Per-band bucket keys, index i holds bits [16*i, 16*i+16)."""
+    value = to_int(fingerprint)
+    return [(value >> (band * BAND_BITS)) & _BAND_MASK for band in range(NUM_BANDS)]
+
+
+def nearest(fingerprint: str, candidates: Iterable[Optional[str]], max_distance: int = MAX_DISTANCE) -> Optional[str]:
+    """Returns the first candidate within ``max_distance`` bits, or None."""
+    value = to_int(fingerprint)
+    for cand in candidates:
+        if cand and (value ^ to_int(cand)).bit_count() <= max_distance:
+            return cand
+    return None
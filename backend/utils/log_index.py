@@ -0,0 +1,284 @@
+"""Reverse tail and indexed queries over the JSON access log.
+
+``middleware/logging.py`` writes one JSON object per line to a
+``RotatingFileHandler`` (``backend_access.log``, ``.1`` .. ``.N``). The admin
+panel used to ``readlines()`` the whole file on every refresh; this module
+keeps both paths proportional to what is actually returned:
+
+* ``tail_lines`` seeks backwards from EOF in fixed-size blocks.
+* ``LogIndex`` maintains a small sidecar offset table
+  (``backend_access.log.idx``): every file of the rotation set is cut into
+  ~64 KiB blocks of whole lines and each block records its byte range, first
+  and last timestamp and a bitmask of the levels it contains. Files are keyed
+  by inode plus a hash of their first bytes, so a rename by the rotating
+  handler keeps its entry and a truncated/reused file is re-indexed. Only the
+  unindexed tail of each file is read on refresh.
+
+Queries walk blocks newest-first, skip the ones whose time range or level
+mask cannot match, and stop as soon as ``limit`` rows are collected.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+__all__ = [
+    "ACCESS_LOG_PATH",
+    "ACCESS_LOG_BACKUPS",
+    "LogFilter",
+    "LogIndex",
+    "tail_lines",
+    "format_log_time",
+]
+
+ACCESS_LOG_PATH = Path(os.getenv("ACCESS_LOG_FILE") or "backend_access.log")
+ACCESS_LOG_BACKUPS = 5
+
+TAIL_BLOCK = 64 * 1024
+INDEX_STRIDE = 64 * 1024
+_HEAD_BYTES = 256
+_INDEX_VERSION = 1
+
+_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+_LEVEL_BITS = {name: 1 << i for i, name in enumerate(_LEVELS)}
+_OTHER_LEVEL = 1 << len(_LEVELS)
+
+
+def _level_bit(level: Optional[str]) -> int:
+    return _LEVEL_BITS.get((level or "").upper(), _OTHER_LEVEL)
+
+
+def format_log_time(dt: datetime) -> str:
+    """Render ``dt`` the way ``logging.Formatter.formatTime`` does (local time,
+    ``YYYY-mm-dd HH:MM:SS,mmm``) so bounds compare lexically with log rows."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%d %H:%M:%S") + f",{dt.microsecond // 1000:03d}"
+
+
+def tail_lines(path: Path, n: int, block_size: int = TAIL_BLOCK) -> List[str]:
+    """Last ``n`` lines of ``path`` (with their newlines, like ``readlines``),
+    reading backwards from EOF so cost is O(returned bytes)."""
+    if n <= 0:
+        return []
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        data = b""
+        # A trailing newline terminates the last line; it doesn't start a new one.
+        needed = n + 1 if end else n
+        while pos > 0 and data.count(b"\n") < needed:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.splitlines(keepends=True)
+    if pos > 0:
+        lines = lines[1:]  # first piece is a partial line
+    return [line.decode("utf-8", errors="replace") for line in lines[-n:]]
+
+
+@dataclass
+class LogFilter:
+    level: Optional[str] = None
+    path: Optional[str] = None          # prefix match
+    request_id: Optional[str] = None
+    since: Optional[str] = None         # format_log_time() strings, inclusive
+    until: Optional[str] = None
+
+    def block_may_match(self, block: List[Any]) -> bool:
+        _, _, ts_first, ts_last, mask = block
+        if self.level and not mask & _level_bit(self.level):
+            return False
+        if self.since and ts_last and ts_last < self.since:
+            return False
+        if self.until and ts_first and ts_first > self.until:
+            return False
+        return True
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        if self.level and str(row.get("level", "")).upper() != self.level.upper():
+            return False
+        if self.path and not str(row.get("path") or "").startswith(self.path):
+            return False
+        if self.request_id and row.get("request_id") != self.request_id:
+            return False
+        ts = row.get("timestamp") or ""
+        if self.since and ts < self.since:
+            return False
+        if self.until and ts > self.until:
+            return False
+        return True
+
+
+class LogIndex:
+    def __init__(
+        self,
+        log_path: Path = ACCESS_LOG_PATH,
+        backups: int = ACCESS_LOG_BACKUPS,
+        index_path: Optional[Path] = None,
+        stride: int = INDEX_STRIDE,
+    ):
+        self.log_path = Path(log_path)
+        self.backups = backups
+        self.index_path = Path(index_path) if index_path else self.log_path.with_name(self.log_path.name + ".idx")
+        self.stride = stride
+        self._lock = threading.Lock()
+
+    # -- rotation set -------------------------------------------------------
+
+    def files(self) -> List[Path]:
+        """Existing files of the rotation set, newest first."""
+        candidates = [self.log_path] + [
+            self.log_path.with_name(f"{self.log_path.name}.{i}") for i in range(1, self.backups + 1)
+        ]
+        return [p for p in candidates if p.exists()]
+
+    @staticmethod
+    def _head(path: Path) -> str:
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(_HEAD_BYTES), digest_size=8).hexdigest()
+
+    # -- sidecar ------------------------------------------------------------
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == _INDEX_VERSION and data.get("stride") == self.stride:
+                return data["files"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return {}
+
+    def _save(self, files: Dict[str, Any]) -> None:
+        tmp = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": _INDEX_VERSION, "stride": self.stride, "files": files}, f, separators=(",", ":"))
+        os.replace(tmp, self.index_path)
+
+    # -- indexing -----------------------------------------------------------
+
+    def _extend(self, path: Path, entry: Dict[str, Any], size: int) -> None:
+        blocks: List[List[Any]] = entry["blocks"]
+        offset = entry["size"]
+        # Reopen the last block if it is still below the stride.
+        if blocks and blocks[-1][1] - blocks[-1][0] < self.stride:
+            current = blocks.pop()
+        else:
+            current = [offset, offset, None, None, 0]
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written last line
+                offset += len(line)
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                if isinstance(row, dict):
+                    ts = row.get("timestamp")
+                    if ts:
+                        current[2] = current[2] or ts
+                        current[3] = ts
+                    current[4] |= _level_bit(row.get("level"))
+                current[1] = offset
+                if current[1] - current[0] >= self.stride:
+                    blocks.append(current)
+                    current = [offset, offset, None, None, 0]
+                if offset >= size:
+                    break
+        if current[1] > current[0]:
+            blocks.append(current)
+        entry["size"] = offset
+
+    def refresh(self) -> List[tuple[Path, Dict[str, Any]]]:
+        """Bring the sidecar up to date; returns ``(path, entry)`` newest first."""
+        with self._lock:
+            stored = self._load()
+            files: Dict[str, Any] = {}
+            ordered: List[tuple[Path, Dict[str, Any]]] = []
+            changed = False
+            for path in self.files():
+                try:
+                    st = path.stat()
+                    head = self._head(path)
+                except OSError:
+                    continue
+                key = str(st.st_ino)
+                entry = stored.get(key)
+                if entry is None or entry.get("head") != head or entry.get("size", 0) > st.st_size:
+                    entry = {"head": head, "size": 0, "blocks": []}
+                    changed = True
+                if entry["size"] < st.st_size:
+                    self._extend(path, entry, st.st_size)
+                    changed = True
+                files[key] = entry
+                ordered.append((path, entry))
+            if changed or set(files) != set(stored):
+                try:
+                    self._save(files)
+                except OSError:
+                    pass  # read-only deployments still get an in-memory index
+            return ordered
+
+    # -- reading ------------------------------------------------------------
+
+    def tail(self, n: int) -> List[str]:
+        """Last ``n`` lines across the rotation set (oldest first)."""
+        out: List[str] = []
+        for path in self.files():
+            try:
+                chunk = tail_lines(path, n - len(out))
+            except OSError:
+                continue
+            out = chunk + out
+            if len(out) >= n:
+                break
+        return out
+
+    @staticmethod
+    def _read_block(path: Path, start: int, end: int) -> Iterator[Dict[str, Any]]:
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        for line in reversed(data.splitlines()):
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(row, dict):
+                yield row
+
+    def query(self, flt: LogFilter, limit: int = 200) -> List[Dict[str, Any]]:
+        """Rows matching ``flt``, newest first, at most ``limit``."""
+        out: List[Dict[str, Any]] = []
+        if limit <= 0:
+            return out
+        for path, entry in self.refresh():
+            for block in reversed(entry["blocks"]):
+                # Files are chronological: once a block ends before `since`,
+                # everything older does too.
+                if flt.since and block[3] and block[3] < flt.since:
+                    return out
+                if not flt.block_may_match(block):
+                    continue
+                try:
+                    rows = list(self._read_block(path, block[0], block[1]))
+                except OSError:
+                    break  # rotated away mid-query
+                for row in rows:
+                    if flt.matches(row):
+                        out.append(row)
+                        if len(out) >= limit:
+                            return out
+        return out
@@ -70,7 +70,8 @@ export default function LibraAssistant({ caseText: caseTextProp = "" }) {
   // Load chats from backend
   useEffect(() => {
     if (!user?.id) return;
-    authFetch("/api/chats")
+    // Liste yalnızca metadata döner; mesajlar sohbet seçilince yüklenir
+    authFetch("/api/chats?limit=200")
       .then((r) => (r.ok ? r.json().catch(() => null) : null))
       .then((data) => {
         const loaded = Array.isArray(data?.chats) ? data.chats : [];
@@ -88,6 +89,22 @@ export default function LibraAssistant({ caseText: caseTextProp = "" }) {
     if (!chats.some((c) => c.id === currentChatId)) setCurrentChatId(chats[0].id);
   }, [chats, chatsLoaded]);
 
+  // Seçili sohbetin mesajları henüz yüklenmediyse getir
+  const loadingChatsRef = useRef(new Set());
+  useEffect(() => {
+    const chat = chats.find((c) => c.id === currentChatId);
+    if (!chat || Array.isArray(chat.messages) || loadingChatsRef.current.has(chat.id)) return;
+    loadingChatsRef.current.add(chat.id);
+    authFetch(`/api/chats/${chat.id}`)
+      .then((r) => (r.ok ? r.json().catch(() => null) : null))
+      .then((data) => {
+        const msgs = Array.isArray(data?.messages) ? data.messages : [];
+        setChats((prev) => prev.map((c) => (c.id === chat.id && !Array.isArray(c.messages) ? { ...c, messages: msgs } : c)));
+      })
+      .catch(() => {})
+      .finally(() => loadingChatsRef.current.delete(chat.id));
+  }, [chats, currentChatId]);
+
   const saveChat = useCallback((chat) => {
     authFetch("/api/chats", {
       method: "POST",
@@ -96,6 +113,15 @@ export default function LibraAssistant({ caseText: caseTextProp = "" }) {
     }).catch(() => {});
   }, []);
 
+  // Tur sonunda yalnızca yeni mesajları ekler; sohbetin tamamı yeniden yazılmaz
+  const appendMessages = useCallback((chatId, messages) => {
+    authFetch(`/api/chats/${chatId}/messages`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ messages }),
+    }).catch(() => {});
+  }, []);
+
   // ── UI state ─────────────────────────────────────────────────────────────────
   const [input, setInput] = useState("");
   const [streaming, setStreaming] = useState(false);
@@ -280,7 +306,7 @@ export default function LibraAssistant({ caseText: caseTextProp = "" }) {
   };
 
   const send = async (raw) => {
-    if (!current || streaming) return;
+    if (!current || streaming || !Array.isArray(current.messages)) return;
     const t = String(raw || "").trim();
     if (!t && !attachment) return;
     const uid = current.id;
@@ -369,12 +395,9 @@ export default function LibraAssistant({ caseText: caseTextProp = "" }) {
       } else { finalText = `Yanıt alınamadı: ${e?.message || "Bağlantı hatası"}`; }
     } finally { clearTimeout(abortTimer); }
 
-    setChats((prev) => {
-      const next = prev.map((c) => c.id === uid ? { ...c, messages: [...(c.messages || []), { sender: "assistant", text: finalText }] } : c);
-      const chat = next.find((c) => c.id === uid);
-      if (chat) saveChat(chat);
-      return next;
-    });
+    const assistantMsg = { sender: "assistant", text: finalText };
+    setChats((prev) => prev.map((c) => c.id === uid ? { ...c, messages: [...(c.messages || []), assistantMsg] } : c));
+    appendMessages(uid, [userMsg, assistantMsg]);
     setStreamText("");
     setStreaming(false);
     autoScrollRef.current = true;
@@ -17,6 +17,7 @@ import httpx
 from bs4 import BeautifulSoup
 
 from .base import BaseCollector, jitter
+from .store import CollectorStore
 
 # Bireysel Başvuru API
 BB_API = "https://kararlarbilgibankasi.anayasa.gov.tr/api"
@@ -156,10 +157,13 @@ class AnayasaCollector(BaseCollector):
                 await asyncio.sleep(2 ** attempt)
         return None
 
-    async def _collect_bb(self, client: httpx.AsyncClient, seen: set) -> AsyncIterator[Dict]:
+    async def _collect_bb(self, client: httpx.AsyncClient, seen: CollectorStore) -> AsyncIterator[Dict]:
         """Bireysel Başvuru kararları."""
         for year in range(self.start_year, self.end_year + 1):
-            sayfa = 1
+            shard = self._shard(f"bb:{year}", year)
+            if shard.done:
+                continue
+            sayfa = shard.start_page
             while True:
                 data = await self._bb_search(client, sayfa, year)
                 if not data:
@@ -167,11 +171,12 @@ class AnayasaCollector(BaseCollector):
 
                 items = data.get("data") or data.get("kararlar") or data.get("items") or []
                 if not items:
+                    shard.finish()
                     break
 
                 for item in items:
                     kid = str(item.get("id") or item.get("kararId") or "")
-                    if not kid or kid in seen:
+                    if not kid or f"aym_bb_{kid}" in seen:
                         continue
 
                     await jitter(0.5, 1.5)
@@ -179,6 +184,7 @@ class AnayasaCollector(BaseCollector):
                     if not metin or len(metin) < 100:
                         metin = item.get("ozet") or item.get("baslik") or ""
                     if not metin:
+                        shard.failed(sayfa)
                         continue
 
                     record: Dict[str, Any] = {
@@ -193,22 +199,25 @@ class AnayasaCollector(BaseCollector):
                         "text": metin,
                     }
 
-                    seen.add(kid)
                     self._append(record)
                     yield record
 
-                total = data.get("toplam") or data.get("total") or 0
-                if not items or len(items) < PAGE_SIZE:
+                if len(items) < PAGE_SIZE:
+                    shard.finish()
                     break
+                shard.page_done(sayfa)
                 sayfa += 1
                 await jitter(1.0, 2.5)
 
             print(f"  [AYM BB] {year}: tamamlandı")
 
-    async def _collect_nd(self, client: httpx.AsyncClient, seen: set) -> AsyncIterator[Dict]:
+    async def _collect_nd(self, client: httpx.AsyncClient, seen: CollectorStore) -> AsyncIterator[Dict]:
         """Norm Denetimi (iptal/itiraz) kararları."""
         for year in range(self.start_year, self.end_year + 1):
-            sayfa = 1
+            shard = self._shard(f"nd:{year}", year)
+            if shard.done:
+                continue
+            sayfa = shard.start_page
             while True:
                 data = await self._nd_search(client, sayfa, year)
                 if not data:
@@ -216,16 +225,18 @@ class AnayasaCollector(BaseCollector):
 
                 items = data.get("data") or data.get("kararlar") or data.get("items") or []
                 if not items:
+                    shard.finish()
                     break
 
                 for item in items:
                     kid = str(item.get("id") or item.get("kararId") or "")
-                    if not kid or kid in seen:
+                    if not kid or f"aym_nd_{kid}" in seen:
                         continue
 
                     await jitter(0.5, 1.5)
                     metin = await self._nd_detail(client, kid)
                     if not metin or len(metin) < 100:
+                        shard.failed(sayfa)
                         continue
 
                     record: Dict[str, Any] = {
@@ -239,12 +250,13 @@ class AnayasaCollector(BaseCollector):
                         "text": metin,
                     }
 
-                    seen.add(kid)
                     self._append(record)
                     yield record
 
-                if not items or len(items) < PAGE_SIZE:
+                if len(items) < PAGE_SIZE:
+                    shard.finish()
                     break
+                shard.page_done(sayfa)
                 sayfa += 1
                 await jitter(1.5, 3.0)
 
@@ -254,11 +266,14 @@ class AnayasaCollector(BaseCollector):
         seen = self._already_collected()
         print(f"[AYM] Zaten toplanan: {len(seen):,}")
 
-        async with self._make_client(timeout=40.0) as client:
-            async for rec in self._collect_bb(client, seen):
-                yield rec
-            async for rec in self._collect_nd(client, seen):
-                yield rec
+        try:
+            async with self._make_client(timeout=40.0) as client:
+                async for rec in self._collect_bb(client, seen):
+                    yield rec
+                async for rec in self._collect_nd(client, seen):
+                    yield rec
+        finally:
+            self.close()
 
 
 async def run(output_dir: str = "raw_data", start_year: int = 2012, end_year: int = 2024):
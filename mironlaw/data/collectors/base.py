@@ -1,15 +1,16 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import random
-import time
+from datetime import date
 from pathlib import Path
-from typing import AsyncIterator, Dict, Any
+from typing import AsyncIterator, Callable, Dict, Any, Optional
 
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+from .store import CollectorStore
+
 _USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
@@ -26,8 +27,47 @@ async def jitter(min_s: float = 1.0, max_s: float = 3.5) -> None:
     await asyncio.sleep(random.uniform(min_s, max_s))
 
 
+class ShardCursor:
+    """
+    Tek bir shard'ın (ör. yıl+daire) sayfa checkpoint'i.
+
+    Cursor, tamamı işlenmiş son sayfanın bir sonrasını gösterir. Detayı alınamayan
+    kayıt olan ilk sayfada durur; böylece yeniden başlatmada o sayfadan devam edilir
+    (görülen id'ler yine atlanır). Kapanmış bir dönem (geçmiş yıl) hatasız biterse
+    "done" işaretlenir ve bir daha taranmaz; açık dönemlerde cursor silinir ki bir
+    sonraki çalıştırma yeni kayıtları baştan yakalasın.
+    """
+
+    def __init__(self, store: CollectorStore, key: str, closed: bool = False):
+        self.store = store
+        self.key = key
+        self.closed = closed
+        self._retry_from: Optional[int] = None
+        state = store.get_cursor(key) or {}
+        self.done = bool(state.get("done"))
+        self.start_page = int(state.get("page") or 1)
+
+    def failed(self, sayfa: int) -> None:
+        if self._retry_from is None:
+            self._retry_from = sayfa
+
+    def page_done(self, sayfa: int) -> None:
+        self.store.set_cursor(self.key, {"page": self._retry_from or sayfa + 1})
+
+    def finish(self) -> None:
+        if self._retry_from is not None:
+            self.store.set_cursor(self.key, {"page": self._retry_from})
+        elif self.closed:
+            self.store.set_cursor(self.key, {"done": True})
+        else:
+            self.store.set_cursor(self.key, None)
+
+
 class BaseCollector:
-    """Tüm scraper'ların base class'ı. JSONL'e incremental yazar."""
+    """
+    Tüm scraper'ların base class'ı. JSONL'e tamponlu yazar; görülen id'ler ve
+    shard cursor'ları raw_data/.state/{source}.sqlite altında tutulur.
+    """
 
     source_name: str = "base"
 
@@ -35,31 +75,40 @@ class BaseCollector:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.out_path = self.output_dir / f"{self.source_name}.jsonl"
+        self.state_path = self.output_dir / ".state" / f"{self.source_name}.sqlite"
+        self._store: Optional[CollectorStore] = None
+        # Zamanlayıcı, host başına nezaket bütçesi uygulayan bir transport verebilir
+        self.transport_factory: Optional[Callable[[], httpx.AsyncBaseTransport]] = None
+
+    @property
+    def store(self) -> CollectorStore:
+        if self._store is None:
+            self._store = CollectorStore(self.out_path, self.state_path)
+        return self._store
 
-    def _already_collected(self) -> set[str]:
-        seen: set[str] = set()
-        if not self.out_path.exists():
-            return seen
-        with self.out_path.open("r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    rec = json.loads(line)
-                    if rec.get("id"):
-                        seen.add(str(rec["id"]))
-                except Exception:
-                    pass
-        return seen
+    def _already_collected(self) -> CollectorStore:
+        """Kalıcı seen-id indeksi; `record_id in seen` ve `len(seen)` destekler."""
+        return self.store
 
     def _append(self, record: Dict[str, Any]) -> None:
-        with self.out_path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.store.append(record)
+
+    def _shard(self, key: str, year: Optional[int] = None) -> ShardCursor:
+        closed = year is not None and year < date.today().year
+        return ShardCursor(self.store, key, closed=closed)
+
+    def close(self) -> None:
+        """Tamponu diske indirir; collect() sonunda (veya iptalde) çağrılır."""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
 
     async def collect(self) -> AsyncIterator[Dict[str, Any]]:
         raise NotImplementedError
 
-    @staticmethod
-    def _make_client(timeout: float = 30.0) -> httpx.AsyncClient:
+    def _make_client(self, timeout: float = 30.0) -> httpx.AsyncClient:
         return httpx.AsyncClient(
+            transport=self.transport_factory() if self.transport_factory else None,
             headers={
                 "User-Agent": random_ua(),
                 "Accept-Language": "tr-TR,tr;q=0.9,en;q=0.8",
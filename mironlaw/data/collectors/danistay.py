@@ -151,63 +151,72 @@ class DanistayCollector(BaseCollector):
         seen = self._already_collected()
         print(f"[Danıştay] Zaten toplanan: {len(seen):,}")
 
-        async with self._make_client(timeout=45.0) as client:
-            # Önce session kur (CSRF token vs)
-            try:
-                await client.get(BASE_URL)
-                await jitter(1.0, 2.0)
-            except Exception:
-                pass
-
-            for year in range(self.start_year, self.end_year + 1):
-                baslangic = f"01.01.{year}"
-                bitis = f"31.12.{year}"
-                sayfa = 1
-
-                while True:
-                    data = await self._search(client, baslangic, bitis, sayfa)
-                    if not data:
-                        break
-
-                    if "html" in data:
-                        kararlar = self._parse_html_results(data["html"])
-                    else:
-                        kararlar = data.get("data") or data.get("kararlar") or []
-
-                    if not kararlar:
-                        break
-
-                    for k in kararlar:
-                        kid = str(k.get("id") or k.get("kararId") or "")
-                        if not kid or kid in seen:
-                            continue
-
-                        await jitter(0.8, 2.0)
-                        metin = await self._fetch_detail(client, kid)
-                        if not metin or len(metin) < 100:
-                            continue
-
-                        record: Dict[str, Any] = {
-                            "id": f"danistay_{kid}",
-                            "source": "danistay",
-                            "mahkeme": "Danıştay",
-                            "daire": k.get("daire") or "",
-                            "esas_no": k.get("esas_no") or "",
-                            "karar_no": k.get("karar_no") or "",
-                            "karar_tarihi": k.get("tarih") or "",
-                            "text": metin,
-                        }
-
-                        seen.add(kid)
-                        self._append(record)
-                        yield record
-
-                    if len(kararlar) < PAGE_SIZE:
-                        break
-                    sayfa += 1
-                    await jitter(2.0, 4.0)
-
-                print(f"  [Danıştay] {year}: tamamlandı")
+        try:
+            async with self._make_client(timeout=45.0) as client:
+                # Önce session kur (CSRF token vs)
+                try:
+                    await client.get(BASE_URL)
+                    await jitter(1.0, 2.0)
+                except Exception:
+                    pass
+
+                for year in range(self.start_year, self.end_year + 1):
+                    baslangic = f"01.01.{year}"
+                    bitis = f"31.12.{year}"
+                    shard = self._shard(str(year), year)
+                    if shard.done:
+                        continue
+                    sayfa = shard.start_page
+
+                    while True:
+                        data = await self._search(client, baslangic, bitis, sayfa)
+                        if not data:
+                            break
+
+                        if "html" in data:
+                            kararlar = self._parse_html_results(data["html"])
+                        else:
+                            kararlar = data.get("data") or data.get("kararlar") or []
+
+                        if not kararlar:
+                            shard.finish()
+                            break
+
+                        for k in kararlar:
+                            kid = str(k.get("id") or k.get("kararId") or "")
+                            if not kid or f"danistay_{kid}" in seen:
+                                continue
+
+                            await jitter(0.8, 2.0)
+                            metin = await self._fetch_detail(client, kid)
+                            if not metin or len(metin) < 100:
+                                shard.failed(sayfa)
+                                continue
+
+                            record: Dict[str, Any] = {
+                                "id": f"danistay_{kid}",
+                                "source": "danistay",
+                                "mahkeme": "Danıştay",
+                                "daire": k.get("daire") or "",
+                                "esas_no": k.get("esas_no") or "",
+                                "karar_no": k.get("karar_no") or "",
+                                "karar_tarihi": k.get("tarih") or "",
+                                "text": metin,
+                            }
+
+                            self._append(record)
+                            yield record
+
+                        if len(kararlar) < PAGE_SIZE:
+                            shard.finish()
+                            break
+                        shard.page_done(sayfa)
+                        sayfa += 1
+                        await jitter(2.0, 4.0)
+
+                    print(f"  [Danıştay] {year}: tamamlandı")
+        finally:
+            self.close()
 
 
 async def run(output_dir: str = "raw_data", start_year: int = 2000, end_year: int = 2024):
@@ -1,59 +1,273 @@
 """
 HuggingFace'teki 700k Türk hukuk datasetini yükler.
 erdem-erdem/Turkish-Law-Documents-700k-clustered
+
+Dataset bir kerede RAM'e alınmaz: ya HF streaming ile ya da yerel Parquet
+shard'larından batch batch okunur. Her kayıt tek geçişte iki yere yazılır:
+  - raw_data/hf_700k.jsonl (önce .part, bitince rename)
+  - (opsiyonel) backend `decisions` tablosu: staging tabloya COPY, oradan
+    hash üzerinden ON CONFLICT DO NOTHING ile aktarım. cluster_id korunur
+    (retrieval çeşitliliği için). fingerprint/SimHash band'leri burada
+    hesaplanmaz; backend/scripts/backfill_fingerprints.py doldurur.
+
+Çalıştır:
+  python -m data.collectors.hf_loader [--parquet-dir DIR] [--to-db]   (DATABASE_URL env)
 """
 from __future__ import annotations
 
+import argparse
+import hashlib
+import io
 import json
+import os
+from datetime import datetime
 from pathlib import Path
-from typing import Iterator, Dict, Any
+from typing import Iterator, Dict, Any, Optional
 
 from tqdm import tqdm
 
 
 HF_DATASET_ID = "erdem-erdem/Turkish-Law-Documents-700k-clustered"
+HF_COLUMNS = ["id", "source", "text", "esasNo", "kararNo", "kararTarihi", "tr_e5_knn_cluster_id"]
+PARQUET_BATCH_ROWS = 1024
+COPY_BATCH_ROWS = 2000
+
+_COURTS = (
+    ("yargitay", "Yargıtay"),
+    ("danistay", "Danıştay"),
+    ("anayasa", "Anayasa Mahkemesi"),
+    ("aym", "Anayasa Mahkemesi"),
+    ("bam", "Bölge Adliye Mahkemesi"),
+    ("istinaf", "Bölge Adliye Mahkemesi"),
+)
+
+
+def iter_hf_rows(parquet_dir: Optional[str | Path] = None) -> Iterator[Dict[str, Any]]:
+    """Ham dataset satırları; bellek kullanımı batch boyutuyla sınırlı."""
+    if parquet_dir:
+        import pyarrow.parquet as pq
+
+        files = sorted(Path(parquet_dir).rglob("*.parquet"))
+        if not files:
+            raise FileNotFoundError(f"Parquet shard bulunamadı: {parquet_dir}")
+        for path in files:
+            pf = pq.ParquetFile(path)
+            columns = [c for c in HF_COLUMNS if c in pf.schema_arrow.names]
+            for batch in pf.iter_batches(batch_size=PARQUET_BATCH_ROWS, columns=columns):
+                yield from batch.to_pylist()
+        return
+
+    from datasets import load_dataset
+
+    yield from load_dataset(HF_DATASET_ID, split="train", streaming=True)
+
+
+def _to_record(row: Dict[str, Any], index: int, min_chars: int) -> Optional[Dict[str, Any]]:
+    text = (row.get("text") or "").strip()
+    if len(text) < min_chars:
+        return None
+    cluster_id = row.get("tr_e5_knn_cluster_id")
+    return {
+        "id": f"hf_{row.get('id', index)}",
+        "source": f"hf_{row.get('source', 'unknown')}",
+        "text": text,
+        "esas_no": row.get("esasNo") or "",
+        "karar_no": row.get("kararNo") or "",
+        "karar_tarihi": str(row.get("kararTarihi") or ""),
+        "cluster_id": int(cluster_id) if cluster_id is not None else None,
+    }
+
+
+def _iter_jsonl_records(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except Exception:
+                continue
+
+
+# ──────────────────────────────────────────────
+# decisions COPY sink
+# ──────────────────────────────────────────────
+
+def _court(source: str) -> str:
+    s = source.lower()
+    for key, name in _COURTS:
+        if key in s:
+            return name
+    return "Diğer"
 
 
-def load_and_save(output_dir: str | Path = "raw_data", min_chars: int = 200) -> int:
+def _parse_date(value: str) -> Optional[str]:
+    value = (value or "").strip()[:10]
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _copy_field(value: Any) -> str:
+    """COPY text formatı: NULL=\\N; ters bölü, tab ve satır sonları kaçırılır."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class DecisionsCopySink:
     """
-    HF dataset'i indirip raw_data/hf_700k.jsonl'e yazar.
-    Zaten varsa atlar.
+    Kayıtları COPY_BATCH_ROWS'luk batch'ler halinde `decisions`'a yükler.
+    Hash dedup'u hem batch içinde (DISTINCT ON) hem tabloya karşı (ON CONFLICT)
+    yapılır; her batch kendi transaction'ında commit edilir.
     """
-    from datasets import load_dataset
 
+    _COLUMNS = ("source", "court", "decision_date", "file_no", "decision_no",
+                "full_text", "hash", "cluster_id", "metadata")
+
+    def __init__(self, db_url: str, batch_rows: int = COPY_BATCH_ROWS):
+        import psycopg2
+
+        self._conn = psycopg2.connect(db_url)
+        self._cur = self._conn.cursor()
+        self._batch_rows = batch_rows
+        self._buf = io.StringIO()
+        self._pending = 0
+        self.copied = 0
+        self.inserted = 0
+        self._cur.execute("""
+            CREATE TEMP TABLE hf_decisions_stage (
+                source TEXT, court TEXT, decision_date DATE, file_no TEXT, decision_no TEXT,
+                full_text TEXT, hash TEXT, cluster_id INTEGER, metadata JSONB
+            )
+        """)
+        self._conn.commit()
+
+    def write(self, rec: Dict[str, Any]) -> None:
+        full_text = rec["text"]
+        row = (
+            rec["source"],
+            _court(rec["source"]),
+            _parse_date(rec.get("karar_tarihi") or ""),
+            rec.get("esas_no") or None,
+            rec.get("karar_no") or None,
+            full_text,
+            hashlib.sha256(full_text.encode("utf-8")).hexdigest(),
+            rec.get("cluster_id"),
+            json.dumps({"hf_id": rec["id"]}, ensure_ascii=False),
+        )
+        self._buf.write("\t".join(_copy_field(v) for v in row) + "\n")
+        self._pending += 1
+        if self._pending >= self._batch_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        cols = ", ".join(self._COLUMNS)
+        self._buf.seek(0)
+        try:
+            self._cur.copy_expert(f"COPY hf_decisions_stage ({cols}) FROM STDIN", self._buf)
+            self._cur.execute(f"""
+                INSERT INTO decisions ({cols})
+                SELECT DISTINCT ON (hash) {cols} FROM hf_decisions_stage
+                ON CONFLICT (hash) DO NOTHING
+            """)
+            inserted = self._cur.rowcount
+            self._cur.execute("TRUNCATE hf_decisions_stage")
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+        self.copied += self._pending
+        self.inserted += max(inserted, 0)
+        self._buf = io.StringIO()
+        self._pending = 0
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._cur.close()
+            self._conn.close()
+
+
+# ──────────────────────────────────────────────
+# Giriş noktası
+# ──────────────────────────────────────────────
+
+def load_and_save(
+    output_dir: str | Path = "raw_data",
+    min_chars: int = 200,
+    parquet_dir: Optional[str | Path] = None,
+    db_url: Optional[str] = None,
+) -> int:
+    """
+    HF dataset'i stream ederek raw_data/hf_700k.jsonl'e yazar.
+    JSONL zaten varsa indirme atlanır; db_url verildiyse kayıtlar mevcut
+    JSONL'den decisions'a yüklenir.
+    """
     out_path = Path(output_dir) / "hf_700k.jsonl"
     Path(output_dir).mkdir(parents=True, exist_ok=True)
+    sink = DecisionsCopySink(db_url) if db_url else None
 
-    if out_path.exists():
-        lines = sum(1 for _ in out_path.open("r", encoding="utf-8"))
-        print(f"[HF] Zaten var: {out_path} ({lines:,} kayıt)")
-        return lines
+    try:
+        if out_path.exists():
+            if sink is None:
+                lines = sum(1 for _ in out_path.open("r", encoding="utf-8"))
+                print(f"[HF] Zaten var: {out_path} ({lines:,} kayıt)")
+                return lines
+            print(f"[HF] Zaten var: {out_path} → decisions'a yükleniyor")
+            written = 0
+            for rec in tqdm(_iter_jsonl_records(out_path), desc="HF → decisions", unit="doc"):
+                sink.write(rec)
+                written += 1
+            return written
 
-    print(f"[HF] Dataset indiriliyor: {HF_DATASET_ID}")
-    ds = load_dataset(HF_DATASET_ID, split="train")
+        source = parquet_dir or HF_DATASET_ID
+        print(f"[HF] Dataset stream ediliyor: {source}")
+        tmp_path = out_path.with_name(out_path.name + ".part")
+        written = 0
+        with tmp_path.open("w", encoding="utf-8") as f:
+            for i, row in enumerate(tqdm(iter_hf_rows(parquet_dir), desc="HF 700k", unit="doc")):
+                record = _to_record(row, i, min_chars)
+                if record is None:
+                    continue
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if sink is not None:
+                    sink.write(record)
+                written += 1
+        tmp_path.replace(out_path)
+
+        print(f"[HF] Yazıldı: {written:,} kayıt → {out_path}")
+        return written
+    finally:
+        if sink is not None:
+            sink.close()
+            print(f"[HF] decisions: {sink.copied:,} kayıt COPY, {sink.inserted:,} yeni (hash dedup)")
 
-    written = 0
-    with out_path.open("w", encoding="utf-8") as f:
-        for row in tqdm(ds, desc="HF 700k", unit="doc"):
-            text = (row.get("text") or "").strip()
-            if len(text) < min_chars:
-                continue
 
-            record: Dict[str, Any] = {
-                "id": f"hf_{row.get('id', written)}",
-                "source": f"hf_{row.get('source', 'unknown')}",
-                "text": text,
-                "esas_no": row.get("esasNo") or "",
-                "karar_no": row.get("kararNo") or "",
-                "karar_tarihi": str(row.get("kararTarihi") or ""),
-                "cluster_id": row.get("tr_e5_knn_cluster_id"),
-            }
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
-            written += 1
+def main():
+    parser = argparse.ArgumentParser(description="HF 700k → JSONL (+ decisions)")
+    parser.add_argument("--output-dir", default="raw_data")
+    parser.add_argument("--parquet-dir", default=None, help="Yerel Parquet shard klasörü (HF streaming yerine)")
+    parser.add_argument("--to-db", action="store_true", help="DATABASE_URL'deki decisions tablosuna da yükle")
+    args = parser.parse_args()
 
-    print(f"[HF] Yazıldı: {written:,} kayıt → {out_path}")
-    return written
+    db_url = None
+    if args.to_db:
+        db_url = os.environ.get("DATABASE_URL")
+        if not db_url:
+            parser.error("--to-db için DATABASE_URL gerekli")
+    load_and_save(args.output_dir, parquet_dir=args.parquet_dir, db_url=db_url)
 
 
 if __name__ == "__main__":
-    load_and_save()
+    main()
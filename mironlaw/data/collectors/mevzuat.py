@@ -132,56 +132,64 @@ class MevzuatCollector(BaseCollector):
         seen = self._already_collected()
         print(f"[Mevzuat] Zaten toplanan: {len(seen):,}")
 
-        async with self._make_client(timeout=40.0) as client:
-            for tur_id in self.tur_ids:
-                tur_ad = MEVZUAT_TURLERI.get(tur_id, tur_id)
-                sayfa = 1
-
-                while True:
-                    data = await self._list_mevzuat(client, tur_id, sayfa)
-                    if not data:
-                        break
-
-                    if "html" in data:
-                        items = self._parse_list_html(data["html"])
-                    else:
-                        items = data.get("data") or data.get("items") or data.get("mevzuatlar") or []
-
-                    if not items:
-                        break
-
-                    for item in items:
-                        mid = str(item.get("id") or item.get("mevzuatId") or "")
-                        if not mid or mid in seen:
-                            continue
-
-                        baslik = item.get("baslik") or item.get("adi") or item.get("mevzuatAdi") or ""
-                        resmi_gazete = item.get("resmiGazete") or item.get("yayinTarihi") or ""
-
-                        await jitter(0.5, 1.5)
-                        metin = await self._fetch_metin(client, mid)
-                        if not metin or len(metin) < 100:
-                            continue
-
-                        record: Dict[str, Any] = {
-                            "id": f"mevzuat_{mid}",
-                            "source": "mevzuat",
-                            "tur": tur_ad,
-                            "baslik": baslik,
-                            "resmi_gazete": resmi_gazete,
-                            "text": metin,
-                        }
-
-                        seen.add(mid)
-                        self._append(record)
-                        yield record
-
-                    if len(items) < PAGE_SIZE:
-                        break
-                    sayfa += 1
-                    await jitter(1.0, 2.5)
-
-                print(f"  [Mevzuat] {tur_ad}: tamamlandı")
+        try:
+            async with self._make_client(timeout=40.0) as client:
+                for tur_id in self.tur_ids:
+                    tur_ad = MEVZUAT_TURLERI.get(tur_id, tur_id)
+                    # Yeni mevzuat her an eklenebilir: shard "done" işaretlenmez
+                    shard = self._shard(f"tur:{tur_id}")
+                    sayfa = shard.start_page
+
+                    while True:
+                        data = await self._list_mevzuat(client, tur_id, sayfa)
+                        if not data:
+                            break
+
+                        if "html" in data:
+                            items = self._parse_list_html(data["html"])
+                        else:
+                            items = data.get("data") or data.get("items") or data.get("mevzuatlar") or []
+
+                        if not items:
+                            shard.finish()
+                            break
+
+                        for item in items:
+                            mid = str(item.get("id") or item.get("mevzuatId") or "")
+                            if not mid or f"mevzuat_{mid}" in seen:
+                                continue
+
+                            baslik = item.get("baslik") or item.get("adi") or item.get("mevzuatAdi") or ""
+                            resmi_gazete = item.get("resmiGazete") or item.get("yayinTarihi") or ""
+
+                            await jitter(0.5, 1.5)
+                            metin = await self._fetch_metin(client, mid)
+                            if not metin or len(metin) < 100:
+                                shard.failed(sayfa)
+                                continue
+
+                            record: Dict[str, Any] = {
+                                "id": f"mevzuat_{mid}",
+                                "source": "mevzuat",
+                                "tur": tur_ad,
+                                "baslik": baslik,
+                                "resmi_gazete": resmi_gazete,
+                                "text": metin,
+                            }
+
+                            self._append(record)
+                            yield record
+
+                        if len(items) < PAGE_SIZE:
+                            shard.finish()
+                            break
+                        shard.page_done(sayfa)
+                        sayfa += 1
+                        await jitter(1.0, 2.5)
+
+                    print(f"  [Mevzuat] {tur_ad}: tamamlandı")
+        finally:
+            self.close()
 
 
 async def run(output_dir: str = "raw_data"):
@@ -0,0 +1,288 @@
+"""
+Eşzamanlı toplama zamanlayıcısı.
+
+Kaynakların her biri farklı bir host'a gidip I/O beklediği için sırayla değil
+birlikte çalıştırılır:
+  - Host başına nezaket bütçesi: eşzamanlı istek sınırı + iki istek arası
+    minimum aralık. Transport seviyesinde uygulanır; collector kodu değişmez.
+  - Sharded kaynaklar (Yargıtay: yıl × daire) sınırlı bir worker havuzuna
+    dağıtılır; her shard kendi cursor'ı ile bağımsız checkpoint'lenir.
+  - Senkron işler (HF loader) thread'de çalışır.
+  - Tek bir rich ilerleme görünümü + sonda kaynak/host metrik tablosu.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from rich.console import Console
+from rich.progress import BarColumn, Progress, SpinnerColumn, TaskProgressColumn, TextColumn
+from rich.table import Table
+
+from .base import BaseCollector
+
+
+@dataclass(frozen=True)
+class HostBudget:
+    concurrency: int = 2       # aynı host'a eşzamanlı istek sayısı
+    min_interval: float = 0.5  # aynı host'a iki istek başlangıcı arası (sn)
+
+
+DEFAULT_BUDGETS: Dict[str, HostBudget] = {
+    "emsal.yargitay.gov.tr": HostBudget(concurrency=4, min_interval=0.25),
+    "www.danistay.gov.tr": HostBudget(concurrency=2, min_interval=0.5),
+    "kararlarbilgibankasi.anayasa.gov.tr": HostBudget(concurrency=2, min_interval=0.5),
+    "normkararlarbilgibankasi.anayasa.gov.tr": HostBudget(concurrency=2, min_interval=0.5),
+    "www.mevzuat.gov.tr": HostBudget(concurrency=2, min_interval=0.5),
+}
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    errors: int = 0      # bağlantı hatası veya HTTP >= 400
+    latency: float = 0.0
+
+
+@dataclass
+class SourceStats:
+    records: int = 0
+    shards_total: Optional[int] = None
+    shards_done: int = 0
+    status: str = "bekliyor"
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+@dataclass
+class CollectionMetrics:
+    sources: Dict[str, SourceStats] = field(default_factory=dict)
+    hosts: Dict[str, HostStats] = field(default_factory=dict)
+
+    def host(self, key: str) -> HostStats:
+        return self.hosts.setdefault(key, HostStats())
+
+
+class _HostGate:
+    def __init__(self, budget: HostBudget):
+        self._sem = asyncio.Semaphore(budget.concurrency)
+        self._min_interval = budget.min_interval
+        self._next_slot = 0.0
+
+    async def __aenter__(self):
+        await self._sem.acquire()
+        now = time.monotonic()
+        # Slot rezervasyonu await'siz yapılır: tek event loop'ta atomik
+        start = max(now, self._next_slot)
+        self._next_slot = start + self._min_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def __aexit__(self, *exc):
+        self._sem.release()
+
+
+class PoliteTransport(httpx.AsyncBaseTransport):
+    """Her isteği host'un kapısından geçirir ve host metriklerini günceller."""
+
+    def __init__(self, gates: Dict[str, _HostGate], budgets: Dict[str, HostBudget],
+                 default: HostBudget, metrics: CollectionMetrics):
+        self._inner = httpx.AsyncHTTPTransport(verify=False)
+        self._gates = gates
+        self._budgets = budgets
+        self._default = default
+        self._metrics = metrics
+
+    def _gate(self, url: httpx.URL) -> tuple[str, _HostGate]:
+        key = url.netloc.decode("ascii")
+        gate = self._gates.get(key)
+        if gate is None:
+            budget = self._budgets.get(key) or self._budgets.get(url.host) or self._default
+            gate = self._gates[key] = _HostGate(budget)
+        return key, gate
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key, gate = self._gate(request.url)
+        stats = self._metrics.host(key)
+        async with gate:
+            started = time.monotonic()
+            stats.requests += 1
+            try:
+                response = await self._inner.handle_async_request(request)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                stats.latency += time.monotonic() - started
+            if response.status_code >= 400:
+                stats.errors += 1
+            return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class CollectionScheduler:
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, HostBudget]] = None,
+        default_budget: HostBudget = HostBudget(),
+        console: Optional[Console] = None,
+    ):
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.default_budget = default_budget
+        self.console = console or Console()
+        self.metrics = CollectionMetrics()
+        self._gates: Dict[str, _HostGate] = {}
+        self._jobs: List[tuple[str, Callable[[], Awaitable[None]]]] = []
+        self._progress: Optional[Progress] = None
+        self._tasks: Dict[str, Any] = {}
+
+    # ── İş tanımları ──────────────────────────────────────────────────────
+
+    def _attach(self, collector: BaseCollector) -> None:
+        collector.transport_factory = lambda: PoliteTransport(
+            self._gates, self.budgets, self.default_budget, self.metrics
+        )
+
+    def add_blocking(self, name: str, fn: Callable[[], int]) -> None:
+        """Senkron bir işi (ör. HF loader) thread'de çalıştırır; dönüş değeri kayıt sayısıdır."""
+        async def job():
+            self.metrics.sources[name].records = await asyncio.to_thread(fn)
+        self._register(name, job)
+
+    def add(self, name: str, collector: BaseCollector) -> None:
+        """collect() üreticisini olduğu gibi çalıştırır."""
+        self._attach(collector)
+
+        async def job():
+            stats = self.metrics.sources[name]
+            async for _ in collector.collect():
+                stats.records += 1
+        self._register(name, job)
+
+    def add_sharded(self, name: str, collector: Any, workers: int = 4, timeout: float = 45.0) -> None:
+        """
+        collector.shards() listesini `workers` adet eşzamanlı worker'a dağıtır.
+        Collector `collect_shard(client, seen, *shard)` sağlamalıdır.
+        """
+        self._attach(collector)
+
+        async def job():
+            stats = self.metrics.sources[name]
+            shards = collector.shards()
+            stats.shards_total = len(shards)
+            queue: asyncio.Queue = asyncio.Queue()
+            for shard in shards:
+                queue.put_nowait(shard)
+            seen = collector._already_collected()
+
+            async def worker(client: httpx.AsyncClient):
+                while True:
+                    try:
+                        shard = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    async for _ in collector.collect_shard(client, seen, *shard):
+                        stats.records += 1
+                    stats.shards_done += 1
+
+            try:
+                async with collector._make_client(timeout=timeout) as client:
+                    await asyncio.gather(*(worker(client) for _ in range(max(1, min(workers, len(shards))))))
+            finally:
+                collector.close()
+        self._register(name, job)
+
+    def _register(self, name: str, job: Callable[[], Awaitable[None]]) -> None:
+        self.metrics.sources[name] = SourceStats()
+        self._jobs.append((name, job))
+
+    # ── Çalıştırma ────────────────────────────────────────────────────────
+
+    async def _run_job(self, name: str, job: Callable[[], Awaitable[None]]) -> None:
+        stats = self.metrics.sources[name]
+        stats.status = "çalışıyor"
+        stats.started = time.monotonic()
+        try:
+            await job()
+            stats.status = "tamam"
+        except asyncio.CancelledError:
+            stats.status = "iptal"
+            raise
+        except Exception as e:
+            # Bir kaynağın çökmesi diğerlerini durdurmaz
+            stats.status = f"hata: {type(e).__name__}"
+            self.console.print(f"[red][Collect] {name} hata: {e}")
+        finally:
+            stats.finished = time.monotonic()
+            self._refresh()
+
+    def _refresh(self) -> None:
+        if self._progress is None:
+            return
+        for name, stats in self.metrics.sources.items():
+            desc = f"{name:<10} {stats.records:>8,} kayıt  [{stats.status}]"
+            if stats.shards_total is not None:
+                self._progress.update(self._tasks[name], description=desc,
+                                      total=stats.shards_total, completed=stats.shards_done)
+            else:
+                self._progress.update(self._tasks[name], description=desc,
+                                      total=1, completed=1 if stats.finished else 0)
+
+    async def _refresher(self, interval: float) -> None:
+        while True:
+            self._refresh()
+            await asyncio.sleep(interval)
+
+    async def run(self, refresh_interval: float = 1.0) -> CollectionMetrics:
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=self.console,
+        ) as progress:
+            self._progress = progress
+            for name, _ in self._jobs:
+                self._tasks[name] = progress.add_task(name, total=None)
+            refresher = asyncio.create_task(self._refresher(refresh_interval))
+            try:
+                await asyncio.gather(*(self._run_job(name, job) for name, job in self._jobs))
+            finally:
+                refresher.cancel()
+                self._refresh()
+                self._progress = None
+        self.print_summary()
+        return self.metrics
+
+    def print_summary(self) -> None:
+        table = Table(title="Toplama Metrikleri")
+        table.add_column("Kaynak")
+        table.add_column("Kayıt", justify="right")
+        table.add_column("Shard", justify="right")
+        table.add_column("Süre", justify="right")
+        table.add_column("Durum")
+        for name, s in self.metrics.sources.items():
+            shard = f"{s.shards_done}/{s.shards_total}" if s.shards_total is not None else "-"
+            table.add_row(name, f"{s.records:,}", shard, f"{s.elapsed:.1f} sn", s.status)
+        self.console.print(table)
+
+        hosts = Table(title="Host Metrikleri")
+        hosts.add_column("Host")
+        hosts.add_column("İstek", justify="right")
+        hosts.add_column("Hata", justify="right")
+        hosts.add_column("Ort. gecikme", justify="right")
+        for key, h in sorted(self.metrics.hosts.items()):
+            avg = h.latency / max(1, h.requests) * 1000
+            hosts.add_row(key, f"{h.requests:,}", f"{h.errors:,}", f"{avg:.0f} ms")
+        self.console.print(hosts)
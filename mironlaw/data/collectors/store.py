@@ -0,0 +1,168 @@
+"""
+Collector depolama katmanı.
+
+- Kayıtlar JSONL'e tamponlanarak, toplu halde yazılır; her flush'ta fsync.
+- Görülen id'ler kalıcı bir SQLite indeksinde tutulur; yeniden başlatmada JSONL
+  baştan okunmaz. İndeks JSONL'in hangi bayta kadar işlendiğini bilir; dosya
+  dışarıdan büyüdüyse yalnızca kuyruk taranır, küçüldüyse indeks yeniden kurulur.
+- Her collector için küçük bir cursor tablosu (ör. "2019:3" → {"page": 12}).
+  Cursor'lar ilgili kayıtlarla aynı flush'ta, kayıtlardan sonra yazılır; yani
+  cursor hiçbir zaman diske inmemiş verinin ilerisini göstermez.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+FLUSH_RECORDS = 200
+FLUSH_SECONDS = 5.0
+
+
+class CollectorStore:
+    def __init__(
+        self,
+        out_path: Path,
+        state_path: Path,
+        flush_records: int = FLUSH_RECORDS,
+        flush_seconds: float = FLUSH_SECONDS,
+    ):
+        self.out_path = Path(out_path)
+        self.state_path = Path(state_path)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+
+        self._db = sqlite3.connect(str(self.state_path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS cursor (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+        """)
+        self._db.commit()
+
+        self._buffer: list[str] = []
+        self._pending_ids: set[str] = set()
+        self._pending_cursors: Dict[str, Optional[str]] = {}
+        self._last_flush = time.monotonic()
+        self._count = self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+        self._sync_with_jsonl()
+        self._fh = self.out_path.open("a", encoding="utf-8")
+
+    # ── İndeks senkronizasyonu ────────────────────────────────────────────
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._db.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def _sync_with_jsonl(self) -> None:
+        """İndeksi JSONL ile hizalar: normalde O(1), yalnızca eksik kuyruk taranır."""
+        size = self.out_path.stat().st_size if self.out_path.exists() else 0
+        indexed = int(self._meta("jsonl_size") or 0)
+        if size == indexed:
+            return
+        if size < indexed:
+            # Dosya değiştirilmiş/kısaltılmış: sıfırdan kur
+            self._db.execute("DELETE FROM seen")
+            indexed = 0
+
+        ids = []
+        with self.out_path.open("rb") as f:
+            f.seek(indexed)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # yarım yazılmış son satır
+                indexed += len(line)
+                try:
+                    rec = json.loads(line)
+                except Exception:
+                    continue
+                if isinstance(rec, dict) and rec.get("id"):
+                    ids.append((str(rec["id"]),))
+        self._db.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", ids)
+        self._set_meta("jsonl_size", str(indexed))
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    # ── Okuma ─────────────────────────────────────────────────────────────
+
+    def __contains__(self, record_id: str) -> bool:
+        if record_id in self._pending_ids:
+            return True
+        return self._db.execute("SELECT 1 FROM seen WHERE id = ?", (record_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._count + len(self._pending_ids)
+
+    def get_cursor(self, key: str) -> Optional[Dict[str, Any]]:
+        if key in self._pending_cursors:
+            value = self._pending_cursors[key]
+        else:
+            row = self._db.execute("SELECT value FROM cursor WHERE key = ?", (key,)).fetchone()
+            value = row[0] if row else None
+        return json.loads(value) if value is not None else None
+
+    # ── Yazma ─────────────────────────────────────────────────────────────
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if record.get("id"):
+            self._pending_ids.add(str(record["id"]))
+        self._maybe_flush()
+
+    def set_cursor(self, key: str, value: Optional[Dict[str, Any]]) -> None:
+        """value=None cursor'ı siler (shard yeniden baştan taranır)."""
+        self._pending_cursors[key] = json.dumps(value) if value is not None else None
+        self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if (len(self._buffer) >= self.flush_records
+                or time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._fh.write("".join(self._buffer))
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        size = self._fh.tell()
+
+        # rowcount yalnızca gerçekten eklenen id'leri sayar; seen'de zaten olanlar
+        # (ör. devam eden çalıştırmada yeniden yazılan kayıt) sayacı şişirmez.
+        inserted = self._db.executemany(
+            "INSERT OR IGNORE INTO seen (id) VALUES (?)", ((i,) for i in self._pending_ids)
+        ).rowcount
+        for key, value in self._pending_cursors.items():
+            if value is None:
+                self._db.execute("DELETE FROM cursor WHERE key = ?", (key,))
+            else:
+                self._db.execute(
+                    "INSERT INTO cursor (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (key, value),
+                )
+        self._set_meta("jsonl_size", str(size))
+        self._db.commit()
+
+        self._count += max(inserted, 0)
+        self._buffer.clear()
+        self._pending_ids.clear()
+        self._pending_cursors.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self._fh.close()
+        self._db.close()
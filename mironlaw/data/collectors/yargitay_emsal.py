@@ -12,13 +12,14 @@ import json
 import re
 from datetime import date, timedelta
 from pathlib import Path
-from typing import AsyncIterator, Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 
 import httpx
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 
 from .base import BaseCollector, jitter, random_ua
+from .store import CollectorStore
 
 BASE_URL = "https://emsal.yargitay.gov.tr"
 
@@ -132,73 +133,99 @@ class YargitayEmsalCollector(BaseCollector):
                 await asyncio.sleep(2 ** attempt)
         return None
 
+    def shards(self) -> List[Tuple[int, int]]:
+        """Bağımsız checkpoint'lenen (yıl, daire) shard'ları."""
+        return [(year, daire_id) for year in range(self.start_year, self.end_year + 1) for daire_id in self.daire_ids]
+
+    async def collect_shard(
+        self,
+        client: httpx.AsyncClient,
+        seen: CollectorStore,
+        year: int,
+        daire_id: int,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Tek bir (yıl, daire) shard'ını cursor'ından devam ederek toplar."""
+        shard = self._shard(f"{year}:{daire_id}", year)
+        if shard.done:
+            return
+        baslangic = f"01.01.{year}"
+        bitis = f"31.12.{year}"
+        daire_ad = DAIRELER.get(daire_id, str(daire_id))
+        sayfa = shard.start_page
+        toplam = None
+
+        while True:
+            data = await self._fetch_page(client, daire_id, baslangic, bitis, sayfa)
+            if not data:
+                # Liste alınamadı: cursor bu sayfada kalır
+                break
+
+            # API yanıt yapısı: {"data": [...], "toplam": N} veya benzeri
+            kararlar = data.get("data") or data.get("kararlar") or data.get("rows") or []
+            if toplam is None:
+                toplam = data.get("toplam") or data.get("total") or len(kararlar)
+
+            if not kararlar:
+                shard.finish()
+                break
+
+            for k in kararlar:
+                hkm_id = str(k.get("hkm_id") or k.get("id") or "")
+                if not hkm_id or f"yargitay_{hkm_id}" in seen:
+                    continue
+
+                # Liste sayfasındaki özet bilgi
+                ozet = k.get("ozet") or k.get("summary") or k.get("karar_ozeti") or ""
+                esas = k.get("esas_no") or k.get("esasNo") or ""
+                karar = k.get("karar_no") or k.get("kararNo") or ""
+                tarih = k.get("tarih") or k.get("kararTarihi") or ""
+
+                # Detay metin çek
+                await jitter(0.8, 2.5)
+                metin = await self._fetch_detail(client, hkm_id)
+                # Beklerken başka bir shard (ör. "Tümü") aynı kararı yazmış olabilir;
+                # kontrol ile _append arasında await yok, tek event loop'ta atomik.
+                if f"yargitay_{hkm_id}" in seen:
+                    continue
+                if not metin or len(metin) < 100:
+                    metin = ozet
+
+                record: Dict[str, Any] = {
+                    "id": f"yargitay_{hkm_id}",
+                    "source": "yargitay_emsal",
+                    "mahkeme": "Yargıtay",
+                    "daire": daire_ad,
+                    "esas_no": esas,
+                    "karar_no": karar,
+                    "karar_tarihi": tarih,
+                    "text": metin,
+                    "ozet": ozet,
+                }
+
+                self._append(record)
+                yield record
+
+            # Sonraki sayfa var mı?
+            if len(kararlar) < PAGE_SIZE:
+                shard.finish()
+                break
+            shard.page_done(sayfa)
+            sayfa += 1
+            await jitter(1.0, 3.0)
+
+        print(f"  [{year}] {daire_ad}: tamamlandı")
+
     async def collect(self) -> AsyncIterator[Dict[str, Any]]:
         seen = self._already_collected()
         print(f"[Yargıtay] Zaten toplanan: {len(seen):,}")
 
-        async with self._make_client(timeout=45.0) as client:
-            for year in range(self.start_year, self.end_year + 1):
-                baslangic = f"01.01.{year}"
-                bitis = f"31.12.{year}"
-
-                for daire_id in self.daire_ids:
-                    daire_ad = DAIRELER.get(daire_id, str(daire_id))
-                    sayfa = 1
-                    toplam = None
-
-                    while True:
-                        data = await self._fetch_page(client, daire_id, baslangic, bitis, sayfa)
-                        if not data:
-                            break
-
-                        # API yanıt yapısı: {"data": [...], "toplam": N} veya benzeri
-                        kararlar = data.get("data") or data.get("kararlar") or data.get("rows") or []
-                        if toplam is None:
-                            toplam = data.get("toplam") or data.get("total") or len(kararlar)
-
-                        if not kararlar:
-                            break
-
-                        for k in kararlar:
-                            hkm_id = str(k.get("hkm_id") or k.get("id") or "")
-                            if not hkm_id or hkm_id in seen:
-                                continue
-
-                            # Liste sayfasındaki özet bilgi
-                            ozet = k.get("ozet") or k.get("summary") or k.get("karar_ozeti") or ""
-                            esas = k.get("esas_no") or k.get("esasNo") or ""
-                            karar = k.get("karar_no") or k.get("kararNo") or ""
-                            tarih = k.get("tarih") or k.get("kararTarihi") or ""
-
-                            # Detay metin çek
-                            await jitter(0.8, 2.5)
-                            metin = await self._fetch_detail(client, hkm_id)
-                            if not metin or len(metin) < 100:
-                                metin = ozet
-
-                            record: Dict[str, Any] = {
-                                "id": f"yargitay_{hkm_id}",
-                                "source": "yargitay_emsal",
-                                "mahkeme": "Yargıtay",
-                                "daire": daire_ad,
-                                "esas_no": esas,
-                                "karar_no": karar,
-                                "karar_tarihi": tarih,
-                                "text": metin,
-                                "ozet": ozet,
-                            }
-
-                            seen.add(hkm_id)
-                            self._append(record)
-                            yield record
-
-                        # Sonraki sayfa var mı?
-                        if len(kararlar) < PAGE_SIZE:
-                            break
-                        sayfa += 1
-                        await jitter(1.0, 3.0)
-
-                    print(f"  [{year}] {daire_ad}: tamamlandı")
+        try:
+            async with self._make_client(timeout=45.0) as client:
+                for year, daire_id in self.shards():
+                    async for record in self.collect_shard(client, seen, year, daire_id):
+                        yield record
+        finally:
+            self.close()
 
 
 async def run(output_dir: str = "raw_data", start_year: int = 2000, end_year: int = 2024):
@@ -39,58 +39,44 @@ TRAIN_DIR.mkdir(parents=True, exist_ok=True)
 # ADIM 1: COLLECT
 # ──────────────────────────────────────────────
 
-async def step_collect(start_year: int = 2000, end_year: int = 2024):
+async def step_collect(
+    start_year: int = 2000,
+    end_year: int = 2024,
+    yargitay_workers: int = 4,
+    load_decisions: bool = False,
+):
+    """
+    Tüm kaynakları eşzamanlı toplar. Her kaynak farklı bir host'a gider;
+    host başına nezaket bütçeleri collectors/scheduler.py içinde.
+    """
     console.rule("[bold cyan]ADIM 1: VERİ TOPLAMA")
-
-    # 1a. HuggingFace 700k
-    console.print("[cyan]1a.[/] HuggingFace 700k yükleniyor...")
-    from .collectors.hf_loader import load_and_save
-    n = load_and_save(output_dir=RAW_DIR)
-    console.print(f"  ✓ HF: {n:,} kayıt")
-
-    # 1b. Yargıtay Emsal
-    console.print("[cyan]1b.[/] Yargıtay Emsal toplanıyor...")
-    from .collectors.yargitay_emsal import YargitayEmsalCollector
-    yc = YargitayEmsalCollector(output_dir=RAW_DIR, start_year=start_year, end_year=end_year)
-    count = 0
-    async for _ in yc.collect():
-        count += 1
-        if count % 5000 == 0:
-            console.print(f"  ↳ Yargıtay: {count:,}")
-    console.print(f"  ✓ Yargıtay: {count:,} karar")
-
-    # 1c. Danıştay
-    console.print("[cyan]1c.[/] Danıştay toplanıyor...")
-    from .collectors.danistay import DanistayCollector
-    dc = DanistayCollector(output_dir=RAW_DIR, start_year=start_year, end_year=end_year)
-    count = 0
-    async for _ in dc.collect():
-        count += 1
-        if count % 2000 == 0:
-            console.print(f"  ↳ Danıştay: {count:,}")
-    console.print(f"  ✓ Danıştay: {count:,} karar")
-
-    # 1d. Anayasa Mahkemesi
-    console.print("[cyan]1d.[/] Anayasa Mahkemesi toplanıyor...")
+    import httpx
     from .collectors.anayasa import AnayasaCollector
-    ac = AnayasaCollector(output_dir=RAW_DIR, start_year=2012, end_year=end_year)
-    count = 0
-    async for _ in ac.collect():
-        count += 1
-        if count % 500 == 0:
-            console.print(f"  ↳ AYM: {count:,}")
-    console.print(f"  ✓ AYM: {count:,} karar")
-
-    # 1e. Mevzuat
-    console.print("[cyan]1e.[/] Mevzuat.gov.tr toplanıyor...")
+    from .collectors.danistay import DanistayCollector
+    from .collectors.hf_loader import load_and_save
     from .collectors.mevzuat import MevzuatCollector
-    mc = MevzuatCollector(output_dir=RAW_DIR)
-    count = 0
-    async for _ in mc.collect():
-        count += 1
-        if count % 500 == 0:
-            console.print(f"  ↳ Mevzuat: {count:,}")
-    console.print(f"  ✓ Mevzuat: {count:,} metin")
+    from .collectors.scheduler import DEFAULT_BUDGETS, CollectionScheduler, HostBudget
+    from .collectors.yargitay_emsal import BASE_URL as YARGITAY_URL, YargitayEmsalCollector
+
+    budgets = dict(DEFAULT_BUDGETS)
+    yargitay_host = httpx.URL(YARGITAY_URL).host
+    budgets[yargitay_host] = HostBudget(concurrency=yargitay_workers, min_interval=budgets[yargitay_host].min_interval)
+
+    scheduler = CollectionScheduler(budgets=budgets, console=console)
+    # --load-decisions: HF kayıtları backend decisions tablosuna da COPY edilir
+    db_url = os.environ.get("DATABASE_URL") if load_decisions else None
+    if load_decisions and not db_url:
+        console.print("[red]--load-decisions için DATABASE_URL gerekli; decisions yüklemesi atlanıyor.")
+    scheduler.add_blocking("HF 700k", lambda: load_and_save(output_dir=RAW_DIR, db_url=db_url))
+    scheduler.add_sharded(
+        "Yargıtay",
+        YargitayEmsalCollector(output_dir=RAW_DIR, start_year=start_year, end_year=end_year),
+        workers=yargitay_workers,
+    )
+    scheduler.add("Danıştay", DanistayCollector(output_dir=RAW_DIR, start_year=start_year, end_year=end_year))
+    scheduler.add("AYM", AnayasaCollector(output_dir=RAW_DIR, start_year=2012, end_year=end_year))
+    scheduler.add("Mevzuat", MevzuatCollector(output_dir=RAW_DIR))
+    await scheduler.run()
 
     _print_raw_stats()
 
@@ -134,7 +120,7 @@ def step_dedup():
 # ADIM 3: Q&A DATASETI
 # ──────────────────────────────────────────────
 
-def step_build_qa():
+def step_build_qa(fmt: str = "jsonl"):
     console.rule("[bold green]ADIM 3: Q&A DATASETI OLUŞTURMA")
     from .processors.qa_builder import build_dataset
 
@@ -149,28 +135,18 @@ def step_build_qa():
     console.print(f"[green]✓ Eğitim örneği: {n:,}")
 
     # Kaggle için split
-    _split_for_kaggle(out)
-
+    _split_for_kaggle(out, fmt=fmt)
 
-def _split_for_kaggle(train_path: Path, val_ratio: float = 0.02):
-    """%98 train, %2 validation split."""
-    import random
-    lines = train_path.read_text(encoding="utf-8").strip().splitlines()
-    random.shuffle(lines)
 
-    split_idx = int(len(lines) * (1 - val_ratio))
-    train_lines = lines[:split_idx]
-    val_lines = lines[split_idx:]
+def _split_for_kaggle(train_path: Path, val_ratio: float = 0.02, fmt: str = "jsonl"):
+    """%98 train, %2 validation split — hash tabanlı, bellek dışı (bkz. processors.splitter)."""
+    from .processors.splitter import split_jsonl
 
-    train_out = PROCESSED_DIR / "train.jsonl"
-    val_out = PROCESSED_DIR / "val.jsonl"
+    n_train, n_val = split_jsonl(train_path, PROCESSED_DIR, val_ratio=val_ratio, fmt=fmt)
 
-    train_out.write_text("\n".join(train_lines), encoding="utf-8")
-    val_out.write_text("\n".join(val_lines), encoding="utf-8")
-
-    console.print(f"  Train: {len(train_lines):,} | Val: {len(val_lines):,}")
-    console.print(f"  → {train_out}")
-    console.print(f"  → {val_out}")
+    console.print(f"  Train: {n_train:,} | Val: {n_val:,}")
+    console.print(f"  → {PROCESSED_DIR / f'train.{fmt}'}")
+    console.print(f"  → {PROCESSED_DIR / f'val.{fmt}'}")
 
 
 # ──────────────────────────────────────────────
@@ -180,23 +156,27 @@ def _split_for_kaggle(train_path: Path, val_ratio: float = 0.02):
 def step_push_hf(repo_id: str = "mironintelligence/mironlaw-train-data"):
     console.rule("[bold magenta]ADIM 4: HUGGINGFACE'E PUSH")
     from datasets import Dataset
-    import json
+    from .processors.splitter import iter_jsonl
 
+    parquet_path = PROCESSED_DIR / "train.parquet"
     train_path = PROCESSED_DIR / "train.jsonl"
-    if not train_path.exists():
+    # Kayıtlar RAM'e alınmaz: Parquet doğrudan memory-map edilir, JSONL ise
+    # generator ile diskteki Arrow cache'e akıtılır. İkisi de varsa en son
+    # yazılan split kullanılır (ör. extra_qa_converter sonrası yeni JSONL).
+    if parquet_path.exists() and (
+        not train_path.exists() or parquet_path.stat().st_mtime >= train_path.stat().st_mtime
+    ):
+        console.print(f"Dataset yükleniyor: {parquet_path}")
+        ds = Dataset.from_parquet(str(parquet_path))
+    elif train_path.exists():
+        console.print(f"Dataset yükleniyor: {train_path}")
+        ds = Dataset.from_generator(iter_jsonl, gen_kwargs={"path": str(train_path)})
+    else:
         console.print("[red]train.jsonl bulunamadı. Önce 'build_qa' adımını çalıştır.")
         return
 
-    console.print(f"Dataset yükleniyor: {train_path}")
-    records = []
-    with train_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                records.append(json.loads(line))
-
-    ds = Dataset.from_list(records)
     console.print(f"HuggingFace'e push ediliyor: {repo_id}")
-    ds.push_to_hub(repo_id, private=True)
+    ds.push_to_hub(repo_id, private=True, max_shard_size="500MB")
     console.print(f"[green]✓ Push tamamlandı: https://huggingface.co/datasets/{repo_id}")
 
 
@@ -214,19 +194,31 @@ def main():
     )
     parser.add_argument("--start-year", type=int, default=2000)
     parser.add_argument("--end-year", type=int, default=2024)
+    parser.add_argument("--yargitay-workers", type=int, default=4, help="Eşzamanlı Yargıtay shard worker sayısı")
+    parser.add_argument(
+        "--load-decisions",
+        action="store_true",
+        help="HF 700k'yı DATABASE_URL'deki decisions tablosuna da yükle",
+    )
     parser.add_argument("--hf-repo", default="mironintelligence/mironlaw-train-data")
+    parser.add_argument(
+        "--format",
+        choices=["jsonl", "parquet"],
+        default="jsonl",
+        help="train/val çıktı formatı (parquet: training tarafında memory-map)",
+    )
     args = parser.parse_args()
 
     console.print(f"[bold]MironLaw 1.0 — Data Pipeline[/] | Adım: [yellow]{args.step}[/]")
 
     if args.step in ("collect", "all"):
-        asyncio.run(step_collect(args.start_year, args.end_year))
+        asyncio.run(step_collect(args.start_year, args.end_year, args.yargitay_workers, args.load_decisions))
 
     if args.step in ("dedup", "all"):
         step_dedup()
 
     if args.step in ("build_qa", "all"):
-        step_build_qa()
+        step_build_qa(args.format)
 
     if args.step == "push_hf":
         step_push_hf(args.hf_repo)
@@ -0,0 +1,72 @@
+"""
+Dedup benchmark — sentetik korpus üzerinde docs/sn ve tepe RSS.
+Çalıştır: python -m data.processors.bench_dedup --docs 100000 500000 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from .dedup import merge_and_dedup
+
+_WORDS = (
+    "mahkeme karar davacı davalı temyiz istinaf hüküm bozma onama gerekçe dosya "
+    "tanık bilirkişi rapor sözleşme tazminat alacak faiz icra iflas kira tahliye "
+    "boşanma velayet nafaka miras tapu iptal tescil idari işlem iptali kamulaştırma "
+    "ceza sanık mağdur beraat mahkumiyet hapis adli para cezası anayasa ihlal hak"
+).split()
+
+
+def _write_corpus(path: Path, docs: int, dup_ratio: float, seed: int = 7) -> None:
+    rnd = random.Random(seed)
+    originals: list[str] = []
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(docs):
+            if originals and rnd.random() < dup_ratio:
+                words = rnd.choice(originals).split()
+                words[rnd.randrange(len(words))] = rnd.choice(_WORDS)  # küçük varyant
+                text = " ".join(words)
+            else:
+                text = " ".join(rnd.choice(_WORDS) for _ in range(220))
+                if len(originals) < 5000:
+                    originals.append(text)
+                else:
+                    originals[rnd.randrange(5000)] = text
+            f.write(json.dumps({"id": f"doc-{i}", "text": text}, ensure_ascii=False) + "\n")
+
+
+def _peak_rss_mb() -> tuple[float, float]:
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash dedup benchmark")
+    parser.add_argument("--docs", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--dup-ratio", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-mb", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_dedup_") as tmp:
+        tmp = Path(tmp)
+        for n in args.docs:
+            src = tmp / f"corpus_{n}.jsonl"
+            _write_corpus(src, n, args.dup_ratio)
+            started = time.perf_counter()
+            total, written = merge_and_dedup([src], tmp / f"unique_{n}.jsonl", workers=args.workers,
+                                             cache_mb=args.cache_mb, return_total=True)
+            elapsed = time.perf_counter() - started
+            own, children = _peak_rss_mb()
+            print(f"{n:>9,} doc | {total / elapsed:8.0f} doc/sn | unique {written:,} "
+                  f"| tepe RSS ana={own:.0f} MB worker={children:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
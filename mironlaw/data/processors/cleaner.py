@@ -8,7 +8,7 @@ from __future__ import annotations
 
 import re
 import unicodedata
-from typing import Optional
+from typing import Iterator, Optional
 
 
 _NOISE_PATTERNS = [
@@ -58,12 +58,67 @@ def normalize_text(text: str) -> str:
         clean_lines.append(stripped)
 
     text = "\n".join(clean_lines)
-    text = _MULTI_NEWLINE.sub("\n\n", text)
-    text = _MULTI_SPACE.sub(" ", text)
+    # Regex taraması metin boyunca pahalı; eşleşme mümkün değilse atla
+    # (sekmeler yukarıda boşluğa çevrildi).
+    if "\n\n\n" in text:
+        text = _MULTI_NEWLINE.sub("\n\n", text)
+    if "  " in text:
+        text = _MULTI_SPACE.sub(" ", text)
 
     return text.strip()
 
 
+# Bölüm başlıkları: "BAŞLIK [:;]" ve ardından satır sonu. Başlık her zaman bir
+# satırın son kelimesi olduğundan aday konumlar IGNORECASE ile tüm metni taramak
+# yerine satır sonlarından geriye yürüyerek bulunur; tam desen yalnızca bu
+# konumlarda ve sınırlı bir pencerede çalışır. Yakalanan metin zaten kırpıldığı
+# için pencere (kırpma + pay) sonucu değiştirmez.
+_HUKUM_WORDS = ("HÜKÜM", "SONUÇ", "KARAR")
+_GEREKCE_WORDS = ("GEREKÇE", "DEĞERLENDIRME", "İNCELEME")
+
+_TARAF_RE = re.compile(r"(davac[ıi]\s*[:;]?.+?(?=daval[ıi]|mahkeme|$))", re.IGNORECASE | re.DOTALL)
+_HUKUM_RE = re.compile(
+    rf"(?:{'|'.join(_HUKUM_WORDS)})\s*[:;]?\s*\n(.+?)(?:\n\n|\Z)",
+    re.IGNORECASE | re.DOTALL,
+)
+_GEREKCE_RE = re.compile(
+    rf"(?:{'|'.join(_GEREKCE_WORDS)})\s*[:;]?\s*\n(.+?)(?:{'|'.join(_HUKUM_WORDS)}|\Z)",
+    re.IGNORECASE | re.DOTALL,
+)
+_TARAF_WINDOW = 2000
+_HUKUM_WINDOW = 1000 + 2048
+_GEREKCE_WINDOW = 2000 + 2048
+
+
+def _line_end_words(text: str) -> Iterator[int]:
+    """Her satır sonundan boşluk ve tek [:;] geriye atlanarak ulaşılan kelime sonu konumları."""
+    last = -1
+    n = text.find("\n")
+    while n != -1:
+        e = n
+        while e > 0 and text[e - 1].isspace():
+            e -= 1
+        if e > 0 and text[e - 1] in ":;":
+            e -= 1
+            while e > 0 and text[e - 1].isspace():
+                e -= 1
+        if e != last:
+            last = e
+            yield e
+        n = text.find("\n", n + 1)
+
+
+def _find_section(pattern: re.Pattern, words: tuple[str, ...], text: str, window: int) -> Optional[str]:
+    lengths = sorted({len(w) for w in words}, reverse=True)
+    for end in _line_end_words(text):
+        for length in lengths:
+            if end >= length:
+                m = pattern.match(text, end - length, end - length + window)
+                if m:
+                    return m.group(1)
+    return None
+
+
 def extract_sections(text: str) -> dict:
     """
     Karar metninden yapısal bölümleri çıkarır.
@@ -72,28 +127,19 @@ def extract_sections(text: str) -> dict:
     sections = {"ozet": "", "gerekce": "", "hüküm": "", "taraflar": ""}
 
     # Taraflar: davacı/davalı bloğu
-    taraf_m = re.search(
-        r"(davac[ıi]\s*[:;]?.+?(?=daval[ıi]|mahkeme|$))",
-        text[:2000], re.IGNORECASE | re.DOTALL
-    )
+    taraf_m = _TARAF_RE.search(text[:_TARAF_WINDOW])
     if taraf_m:
         sections["taraflar"] = taraf_m.group(1).strip()[:500]
 
     # Hüküm/Sonuç
-    hüküm_m = re.search(
-        r"(?:HÜKÜM|SONUÇ|KARAR)\s*[:;]?\s*\n(.+?)(?:\n\n|\Z)",
-        text, re.IGNORECASE | re.DOTALL
-    )
-    if hüküm_m:
-        sections["hüküm"] = hüküm_m.group(1).strip()[:1000]
+    hüküm = _find_section(_HUKUM_RE, _HUKUM_WORDS, text, _HUKUM_WINDOW)
+    if hüküm:
+        sections["hüküm"] = hüküm.strip()[:1000]
 
     # Gerekçe
-    gerekce_m = re.search(
-        r"(?:GEREKÇE|DEĞERLENDIRME|İNCELEME)\s*[:;]?\s*\n(.+?)(?:HÜKÜM|SONUÇ|KARAR|\Z)",
-        text, re.IGNORECASE | re.DOTALL
-    )
-    if gerekce_m:
-        sections["gerekce"] = gerekce_m.group(1).strip()[:2000]
+    gerekce = _find_section(_GEREKCE_RE, _GEREKCE_WORDS, text, _GEREKCE_WINDOW)
+    if gerekce:
+        sections["gerekce"] = gerekce.strip()[:2000]
 
     # Özet (ilk 3 paragraf)
     paragraflar = [p.strip() for p in text.split("\n\n") if len(p.strip()) > 50]
@@ -109,11 +155,11 @@ def is_valid(text: str, min_chars: int = 200, min_words: int = 30) -> bool:
     clean = text.strip()
     if len(clean) < min_chars:
         return False
-    words = clean.split()
-    if len(words) < min_words:
+    # Kelime sayısının yalnızca eşiği geçip geçmediği önemli
+    if len(clean.split(None, min_words)) < min_words:
         return False
     # Çok fazla sayı/özel karakter oranı (bozuk OCR)
-    alpha_count = sum(1 for c in clean if c.isalpha())
+    alpha_count = sum(map(str.isalpha, clean))
     if len(clean) > 0 and alpha_count / len(clean) < 0.3:
         return False
     return True
@@ -1,83 +1,280 @@
 """
 MinHash LSH tabanlı deduplication.
 Neredeyse aynı metinleri (paraphrase, OCR varyant) kaldırır.
+
+İki geçişli, deterministik akış:
+  1. İmza  → JSONL satırları parça parça worker process'lere dağıtılır; her
+             worker 5-karakter shingle'ları NumPy ile hash'leyip MinHash
+             imzasını tek seferde (vektörel) hesaplar. İmzalar diske
+             yazılır, RAM'de tutulmaz.
+  2. Band  → İmzalar girdi sırasıyla band'lere bölünür; bucket'lar band
+             anahtarına göre shard'lanmış SQLite dosyalarında tutulur
+             (sabit cache → sabit bellek tavanı). Aday çıkan kayıtlar imza
+             üzerinden tahmini Jaccard ile doğrulanır.
+Son olarak unique satırlar orijinal sırayla çıktıya yazılır. Sonuç worker
+sayısından bağımsızdır.
 """
 from __future__ import annotations
 
+import hashlib
 import json
-import re
+import os
+import shutil
+import sqlite3
+import tempfile
+from array import array
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Iterator, Dict, Any
+from typing import Iterator
 
-from datasketch import MinHash, MinHashLSH
+import numpy as np
 
+SHINGLE_K = 5
+MAX_CHARS = 5000
+CHUNK_LINES = 2000      # worker'a gönderilen satır parçası
+BAND_BATCH = 8192       # band geçişinde tek seferde sorgulanan imza sayısı
+SQLITE_VARS = 900       # IN (...) başına parametre
 
-def _shingle(text: str, k: int = 5) -> set[str]:
-    """k-gram shingle seti."""
-    text = re.sub(r"\s+", " ", text.lower().strip())
-    return {text[i:i+k] for i in range(len(text) - k + 1)} if len(text) >= k else {text}
+_SHIFT = np.uint64(32)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_POLY = np.uint64(0x100000001B3)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
 
+# Satır durumları (geçiş 1 → geçiş 3)
+_EMPTY, _INVALID, _SHORT, _ELIGIBLE = 0, 1, 2, 3
+
+
+# ──────────────────────────────────────────────
+# MinHash
+# ──────────────────────────────────────────────
+
+def _mix64(h: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer — uint64 dizisi üzerinde, taşma bilinçli."""
+    h = h ^ (h >> np.uint64(30))
+    h = h * _MIX1
+    h = h ^ (h >> np.uint64(27))
+    h = h * _MIX2
+    return h ^ (h >> np.uint64(31))
+
+
+def _permutations(num_perm: int, seed: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    # multiply-add-shift: 32-bit anahtar, 64-bit (a tek) katsayı, üst 32 bit
+    gen = np.random.RandomState(seed)
+    a = gen.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+    b = gen.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+    return (a * np.uint64(2) + np.uint64(1))[:, None], (b * np.uint64(2))[:, None]
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_K) -> np.ndarray:
+    """k-karakter shingle'ların 32-bit hash'leri (normalize edilmiş metin üzerinde)."""
+    text = " ".join(text.lower().split())
+    cps = np.frombuffer(text.encode("utf-32-le"), dtype="<u4").astype(np.uint64)
+    n = len(cps) - k + 1
+    if n <= 0:
+        n, k = 1, len(cps)
+    h = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(k):
+            h = h * _POLY + cps[j:j + n]
+        return _mix64(h) & _MAX_HASH
+
+
+def minhash_signature(text: str, a: np.ndarray, b: np.ndarray, k: int = SHINGLE_K) -> np.ndarray:
+    """Tüm permütasyonlar tek matris işlemiyle: min((a*h + b) >> 32) → uint32[num_perm]."""
+    hv = shingle_hashes(text, k)
+    with np.errstate(over="ignore"):
+        phv = a * hv
+        phv += b
+        phv >>= _SHIFT
+    return phv.min(axis=1).astype(np.uint32)
+
+
+def optimal_bands(threshold: float, num_perm: int) -> tuple[int, int]:
+    """(band sayısı, band genişliği) — FP ve FN alanlarının eşit ağırlıklı minimumu."""
+    xs = np.linspace(0.0, 1.0, 201)
+
+    def _area(lo, hi, b, r, fp):
+        x = xs[(xs >= lo) & (xs <= hi)]
+        p = 1 - (1 - x ** r) ** b
+        y = p if fp else 1 - p
+        return float(np.trapezoid(y, x)) if hasattr(np, "trapezoid") else float(np.trapz(y, x))
+
+    best, best_err = (1, num_perm), float("inf")
+    for b in range(1, num_perm + 1):
+        for r in range(1, num_perm // b + 1):
+            err = 0.5 * _area(0.0, threshold, b, r, True) + 0.5 * _area(threshold, 1.0, b, r, False)
+            if err < best_err:
+                best, best_err = (b, r), err
+    return best
+
+
+def band_keys(sigs: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """(m, num_perm) imzalardan (m, bands) int64 bucket anahtarı; band indisi anahtara karışır."""
+    m = sigs.shape[0]
+    parts = sigs[:, :bands * rows].reshape(m, bands, rows).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        h = np.arange(1, bands + 1, dtype=np.uint64)[None, :] * _MIX2
+        for j in range(rows):
+            h = _mix64(h * _POLY + parts[:, :, j])
+    return h.view(np.int64)
+
+
+def _id_key(doc_id: str) -> int:
+    digest = hashlib.blake2b(b"id:" + doc_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
 
-def dedup_jsonl(
-    input_path: str | Path,
-    output_path: str | Path,
-    threshold: float = 0.85,
-    num_perm: int = 128,
-    min_chars: int = 200,
-) -> tuple[int, int]:
-    """
-    JSONL dosyasını okuyup duplicate'leri kaldırarak yeni dosyaya yazar.
-    Returns: (toplam_okunan, yazılan_unique)
-    """
-    input_path = Path(input_path)
-    output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
-    total = 0
-    written = 0
+# ──────────────────────────────────────────────
+# Geçiş 1: imzalar (worker process'lerde)
+# ──────────────────────────────────────────────
 
-    with (
-        input_path.open("r", encoding="utf-8") as fin,
-        output_path.open("w", encoding="utf-8") as fout,
-    ):
-        for line in fin:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                rec = json.loads(line)
-            except Exception:
-                continue
+_worker_params: dict = {}
 
-            total += 1
-            text = (rec.get("text") or "").strip()
-            if len(text) < min_chars:
-                continue
 
-            doc_id = str(rec.get("id") or total)
+def _init_worker(num_perm: int, min_chars: int, seed: int) -> None:
+    a, b = _permutations(num_perm, seed)
+    _worker_params.update(a=a, b=b, num_perm=num_perm, min_chars=min_chars)
 
-            m = MinHash(num_perm=num_perm)
-            for s in _shingle(text[:5000]):
-                m.update(s.encode("utf-8"))
 
-            try:
-                result = lsh.query(m)
-                if result:
-                    continue  # duplicate — atla
-                lsh.insert(doc_id, m)
-            except Exception:
-                pass
+def _signature_chunk(lines: list[str]) -> tuple[bytes, list, np.ndarray]:
+    """Satır parçası → (satır durumları, uygun kayıtların id'leri, imza matrisi)."""
+    p = _worker_params
+    status = bytearray(len(lines))
+    ids: list = []
+    sigs = []
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except Exception:
+            status[i] = _INVALID
+            continue
+        text = (rec.get("text") or "").strip()
+        if len(text) < p["min_chars"]:
+            status[i] = _SHORT
+            continue
+        status[i] = _ELIGIBLE
+        ids.append(str(rec["id"]) if rec.get("id") else None)
+        sigs.append(minhash_signature(text[:MAX_CHARS], p["a"], p["b"]))
+    matrix = np.vstack(sigs) if sigs else np.empty((0, p["num_perm"]), dtype=np.uint32)
+    return bytes(status), ids, matrix
 
-            fout.write(json.dumps(rec, ensure_ascii=False) + "\n")
-            written += 1
 
-            if written % 50_000 == 0:
-                print(f"  [Dedup] {total:,} okundu, {written:,} unique")
+def _read_chunks(input_files: list[Path]) -> Iterator[list[str]]:
+    for fpath in input_files:
+        print(f"[Merge] İşleniyor: {fpath.name}")
+        with fpath.open("r", encoding="utf-8") as fin:
+            chunk: list[str] = []
+            for line in fin:
+                chunk.append(line)
+                if len(chunk) >= CHUNK_LINES:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
 
-    print(f"[Dedup] Tamamlandı: {total:,} → {written:,} unique (kaldırılan: {total-written:,})")
-    return total, written
 
+# ──────────────────────────────────────────────
+# Geçiş 2: shard'lı, diske taşan LSH bucket'ları
+# ──────────────────────────────────────────────
+
+class ShardedBuckets:
+    """bucket anahtarı → ilk (temsilci) satır. Anahtar % shards ile SQLite dosyalarına dağılır."""
+
+    def __init__(self, directory: Path, shards: int = 16, cache_mb: int = 256):
+        self.shards = max(1, shards)
+        per_shard_kb = max(1024, cache_mb * 1024 // self.shards)
+        self._conns = []
+        for i in range(self.shards):
+            conn = sqlite3.connect(str(directory / f"lsh_{i:03d}.sqlite"))
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(f"PRAGMA cache_size=-{per_shard_kb}")
+            conn.execute("CREATE TABLE IF NOT EXISTS b (key INTEGER PRIMARY KEY, doc INTEGER NOT NULL)")
+            self._conns.append(conn)
+
+    def _by_shard(self, keys) -> dict[int, list[int]]:
+        groups: dict[int, list[int]] = {}
+        for key in keys:
+            groups.setdefault(key % self.shards, []).append(key)
+        return groups
+
+    def get_many(self, keys) -> dict[int, int]:
+        found: dict[int, int] = {}
+        for shard, group in self._by_shard(keys).items():
+            conn = self._conns[shard]
+            for i in range(0, len(group), SQLITE_VARS):
+                part = group[i:i + SQLITE_VARS]
+                marks = ",".join("?" * len(part))
+                found.update(conn.execute(f"SELECT key, doc FROM b WHERE key IN ({marks})", part))
+        return found
+
+    def put_many(self, items: dict[int, int]) -> None:
+        for shard, group in self._by_shard(items).items():
+            conn = self._conns[shard]
+            conn.executemany("INSERT OR IGNORE INTO b (key, doc) VALUES (?, ?)",
+                             [(k, items[k]) for k in group])
+            conn.commit()
+
+    def close(self) -> None:
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+
+
+def _band_pass(sig_path: Path, num_perm: int, id_keys: np.ndarray, store: ShardedBuckets,
+               threshold: float, bands: int, rows: int) -> np.ndarray:
+    """Girdi sırasıyla: id tekrarı veya doğrulanmış LSH adayı → duplicate. keep maskesi döner.
+
+    İmzalar dosyadan blok blok okunur; önceki bloklardaki temsilciler tek satır
+    pread ile alınır — bellek blok boyutuyla sınırlı kalır.
+    """
+    n = len(id_keys)
+    keep = np.zeros(n, dtype=bool)
+    row_bytes = num_perm * 4
+    min_equal = threshold * num_perm
+    with sig_path.open("rb") as sig_in:
+        fd = sig_in.fileno()
+        for start in range(0, n, BAND_BATCH):
+            end = min(n, start + BAND_BATCH)
+            block = np.fromfile(sig_in, dtype="<u4", count=(end - start) * num_perm).reshape(-1, num_perm)
+            keys = band_keys(block, bands, rows).tolist()
+            ids = id_keys[start:end].tolist()
+            found = store.get_many({k for row in keys for k in row} | set(ids))
+            pending: dict[int, int] = {}
+
+            for j in range(end - start):
+                if ids[j] in found or ids[j] in pending:
+                    continue
+                duplicate = False
+                for key in keys[j]:
+                    rep = found.get(key, pending.get(key))
+                    if rep is None:
+                        continue
+                    if rep >= start:
+                        rep_sig = block[rep - start]
+                    else:
+                        rep_sig = np.frombuffer(os.pread(fd, row_bytes, rep * row_bytes), dtype="<u4")
+                    if np.count_nonzero(block[j] == rep_sig) >= min_equal:
+                        duplicate = True
+                        break
+                if duplicate:
+                    continue
+                keep[start + j] = True
+                pending[ids[j]] = start + j
+                for key in keys[j]:
+                    if key not in found:
+                        pending.setdefault(key, start + j)
+            store.put_many(pending)
+    return keep
+
+
+# ──────────────────────────────────────────────
+# Public API
+# ──────────────────────────────────────────────
 
 def merge_and_dedup(
     input_files: list[str | Path],
@@ -85,63 +282,104 @@ def merge_and_dedup(
     threshold: float = 0.85,
     num_perm: int = 128,
     min_chars: int = 200,
-) -> int:
+    workers: int | None = None,
+    shards: int = 16,
+    cache_mb: int = 256,
+    work_dir: str | Path | None = None,
+    seed: int = 1,
+    return_total: bool = False,
+) -> int | tuple[int, int]:
     """
     Birden fazla JSONL dosyasını birleştirip dedup yapar.
-    Büyük dataset için: streaming, RAM'e sığdırır.
+    Büyük dataset için: imzalar worker process'lerde, imza ve bucket'lar diskte;
+    RAM kullanımı kayıt sayısıyla değil parça boyutu ve cache_mb ile sınırlı.
     """
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    files = []
+    for fpath in map(Path, input_files):
+        if fpath.exists():
+            files.append(fpath)
+        else:
+            print(f"[WARN] Dosya yok: {fpath}")
 
-    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
-    seen_ids: set[str] = set()
-    written = 0
-    total = 0
-
-    with output_path.open("w", encoding="utf-8") as fout:
-        for fpath in input_files:
-            fpath = Path(fpath)
-            if not fpath.exists():
-                print(f"[WARN] Dosya yok: {fpath}")
-                continue
-
-            print(f"[Merge] İşleniyor: {fpath.name}")
-            with fpath.open("r", encoding="utf-8") as fin:
-                for line in fin:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        rec = json.loads(line)
-                    except Exception:
-                        continue
+    workers = workers or int(os.getenv("DEDUP_WORKERS", str(os.cpu_count() or 1)))
+    bands, rows = optimal_bands(threshold, num_perm)
+    tmp = Path(tempfile.mkdtemp(prefix="dedup_", dir=work_dir or output_path.parent))
 
-                    total += 1
-                    doc_id = str(rec.get("id") or total)
-                    text = (rec.get("text") or "").strip()
+    try:
+        # ── Geçiş 1: imzalar → diske
+        sig_path = tmp / "signatures.u32"
+        status = bytearray()
+        id_keys = array("q")
+        total = 0
+        params = (num_perm, min_chars, seed)
+        pool = Pool(workers, initializer=_init_worker, initargs=params) if workers > 1 else None
+        if pool is None:
+            _init_worker(*params)
+        try:
+            results = (pool.imap(_signature_chunk, _read_chunks(files)) if pool
+                       else map(_signature_chunk, _read_chunks(files)))
+            with sig_path.open("wb") as sig_out:
+                for chunk_status, ids, matrix in results:
+                    id_iter = iter(ids)
+                    for s in chunk_status:
+                        if s >= _SHORT:
+                            total += 1
+                        if s == _ELIGIBLE:
+                            doc_id = next(id_iter) or str(total)
+                            id_keys.append(_id_key(doc_id))
+                    status += chunk_status
+                    sig_out.write(matrix.astype("<u4", copy=False).tobytes())
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
-                    if len(text) < min_chars:
-                        continue
-                    if doc_id in seen_ids:
-                        continue
+        eligible = len(id_keys)
+        print(f"  [Dedup] {total:,} okundu, {eligible:,} imza (band={bands}x{rows}, worker={workers})")
 
-                    m = MinHash(num_perm=num_perm)
-                    for s in _shingle(text[:5000]):
-                        m.update(s.encode("utf-8"))
+        # ── Geçiş 2: band bucket'ları
+        store = ShardedBuckets(tmp, shards=shards, cache_mb=cache_mb)
+        try:
+            keep = _band_pass(sig_path, num_perm, np.frombuffer(id_keys, dtype=np.int64),
+                              store, threshold, bands, rows)
+        finally:
+            store.close()
+        del id_keys
 
-                    try:
-                        if lsh.query(m):
-                            continue
-                        lsh.insert(doc_id, m)
-                    except Exception:
-                        pass
+        # ── Geçiş 3: unique satırları sırayla yaz
+        written = 0
+        line_no = 0
+        row = 0
+        with output_path.open("w", encoding="utf-8") as fout:
+            for fpath in files:
+                with fpath.open("r", encoding="utf-8") as fin:
+                    for line in fin:
+                        if status[line_no] == _ELIGIBLE:
+                            if keep[row]:
+                                fout.write(line.strip() + "\n")
+                                written += 1
+                            row += 1
+                        line_no += 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
 
-                    seen_ids.add(doc_id)
-                    fout.write(json.dumps(rec, ensure_ascii=False) + "\n")
-                    written += 1
+    print(f"[Merge+Dedup] {total:,} → {written:,} unique")
+    return (total, written) if return_total else written
 
-                    if written % 100_000 == 0:
-                        print(f"  [Merge] {total:,} okundu, {written:,} unique")
 
-    print(f"[Merge+Dedup] {total:,} → {written:,} unique")
-    return written
+def dedup_jsonl(
+    input_path: str | Path,
+    output_path: str | Path,
+    threshold: float = 0.85,
+    num_perm: int = 128,
+    min_chars: int = 200,
+    **kwargs,
+) -> tuple[int, int]:
+    """
+    JSONL dosyasını okuyup duplicate'leri kaldırarak yeni dosyaya yazar.
+    Returns: (toplam_okunan, yazılan_unique)
+    """
+    return merge_and_dedup([input_path], output_path, threshold=threshold, num_perm=num_perm,
+                           min_chars=min_chars, return_total=True, **kwargs)
@@ -8,9 +8,13 @@ Ana pipeline bittikten sonra çalıştır:
 from __future__ import annotations
 
 import json
+import os
 import random
+import shutil
+import tempfile
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 
 ROOT = Path(__file__).resolve().parents[2]
 RAW_DIR = ROOT / "raw_data"
@@ -35,9 +39,8 @@ def _msg(user: str, asst: str) -> Dict:
     }
 
 
-def convert_orion_qa(path: Path) -> List[Dict]:
+def convert_orion_qa(path: Path) -> Iterator[Dict]:
     """OrionCAF/turkish_law_qa_dataset: question + answer + context"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -49,13 +52,11 @@ def convert_orion_qa(path: Path) -> List[Dict]:
             user = f"{q}"
             if ctx:
                 user = f"Bağlam: {ctx[:600]}\n\nSoru: {q}"
-            results.append(_msg(user, a))
-    return results
+            yield _msg(user, a)
 
 
-def convert_eqa(path: Path) -> List[Dict]:
+def convert_eqa(path: Path) -> Iterator[Dict]:
     """yeniguno/turkish-law-eqa: question + context + answers"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -73,13 +74,11 @@ def convert_eqa(path: Path) -> List[Dict]:
             user = f"Hukuki soru: {q}"
             if ctx:
                 user = f"Metin: {ctx[:800]}\n\nSoru: {q}"
-            results.append(_msg(user, ans_text))
-    return results
+            yield _msg(user, ans_text)
 
 
-def convert_chatbot(path: Path) -> List[Dict]:
+def convert_chatbot(path: Path) -> Iterator[Dict]:
     """Renicames/turkish-law-chatbot: instruction + input + output"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -91,13 +90,11 @@ def convert_chatbot(path: Path) -> List[Dict]:
             user = inst
             if inp:
                 user = f"{inst}\n\n{inp}" if inst else inp
-            results.append(_msg(user, out))
-    return results
+            yield _msg(user, out)
 
 
-def convert_aym(path: Path) -> List[Dict]:
+def convert_aym(path: Path) -> Iterator[Dict]:
     """icgcihan/Turkish_Constutional_Court_Decisions"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -107,37 +104,33 @@ def convert_aym(path: Path) -> List[Dict]:
             if not text or len(text) < 100:
                 continue
             if decision:
-                results.append(_msg(
+                yield _msg(
                     f"Bu Anayasa Mahkemesi kararının sonucu nedir?\n\n{text[:2000]}",
                     f"Anayasa Mahkemesi şu kararı vermiştir:\n\n{decision[:800]}"
-                ))
+                )
             if summary:
-                results.append(_msg(
+                yield _msg(
                     f"Bu Anayasa Mahkemesi kararını özetle:\n\n{text[:2000]}",
                     summary[:800]
-                ))
-    return results
+                )
 
 
-def convert_koclab_aym(path: Path) -> List[Dict]:
+def convert_koclab_aym(path: Path) -> Iterator[Dict]:
     """KocLab-Bilkent/turkish-constitutional-court"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
             text = str(r.get("text") or r.get("karar") or "").strip()
             if not text or len(text) < 100:
                 continue
-            results.append(_msg(
+            yield _msg(
                 f"Bu Anayasa Mahkemesi kararını hukuki açıdan analiz et:\n\n{text[:2500]}",
                 f"Bu karar, Anayasa Mahkemesi tarafından şu değerlendirme ile karara bağlanmıştır:\n\n{text[:1200]}"
-            ))
-    return results
+            )
 
 
-def convert_yargitay_2025(path: Path) -> List[Dict]:
+def convert_yargitay_2025(path: Path) -> Iterator[Dict]:
     """Yargıtay 9. Daire 2025 kararları"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -153,16 +146,14 @@ def convert_yargitay_2025(path: Path) -> List[Dict]:
                 header += f" | Esas: {esas}"
             if karar:
                 header += f" | Karar: {karar}"
-            results.append(_msg(
+            yield _msg(
                 f"Aşağıdaki Yargıtay kararını analiz et:\n\n{header}\n\n{text[:2500]}",
                 f"Bu Yargıtay kararının analizi:\n\n{text[:1500]}"
-            ))
-    return results
+            )
 
 
-def convert_law_qa(path: Path) -> List[Dict]:
+def convert_law_qa(path: Path) -> Iterator[Dict]:
     """turkish_law_dataset.xls / extra_law_qa: soru + cevap + context"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -170,13 +161,11 @@ def convert_law_qa(path: Path) -> List[Dict]:
             a = str(r.get("answer") or r.get("cevap") or "").strip()
             if not q or not a or len(a) < 30:
                 continue
-            results.append(_msg(q, a))
-    return results
+            yield _msg(q, a)
 
 
-def convert_legal_nli(path: Path) -> List[Dict]:
+def convert_legal_nli(path: Path) -> Iterator[Dict]:
     """Turkish-NLI/legal_nli_TR_V1: premise + hypothesis + label"""
-    results = []
     label_map = {
         "entailment": "Bu iki ifade arasında çıkarım ilişkisi vardır. İkinci ifade, birincisinden mantıksal olarak çıkmaktadır.",
         "contradiction": "Bu iki ifade birbiriyle çelişmektedir. Bir doğruysa, diğeri yanlış olmalıdır.",
@@ -196,17 +185,15 @@ def convert_legal_nli(path: Path) -> List[Dict]:
             label_text = label_map.get(label, "")
             if not label_text:
                 continue
-            results.append(_msg(
+            yield _msg(
                 f"Aşağıdaki iki hukuki ifade arasındaki ilişkiyi değerlendir:\n\n"
                 f"İfade 1: {premise}\n\nİfade 2: {hyp}",
                 label_text
-            ))
-    return results
+            )
 
 
-def convert_ontology(path: Path) -> List[Dict]:
+def convert_ontology(path: Path) -> Iterator[Dict]:
     """hayriyigit/turkish-law-ontology: instruction-following format"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -216,16 +203,14 @@ def convert_ontology(path: Path) -> List[Dict]:
             if not inp or not out or len(out) < 50:
                 continue
             # Use the decision text as the basis for Q&A
-            results.append(_msg(
+            yield _msg(
                 f"Bu mahkeme kararını analiz et ve yapılandırılmış bilgi çıkar:\n\n{inp[:2000]}",
                 out[:1500]
-            ))
-    return results
+            )
 
 
-def convert_mevzuat(path: Path) -> List[Dict]:
+def convert_mevzuat(path: Path) -> Iterator[Dict]:
     """muhammetakkurt/mevzuat-gov-dataset: kanun metinleri → Q&A"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -236,20 +221,18 @@ def convert_mevzuat(path: Path) -> List[Dict]:
                 continue
             label = kanun_adi or "Bu kanun"
             no_str = f" (Kanun No: {kanun_no})" if kanun_no else ""
-            results.append(_msg(
+            yield _msg(
                 f"{label}{no_str} hakkında bilgi verir misin?",
                 f"{label}{no_str} hükümleri:\n\n{text[:2800]}"
-            ))
-            results.append(_msg(
+            )
+            yield _msg(
                 f"{label}'nun temel maddelerini açıkla.",
                 f"Bu kanunun temel hükümleri şunlardır:\n\n{text[:2200]}"
-            ))
-    return results
+            )
 
 
-def convert_mevzuat_qa(path: Path) -> List[Dict]:
+def convert_mevzuat_qa(path: Path) -> Iterator[Dict]:
     """yusufbaykaloglu/University_Mevzuat_QA_v2: questions/answers fields"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -257,13 +240,11 @@ def convert_mevzuat_qa(path: Path) -> List[Dict]:
             a = str(r.get("answer") or r.get("answers") or r.get("cevap") or "").strip()
             if not q or not a or len(a) < 20:
                 continue
-            results.append(_msg(q, a))
-    return results
+            yield _msg(q, a)
 
 
-def convert_academic_theses(path: Path) -> List[Dict]:
+def convert_academic_theses(path: Path) -> Iterator[Dict]:
     """umutertugrul/turkish-academic-theses-dataset: hukuk tez özetleri"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -271,16 +252,14 @@ def convert_academic_theses(path: Path) -> List[Dict]:
             text = str(r.get("text") or "").strip()
             if not title or not text or len(text) < 100:
                 continue
-            results.append(_msg(
+            yield _msg(
                 f"'{title}' konulu hukuk tezini özetle.",
                 text[:2000]
-            ))
-    return results
+            )
 
 
-def convert_hukuk_soru_cevap(path: Path) -> List[Dict]:
+def convert_hukuk_soru_cevap(path: Path) -> Iterator[Dict]:
     """alibayram/hukuk_soru_cevap"""
-    results = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             r = json.loads(line)
@@ -288,11 +267,10 @@ def convert_hukuk_soru_cevap(path: Path) -> List[Dict]:
             a = str(r.get("answer") or r.get("cevap") or "").strip()
             if not q or not a or len(a) < 20:
                 continue
-            results.append(_msg(q, a))
-    return results
+            yield _msg(q, a)
 
 
-def convert_yargitay_2025_hf(path: Path) -> List[Dict]:
+def convert_yargitay_2025_hf(path: Path) -> Iterator[Dict]:
     """aketen0654/9_yargitay_kararlari_2025"""
     return convert_yargitay_2025(path)
 
@@ -317,23 +295,49 @@ CONVERTERS = [
 ]
 
 
-def build_extra_qa(output_path: Path) -> int:
-    """Tüm extra datasetleri Q&A formatına çevirip output_path'e yazar."""
+def _convert_file(job: tuple) -> tuple[str, int, Optional[str]]:
+    """Tek kaynak dosyayı kendi parça dosyasına çevirir (worker process'te)."""
+    filename, converter, part_path = job
+    count = 0
+    try:
+        with Path(part_path).open("w", encoding="utf-8") as fout:
+            for ex in converter(RAW_DIR / filename):
+                fout.write(json.dumps(ex, ensure_ascii=False) + "\n")
+                count += 1
+    except Exception as e:
+        return filename, 0, str(e)
+    return filename, count, None
+
+
+def build_extra_qa(output_path: Path, workers: Optional[int] = None) -> int:
+    """
+    Tüm extra datasetleri Q&A formatına çevirip output_path'e yazar.
+    Her kaynak ayrı bir process'te kendi parça dosyasına akıtılır; parçalar
+    CONVERTERS sırasıyla birleştirilir. Hata veren kaynak tümüyle atlanır.
+    """
+    workers = workers or int(os.getenv("QA_WORKERS", str(os.cpu_count() or 1)))
+    tmp = Path(tempfile.mkdtemp(prefix="extra_qa_", dir=output_path.parent))
+    jobs = []
+    for i, (filename, converter) in enumerate(CONVERTERS):
+        if not (RAW_DIR / filename).exists():
+            print(f"  [SKIP] {filename} bulunamadı")
+            continue
+        jobs.append((filename, converter, str(tmp / f"{i:03d}.jsonl")))
+
     total = 0
-    with output_path.open("w", encoding="utf-8") as fout:
-        for filename, converter in CONVERTERS:
-            src = RAW_DIR / filename
-            if not src.exists():
-                print(f"  [SKIP] {filename} bulunamadı")
-                continue
-            try:
-                examples = converter(src)
-                for ex in examples:
-                    fout.write(json.dumps(ex, ensure_ascii=False) + "\n")
-                total += len(examples)
-                print(f"  ✓ {filename}: {len(examples):,} örnek")
-            except Exception as e:
-                print(f"  [HATA] {filename}: {e}")
+    try:
+        with Pool(max(1, min(workers, len(jobs) or 1))) as pool, \
+                output_path.open("w", encoding="utf-8") as fout:
+            for job, (filename, count, error) in zip(jobs, pool.imap(_convert_file, jobs)):
+                if error:
+                    print(f"  [HATA] {filename}: {error}")
+                    continue
+                with open(job[2], "r", encoding="utf-8") as part:
+                    shutil.copyfileobj(part, fout)
+                total += count
+                print(f"  ✓ {filename}: {count:,} örnek")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
     return total
 
 
@@ -375,13 +379,9 @@ def main():
 
     # Split güncelle
     if train_path.exists():
-        import random as rnd
-        lines = train_path.read_text(encoding="utf-8").strip().splitlines()
-        rnd.shuffle(lines)
-        split = int(len(lines) * 0.98)
-        (PROCESSED_DIR / "train.jsonl").write_text("\n".join(lines[:split]), encoding="utf-8")
-        (PROCESSED_DIR / "val.jsonl").write_text("\n".join(lines[split:]), encoding="utf-8")
-        print(f"\nSplit: train={split:,} | val={len(lines)-split:,}")
+        from .splitter import split_jsonl
+        n_train, n_val = split_jsonl(train_path, PROCESSED_DIR, val_ratio=0.02)
+        print(f"\nSplit: train={n_train:,} | val={n_val:,}")
 
     print("\n=== TAMAMLANDI ===")
 
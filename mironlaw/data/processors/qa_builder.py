@@ -17,13 +17,26 @@ Strateji: Her karar için birden fazla Q&A varyantı üret (5-8 adet)
 from __future__ import annotations
 
 import json
+import os
 import random
 import re
+import time
+from collections import Counter
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Iterator, Dict, Any, List
+from typing import Iterator, Dict, Any, List, Tuple
 
 from .cleaner import normalize_text, extract_sections, is_valid
 
+CHUNK_LINES = 500       # worker'a gönderilen iş birimi (satır)
+DEFAULT_SEED = 42
+
+_PARAGRAPH_SPLIT = re.compile(r"\n{2,}")
+
+# Template'lerin kullandığı RNG; her kayıt için (seed, kayıt sırası) ile
+# yeniden tohumlanır, böylece çıktı worker sayısından bağımsızdır.
+_rng = random.Random(DEFAULT_SEED)
+
 SYSTEM_PROMPT = (
     "Sen MironLaw 1.0, Türk hukuku konusunda uzmanlaşmış bir yapay zeka asistanısın. "
     "Yargıtay, Danıştay ve Anayasa Mahkemesi içtihatlarına hakim, "
@@ -51,7 +64,7 @@ def _karar_header(rec: Dict) -> str:
 
 def _paragraflar(text: str, min_len: int = 80) -> List[str]:
     """Metni anlamlı paragraflara böler."""
-    ps = [p.strip() for p in re.split(r"\n{2,}", text) if len(p.strip()) >= min_len]
+    ps = [p.strip() for p in _PARAGRAPH_SPLIT.split(text) if len(p.strip()) >= min_len]
     return ps
 
 
@@ -169,7 +182,7 @@ def _t_soru_cevap(rec: Dict, sections: Dict, text: str) -> Dict:
         return None
 
     # Rastgele bir paragraf kullanıcı sorusu gibi davranacak
-    soru_para = random.choice(ps[1:-1]) if len(ps) > 3 else ps[0]
+    soru_para = _rng.choice(ps[1:-1]) if len(ps) > 3 else ps[0]
     cevap_para = sections["hüküm"] or (ps[-1] if ps else text[-500:])
 
     return {
@@ -193,16 +206,27 @@ TEMPLATE_FUNCS = [
 MEVZUAT_TEMPLATES = [_t_mevzuat_analiz, _t_ozet_iste]
 
 
-def record_to_examples(rec: Dict[str, Any]) -> List[Dict]:
+def record_to_examples(rec: Dict[str, Any], stats: Counter | None = None) -> List[Dict]:
     """
     Tek bir ham karar kaydından birden fazla eğitim örneği üretir.
     Returns: List of {messages: [...]} dicts
+    stats verilirse aşama süreleri (sn) ve sayaçlar buraya eklenir.
     """
+    stats = stats if stats is not None else Counter()
+
+    t0 = time.perf_counter()
     text = normalize_text(rec.get("text") or "")
-    if not is_valid(text):
+    valid = is_valid(text)
+    t1 = time.perf_counter()
+    stats["t_normalize"] += t1 - t0
+    if not valid:
+        stats["invalid"] += 1
         return []
 
     sections = extract_sections(text)
+    t2 = time.perf_counter()
+    stats["t_sections"] += t2 - t1
+
     source = rec.get("source", "")
     examples = []
 
@@ -216,54 +240,149 @@ def record_to_examples(rec: Dict[str, Any]) -> List[Dict]:
                 asst = ex["messages"][-1]["content"]
                 if len(asst.strip()) >= 50:
                     examples.append(ex)
+                else:
+                    stats["filtered"] += 1
         except Exception:
-            pass
+            stats["template_errors"] += 1
 
+    stats["t_templates"] += time.perf_counter() - t2
+    stats["records_used"] += 1
     return examples
 
 
+def _build_chunk(args: Tuple[int, List[str], int]) -> Tuple[List[str], Counter]:
+    """İş birimi: satırlar → serileştirilmiş örnekler + aşama sayaçları."""
+    first_line_no, lines, seed = args
+    stats: Counter = Counter()
+    out: List[str] = []
+    for offset, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except Exception:
+            stats["json_errors"] += 1
+            continue
+        stats["records"] += 1
+
+        _rng.seed(f"{seed}:{first_line_no + offset}")
+        examples = record_to_examples(rec, stats)
+        t0 = time.perf_counter()
+        out.extend(json.dumps(ex, ensure_ascii=False) for ex in examples)
+        stats["t_serialize"] += time.perf_counter() - t0
+    return out, stats
+
+
+def _iter_work(input_files: List[str | Path], seed: int) -> Iterator[Tuple[int, List[str], int]]:
+    """Girdi dosyalarını (global satır no, satırlar, seed) iş birimlerine böler."""
+    line_no = 0
+    for fpath in input_files:
+        fpath = Path(fpath)
+        if not fpath.exists():
+            print(f"[WARN] Dosya yok: {fpath}")
+            continue
+
+        print(f"[QA Builder] İşleniyor: {fpath.name}")
+        with fpath.open("r", encoding="utf-8") as fin:
+            chunk: List[str] = []
+            for line in fin:
+                chunk.append(line)
+                if len(chunk) >= CHUNK_LINES:
+                    yield line_no, chunk, seed
+                    line_no += len(chunk)
+                    chunk = []
+            if chunk:
+                yield line_no, chunk, seed
+                line_no += len(chunk)
+
+
+def iter_examples(
+    input_files: List[str | Path],
+    workers: int | None = None,
+    seed: int = DEFAULT_SEED,
+    stats: Counter | None = None,
+) -> Iterator[str]:
+    """
+    Serileştirilmiş eğitim örneklerini girdi sırasıyla üretir.
+    İş birimleri worker process'lerde işlenir; çıktı worker sayısından bağımsızdır.
+    """
+    workers = workers or int(os.getenv("QA_WORKERS", str(os.cpu_count() or 1)))
+    stats = stats if stats is not None else Counter()
+    work = _iter_work(input_files, seed)
+
+    if workers <= 1:
+        results = map(_build_chunk, work)
+        pool = None
+    else:
+        pool = Pool(workers)
+        results = pool.imap(_build_chunk, work)
+    try:
+        for lines, chunk_stats in results:
+            stats.update(chunk_stats)
+            yield from lines
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def _print_stats(stats: Counter, written: int, elapsed: float) -> None:
+    print(
+        f"[QA Builder] kayıt={stats['records']:,} kullanılan={stats['records_used']:,} "
+        f"geçersiz={stats['invalid']:,} json_hata={stats['json_errors']:,} "
+        f"filtrelenen={stats['filtered']:,} template_hata={stats['template_errors']:,}"
+    )
+    stage_total = sum(stats[k] for k in ("t_normalize", "t_sections", "t_templates", "t_serialize")) or 1.0
+    print(
+        "[QA Builder] aşama süreleri (worker toplamı): "
+        + " | ".join(
+            f"{name} {stats[key]:.1f}s (%{100 * stats[key] / stage_total:.0f})"
+            for name, key in (
+                ("normalize", "t_normalize"),
+                ("sections", "t_sections"),
+                ("templates", "t_templates"),
+                ("serialize", "t_serialize"),
+            )
+        )
+    )
+    print(f"[QA Builder] {written / max(elapsed, 1e-9):,.0f} örnek/sn ({elapsed:.1f}s)")
+
+
 def build_dataset(
     input_files: List[str | Path],
     output_path: str | Path,
     max_examples: int | None = None,
+    workers: int | None = None,
+    seed: int = DEFAULT_SEED,
 ) -> int:
     """
     Ham JSONL dosyalarından eğitim dataseti oluşturur.
+    Aynı girdi ve seed için çıktı, worker sayısından bağımsız olarak aynıdır.
     """
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     total_written = 0
-
-    with output_path.open("w", encoding="utf-8") as fout:
-        for fpath in input_files:
-            fpath = Path(fpath)
-            if not fpath.exists():
-                print(f"[WARN] Dosya yok: {fpath}")
-                continue
-
-            print(f"[QA Builder] İşleniyor: {fpath.name}")
-            with fpath.open("r", encoding="utf-8") as fin:
-                for line in fin:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        rec = json.loads(line)
-                    except Exception:
-                        continue
-
-                    examples = record_to_examples(rec)
-                    for ex in examples:
-                        fout.write(json.dumps(ex, ensure_ascii=False) + "\n")
-                        total_written += 1
-
-                        if max_examples and total_written >= max_examples:
-                            print(f"[QA Builder] max_examples={max_examples} limitine ulaşıldı")
-                            return total_written
-
-                    if total_written % 100_000 == 0 and total_written > 0:
-                        print(f"  [QA Builder] {total_written:,} örnek üretildi")
-
+    stats: Counter = Counter()
+    started = time.perf_counter()
+
+    examples = iter_examples(input_files, workers=workers, seed=seed, stats=stats)
+    try:
+        with output_path.open("w", encoding="utf-8") as fout:
+            for line in examples:
+                fout.write(line + "\n")
+                total_written += 1
+
+                if max_examples and total_written >= max_examples:
+                    print(f"[QA Builder] max_examples={max_examples} limitine ulaşıldı")
+                    break
+
+                if total_written % 100_000 == 0:
+                    print(f"  [QA Builder] {total_written:,} örnek üretildi")
+    finally:
+        examples.close()
+
+    _print_stats(stats, total_written, time.perf_counter() - started)
     print(f"[QA Builder] TOPLAM: {total_written:,} eğitim örneği")
     return total_written
@@ -0,0 +1,223 @@
+"""
+Bellek dışı (out-of-core) train/validation split.
+
+  1. Dağıt  → Her satır, içeriğinin (seed'li) hash'i ile deterministik olarak
+              train/val'e ve bir karıştırma bucket'ına atanır; bucket'lar geçici
+              dosyalara yazılır. Aynı satır her çalıştırmada aynı split'e düşer.
+  2. Karıştır → Her bucket tek başına RAM'e alınır, seed'li RNG ile karıştırılır
+              ve çıktıya eklenir. Bellek kullanımı ~bucket_mb ile sınırlıdır.
+
+Çıktı JSONL ya da Parquet (training tarafında memory-map ile okunabilir);
+Parquet kayıtların tüm alanlarını taşır. Yeni split, diğer formatta kalmış
+eski train/val dosyalarını siler.
+Çalıştır: python -m data.processors.splitter processed/mironlaw_train.jsonl [--format parquet]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+BUCKET_MB = 256
+PARQUET_ROW_GROUP = 10_000
+SPLITS = ("train", "val")
+
+
+def iter_jsonl(path: str | Path) -> Iterator[Dict[str, Any]]:
+    """JSONL kayıtlarını tek tek üretir; bozuk satırları atlar."""
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except Exception:
+                continue
+
+
+def _assign(line: bytes, key: bytes, val_ratio: float, buckets: int) -> tuple[int, int]:
+    h = int.from_bytes(hashlib.blake2b(line, digest_size=8, key=key).digest(), "little")
+    split = 1 if (h >> 32) < val_ratio * (1 << 32) else 0
+    return split, (h & 0xFFFFFFFF) % buckets
+
+
+def _messages_type(pa):
+    return pa.list_(pa.struct([("role", pa.string()), ("content", pa.string())]))
+
+
+def _nullable(pa, t):
+    """Hiç değer görülmemiş (null tipli) alanları nullable string yapar; iç içe tiplerde de."""
+    if pa.types.is_null(t):
+        return pa.string()
+    if pa.types.is_list(t) or pa.types.is_large_list(t):
+        return pa.list_(_nullable(pa, t.value_type))
+    if pa.types.is_struct(t):
+        return pa.struct([pa.field(f.name, _nullable(pa, f.type)) for f in t])
+    return t
+
+
+def _parquet_schema(parts: list[Path]):
+    """
+    Split'in tüm kayıtlarından Parquet şemasını çıkarır (kayıtlar RAM'e
+    alınmaz, row group'lar halinde okunur). messages tipi sabittir; diğer
+    alanların tipleri pa.unify_schemas ile genişletilir, yalnızca null
+    görülen alanlar nullable string olur. Böylece ilk row group'ta hep null
+    olan bir alan sonraki batch'lerde değer aldığında yazım kırılmaz.
+    """
+    import pyarrow as pa
+
+    schema = None
+
+    def widen(rows: list[dict]) -> None:
+        nonlocal schema
+        if rows:
+            found = pa.Table.from_pylist(rows).schema
+            schema = found if schema is None else pa.unify_schemas([schema, found], promote_options="permissive")
+
+    for part in parts:
+        rows: list[dict] = []
+        with part.open("rb") as f:
+            for line in f:
+                rec = json.loads(line)
+                rec.pop("messages", None)
+                rows.append(rec)
+                if len(rows) >= PARQUET_ROW_GROUP:
+                    widen(rows)
+                    rows = []
+        widen(rows)
+
+    fields = [pa.field("messages", _messages_type(pa))]
+    fields += [pa.field(f.name, _nullable(pa, f.type)) for f in (schema or [])]
+    return pa.schema(fields)
+
+
+class _ParquetSink:
+    """Kayıtların tüm alanlarını verilen şemayla Parquet'e, row group'lar halinde yazar."""
+
+    def __init__(self, path: Path, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = schema
+        self._writer = pq.ParquetWriter(str(path), schema)
+        self._rows: list[dict] = []
+
+    def write(self, line: str) -> None:
+        self._rows.append(json.loads(line))
+        if len(self._rows) >= PARQUET_ROW_GROUP:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+class _JsonlSink:
+    def __init__(self, path: Path):
+        self._f = path.open("w", encoding="utf-8")
+
+    def write(self, line: str) -> None:
+        self._f.write(line + "\n")
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def split_jsonl(
+    src: str | Path,
+    out_dir: str | Path,
+    val_ratio: float = 0.02,
+    seed: int = 42,
+    fmt: str = "jsonl",
+    bucket_mb: int = BUCKET_MB,
+) -> tuple[int, int]:
+    """
+    src'yi out_dir/train.{fmt} ve out_dir/val.{fmt} olarak böler.
+    Returns: (train_sayısı, val_sayısı)
+    """
+    if fmt not in ("jsonl", "parquet"):
+        raise ValueError(f"Bilinmeyen format: {fmt}")
+    src = Path(src)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    buckets = max(1, math.ceil(src.stat().st_size / (bucket_mb * 1024 * 1024)))
+    key = hashlib.blake2b(str(seed).encode(), digest_size=16).digest()
+    counts = [0, 0]
+    tmp = Path(tempfile.mkdtemp(prefix="split_", dir=out_dir))
+
+    try:
+        # ── Dağıt
+        handles = [[(tmp / f"{name}_{b:04d}.jsonl").open("wb") for b in range(buckets)] for name in SPLITS]
+        try:
+            with src.open("rb") as fin:
+                for raw in fin:
+                    line = raw.strip()
+                    if not line:
+                        continue
+                    split, bucket = _assign(line, key, val_ratio, buckets)
+                    handles[split][bucket].write(line + b"\n")
+                    counts[split] += 1
+        finally:
+            for group in handles:
+                for h in group:
+                    h.close()
+
+        # ── Karıştır + yaz
+        for split, name in enumerate(SPLITS):
+            out = out_dir / f"{name}.{fmt}"
+            if fmt == "parquet":
+                sink = _ParquetSink(out, _parquet_schema([tmp / f"{name}_{b:04d}.jsonl" for b in range(buckets)]))
+            else:
+                sink = _JsonlSink(out)
+            try:
+                for b in range(buckets):
+                    part = tmp / f"{name}_{b:04d}.jsonl"
+                    # bytes.splitlines: JSON içindeki U+2028 gibi ayraçlarda bölmez
+                    lines = part.read_bytes().splitlines()
+                    part.unlink()
+                    random.Random(seed * 1_000_003 + b).shuffle(lines)
+                    for line in lines:
+                        sink.write(line.decode("utf-8"))
+            finally:
+                sink.close()
+        # Diğer formatta kalmış eski split, yeni split'in yerine okunmasın
+        for name in SPLITS:
+            for other in ("jsonl", "parquet"):
+                if other != fmt:
+                    (out_dir / f"{name}.{other}").unlink(missing_ok=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return counts[0], counts[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming train/val split")
+    parser.add_argument("src")
+    parser.add_argument("--out-dir", default=None, help="Varsayılan: src ile aynı klasör")
+    parser.add_argument("--val-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    args = parser.parse_args()
+
+    src = Path(args.src)
+    train, val = split_jsonl(src, args.out_dir or src.parent, args.val_ratio, args.seed, args.format)
+    print(f"Split: train={train:,} | val={val:,}")
+
+
+if __name__ == "__main__":
+    main()
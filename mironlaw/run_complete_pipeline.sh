@@ -43,15 +43,7 @@ if [ -f "$DILEKCE_FILE" ] && [ -f "$TRAIN_FILE" ]; then
     COUNT=$(wc -l < "$TRAIN_FILE" | tr -d ' ')
     echo "Dilekçe eklendi. Toplam train.jsonl: $COUNT satır" | tee -a "$LOG"
     # Split güncelle
-    python3 -c "
-import random, pathlib
-lines = pathlib.Path('$TRAIN_FILE').read_text(encoding='utf-8').strip().splitlines()
-random.shuffle(lines)
-split = int(len(lines) * 0.98)
-pathlib.Path('processed/train.jsonl').write_text('\n'.join(lines[:split]), encoding='utf-8')
-pathlib.Path('processed/val.jsonl').write_text('\n'.join(lines[split:]), encoding='utf-8')
-print(f'Split: train={split:,} | val={len(lines)-split:,}')
-" 2>&1 | tee -a "$LOG"
+    python3 -m data.processors.splitter "$TRAIN_FILE" --out-dir processed --val-ratio 0.02 2>&1 | tee -a "$LOG"
 else
     echo "[WARN] train.jsonl veya dilekçe dosyası bulunamadı" | tee -a "$LOG"
 fi
@@ -0,0 +1,209 @@
+"""CollectionScheduler against local fake HTTP servers (no external network)."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import pathlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from rich.console import Console  # noqa: E402
+
+from mironlaw.data.collectors import yargitay_emsal  # noqa: E402
+from mironlaw.data.collectors.base import BaseCollector  # noqa: E402
+from mironlaw.data.collectors.scheduler import CollectionScheduler, HostBudget  # noqa: E402
+
+YEARS = (2020, 2021)
+DAIRELER = (1, 2)
+PER_SHARD = 12
+PAGE_SIZE = 5
+
+
+def _decisions(year: int, daire_id: int) -> list:
+    # daire 0 ("Tümü") tüm dairelerin kararlarını döner: shard'lar arası örtüşme
+    daireler = DAIRELER if daire_id == 0 else (daire_id,)
+    return [f"{year}{d}{i:02d}" for d in daireler for i in range(PER_SHARD)]
+
+
+class FakeServer:
+    """Thread'li yerel HTTP sunucusu; eşzamanlı istek tepe değerini ölçer."""
+
+    def __init__(self, handle, delay: float = 0.02):
+        self.handle = handle
+        self.delay = delay
+        self.requests: list = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with server._lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    server.requests.append((url.path, query))
+                try:
+                    time.sleep(server.delay)
+                    status, ctype, body = server.handle(url.path, query)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.netloc = f"127.0.0.1:{self._httpd.server_address[1]}"
+        self.url = f"http://{self.netloc}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.max_in_flight = 0
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeYargitay:
+    def __init__(self):
+        self.fail_pages: set = set()
+
+    def __call__(self, path: str, query: dict):
+        if path == "/BilgiBankasiIslem":
+            year = int(query["baslangicTarihi"][-4:])
+            daire_id, sayfa = int(query["daire_id"]), int(query["sayfa"])
+            if (year, daire_id, sayfa) in self.fail_pages:
+                return 500, "text/plain", "down"
+            size = int(query["kayitSayisi"])
+            ids = _decisions(year, daire_id)[(sayfa - 1) * size:sayfa * size]
+            rows = [{"hkm_id": i, "esas_no": f"E.{i}", "ozet": "özet"} for i in ids]
+            return 200, "application/json", json.dumps({"data": rows, "toplam": len(rows)})
+        if path == "/VeriBilgi":
+            text = f"Karar {query['hkm_id']} " + "Gereği düşünüldü. " * 10
+            return 200, "text/html", f'<html><body><div class="kararMetni">{text}</div></body></html>'
+        return 404, "text/plain", "yok"
+
+
+class EchoCollector(BaseCollector):
+    """İkinci host: her shard'da istekleri aynı anda açan küçük bir collector."""
+
+    source_name = "echo"
+
+    def __init__(self, output_dir, base_url: str):
+        super().__init__(output_dir)
+        self.base_url = base_url
+
+    def shards(self):
+        return [(n,) for n in range(8)]
+
+    async def collect_shard(self, client, seen, n):
+        responses = await asyncio.gather(*(client.get(f"{self.base_url}/echo/{n}/{i}") for i in range(3)))
+        for i, resp in enumerate(responses):
+            record = {"id": f"echo_{n}_{i}", "text": resp.text}
+            if record["id"] not in seen:
+                self._append(record)
+                yield record
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    yargitay = FakeYargitay()
+    court = FakeServer(yargitay)
+    echo = FakeServer(lambda path, query: (200, "text/plain", path))
+    monkeypatch.setattr(yargitay_emsal, "BASE_URL", court.url)
+    monkeypatch.setattr(yargitay_emsal, "PAGE_SIZE", PAGE_SIZE)
+    monkeypatch.setattr(yargitay_emsal, "MAX_RETRIES", 1)
+
+    async def no_jitter(*_args):
+        return None
+    monkeypatch.setattr(yargitay_emsal, "jitter", no_jitter)
+    yield yargitay, court, echo
+    court.close()
+    echo.close()
+
+
+def _run(tmp_path, court, echo, budgets):
+    scheduler = CollectionScheduler(budgets=budgets, console=Console(file=io.StringIO()))
+    scheduler.add_sharded(
+        "Yargıtay",
+        yargitay_emsal.YargitayEmsalCollector(
+            output_dir=tmp_path, start_year=YEARS[0], end_year=YEARS[-1], daire_ids=[0, *DAIRELER],
+        ),
+        workers=6,
+    )
+    scheduler.add_sharded("Echo", EchoCollector(tmp_path, echo.url), workers=8)
+    return asyncio.run(scheduler.run(refresh_interval=0.05))
+
+
+def _ids(path: pathlib.Path) -> list:
+    return [json.loads(line)["id"] for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _pages(court: FakeServer, year: int, daire_id: int) -> list:
+    return [
+        int(q["sayfa"]) for path, q in court.requests
+        if path == "/BilgiBankasiIslem" and q["baslangicTarihi"].endswith(str(year)) and int(q["daire_id"]) == daire_id
+    ]
+
+
+def test_scheduler_budgets_resume_and_unique_ids(servers, tmp_path):
+    yargitay, court, echo = servers
+    budgets = {
+        court.netloc: HostBudget(concurrency=3, min_interval=0.0),
+        echo.netloc: HostBudget(concurrency=2, min_interval=0.0),
+    }
+
+    # 1. çalıştırma: 2020 / 1. daire'nin 2. sayfası alınamıyor
+    yargitay.fail_pages = {(2020, 1, 2)}
+    metrics = _run(tmp_path, court, echo, budgets)
+
+    assert 1 < court.max_in_flight <= 3
+    assert 1 < echo.max_in_flight <= 2
+    assert metrics.sources["Yargıtay"].status == "tamam"
+    assert metrics.sources["Yargıtay"].shards_done == len(YEARS) * 3
+    assert metrics.hosts[court.netloc].errors == 1
+    first_run = _ids(tmp_path / "yargitay_emsal.jsonl")
+    assert len(first_run) == len(set(first_run))
+
+    # 2. çalıştırma: yalnızca yarım kalan shard, checkpoint'indeki sayfadan devam eder
+    yargitay.fail_pages = set()
+    court.reset()
+    _run(tmp_path, court, echo, budgets)
+
+    assert court.max_in_flight <= 3
+    assert _pages(court, 2020, 1) == [2, 3]
+    for year in YEARS:
+        for daire_id in (0, *DAIRELER):
+            if (year, daire_id) != (2020, 1):
+                assert _pages(court, year, daire_id) == []
+
+    ids = _ids(tmp_path / "yargitay_emsal.jsonl")
+    assert len(ids) == len(set(ids))
+    expected = {f"yargitay_{i}" for year in YEARS for i in _decisions(year, 0)}
+    assert set(ids) == expected
+    assert sorted(_ids(tmp_path / "echo.jsonl")) == sorted(f"echo_{n}_{i}" for n in range(8) for i in range(3))
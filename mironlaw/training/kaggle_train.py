@@ -109,8 +109,11 @@ try:
 except Exception:
     # Seçenek B: Kaggle'a upload ettiğin dosyadan yükle
     print("HF dataset bulunamadı, yerel dosya aranıyor...")
-    data = load_jsonl("/kaggle/input/mironlaw-data/train.jsonl")
-    ds = Dataset.from_list(data)
+    if os.path.exists("/kaggle/input/mironlaw-data/train.parquet"):
+        # pipeline --format parquet çıktısı: RAM'e kopyalanmadan memory-map edilir
+        ds = Dataset.from_parquet("/kaggle/input/mironlaw-data/train.parquet")
+    else:
+        ds = load_dataset("json", data_files="/kaggle/input/mironlaw-data/train.jsonl", split="train")
     print(f"Yerel dosyadan yüklendi: {len(ds):,} örnek")
 
 